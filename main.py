@@ -6,6 +6,9 @@
     python main.py                          # 运行完整管道
     python main.py --skip-pdf                # 跳过PDF处理，只导入数据
     python main.py --skip-import             # 只处理PDF，不导入数据
+    python main.py --streaming               # 流式：PDF转换与解析入库重叠执行
+    python main.py retry-failed              # 只重新处理死信存储中的失败文档
+    python main.py --lease                   # 多节点：从共享 Postgres 租约表领取PDF
     python main.py --help                    # 查看帮助
 """
 
@@ -18,6 +21,7 @@ sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from src.core.config import Config, UnifiedConfig, setup_logging
 from src.core.pipeline import KnowledgePipeline
+from src.core.metrics import start_exporter
 
 def main():
     import argparse
@@ -30,10 +34,28 @@ def main():
   python main.py                          # 完整处理流程
   python main.py --skip-pdf               # 只处理已有的Markdown文件
   python main.py --skip-import            # 只转换PDF为Markdown
+  python main.py --streaming              # 每篇PDF转换完成即解析入库
+  python main.py retry-failed             # 重试已到期的失败文档
+  python main.py retry-failed --force     # 立即重试全部失败文档（含已放弃的）
+  python main.py --lease                  # 多台机器共享同一 Postgres 分摊PDF积压
   python main.py --log-level DEBUG        # 调试模式运行
         """
     )
 
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["run", "retry-failed"],
+        default="run",
+        help="run: 运行管道（默认）；retry-failed: 只重新处理死信存储中的失败文档"
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="retry-failed 时忽略重试等待时间，并包含已放弃的文档"
+    )
+
     parser.add_argument(
         "--skip-pdf",
         action="store_true",
@@ -74,12 +96,31 @@ def main():
         help="每 N 个文件输出阶段统计并写入 logs/pdf_progress.jsonl"
     )
 
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="流式模式：每篇PDF转换完成即送入解析/入库（有界队列，STREAMING_QUEUE_SIZE / STREAMING_IMPORT_WORKERS）"
+    )
+
+    parser.add_argument(
+        "--lease",
+        action="store_true",
+        help="多节点协调：从共享 Postgres 的 work_lease 表领取PDF（默认按 WORK_LEASE）"
+    )
+
     parser.add_argument(
         "--config",
         type=Path,
         help="指定配置文件路径（默认: config/config.env）"
     )
 
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="在该端口提供 Prometheus 格式的 /metrics（默认取 METRICS_PORT，0 表示关闭）"
+    )
+
     args = parser.parse_args()
 
     try:
@@ -95,17 +136,27 @@ def main():
         logger.info("学术论文知识图谱构建工具")
         logger.info("=" * 50)
 
+        # 指标导出（可选）
+        if args.metrics_port != 0:
+            start_exporter(args.metrics_port)
+
         # 创建管道
         pipeline = KnowledgePipeline(config)
+        if args.lease:
+            pipeline.lease_mode = True
 
         # 运行管道
-        results = pipeline.run_full_pipeline(
-            skip_pdf=args.skip_pdf,
-            skip_import=args.skip_import,
-            limit_pdfs=args.limit_pdfs,
-            limit_md=args.limit_md,
-            stats_every=args.stats_every
-        )
+        if args.command == "retry-failed":
+            results = pipeline.retry_failed(force=args.force, stats_every=args.stats_every)
+        else:
+            results = pipeline.run_full_pipeline(
+                skip_pdf=args.skip_pdf,
+                skip_import=args.skip_import,
+                limit_pdfs=args.limit_pdfs,
+                limit_md=args.limit_md,
+                stats_every=args.stats_every,
+                streaming=args.streaming
+            )
 
         # 输出结果
         print("\n" + "=" * 50)
@@ -120,10 +171,20 @@ def main():
         if results.get('pdf_processing'):
             pdf = results['pdf_processing']
             print(f"📄 PDF处理: {pdf['processed']} 成功, {pdf['failed']} 失败")
+            for node in pdf.get('lease_nodes') or []:
+                state = "在线" if node['alive'] else "离线"
+                print(f"   🖥️  {node['node_id']} ({state}): {node['processed']} 成功, {node['failed']} 失败, "
+                      f"{node['files_per_sec']:.2f} 文件/秒")
 
         if results.get('data_import'):
             imp = results['data_import']
-            print(f"💾 数据导入: {imp['imported']} 成功, {imp['failed']} 失败")
+            print(f"💾 数据导入: {imp['imported']} 成功, {imp.get('skipped', 0)} 跳过(未变化), {imp['failed']} 失败")
+
+        dead = results.get('dead_letter')
+        if dead and dead['total']:
+            stages = ", ".join(f"{stage} {counts}" for stage, counts in dead['by_stage'].items())
+            print(f"📮 死信记录: {dead['total']} 个（{stages}）")
+            print("   运行 `python main.py retry-failed` 重新处理")
 
         if results.get('error'):
             print(f"❗ 错误: {results['error']}")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+研究领域推断基准：对比旧实现（每次调用重建字典、逐词子串扫描）与编译后的 FieldTaxonomy，
+输出两者的分配差异与单篇耗时。
+
+记录来源：
+- --md-dir：用启发式解析（不调用LLM）得到 title/abstract/keywords/venue
+- --json-dir：已解析的论文JSON（如 llm_parse_md_to_json.py 的输出）
+
+示例：
+  python scripts/benchmark_field_taxonomy.py --md-dir data/output/markdown --repeat 20 \
+    --out logs/benchmark_field_taxonomy.json
+  RESEARCH_FIELD_TAXONOMY=config/research_fields.json python scripts/benchmark_field_taxonomy.py --json-dir data/json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 允许导入 src/*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.llm_parser import LLMParser
+from src.utils.field_mapping import FieldTaxonomy, get_taxonomy
+
+
+# ---- 旧实现，仅作基线 ----
+
+def _legacy_norm(s):
+    return (s or "").strip().lower()
+
+
+def legacy_infer_research_field(data: Dict[str, Any]) -> Optional[str]:
+    title = _legacy_norm(data.get("title"))
+    abstract = _legacy_norm(data.get("abstract"))
+    venue = _legacy_norm(data.get("venue"))
+    keywords = " ".join([_legacy_norm(k) for k in data.get("keywords") or []])
+    content = " ".join(filter(None, [title, abstract, keywords, venue]))
+    venue_map = {
+        "chemical engineering": "Chemical Engineering",
+        "chemical engineering journal": "Chemical Engineering",
+        "cej": "Chemical Engineering",
+        "marine pollution bulletin": "Marine Pollution",
+        "marine pollution": "Marine Pollution",
+        "water research": "Environmental Engineering",
+        "journal of environmental": "Environmental Engineering",
+    }
+    for k, v in venue_map.items():
+        if k in venue:
+            return v
+    field_signals = {
+        "Chemical Engineering": {"chemical engineering", "chem eng", "reaction", "catalysis",
+                                 "adsorption", "oxygen vacancy", "kinetics", "process"},
+        "Marine Pollution": {"marine pollution", "marine", "coastal", "ocean", "sea", "reef"},
+        "Environmental Engineering": {"wastewater", "water quality", "sewage", "hrt", "cod", "bod",
+                                      "bioreactor", "activated sludge", "nitrification", "denitrification",
+                                      "pollutant", "removal", "treatment"},
+        "Materials Science": {"materials", "nanomaterial", "nanomaterials", "sensor", "graphene",
+                              "lignocellulose", "composite", "adsorbent"},
+    }
+    scores = {f: 0 for f in field_signals}
+    if "chemical" in venue and "engineering" in venue:
+        scores["Chemical Engineering"] += 2
+    if "marine" in venue and ("pollution" in venue or "bulletin" in venue):
+        scores["Marine Pollution"] += 2
+    if "water" in venue or "environment" in venue:
+        scores["Environmental Engineering"] += 1
+    for field, tokens in field_signals.items():
+        for t in tokens:
+            if t in content:
+                scores[field] += 1
+    best_field, best_score = None, 0
+    for f, s in scores.items():
+        if s > best_score:
+            best_field, best_score = f, s
+    return best_field if best_score > 0 else None
+
+
+# ---- 记录加载 ----
+
+def load_md_records(md_dir: Path, limit: int) -> List[Dict[str, Any]]:
+    parser = LLMParser(None)
+    parser.llm_policy = 'never'
+    records = []
+    for md in sorted(md_dir.rglob('*.md'))[:limit]:
+        result = parser.heuristic_stage(str(md))["result"]
+        result["_source"] = md.name
+        records.append(result)
+    return records
+
+
+def load_json_records(json_dir: Path, limit: int) -> List[Dict[str, Any]]:
+    records = []
+    for p in sorted(json_dir.rglob('*.json'))[:limit]:
+        try:
+            data = json.loads(p.read_text(encoding='utf-8'))
+        except Exception:
+            continue
+        for item in data if isinstance(data, list) else [data]:
+            if isinstance(item, dict):
+                item.setdefault("_source", p.name)
+                records.append(item)
+    return records
+
+
+def time_per_record(fn, records, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(records)
+    return (time.perf_counter() - t0) / (repeat * len(records))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='研究领域推断基准（旧实现 vs 编译词表）')
+    ap.add_argument('--md-dir', type=Path, help='Markdown目录')
+    ap.add_argument('--json-dir', type=Path, help='已解析论文JSON目录')
+    ap.add_argument('--taxonomy', type=Path, help='词表JSON文件（默认取 RESEARCH_FIELD_TAXONOMY 或内置词表）')
+    ap.add_argument('--limit', type=int, default=10000, help='最多加载的文件数')
+    ap.add_argument('--repeat', type=int, default=20, help='计时重复次数')
+    ap.add_argument('--out', type=Path, help='结果JSON输出路径')
+    args = ap.parse_args()
+
+    records: List[Dict[str, Any]] = []
+    if args.md_dir:
+        records += load_md_records(args.md_dir, args.limit)
+    if args.json_dir:
+        records += load_json_records(args.json_dir, args.limit)
+    if not records:
+        print('⚠️ 未找到记录，请指定 --md-dir 或 --json-dir')
+        return
+
+    taxonomy = FieldTaxonomy.from_file(args.taxonomy) if args.taxonomy else get_taxonomy()
+    old = [legacy_infer_research_field(r) for r in records]
+    new = taxonomy.classify_batch(records)
+    diffs = [
+        {"source": r.get("_source"), "legacy": o, "taxonomy": n, "scores": {
+            k: v for k, v in taxonomy.score(r).items() if v}}
+        for r, o, n in zip(records, old, new) if o != n
+    ]
+
+    old_s = time_per_record(lambda rs: [legacy_infer_research_field(r) for r in rs], records, args.repeat)
+    new_s = time_per_record(taxonomy.classify_batch, records, args.repeat)
+    report = {
+        "records": len(records),
+        "agreement": round(1 - len(diffs) / len(records), 4),
+        "legacy_us_per_record": round(old_s * 1e6, 2),
+        "taxonomy_us_per_record": round(new_s * 1e6, 2),
+        "speedup": round(old_s / new_s, 2) if new_s > 0 else None,
+        "distribution": {str(f): new.count(f) for f in sorted(set(new), key=str)},
+        "diffs": diffs,
+    }
+
+    print(f"📊 记录 {len(records)} 条 | 一致率 {report['agreement']:.1%} | "
+          f"旧实现 {report['legacy_us_per_record']}µs/条 | 新实现 {report['taxonomy_us_per_record']}µs/条 | "
+          f"加速 {report['speedup']}x")
+    for d in diffs[:20]:
+        print(f"- {d['source']}: {d['legacy']} → {d['taxonomy']} {d['scores']}")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLMParser 离线压测：默认启动本地 Ollama 替身（scripts/mock_ollama.py），
+也可通过 --endpoint 指向真实服务。以指定并发驱动 parse_markdown_file，
+输出 p50/p95/p99 延迟、吞吐、重试/回退率与启发式/LLM 耗时占比。
+
+示例：
+  # 离线：对数正态延迟 + 注入故障，并发 8
+  python scripts/benchmark_llm_harness.py --md-dir tests/data/md --docs 200 --concurrency 8 \
+    --latency-dist lognormal --latency-ms 300 --latency-spread-ms 150 \
+    --error-rate 0.02 --empty-rate 0.05 --malformed-rate 0.03 --out logs/llm_harness.json
+
+  # 真实服务，与基线对比
+  python scripts/benchmark_llm_harness.py --md-dir data/output/markdown --docs 50 \
+    --endpoint http://127.0.0.1:11434 --baseline logs/llm_harness.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 允许导入 src/*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.config import Config
+from src.core.llm_parser import LLMParser
+from mock_ollama import MockOllamaServer, add_behavior_args, behavior_from_args
+
+
+def percentile(sorted_vals: List[float], pct: float) -> Optional[float]:
+    """最近秩百分位；输入需已排序。"""
+    if not sorted_vals:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_vals)))
+    return sorted_vals[min(rank, len(sorted_vals)) - 1]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, Optional[float]]:
+    vals = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        "p50_ms": ms(percentile(vals, 50)),
+        "p95_ms": ms(percentile(vals, 95)),
+        "p99_ms": ms(percentile(vals, 99)),
+        "mean_ms": ms(sum(vals) / len(vals)) if vals else None,
+        "max_ms": ms(vals[-1]) if vals else None,
+    }
+
+
+def run_benchmark(parser: LLMParser, md_files: List[Path], concurrency: int) -> Dict:
+    """并发解析，返回延迟、吞吐与 LLMParser 统计。"""
+    latencies: List[float] = []
+    failures: List[Dict[str, str]] = []
+
+    def _one(md: Path):
+        t0 = time.perf_counter()
+        try:
+            parser.parse_markdown_file(str(md))
+            return time.perf_counter() - t0, None
+        except Exception as e:
+            return time.perf_counter() - t0, f"{md.name}: {e}"
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, err in pool.map(_one, md_files):
+            latencies.append(elapsed)
+            if err:
+                failures.append(err)
+    wall = time.perf_counter() - t_start
+
+    gate = parser.get_gate_stats()
+    called = gate["llm_called"]
+    busy = gate["heuristic_secs"] + gate["llm_secs"]
+    return {
+        "docs": len(md_files),
+        "concurrency": concurrency,
+        "wall_secs": round(wall, 3),
+        "throughput_docs_per_sec": round(len(md_files) / wall, 3) if wall > 0 else None,
+        "latency": latency_summary(latencies),
+        "failures": failures,
+        "llm_called": called,
+        "retry_rate": round(gate["llm_retries"] / called, 4) if called else 0.0,
+        "fallback_rate": round(gate["llm_fallbacks"] / called, 4) if called else 0.0,
+        "time_split": {
+            "heuristic_secs": round(gate["heuristic_secs"], 3),
+            "llm_secs": round(gate["llm_secs"], 3),
+            "heuristic_pct": round(100.0 * gate["heuristic_secs"] / busy, 2) if busy > 0 else 0.0,
+        },
+        "llm_gate": gate,
+        "llm_sizing": parser.get_sizing_stats(),
+        "llm_prompt": parser.get_prompt_stats(),
+        "llm_stream": parser.get_stream_stats(),
+        "llm_retry": parser.get_retry_stats(),
+    }
+
+
+def compare_with_baseline(report: Dict, baseline: Dict) -> Dict[str, Dict[str, Optional[float]]]:
+    """与基线报告对比关键指标（正数表示变慢/变差）。"""
+    diff = {}
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        cur, base = report["latency"].get(key), baseline.get("latency", {}).get(key)
+        diff[key] = {"current": cur, "baseline": base,
+                     "delta_pct": round(100.0 * (cur - base) / base, 2) if cur is not None and base else None}
+    cur, base = report["throughput_docs_per_sec"], baseline.get("throughput_docs_per_sec")
+    diff["throughput_docs_per_sec"] = {"current": cur, "baseline": base,
+                                       "delta_pct": round(100.0 * (base - cur) / base, 2) if cur and base else None}
+    return diff
+
+
+def main():
+    ap = argparse.ArgumentParser(description='LLMParser 离线/在线压测')
+    ap.add_argument('--md-dir', type=Path, default=Path(__file__).resolve().parent.parent / 'tests' / 'data' / 'md',
+                    help='Markdown目录')
+    ap.add_argument('--docs', type=int, default=50, help='解析文档数（目录文件循环复用）')
+    ap.add_argument('--concurrency', type=int, default=4, help='并发数')
+    ap.add_argument('--endpoint', help='真实 Ollama 地址；为空时启动本地替身')
+    ap.add_argument('--policy', choices=['always', 'missing', 'never'], help='覆盖 LLM_INVOKE_POLICY')
+    ap.add_argument('--out', type=Path, help='结果JSON输出路径')
+    ap.add_argument('--baseline', type=Path, help='基线结果JSON，用于回归对比')
+    add_behavior_args(ap)
+    args = ap.parse_args()
+
+    md_pool = sorted(args.md_dir.rglob('*.md'))
+    if not md_pool:
+        print(f"⚠️ 未找到Markdown文件: {args.md_dir}")
+        return
+    md_files = [md_pool[i % len(md_pool)] for i in range(args.docs)]
+
+    if args.policy:
+        os.environ['LLM_INVOKE_POLICY'] = args.policy
+    # 替身模式下关闭云端回退，避免误调 DashScope
+    mock = None if args.endpoint else MockOllamaServer(behavior_from_args(args))
+    with (mock if mock else nullcontext()):
+        parser = LLMParser(Config())
+        parser.use_local = True
+        parser.ollama_url = args.endpoint or mock.url
+        if mock:
+            parser.api_key = None
+        print(f"🚀 压测: {len(md_files)} 篇 | 并发 {args.concurrency} | 端点 {parser.ollama_url}"
+              f"{' (替身)' if mock else ''} | 策略 {parser.llm_policy}")
+        report = run_benchmark(parser, md_files, args.concurrency)
+        report["endpoint"] = "mock" if mock else args.endpoint
+        if mock:
+            report["mock"] = {"behavior": vars(mock.behavior), "server": mock.snapshot()}
+
+    lat = report["latency"]
+    print(f"⏱️  p50 {lat['p50_ms']}ms | p95 {lat['p95_ms']}ms | p99 {lat['p99_ms']}ms | 吞吐 "
+          f"{report['throughput_docs_per_sec']} 篇/s")
+    split = report["time_split"]
+    print(f"🔁 重试率 {report['retry_rate']:.1%} | 回退率 {report['fallback_rate']:.1%} | "
+          f"启发式 {split['heuristic_secs']}s / LLM {split['llm_secs']}s (启发式占比 {split['heuristic_pct']}%)")
+    if report["failures"]:
+        print(f"❌ 失败 {len(report['failures'])} 篇")
+
+    if args.baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        report["baseline_diff"] = compare_with_baseline(report, baseline)
+        print('\n与基线对比（delta_pct 为正表示退化）:')
+        for key, d in report["baseline_diff"].items():
+            print(f"- {key}: {d['current']} vs {d['baseline']} ({d['delta_pct']}%)")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
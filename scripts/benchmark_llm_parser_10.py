@@ -115,10 +115,13 @@ def main():
         if ok:
             success_paths.append(outp)
 
-    # 写入耗时文件
+    # 写入耗时文件（附LLM门控统计：跳过率与逐字段来源）
+    gate_stats = llm.get_gate_stats()
     args.out_dir.mkdir(parents=True, exist_ok=True)
     with open(args.out_dir / 'timings.json', 'w', encoding='utf-8') as f:
-        json.dump({'timings': timings}, f, ensure_ascii=False, indent=2)
+        json.dump({'timings': timings, 'llm_gate': gate_stats, 'llm_stream': llm.get_stream_stats(),
+                   'llm_sizing': llm.get_sizing_stats(), 'llm_prompt': llm.get_prompt_stats()},
+                  f, ensure_ascii=False, indent=2)
 
     # 当前覆盖率
     cov_cur = compute_coverage(success_paths)
@@ -130,6 +133,25 @@ def main():
     avg = round(sum(t['elapsed_s'] for t in timings if t['ok']) / max(1, sum(1 for t in timings if t['ok'])), 2)
     print(f"\n平均耗时(成功样本): {avg}s")
 
+    # LLM门控：跳过率与字段来源（策略见 LLM_INVOKE_POLICY）
+    print(f"\nLLM策略: {llm.llm_policy} | 调用 {gate_stats['llm_called']} | 跳过 {gate_stats['llm_skipped']} "
+          f"| 跳过率 {gate_stats['skip_rate']:.1%}")
+    for k, src in gate_stats['field_sources'].items():
+        print(f"- {k}: heuristic={src['heuristic']} llm={src['llm']} missing={src['missing']}")
+
+    if llm.stream:
+        st = llm.get_stream_stats()
+        print(f"\n流式生成: 请求 {st['requests']} | 平均首token {st['avg_ttft_secs']}s | 最大首token {st['ttft_max_secs']:.2f}s "
+              f"| {st['tokens_per_sec']} tok/s | 提前终止 {st['early_stops']} | 触达token上限 {st['token_ceiling_hits']}")
+
+    sz = llm.get_sizing_stats()
+    print(f"\n上下文分档({'自适应' if llm.adaptive_ctx else '固定'}): {sz['buckets']} | 平均提示 {sz['avg_prompt_tokens']} tokens "
+          f"| 提示截断 {sz['prompt_truncations']} | 上下文溢出 {sz['ctx_overflows']}")
+
+    for key, pst in llm.get_prompt_stats().items():
+        print(f"提示模板 {key}: 请求 {pst['requests']} | 前缀缓存命中率 {pst['cache_hit_rate']:.1%} "
+              f"| 平均 prompt_eval {pst['avg_prompt_eval_ms']}ms")
+
     # 基线覆盖率（可选）
     if args.baseline_dir and args.baseline_dir.exists():
         baseline_files = sorted(list(args.baseline_dir.glob('*.json')))[: len(success_paths)]
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+启发式抽取微基准：对比逐次正则扫描（旧实现）与 MarkdownDocument 一次索引的耗时，
+并校验两者抽取结果一致。默认取目录中体积最大的 N 个 Markdown。
+
+示例：
+  python scripts/benchmark_markdown_index.py \
+    --md-dir /root/kb_create/data/output/markdown \
+    --top 20 --repeat 50 --out logs/benchmark_markdown_index.json
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# 允许导入 src/*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.markdown_document import _MD_TO_TXT_STEPS, MarkdownDocument
+from src.core.llm_parser import (
+    ABSTRACT_HEADINGS,
+    REFERENCE_HEADINGS,
+    _extract_authors,
+    _extract_doi,
+    _extract_keywords,
+)
+
+
+# ---- 旧实现（每个抽取器独立扫描全文、按次编译正则），仅作基线 ----
+
+def _legacy_section_text(text, names):
+    for name in names:
+        m = re.search(rf"^\s*#\s*{re.escape(name)}\s*$", text, re.MULTILINE | re.IGNORECASE)
+        if m:
+            start = m.end()
+            next_m = re.search(r"^\s*#\s+", text[start:], re.MULTILINE)
+            end = start + (next_m.start() if next_m else len(text))
+            return text[start:end].strip()
+    return ""
+
+
+def _legacy_authors(text):
+    lines = text.splitlines()
+    title_idx = None
+    for i in range(min(15, len(lines))):
+        if re.match(r"^\s*#\s+", lines[i]):
+            title_idx = i
+            break
+    if title_idx is None:
+        return []
+    for j in range(title_idx + 1, min(title_idx + 8, len(lines))):
+        line = lines[j].strip()
+        if not line or line.startswith('#'):
+            continue
+        cleaned = re.sub(r"\s*[*^⁎]+", "", line)
+        parts = [p.strip() for p in re.split(r",|;", cleaned) if p.strip()]
+        authors = [p for p in parts if re.search(r"[A-Za-z]", p) and not re.search(r"\d", p)]
+        if authors:
+            return authors
+    return []
+
+
+def legacy_extract(text):
+    m = re.search(r"^\s*#\s+(.*)$", text, re.MULTILINE)
+    title = m.group(1).strip() if m else ""
+    abstract = _legacy_section_text(text, ABSTRACT_HEADINGS)
+    abstract = re.sub(r"\s+", " ", abstract).strip()[:4000] if abstract else ""
+    m = re.search(r"^\s*Keywords\s*:?\s*(.+)$", text, re.MULTILINE | re.IGNORECASE)
+    keywords = [t.strip().strip(',') for t in re.split(r"[,;]", m.group(1).strip()) if t.strip()] if m else []
+    m = re.search(r"10\.[0-9]{4,9}/\S+", text)
+    doi = m.group(0).strip().rstrip('.') if m else None
+    refs = _legacy_section_text(text, REFERENCE_HEADINGS)
+    references = [ln.strip() for ln in refs.splitlines() if ln.strip()][:50] if refs else []
+    return {
+        "title": title, "abstract": abstract, "authors": _legacy_authors(text),
+        "keywords": keywords, "doi": doi, "references": references,
+    }
+
+
+def legacy_md_to_txt(content):
+    content = re.sub(r"```[\s\S]*?```", "\n", content)
+    content = re.sub(r"!\[[^\]]*\]\([^\)]*\)", "", content)
+    content = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", content)
+    content = re.sub(r"^\s*#{1,6}\s*", "", content, flags=re.MULTILINE)
+    content = re.sub(r"[*_]+", "", content)
+    content = re.sub(r"^[\s>*-]+", "", content, flags=re.MULTILINE)
+    content = re.sub(r"^\s*\|?\s*-{2,}.*$", "", content, flags=re.MULTILINE)
+    content = re.sub(r"\n{3,}", "\n\n", content)
+    return content.strip()
+
+
+# ---- 新实现 ----
+
+def indexed_extract(text):
+    doc = MarkdownDocument(text)
+    abstract = doc.section(ABSTRACT_HEADINGS)
+    abstract = re.sub(r"\s+", " ", abstract).strip()[:4000] if abstract else ""
+    refs = doc.section(REFERENCE_HEADINGS)
+    return {
+        "title": doc.first_heading(), "abstract": abstract, "authors": _extract_authors(doc),
+        "keywords": _extract_keywords(doc), "doi": _extract_doi(doc),
+        # 参考文献已改为按条切分（见 reference_parser），此处仅对比章节定位结果
+        "references": [ln.strip() for ln in refs.splitlines() if ln.strip()][:50] if refs else [],
+    }
+
+
+def compiled_md_to_txt(content):
+    for pattern, repl in _MD_TO_TXT_STEPS:
+        content = pattern.sub(repl, content)
+    return content.strip()
+
+
+def time_per_call(fn, texts, repeat):
+    # 清空 re 模块缓存，模拟大批量运行中缓存被其他模式挤出的情形
+    re.purge()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - t0) / (repeat * len(texts))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Markdown 启发式抽取微基准')
+    ap.add_argument('--md-dir', type=Path, required=True, help='Markdown目录')
+    ap.add_argument('--top', type=int, default=10, help='取体积最大的N个文件')
+    ap.add_argument('--repeat', type=int, default=20, help='每个文件重复次数')
+    ap.add_argument('--out', type=Path, help='结果JSON输出路径')
+    args = ap.parse_args()
+
+    md_files = sorted(args.md_dir.rglob('*.md'), key=lambda p: p.stat().st_size, reverse=True)[: args.top]
+    if not md_files:
+        print('⚠️ 未找到Markdown文件')
+        return
+    texts = [p.read_text(encoding='utf-8', errors='ignore') for p in md_files]
+    total_kb = sum(len(t) for t in texts) / 1024
+
+    # 结果一致性校验
+    mismatches = []
+    for p, t in zip(md_files, texts):
+        old, new = legacy_extract(t), indexed_extract(t)
+        diff = [k for k in old if old[k] != new[k]]
+        if diff:
+            mismatches.append({'file': p.name, 'fields': diff})
+        if legacy_md_to_txt(t) != compiled_md_to_txt(t):
+            mismatches.append({'file': p.name, 'fields': ['md_to_txt']})
+
+    report = {'files': len(md_files), 'total_kb': round(total_kb, 1), 'repeat': args.repeat, 'mismatches': mismatches}
+    for name, old_fn, new_fn in [
+        ('heuristics', legacy_extract, indexed_extract),
+        ('md_to_txt', legacy_md_to_txt, compiled_md_to_txt),
+    ]:
+        old_s = time_per_call(old_fn, texts, args.repeat)
+        new_s = time_per_call(new_fn, texts, args.repeat)
+        report[name] = {
+            'legacy_ms_per_doc': round(old_s * 1000, 3),
+            'indexed_ms_per_doc': round(new_s * 1000, 3),
+            'speedup': round(old_s / new_s, 2) if new_s > 0 else None,
+        }
+        print(f"{name}: 旧实现 {old_s * 1000:.3f}ms/篇 | 新实现 {new_s * 1000:.3f}ms/篇 | 加速 {report[name]['speedup']}x")
+
+    print(f"样本: {len(md_files)} 篇, 共 {total_kb:.1f} KB；结果不一致: {len(mismatches)}")
+    for m in mismatches:
+        print(f"- {m['file']}: {', '.join(m['fields'])}")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
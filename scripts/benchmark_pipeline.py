@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+端到端流水线合成压测：无需 GPU、MinerU、Ollama 与生产库。
+
+- 语料：scripts/bench_corpus.py 生成合成PDF（页数对数正态分布，内嵌论文Markdown）
+- MinerU：scripts/stub_mineru.py，按 启动开销 + 每页耗时 模拟转换
+- LLM：scripts/mock_ollama.py 本地替身（延迟分布/错误率可配）
+- 数据库：默认 scripts/memory_db.py 内存替身；--db postgres 时使用配置中的库（请指向一次性的本地实例）
+
+对 KnowledgePipeline（main.py 路径，分阶段 knowledge / 流式 streaming）与 DualGPUPipeline
+在多个并发度下各跑一遍，从文档追踪（src/core/tracing.py）计算吞吐、端到端延迟分位数与
+各阶段利用率，输出 JSON 基线，可用 --baseline 与之前提交的结果对比。
+
+示例：
+  python scripts/benchmark_pipeline.py --docs 40 --workers 1,2,4 --out logs/pipeline_bench.json
+  python scripts/benchmark_pipeline.py --docs 40 --workers 1,2,4 --latency-ms 300 \
+    --baseline logs/pipeline_bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# 允许导入 src/* 与同目录脚本
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from src.core import tracing
+from src.core.config import Config, reload_config
+from bench_corpus import generate_corpus
+from benchmark_llm_harness import latency_summary
+from memory_db import MemoryDatabase
+from mock_ollama import MockOllamaServer, add_behavior_args, behavior_from_args
+
+MODES = ("knowledge", "streaming", "dual")
+
+# 各阶段的代表 span；利用率 = 忙碌时间 / (墙钟时间 × 该阶段线程数)
+STAGE_SPANS = {"pdf": "pdf.convert", "parse": "parse.document", "import": "import.paper"}
+DETAIL_SPANS = ("pdf.mineru", "llm.attempt", "parse.heuristic", "db.get_or_create_id",
+                "queue.pdf", "queue.md", "queue.json")
+
+
+def _stage_workers(mode: str, workers: int) -> Dict[str, int]:
+    if mode == "dual":
+        return {"pdf": workers, "parse": workers, "import": max(1, workers // 2)}
+    # KnowledgePipeline：PDF 阶段按 pdf_max_workers 并发，导入阶段（含解析）单线程
+    return {"pdf": workers, "parse": 1, "import": 1}
+
+
+def run_once(mode: str, workers: int, base: Config, corpus_dir: Path, work_dir: Path,
+             db_kind: str, db_latency_ms: float, autoscale: bool = False,
+             stage_processes: Optional[List[str]] = None) -> Dict:
+    """在独立目录中运行一次流水线，返回该次的吞吐/延迟/利用率。"""
+    run_dir = work_dir / f"{mode}-w{workers}"
+    shutil.rmtree(run_dir, ignore_errors=True)
+    config = base.with_paths(
+        input_dir=corpus_dir,
+        output_dir=run_dir / "output",
+        processed_dir=run_dir / "processed",
+        logs_dir=run_dir / "logs",
+        temp_dir=run_dir / "temp",
+    ).with_parallel(pdf_max_workers=workers)
+    config.setup_directories()
+    db = MemoryDatabase(db_latency_ms) if db_kind == "memory" else None
+
+    trace_file = run_dir / "traces.jsonl"
+    tracing.set_sink(tracing.TraceSink(trace_file, flush_every=256))
+    stage_workers = _stage_workers(mode, workers)
+    t0 = time.perf_counter()
+    try:
+        if mode == "dual":
+            from src.core.dual_gpu_pipeline import DualGPUPipeline
+            pipeline = DualGPUPipeline(config, db=db)
+            result = pipeline.run_parallel_processing(
+                input_dir=corpus_dir,
+                num_pdf_workers=stage_workers["pdf"],
+                num_md_workers=stage_workers["parse"],
+                num_import_workers=stage_workers["import"],
+                autoscale=autoscale,
+                stage_processes=stage_processes,
+            )
+            converted, imported = result.get("pdf_processed", 0), result.get("json_imported", 0)
+        else:
+            from src.core.pipeline import KnowledgePipeline
+            result = KnowledgePipeline(config, db=db).run_full_pipeline(streaming=(mode == "streaming"))
+            converted = (result.get("pdf_processing") or {}).get("processed", 0)
+            imported = (result.get("data_import") or {}).get("imported", 0)
+    finally:
+        wall = time.perf_counter() - t0
+        tracing.set_sink(None)
+
+    summary = tracing.summarize(tracing.load_records(trace_file), slowest=10 ** 9)
+    stages = {s["span"]: s for s in summary["stages"]}
+    doc_latencies = [d["wall_ms"] / 1000.0 for d in summary["slowest"]]
+
+    stage_report = {}
+    for stage, span_name in STAGE_SPANS.items():
+        st = stages.get(span_name, {})
+        busy = st.get("total_ms", 0.0) / 1000.0
+        stage_report[stage] = {
+            "workers": stage_workers[stage],
+            "count": st.get("count", 0),
+            "p50_ms": st.get("p50_ms"),
+            "p95_ms": st.get("p95_ms"),
+            "busy_secs": round(busy, 3),
+            "utilization": round(busy / (wall * stage_workers[stage]), 4) if wall > 0 else None,
+        }
+    details = {name: {k: stages[name][k] for k in ("count", "total_ms", "p50_ms", "p95_ms", "max_ms")}
+               for name in DETAIL_SPANS if name in stages}
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "success": bool(result.get("success")),
+        "error": result.get("error"),
+        "wall_secs": round(wall, 3),
+        "pdf_converted": converted,
+        "imported": imported,
+        "db_papers": db.count("paper") if db is not None else None,
+        "throughput_docs_per_sec": round(imported / wall, 3) if wall > 0 else None,
+        "doc_latency": latency_summary(doc_latencies),
+        "stages": stage_report,
+        "spans": details,
+        "scaling_decisions": result.get("scaling_decisions", []),
+        "stage_processes": result.get("stage_processes", []),
+    }
+
+
+def compare_with_baseline(report: Dict, baseline: Dict) -> Dict[str, Dict]:
+    """按 模式-并发度 对比吞吐与端到端 p95（delta_pct 为正表示退化）。"""
+    base_runs = {f"{r['mode']}-w{r['workers']}": r for r in baseline.get("runs", [])}
+    diff = {}
+    for run in report["runs"]:
+        key = f"{run['mode']}-w{run['workers']}"
+        base = base_runs.get(key)
+        if not base:
+            continue
+        cur_tp, base_tp = run["throughput_docs_per_sec"], base.get("throughput_docs_per_sec")
+        cur_p95, base_p95 = run["doc_latency"]["p95_ms"], base.get("doc_latency", {}).get("p95_ms")
+        diff[key] = {
+            "throughput": {"current": cur_tp, "baseline": base_tp,
+                           "delta_pct": round(100.0 * (base_tp - cur_tp) / base_tp, 2) if cur_tp is not None and base_tp else None},
+            "p95_ms": {"current": cur_p95, "baseline": base_p95,
+                       "delta_pct": round(100.0 * (cur_p95 - base_p95) / base_p95, 2) if cur_p95 is not None and base_p95 else None},
+        }
+    return diff
+
+
+def _configure_env(args, mock_url: str, work_dir: Path) -> Path:
+    """写入本次压测使用的配置文件（同时作为结果的可复现记录）。"""
+    settings = {
+        "PROJECT_ROOT": str(work_dir),
+        "MINERU_PATH": str(SCRIPTS_DIR / "stub_mineru.py"),
+        "STUB_MINERU_STARTUP_MS": str(args.startup_ms),
+        "STUB_MINERU_PAGE_MS": str(args.page_ms),
+        "STUB_MINERU_FAIL_RATE": str(args.mineru_fail_rate),
+        "OLLAMA_URL": mock_url,
+        "OLLAMA_GPU1_URL": mock_url,
+        "USE_LOCAL_MODEL": "true",
+        "DASHSCOPE_API_KEY": "",
+        "LLM_INVOKE_POLICY": args.policy,
+        "CUDA_VISIBLE_DEVICES": "",
+        "PIPELINE_METRICS_INTERVAL_SECS": "1",
+        "TRACE_FILE": "",
+        "METRICS_PORT": "0",
+    }
+    env_file = work_dir / "bench.env"
+    env_file.write_text("".join(f"{k}={v}\n" for k, v in settings.items()), encoding="utf-8")
+    return env_file
+
+
+def main():
+    ap = argparse.ArgumentParser(description='端到端流水线合成压测（替身 MinerU / Ollama / 数据库）')
+    ap.add_argument('--docs', type=int, default=40, help='合成文档数')
+    ap.add_argument('--median-pages', type=float, default=8, help='页数中位数')
+    ap.add_argument('--sigma', type=float, default=0.6, help='页数对数标准差')
+    ap.add_argument('--max-pages', type=int, default=60, help='页数上限')
+    ap.add_argument('--corpus-seed', type=int, default=0, help='语料随机种子')
+    ap.add_argument('--workers', type=str, default='1,2,4', help='并发度列表，逗号分隔')
+    ap.add_argument('--modes', type=str, default=','.join(MODES), help='knowledge,streaming,dual')
+    ap.add_argument('--startup-ms', type=float, default=200, help='MinerU 替身每次调用固定开销')
+    ap.add_argument('--page-ms', type=float, default=30, help='MinerU 替身每页耗时')
+    ap.add_argument('--mineru-fail-rate', type=float, default=0.0, help='MinerU 替身失败比例')
+    ap.add_argument('--policy', choices=['always', 'missing', 'never'], default='always', help='LLM_INVOKE_POLICY')
+    ap.add_argument('--db', choices=['memory', 'postgres'], default='memory', help='数据库：内存替身或配置中的 Postgres')
+    ap.add_argument('--db-latency-ms', type=float, default=1.0, help='内存替身每次操作延迟')
+    ap.add_argument('--autoscale', action='store_true', help='dual 模式启用按队列深度自动伸缩（并发度为初始线程数）')
+    ap.add_argument('--stage-processes', type=str, default='',
+                    help='dual 模式在工作进程中执行的阶段，如 md,import（内存数据库下入库阶段保持线程）')
+    ap.add_argument('--work-dir', type=Path, help='工作目录（默认临时目录，结束后删除）')
+    ap.add_argument('--out', type=Path, help='结果JSON输出路径')
+    ap.add_argument('--baseline', type=Path, help='基线结果JSON，用于回归对比')
+    add_behavior_args(ap)
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    worker_counts = [int(w) for w in args.workers.split(',') if w.strip()]
+    modes = [m.strip() for m in args.modes.split(',') if m.strip() in MODES]
+    stage_processes = [s.strip() for s in args.stage_processes.split(',') if s.strip()]
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix='kg_bench_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    corpus_dir = work_dir / 'corpus'
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    corpus = generate_corpus(corpus_dir, args.docs, args.median_pages, args.sigma, args.max_pages, seed=args.corpus_seed)
+    print(f"📚 语料: {len(corpus)} 篇合成PDF → {corpus_dir}")
+
+    runs: List[Dict] = []
+    try:
+        with MockOllamaServer(behavior_from_args(args)) as mock:
+            env_file = _configure_env(args, mock.url, work_dir)
+            reload_config()
+            base = Config(str(env_file))
+            for mode in modes:
+                for workers in worker_counts:
+                    print(f"🚀 {mode} | 并发 {workers} ...")
+                    before = mock.snapshot()["requests"]
+                    run = run_once(mode, workers, base, corpus_dir, work_dir, args.db, args.db_latency_ms,
+                                   autoscale=args.autoscale, stage_processes=stage_processes)
+                    run["llm_requests"] = mock.snapshot()["requests"] - before
+                    runs.append(run)
+                    lat = run["doc_latency"]
+                    util = " ".join(f"{k}={v['utilization']:.0%}" for k, v in run["stages"].items() if v["utilization"] is not None)
+                    print(f"   ⏱️  {run['wall_secs']}s | 入库 {run['imported']}/{len(corpus)} | "
+                          f"{run['throughput_docs_per_sec']} 篇/s | p50 {lat['p50_ms']}ms p95 {lat['p95_ms']}ms | 利用率 {util}")
+            behavior = vars(mock.behavior)
+    finally:
+        reload_config()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "corpus": {"docs": args.docs, "median_pages": args.median_pages, "sigma": args.sigma,
+                   "max_pages": args.max_pages, "seed": args.corpus_seed},
+        "stubs": {"mineru_startup_ms": args.startup_ms, "mineru_page_ms": args.page_ms,
+                  "mineru_fail_rate": args.mineru_fail_rate, "llm": behavior, "llm_policy": args.policy,
+                  "db": args.db, "db_latency_ms": args.db_latency_ms if args.db == "memory" else None},
+        "autoscale": args.autoscale,
+        "stage_processes": stage_processes,
+        "runs": runs,
+    }
+
+    if args.baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        report["baseline_diff"] = compare_with_baseline(report, baseline)
+        print('\n与基线对比（delta_pct 为正表示退化）:')
+        for key, d in report["baseline_diff"].items():
+            print(f"- {key}: 吞吐 {d['throughput']['current']} vs {d['throughput']['baseline']} "
+                  f"({d['throughput']['delta_pct']}%) | p95 {d['p95_ms']['current']} vs {d['p95_ms']['baseline']} "
+                  f"({d['p95_ms']['delta_pct']}%)")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
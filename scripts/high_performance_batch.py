@@ -155,8 +155,14 @@ def main():
     parser.add_argument("--pdf-workers", type=int, default=None, help="PDF处理工作线程数")
     parser.add_argument("--md-workers", type=int, default=None, help="MD解析工作线程数")
     parser.add_argument("--import-workers", type=int, default=None, help="JSON入库工作线程数")
+    parser.add_argument("--stage-processes", type=str, default=None,
+                        help="在工作进程中执行的阶段，如 md,import（默认按 PIPELINE_STAGE_PROCESSES）")
     parser.add_argument("--memory-limit", type=int, default=None, help="内存使用限制(GB)")
     parser.add_argument("--monitor", action="store_true", help="启用系统监控")
+    parser.add_argument("--autoscale", action="store_true", default=None,
+                        help="按队列深度自动伸缩各阶段线程数（以上述线程数为初始值，默认按 PIPELINE_AUTOSCALE）")
+    parser.add_argument("--lease", action="store_true", default=None,
+                        help="多节点协调：从共享 Postgres 的 work_lease 表领取PDF（默认按 WORK_LEASE）")
     parser.add_argument("--output-report", type=Path, default=None, help="性能报告输出文件")
     parser.add_argument("--log-level", default="INFO", help="日志级别")
     
@@ -216,7 +222,10 @@ def main():
             limit_pdfs=args.limit,
             num_pdf_workers=num_pdf_workers,
             num_md_workers=num_md_workers,
-            num_import_workers=num_import_workers
+            num_import_workers=num_import_workers,
+            autoscale=args.autoscale,
+            stage_processes=args.stage_processes.split(",") if args.stage_processes is not None else None,
+            lease=args.lease
         )
         
         # 创建性能报告
@@ -237,6 +246,9 @@ def main():
         print(f"MD解析: 成功 {results.get('md_parsed', 0)}, 失败 {results.get('md_failed', 0)}")
         print(f"JSON入库: 成功 {results.get('json_imported', 0)}, 失败 {results.get('json_failed', 0)}")
         print(f"整体吞吐: {results.get('throughput_pdf_per_second', 0):.2f} PDF/秒")
+        for node in results.get('lease_nodes') or []:
+            print(f"节点 {node['node_id']}: 成功 {node['processed']}, 失败 {node['failed']}, "
+                  f"{node['files_per_sec']:.2f} PDF/秒{'' if node['alive'] else ' (离线)'}")
         print(f"GPU1利用率: {results.get('final_stats', {}).get('gpu1_utilization', 0):.1f}%")
         print(f"GPU2利用率: {results.get('final_stats', {}).get('gpu2_utilization', 0):.1f}%")
         print("="*60)
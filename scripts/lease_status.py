@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多节点协调状态：读取共享 Postgres 中的 work_lease / work_node 表，输出整体进度与各节点吞吐。
+
+用法：
+  python scripts/lease_status.py
+  python scripts/lease_status.py --json
+  python scripts/lease_status.py --requeue-failed     # 把失败的单元重新置为待处理
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# 允许导入 src/*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.config import Config
+from src.core.work_lease import WorkLease
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多节点协调状态：工作单元进度与各节点吞吐')
+    parser.add_argument('--requeue-failed', action='store_true', help='把失败的单元重新置为待处理')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+    args = parser.parse_args()
+
+    lease = WorkLease.from_config(Config())
+    requeued = lease.requeue_failed() if args.requeue_failed else 0
+    progress = lease.progress()
+    nodes = lease.node_report()
+
+    if args.json:
+        print(json.dumps({'progress': progress, 'nodes': nodes, 'requeued': requeued}, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.requeue_failed:
+        print(f"🔁 重新置为待处理: {requeued} 个")
+    total = sum(progress.values())
+    print(f"📦 工作单元: 共 {total}")
+    for status in ('pending', 'leased', 'done', 'failed'):
+        n = progress.get(status, 0)
+        print(f"   {status:<8} {n:>8}  ({n / total:.1%})" if total else f"   {status:<8} {n:>8}")
+
+    print(f"\n🖥️  节点: {len(nodes)} 个（在线 {sum(1 for n in nodes if n['alive'])}）")
+    for n in nodes:
+        state = '在线' if n['alive'] else '离线'
+        print(f"   {n['node_id']:<32} {state}  成功 {n['processed']:>7}  失败 {n['failed']:>5}  "
+              f"{n['files_per_sec']:.2f} 文件/秒  忙碌 {n['busy_secs']:.0f}s / 运行 {n['uptime_secs']:.0f}s")
+    alive_rate = sum(n['files_per_sec'] for n in nodes if n['alive'])
+    if alive_rate and progress.get('pending'):
+        print(f"\n⏱️  在线节点合计 {alive_rate:.2f} 文件/秒，剩余约 {progress['pending'] / alive_rate / 3600:.1f} 小时")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+内存数据库替身：实现 DataImporter 用到的 DatabaseManager 接口
+（execute_query / execute_update / execute_batch_update / insert_and_get_id / get_or_create_id），
+每次操作可注入固定延迟，用于在没有 Postgres 的机器上压测导入阶段。
+
+仅支持 DataImporter 实际发出的语句形态：按单字段等值查 id、按 id 列表核对存在性、按 id 更新、关联表批量插入。
+"""
+
+import re
+import time
+import uuid
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+_SELECT_ID_RE = re.compile(r"SELECT\s+id\s+FROM\s+(\w+)\s+WHERE\s+(\w+)\s*=\s*%s", re.I)
+_SELECT_IDS_RE = re.compile(r"SELECT\s+id\s+FROM\s+(\w+)\s+WHERE\s+id(?:::text)?\s*=\s*ANY\(%s\)", re.I)
+_INSERT_RE = re.compile(r"INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)", re.I)
+_UPDATE_RE = re.compile(r"UPDATE\s+(\w+)", re.I)
+
+
+class MemoryDatabase:
+    """线程安全的内存表；op_latency_ms 模拟每次往返的网络与执行耗时"""
+
+    def __init__(self, op_latency_ms: float = 0.0):
+        self.op_latency = op_latency_ms / 1000.0
+        self._lock = threading.Lock()
+        self.rows: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._index: Dict[Tuple[str, str, Any], str] = {}
+        self.link_rows: Dict[str, set] = {}
+        self.op_counts: Dict[str, int] = {}
+
+    def _op(self, name: str) -> None:
+        if self.op_latency:
+            time.sleep(self.op_latency)
+        with self._lock:
+            self.op_counts[name] = self.op_counts.get(name, 0) + 1
+
+    def _insert_row(self, table: str, row: Dict[str, Any]) -> str:
+        record_id = row.setdefault("id", str(uuid.uuid4()))
+        self.rows.setdefault(table, {})[record_id] = row
+        for field, value in row.items():
+            if field != "id" and value is not None and isinstance(value, (str, int)):
+                self._index.setdefault((table, field, value), record_id)
+        return record_id
+
+    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict]:
+        self._op("query")
+        m = _SELECT_IDS_RE.search(query)
+        if m:
+            with self._lock:
+                table = self.rows.get(m.group(1), {})
+                return [{"id": i} for i in params[0] if i in table]
+        m = _SELECT_ID_RE.search(query)
+        if not m:
+            return []
+        with self._lock:
+            record_id = self._index.get((m.group(1), m.group(2), params[0] if params else None))
+        return [{"id": record_id}] if record_id else []
+
+    def execute_update(self, query: str, params: Optional[tuple] = None) -> int:
+        self._op("update")
+        return 1 if _UPDATE_RE.search(query) else 0
+
+    def execute_batch_update(self, query: str, params_list: List[tuple]) -> int:
+        self._op("batch_update")
+        m = _INSERT_RE.search(query)
+        if not m:
+            return 0
+        inserted = 0
+        with self._lock:
+            links = self.link_rows.setdefault(m.group(1), set())
+            for params in params_list:
+                key = tuple(params[:2])
+                if key not in links:
+                    links.add(key)
+                    inserted += 1
+        return inserted
+
+    def insert_and_get_id(self, query: str, params: tuple) -> Optional[str]:
+        self._op("insert")
+        m = _INSERT_RE.search(query)
+        if not m:
+            return None
+        fields = [f.strip() for f in m.group(2).split(",")]
+        with self._lock:
+            return self._insert_row(m.group(1), dict(zip(fields, params)))
+
+    def get_or_create_id(self, table: str, field: str, value: str,
+                         additional_fields: Optional[Dict] = None) -> str:
+        self._op("get_or_create_id")
+        with self._lock:
+            record_id = self._index.get((table, field, value))
+            if record_id:
+                return record_id
+            return self._insert_row(table, {field: value, **(additional_fields or {})})
+
+    def count(self, table: str) -> int:
+        with self._lock:
+            return len(self.rows.get(table, {})) + len(self.link_rows.get(table, set()))
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地 Ollama 替身：实现 /api/tags 与 /api/generate，用于离线压测 LLMParser。
+
+可配置延迟分布、错误率、空响应率与非法JSON比例；支持 stream=true 的逐token输出，
+并返回 prompt_eval_count / prompt_eval_duration 等统计字段。
+
+示例（独立运行）：
+  python scripts/mock_ollama.py --port 11500 --latency-dist lognormal --latency-ms 800 \
+    --error-rate 0.02 --empty-rate 0.05 --malformed-rate 0.03
+"""
+
+import json
+import math
+import random
+import argparse
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+LATENCY_DISTS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+_MOCK_RESULT = {
+    "title": "Mock title",
+    "authors": ["A. Author", "B. Author"],
+    "abstract": "Mock abstract.",
+    "keywords": ["mock"],
+    "year": 2020,
+    "venue": "Mock Journal",
+    "research_field": None,
+    "doi": None,
+    "references": [],
+    "pdf_path": None,
+}
+
+
+@dataclass
+class MockBehavior:
+    """替身行为配置；延迟单位为毫秒。"""
+    latency_dist: str = 'fixed'
+    latency_ms: float = 0.0
+    latency_spread_ms: float = 0.0
+    error_rate: float = 0.0
+    empty_rate: float = 0.0
+    malformed_rate: float = 0.0
+    # 正常响应在JSON之后继续输出的字符数（模拟模型补充说明），用于验证客户端提前断开
+    trailing_chars: int = 0
+    # 按模型名覆盖延迟倍数，如 {"qwen3:30b": 3.0}
+    model_latency_scale: Dict[str, float] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+    def sample_latency(self, rng: random.Random, model: str) -> float:
+        base, spread = self.latency_ms, self.latency_spread_ms
+        if self.latency_dist == 'uniform':
+            ms = rng.uniform(max(0.0, base - spread), base + spread)
+        elif self.latency_dist == 'normal':
+            ms = rng.gauss(base, spread)
+        elif self.latency_dist == 'lognormal':
+            # 以 base 为中位数、spread/base 为对数标准差，产生长尾
+            sigma = spread / base if base > 0 and spread > 0 else 0.5
+            ms = base * math.exp(rng.gauss(0.0, sigma))
+        elif self.latency_dist == 'exponential':
+            ms = rng.expovariate(1.0 / base) if base > 0 else 0.0
+        else:
+            ms = base
+        return max(0.0, ms) * self.model_latency_scale.get(model, 1.0) / 1000.0
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端超时/取消导致的断连属预期情形，不打印堆栈
+        pass
+
+
+class MockOllamaServer:
+    """在后台线程中运行的 Ollama 替身，按请求统计各类注入结果。"""
+
+    def __init__(self, behavior: MockBehavior, host: str = '127.0.0.1', port: int = 0):
+        self.behavior = behavior
+        self._rng = random.Random(behavior.seed)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "empty": 0, "malformed": 0, "by_model": {}}
+        self._httpd = _QuietHTTPServer((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-ollama', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return json.loads(json.dumps(self.counters))
+
+    def _draw(self, model: str):
+        """抽取本次请求的结果类型与延迟（加锁保证可复现的随机序列）。"""
+        b = self.behavior
+        with self._lock:
+            r = self._rng.random()
+            latency = b.sample_latency(self._rng, model)
+            if r < b.error_rate:
+                outcome = 'errors'
+            elif r < b.error_rate + b.empty_rate:
+                outcome = 'empty'
+            elif r < b.error_rate + b.empty_rate + b.malformed_rate:
+                outcome = 'malformed'
+            else:
+                outcome = 'ok'
+            self.counters["requests"] += 1
+            self.counters[outcome] += 1
+            self.counters["by_model"][model] = self.counters["by_model"].get(model, 0) + 1
+        return outcome, latency
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _send_json(self, status: int, obj) -> None:
+                body = json.dumps(obj).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端已超时或被对冲请求取消
+                    pass
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/api/tags':
+                    self._send_json(200, {"models": []})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path.rstrip('/') != '/api/generate':
+                    self._send_json(404, {"error": "not found"})
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except Exception:
+                    self._send_json(400, {"error": "bad request"})
+                    return
+                model = str(payload.get('model', ''))
+                outcome, latency = server._draw(model)
+                time.sleep(latency)
+                if outcome == 'errors':
+                    self._send_json(500, {"error": "injected failure"})
+                    return
+                if outcome == 'empty':
+                    text = ''
+                elif outcome == 'malformed':
+                    text = '{"title": "Mock title", "authors": ["A. Author"'
+                else:
+                    text = json.dumps(_MOCK_RESULT)
+                    if server.behavior.trailing_chars > 0:
+                        text += ("\n\nNote: " + "extracted fields above. " * server.behavior.trailing_chars)[
+                            :server.behavior.trailing_chars]
+                prompt = str(payload.get('prompt', ''))
+                stats = {
+                    "prompt_eval_count": len(prompt) // 4 + 1,
+                    "prompt_eval_duration": int(latency * 0.2 * 1e9),
+                    "eval_count": len(text) // 4,
+                    "eval_duration": int(latency * 0.8 * 1e9),
+                }
+                if payload.get('stream'):
+                    self._stream(model, text, stats)
+                else:
+                    self._send_json(200, dict(model=model, response=text, done=True, **stats))
+
+            def _stream(self, model: str, text: str, stats: Dict) -> None:
+                pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+                lines = [{"model": model, "response": p, "done": False} for p in pieces]
+                lines.append(dict(model=model, response='', done=True, **stats))
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/x-ndjson')
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for obj in lines:
+                        data = (json.dumps(obj) + '\n').encode('utf-8')
+                        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端解析到完整JSON后提前断开，或对冲请求被取消
+                    pass
+
+        return Handler
+
+
+def add_behavior_args(ap: argparse.ArgumentParser) -> None:
+    """注册替身行为参数，供压测脚本复用。"""
+    ap.add_argument('--latency-dist', choices=LATENCY_DISTS, default='fixed', help='延迟分布')
+    ap.add_argument('--latency-ms', type=float, default=50.0, help='延迟基准（毫秒）')
+    ap.add_argument('--latency-spread-ms', type=float, default=0.0, help='延迟离散度（毫秒）')
+    ap.add_argument('--error-rate', type=float, default=0.0, help='HTTP 500 比例')
+    ap.add_argument('--empty-rate', type=float, default=0.0, help='空响应比例')
+    ap.add_argument('--malformed-rate', type=float, default=0.0, help='非法JSON比例')
+    ap.add_argument('--trailing-chars', type=int, default=0, help='正常响应在JSON之后继续输出的字符数')
+    ap.add_argument('--model-latency-scale', action='append', default=[], metavar='MODEL=SCALE',
+                    help='按模型放大延迟，可重复，如 qwen3:30b=3')
+    ap.add_argument('--seed', type=int, default=42, help='随机种子')
+
+
+def behavior_from_args(args) -> MockBehavior:
+    scales = {}
+    for item in args.model_latency_scale:
+        name, _, scale = item.rpartition('=')
+        scales[name] = float(scale)
+    return MockBehavior(
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_spread_ms=args.latency_spread_ms,
+        error_rate=args.error_rate,
+        empty_rate=args.empty_rate,
+        malformed_rate=args.malformed_rate,
+        trailing_chars=args.trailing_chars,
+        model_latency_scale=scales,
+        seed=args.seed,
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description='本地 Ollama 替身服务')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=11500)
+    add_behavior_args(ap)
+    args = ap.parse_args()
+
+    server = MockOllamaServer(behavior_from_args(args), host=args.host, port=args.port)
+    print(f"🚀 Mock Ollama 已启动: {server.url} (Ctrl+C 退出)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(f"📊 请求统计: {json.dumps(server.snapshot(), ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
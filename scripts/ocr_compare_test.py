@@ -50,8 +50,7 @@ def main():
     setup_logging(log_file)
 
     # 强制使用OCR方法（不改全局env，仅在本次运行覆盖）
-    config.mineru_method = (config.mineru_method or 'auto')
-    config.mineru_method = 'ocr'  # 高质量OCR
+    config = config.with_mineru(mineru_method='ocr')  # 高质量OCR
 
     # 目录设置
     input_dir = args.input_dir if args.input_dir else config.paths.input_dir
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+引用关系批量解析：将论文参考文献按 DOI / 标题指纹匹配到库内论文，写入 paper_citation。
+
+默认增量运行（仅处理上次运行之后导入的论文）；--full 重新处理全部论文，
+用于新论文入库后补全旧论文指向它们的引用。
+
+用法：
+  python scripts/resolve_citations.py
+  python scripts/resolve_citations.py --full --dry-run true
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# 允许导入 src/*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.config import Config, setup_logging
+from src.core.citation_resolver import CitationResolver
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量解析论文引用关系并写入 paper_citation')
+    parser.add_argument('--full', action='store_true', help='忽略水位，重新处理全部论文')
+    parser.add_argument('--dry-run', type=str, default='false', help='true 则只统计不落库')
+    parser.add_argument('--fetch-size', type=int, default=5000, help='服务端游标每批拉取行数')
+    parser.add_argument('--page-size', type=int, default=1000, help='每条 INSERT 语句的边数')
+    args = parser.parse_args()
+    dry = str(args.dry_run).lower() == 'true'
+
+    config = Config()
+    config.setup_directories()
+    setup_logging(config.paths.logs_dir / 'resolve_citations.log')
+
+    resolver = CitationResolver(config, fetch_size=args.fetch_size, insert_page_size=args.page_size)
+    print(f"🔗 开始解析引用关系 | 模式: {'全量' if args.full else '增量'}{' (dry-run)' if dry else ''}")
+    stats = resolver.run(full=args.full, dry_run=dry)
+    print(f"📊 {json.dumps(stats, ensure_ascii=False)}")
+    print(f"✅ 完成: 新增引用边 {stats['inserted']} 条")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MinerU 替身：接受与 mineru CLI 相同的参数，按页数模拟转换耗时，
+并把合成 PDF（scripts/bench_corpus.py 生成）中内嵌的 Markdown 写到 MinerU 的输出位置。
+
+延迟由环境变量控制（毫秒）：
+  STUB_MINERU_STARTUP_MS   每次调用的固定开销（模型加载等），默认 200
+  STUB_MINERU_PAGE_MS      每页耗时，默认 50
+  STUB_MINERU_FAIL_RATE    随机失败比例（返回码 1），默认 0
+
+用法（由 PDFProcessor 调用，通过 MINERU_PATH 指向本文件）：
+  stub_mineru.py -p paper.pdf -o /tmp/out -b pipeline -d cpu -m auto -l en
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+PAGES_MARKER = b"% kg-bench pages="
+MD_MARKER = b"\n%%MD\n"
+
+
+def read_synthetic_pdf(path: Path):
+    """返回 (页数, Markdown 正文)；非合成文件按 1 页、空正文处理。"""
+    raw = path.read_bytes()
+    pages = 1
+    start = raw.find(PAGES_MARKER)
+    if start >= 0:
+        end = raw.find(b"\n", start)
+        try:
+            pages = max(1, int(raw[start + len(PAGES_MARKER):end]))
+        except ValueError:
+            pass
+    idx = raw.find(MD_MARKER)
+    text = raw[idx + len(MD_MARKER):].decode("utf-8", errors="ignore") if idx >= 0 else ""
+    return pages, text
+
+
+def main():
+    ap = argparse.ArgumentParser(description='MinerU 替身（压测用）')
+    ap.add_argument('-p', '--path', required=True, type=Path)
+    ap.add_argument('-o', '--output', required=True, type=Path)
+    # 其余参数与 mineru CLI 兼容，忽略取值
+    for flag in ('-b', '-d', '-m', '-l', '-s', '-e', '-f', '-t', '--source', '--lang'):
+        ap.add_argument(flag)
+    args = ap.parse_args()
+
+    pages, text = read_synthetic_pdf(args.path)
+    startup_ms = float(os.getenv('STUB_MINERU_STARTUP_MS', '200'))
+    page_ms = float(os.getenv('STUB_MINERU_PAGE_MS', '50'))
+    time.sleep((startup_ms + page_ms * pages) / 1000.0)
+
+    if random.random() < float(os.getenv('STUB_MINERU_FAIL_RATE', '0')):
+        print(f"stub mineru: injected failure for {args.path.name}", file=sys.stderr)
+        return 1
+
+    stem = args.path.stem
+    out_dir = args.output / stem / 'auto'
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / f"{stem}.md").write_text(text or f"# {stem}\n", encoding='utf-8')
+    print(f"stub mineru: {args.path.name} pages={pages}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
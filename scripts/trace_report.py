@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+追踪报告：读取 TRACE_FILE 产生的 JSONL，输出各阶段耗时分布与最慢的 N 篇文档。
+
+用法：
+  python scripts/trace_report.py --file logs/traces.jsonl
+  python scripts/trace_report.py --file logs/traces.jsonl --top 20 --run 1a2b3c4d
+  python scripts/trace_report.py --file logs/traces.jsonl --json
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# 允许导入 src/*
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.tracing import load_records, summarize
+
+
+def _fmt_ms(ms: float) -> str:
+    return f"{ms / 1000:.2f}s" if ms >= 1000 else f"{ms:.0f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文档追踪报告：阶段耗时分布与最慢文档')
+    parser.add_argument('--file', type=Path, default=Path(os.getenv('TRACE_FILE') or 'logs/traces.jsonl'),
+                        help='追踪 JSONL 文件（默认取 TRACE_FILE）')
+    parser.add_argument('--top', type=int, default=10, help='列出最慢的 N 篇文档')
+    parser.add_argument('--run', type=str, default=None, help='只统计指定 run 标识')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+    args = parser.parse_args()
+
+    if not args.file.exists():
+        print(f"❌ 追踪文件不存在: {args.file}")
+        return 1
+
+    report = summarize(load_records(args.file, run=args.run), slowest=args.top)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"📄 文档 {report['documents']} 篇 | span {report['spans']} 条")
+    print("\n⏱️  阶段耗时分布")
+    print(f"{'span':<24}{'次数':>8}{'合计':>12}{'p50':>10}{'p95':>10}{'最大':>10}")
+    for st in report['stages']:
+        print(f"{st['span']:<24}{st['count']:>8}{_fmt_ms(st['total_ms']):>12}"
+              f"{_fmt_ms(st['p50_ms']):>10}{_fmt_ms(st['p95_ms']):>10}{_fmt_ms(st['max_ms']):>10}")
+
+    print(f"\n🐢 最慢的 {len(report['slowest'])} 篇文档（端到端，含排队）")
+    for doc in report['slowest']:
+        top = ", ".join(f"{k}={_fmt_ms(v)}" for k, v in list(doc['spans'].items())[:4])
+        print(f"  {_fmt_ms(doc['wall_ms']):>9}  {doc['doc']}  [{doc['trace_id']}]  {top}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+按队列深度自动伸缩各阶段工作线程
+
+- WorkerPool：可伸缩的阶段线程池。扩容直接启动新线程；缩容发放“退休名额”，
+  工作线程在取下一项之前领取名额后退出，不会中断正在处理的文档
+- Autoscaler：由指标采样线程按间隔调用，根据各阶段队列深度、服务速率（仅在有积压时测量的
+  单线程吞吐）、上游到达速率估算所需线程数；扩容/缩容各需连续若干次判定（滞回），
+  受内存（MemoryManager.get_optimal_worker_count）、进程RSS与GPU显存余量约束；
+  总线程预算不足时优先分配给预计排空时间最长（最慢）的阶段
+"""
+import math
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """可伸缩的阶段工作线程池"""
+
+    def __init__(self, name: str, target: Callable[[int], None]):
+        self.name = name
+        self._target = target
+        self._threads: Dict[int, threading.Thread] = {}
+        self._next_id = 0
+        self._retire = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """目标线程数（存活线程数减去待退休名额）"""
+        with self._lock:
+            return len(self._threads) - self._retire
+
+    def _run(self, worker_id: int) -> None:
+        try:
+            self._target(worker_id)
+        finally:
+            with self._lock:
+                self._threads.pop(worker_id, None)
+
+    def resize(self, n: int) -> int:
+        """调整到 n 个线程，返回调整前的目标线程数。"""
+        n = max(0, n)
+        with self._lock:
+            current = len(self._threads) - self._retire
+            if n > current:
+                # 先撤销尚未领取的退休名额，再补足新线程
+                cancel = min(self._retire, n - current)
+                self._retire -= cancel
+                for _ in range(n - current - cancel):
+                    worker_id = self._next_id
+                    self._next_id += 1
+                    thread = threading.Thread(target=self._run, args=(worker_id,),
+                                              name=f"{self.name}-worker-{worker_id}", daemon=True)
+                    self._threads[worker_id] = thread
+                    thread.start()
+            elif n < current:
+                self._retire += current - n
+        return current
+
+    def should_retire(self) -> bool:
+        """工作线程在取下一项前调用；领取到退休名额时返回 True，线程应退出。"""
+        with self._lock:
+            if self._retire > 0:
+                self._retire -= 1
+                return True
+            return False
+
+    def join(self, timeout: float = 30) -> None:
+        with self._lock:
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join(timeout=timeout)
+        with self._lock:
+            self._retire = 0
+
+
+@dataclass
+class StageObservation:
+    """一次采样中某阶段的状态"""
+    depth: int          # 队列深度
+    completed: int      # 累计完成数（成功+失败）
+    workers: int        # 当前线程数
+
+
+@dataclass
+class ScalingDecision:
+    stage: str
+    old: int
+    new: int
+    reason: str
+
+
+@dataclass
+class _StageState:
+    last_completed: Optional[int] = None
+    last_depth: int = 0
+    capacity: Optional[float] = None     # 单线程服务速率（篇/秒，EWMA）
+    rate: float = 0.0                    # 最近一次测得的阶段完成速率
+    up_streak: int = 0
+    down_streak: int = 0
+
+
+class Autoscaler:
+    """队列深度驱动的阶段线程数控制器（纯计算，由调用方负责采样与执行）"""
+
+    def __init__(self, bounds: Dict[str, Tuple[int, int]], drain_secs: float = 60.0,
+                 up_after: int = 2, down_after: int = 3, ewma_alpha: float = 0.5,
+                 gpu_stages: Optional[Dict[str, int]] = None, min_gpu_free_gb: float = 2.0,
+                 max_rss_gb: float = 0.0):
+        # bounds 的键顺序即流水线阶段顺序，上一阶段的完成速率视为下一阶段的到达速率
+        self.bounds = dict(bounds)
+        self.stages = list(bounds)
+        self.drain_secs = max(1.0, drain_secs)
+        self.up_after = max(1, up_after)
+        self.down_after = max(1, down_after)
+        self.alpha = ewma_alpha
+        self.gpu_stages = gpu_stages or {}
+        self.min_gpu_free_gb = min_gpu_free_gb
+        self.max_rss_gb = max_rss_gb
+        self._state = {stage: _StageState() for stage in self.stages}
+        self._last_time: Optional[float] = None
+
+    def _observe(self, now: float, obs: Dict[str, StageObservation]) -> float:
+        dt = now - self._last_time if self._last_time is not None else 0.0
+        self._last_time = now
+        for stage in self.stages:
+            st, ob = self._state[stage], obs[stage]
+            if st.last_completed is not None and dt > 0:
+                st.rate = max(0, ob.completed - st.last_completed) / dt
+                # 仅在整段间隔内都有积压时，完成速率才反映服务能力
+                if st.last_depth > 0 and ob.depth > 0 and ob.workers > 0 and st.rate > 0:
+                    per_worker = st.rate / ob.workers
+                    st.capacity = per_worker if st.capacity is None else (
+                        self.alpha * per_worker + (1 - self.alpha) * st.capacity)
+            st.last_completed = ob.completed
+            st.last_depth = ob.depth
+        return dt
+
+    def _desired(self, stage: str, index: int, ob: StageObservation) -> Tuple[int, str]:
+        lo, hi = self.bounds[stage]
+        st = self._state[stage]
+        arrival = self._state[self.stages[index - 1]].rate if index > 0 else 0.0
+        if st.capacity is None:
+            # 尚未测得服务速率：积压超过线程数时逐个扩容，空闲时回落到下限
+            if ob.depth > ob.workers:
+                return min(hi, ob.workers + 1), f"积压 {ob.depth}，服务速率未知"
+            if ob.depth == 0 and arrival == 0:
+                return lo, "队列空闲"
+            return max(lo, min(hi, ob.workers)), "保持"
+        need = math.ceil((arrival + ob.depth / self.drain_secs) / st.capacity) if (arrival or ob.depth) else lo
+        return max(lo, min(hi, need)), (f"到达 {arrival:.2f}/s + 积压 {ob.depth}/{self.drain_secs:.0f}s，"
+                                         f"单线程 {st.capacity:.2f}/s")
+
+    def _drain_time(self, stage: str, ob: StageObservation) -> float:
+        capacity = self._state[stage].capacity
+        if not capacity:
+            return float(ob.depth)
+        return ob.depth / (capacity * max(1, ob.workers))
+
+    def decide(self, now: float, obs: Dict[str, StageObservation],
+               worker_budget: Optional[int] = None, rss_gb: float = 0.0,
+               gpu_free_gb: Optional[Dict[int, float]] = None) -> List[ScalingDecision]:
+        """根据本次采样给出需要调整的阶段（未变化的阶段不返回）。"""
+        if self._observe(now, obs) <= 0:
+            return []
+
+        targets: Dict[str, int] = {}
+        reasons: Dict[str, str] = {}
+        for i, stage in enumerate(self.stages):
+            targets[stage], reasons[stage] = self._desired(stage, i, obs[stage])
+
+        # 资源约束：GPU显存不足时禁止对应阶段扩容；RSS超限时全部禁止扩容并收缩最大的阶段
+        rss_over = self.max_rss_gb > 0 and rss_gb > self.max_rss_gb
+        for stage in self.stages:
+            current = obs[stage].workers
+            gpu = self.gpu_stages.get(stage)
+            free = (gpu_free_gb or {}).get(gpu) if gpu is not None else None
+            if targets[stage] > current and free is not None and free < self.min_gpu_free_gb:
+                targets[stage], reasons[stage] = current, f"GPU{gpu} 显存余量 {free:.1f}GB 不足"
+            elif targets[stage] > current and rss_over:
+                targets[stage], reasons[stage] = current, f"RSS {rss_gb:.1f}GB 超过 {self.max_rss_gb:.1f}GB"
+        if rss_over:
+            largest = max(self.stages, key=lambda s: obs[s].workers - self.bounds[s][0])
+            if obs[largest].workers > self.bounds[largest][0]:
+                targets[largest] = min(targets[largest], obs[largest].workers - 1)
+                reasons[largest] = f"RSS {rss_gb:.1f}GB 超过 {self.max_rss_gb:.1f}GB"
+
+        # 总线程预算：先满足各阶段下限，剩余按预计排空时间从长到短分配
+        if worker_budget is not None and sum(targets.values()) > worker_budget:
+            granted = {s: min(targets[s], self.bounds[s][0]) for s in self.stages}
+            remaining = max(0, worker_budget - sum(granted.values()))
+            for stage in sorted(self.stages, key=lambda s: self._drain_time(s, obs[s]), reverse=True):
+                extra = min(targets[stage] - granted[stage], remaining)
+                granted[stage] += extra
+                remaining -= extra
+                if granted[stage] < targets[stage]:
+                    reasons[stage] += f"；线程预算 {worker_budget} 已用尽"
+            targets = granted
+
+        # 滞回：连续 up_after 次判定需扩容才扩容（直接到目标值），连续 down_after 次才缩容（每次减一）
+        decisions = []
+        for stage in self.stages:
+            st, current = self._state[stage], obs[stage].workers
+            target = targets[stage]
+            if target > current:
+                st.up_streak, st.down_streak = st.up_streak + 1, 0
+                if st.up_streak >= self.up_after:
+                    decisions.append(ScalingDecision(stage, current, target, reasons[stage]))
+                    st.up_streak = 0
+            elif target < current:
+                st.down_streak, st.up_streak = st.down_streak + 1, 0
+                # 资源超限时立即收缩，不等滞回
+                if st.down_streak >= self.down_after or rss_over:
+                    decisions.append(ScalingDecision(stage, current, current - 1, reasons[stage]))
+                    st.down_streak = 0
+            else:
+                st.up_streak = st.down_streak = 0
+        return decisions
@@ -0,0 +1,225 @@
+"""
+引用关系解析：将论文的结构化参考文献（paper_metadata.parsed_references）匹配到库内已有论文，
+批量写入 paper_citation。
+
+- 内存索引：规范化 DOI → paper_id、标题指纹 → paper_id（指纹冲突的标题不参与匹配）
+- 索引用服务端游标分批流式加载，不对单条参考文献发起查询
+- 增量运行：仅处理上次水位（paper.created_at）之后导入的论文；水位保存在 processed_dir
+- 边以 execute_values 分页插入，ON CONFLICT DO NOTHING 保证重复运行幂等
+"""
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+from .database import DatabaseManager
+from .reference_parser import normalize_doi, parse_reference_lines, title_fingerprint
+
+logger = logging.getLogger(__name__)
+
+_STATE_FILE = "citation_resolver.state.json"
+_CONTEXT_MAX_CHARS = 500
+
+
+class CitationIndex:
+    """库内论文的 DOI / 标题指纹索引"""
+
+    def __init__(self):
+        self.by_doi: Dict[str, str] = {}
+        # 指纹 → paper_id；同一指纹对应多篇论文时置为 None，避免误连
+        self.by_title: Dict[str, Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.by_doi) + len(self.by_title)
+
+    def add(self, paper_id: str, doi: Optional[str], title: Optional[str]) -> None:
+        key = normalize_doi(doi)
+        if key:
+            self.by_doi.setdefault(key, paper_id)
+        fp = title_fingerprint(title)
+        if fp:
+            existing = self.by_title.get(fp, paper_id)
+            self.by_title[fp] = paper_id if existing == paper_id else None
+
+    def match(self, ref: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (paper_id, 匹配方式)；优先 DOI，其次标题指纹。"""
+        doi = ref.get("doi")
+        if doi:
+            pid = self.by_doi.get(doi)
+            if pid:
+                return pid, "doi"
+        fp = title_fingerprint(ref.get("title"))
+        if fp:
+            pid = self.by_title.get(fp)
+            if pid:
+                return pid, "title"
+        return None, None
+
+
+def resolve_edges(index: CitationIndex, citing_id: str, refs: Iterable[Dict[str, Any]],
+                  stats: Optional[Dict[str, int]] = None) -> List[Tuple[str, str, Optional[str]]]:
+    """将一篇论文的参考文献解析为去重后的 (citing, cited, context) 边列表（排除自引）。"""
+    edges: Dict[str, Optional[str]] = {}
+    for ref in refs:
+        pid, how = index.match(ref)
+        if stats is not None:
+            stats["references"] = stats.get("references", 0) + 1
+            if how:
+                stats[f"matched_{how}"] = stats.get(f"matched_{how}", 0) + 1
+        if pid and pid != citing_id and pid not in edges:
+            raw = ref.get("raw")
+            edges[pid] = raw[:_CONTEXT_MAX_CHARS] if raw else None
+    return [(citing_id, cited, ctx) for cited, ctx in edges.items()]
+
+
+def _load_refs(meta_key: str, meta_value: Optional[str]) -> List[Dict[str, Any]]:
+    """读取元数据中的参考文献；旧数据仅有原始字符串列表时现场解析。"""
+    if not meta_value:
+        return []
+    try:
+        value = json.loads(meta_value)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(value, list):
+        return []
+    if meta_key == "parsed_references":
+        return [r for r in value if isinstance(r, dict)]
+    return parse_reference_lines(value)
+
+
+class CitationResolver:
+    """批量引用关系解析器"""
+
+    def __init__(self, config, db: Optional[DatabaseManager] = None,
+                 fetch_size: int = 5000, insert_page_size: int = 1000):
+        self.config = config
+        self.db = db or DatabaseManager(config)
+        self.fetch_size = fetch_size
+        self.insert_page_size = insert_page_size
+        self.state_path = Path(config.paths.processed_dir) / _STATE_FILE
+
+    # ---- 水位 ----
+
+    def load_watermark(self) -> Optional[str]:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8")).get("last_created_at")
+        except (OSError, ValueError):
+            return None
+
+    def save_watermark(self, value: Optional[str], stats: Dict[str, Any]) -> None:
+        if value is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        state = {"last_created_at": value, "updated_at": datetime.now().isoformat(), "last_run": stats}
+        self.state_path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    # ---- 数据读取 ----
+
+    def _stream(self, conn, name: str, query: str, params: tuple = ()) -> Iterator[tuple]:
+        """服务端命名游标，按 fetch_size 分批拉取，避免一次性载入全表。"""
+        with conn.cursor(name=name) as cur:
+            cur.itersize = self.fetch_size
+            cur.execute(query, params)
+            yield from cur
+
+    def build_index(self, conn) -> CitationIndex:
+        index = CitationIndex()
+        for pid, doi, title in self._stream(conn, "citation_index", "SELECT id, doi, title FROM paper"):
+            index.add(pid, doi, title)
+        logger.info(f"引用索引已构建: DOI {len(index.by_doi)} 条, 标题指纹 {len(index.by_title)} 条")
+        return index
+
+    def _iter_citing(self, conn, since: Optional[str]) -> Iterator[tuple]:
+        """按论文产出 (paper_id, created_at, meta_key, meta_value)；同一论文优先使用 parsed_references。"""
+        query = """
+            SELECT pm.paper_id, p.created_at, pm.meta_key, pm.meta_value
+            FROM paper_metadata pm
+            JOIN paper p ON p.id = pm.paper_id
+            WHERE pm.meta_key IN ('parsed_references', 'references')
+        """
+        params: tuple = ()
+        if since:
+            # 取 >= 水位：同一时间戳的论文可能跨两次运行，重复插入由 ON CONFLICT 吸收
+            query += " AND p.created_at >= %s"
+            params = (since,)
+        query += " ORDER BY pm.paper_id, pm.meta_key"
+        yield from self._stream(conn, "citation_citing", query, params)
+
+    # ---- 主流程 ----
+
+    def _insert_edges(self, conn, edges: List[Tuple[str, str, Optional[str]]]) -> int:
+        if not edges:
+            return 0
+        inserted = 0
+        size = self.insert_page_size
+        with conn.cursor() as cur:
+            # 逐页执行以累计 rowcount（execute_values 只保留最后一页的计数）
+            for i in range(0, len(edges), size):
+                execute_values(
+                    cur,
+                    """INSERT INTO paper_citation (citing_paper_id, cited_paper_id, citation_context)
+                       VALUES %s
+                       ON CONFLICT (citing_paper_id, cited_paper_id) DO NOTHING""",
+                    edges[i:i + size],
+                    page_size=size,
+                )
+                inserted += max(cur.rowcount, 0)
+        return inserted
+
+    def run(self, full: bool = False, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        执行一次解析
+
+        Args:
+            full: 忽略水位，重新处理全部论文（新论文入库后补全旧论文的引用）
+            dry_run: 只统计不写库、不推进水位
+
+        Returns:
+            统计信息
+        """
+        since = None if full else self.load_watermark()
+        stats: Dict[str, Any] = {"since": since, "papers": 0, "references": 0,
+                                 "matched_doi": 0, "matched_title": 0, "edges": 0, "inserted": 0}
+        high_water = since
+        # 读连接（命名游标需独立事务）与写连接分开，写入按批提交
+        with self.db.get_connection() as read_conn, self.db.get_connection() as write_conn:
+            index = self.build_index(read_conn)
+            buffer: List[Tuple[str, str, Optional[str]]] = []
+            current, current_refs = None, None
+            for pid, created_at, meta_key, meta_value in self._iter_citing(read_conn, since):
+                if created_at is not None:
+                    ts = created_at.isoformat() if hasattr(created_at, "isoformat") else str(created_at)
+                    high_water = max(high_water, ts) if high_water else ts
+                if pid != current:
+                    if current is not None:
+                        buffer.extend(resolve_edges(index, current, current_refs or [], stats))
+                    current, current_refs = pid, None
+                    stats["papers"] += 1
+                # ORDER BY meta_key 使 parsed_references 先于 references 出现
+                if current_refs is None:
+                    refs = _load_refs(meta_key, meta_value)
+                    current_refs = refs or None
+                if len(buffer) >= self.insert_page_size * 10:
+                    stats["edges"] += len(buffer)
+                    if not dry_run:
+                        stats["inserted"] += self._insert_edges(write_conn, buffer)
+                        write_conn.commit()
+                    buffer = []
+            if current is not None:
+                buffer.extend(resolve_edges(index, current, current_refs or [], stats))
+            stats["edges"] += len(buffer)
+            if not dry_run:
+                stats["inserted"] += self._insert_edges(write_conn, buffer)
+                write_conn.commit()
+            read_conn.rollback()
+
+        if not dry_run:
+            self.save_watermark(high_water, stats)
+        logger.info(
+            f"引用解析完成: 论文 {stats['papers']} 篇, 参考文献 {stats['references']} 条, "
+            f"DOI命中 {stats['matched_doi']}, 标题命中 {stats['matched_title']}, 新增边 {stats['inserted']}"
+        )
+        return stats
@@ -1,11 +1,12 @@
 import os
 import logging
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from threading import Lock
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Any, Dict, Optional
 
-@dataclass
+@dataclass(frozen=True)
 class DatabaseConfig:
     host: str = "localhost"
     port: int = 5432
@@ -14,7 +15,7 @@ class DatabaseConfig:
     database: str = "knowledge_base"
     sslmode: str = "prefer"
 
-@dataclass
+@dataclass(frozen=True)
 class MinerUConfig:
     """MinerU相关配置"""
     mineru_path: str = ""
@@ -28,7 +29,7 @@ class MinerUConfig:
     pdf_fast_default: bool = False
     pdf_cleanup_temp: bool = True
 
-@dataclass
+@dataclass(frozen=True)
 class LLMConfig:
     """LLM相关配置"""
     dashscope_api_key: str = ""
@@ -42,7 +43,7 @@ class LLMConfig:
     max_chars: int = 100000
     device: Optional[str] = None  # LLM设备配置，如 "cuda:1"
 
-@dataclass
+@dataclass(frozen=True)
 class ParallelConfig:
     """并行处理相关配置"""
     pdf_max_workers: int = 1
@@ -50,7 +51,7 @@ class ParallelConfig:
     gpu_poll_interval_secs: float = 1.0
     gpu_wait_timeout_secs: int = 300
 
-@dataclass
+@dataclass(frozen=True)
 class PathConfig:
     project_root: Path
     input_dir: Path
@@ -72,31 +73,33 @@ class PathConfig:
             temp_dir=Path(os.getenv('TEMP_DIR', root / 'temp'))
         )
 
-class UnifiedConfig:
-    """统一配置管理类"""
-    def __init__(self, config_path: str = None):
-        if config_path:
-            # 允许项目内配置覆盖环境变量，确保路径一致
-            load_dotenv(dotenv_path=config_path, override=True)
-        else:
-            # 默认加载项目根目录下的 config/config.env
-            project_root = Path(os.getenv('PROJECT_ROOT', '/root/kb_create'))
-            env_path = project_root / 'config' / 'config.env'
-            if env_path.exists():
-                load_dotenv(dotenv_path=env_path, override=True)
-            else:
-                print(f"警告: 默认配置文件 {env_path} 不存在，将依赖环境变量。")
+# 进程级配置缓存：每个配置文件只加载一次，各段配置只解析一次，之后所有 Config()/UnifiedConfig() 共享同一组只读对象
+_CACHE_LOCK = Lock()
+_SECTIONS_CACHE: Dict[str, Dict[str, Any]] = {}
+
+_SECTION_NAMES = ("db", "mineru", "llm", "parallel", "paths")
+
 
-        self.db = DatabaseConfig(
+def _resolve_env_path(config_path: Optional[str]) -> Path:
+    if config_path:
+        return Path(config_path)
+    # 默认加载项目根目录下的 config/config.env
+    project_root = Path(os.getenv('PROJECT_ROOT', '/root/kb_create'))
+    return project_root / 'config' / 'config.env'
+
+
+def _build_sections() -> Dict[str, Any]:
+    """从环境变量解析各段配置（调用前已加载配置文件）。"""
+    return {
+        "db": DatabaseConfig(
             host=os.getenv('DB_HOST', 'localhost'),
             port=int(os.getenv('DB_PORT', '5432')),
             user=os.getenv('DB_USER', 'postgres'),
             password=os.getenv('DB_PASSWORD', ''),
             database=os.getenv('DB_NAME', 'knowledge_base'),
             sslmode=os.getenv('DB_SSLMODE', 'require')
-        )
-
-        self.mineru = MinerUConfig(
+        ),
+        "mineru": MinerUConfig(
             mineru_path=os.getenv('MINERU_PATH', ''),
             mineru_method=os.getenv('MINERU_METHOD', 'auto'),
             mineru_lang=os.getenv('MINERU_LANG', 'en'),
@@ -107,9 +110,8 @@ class UnifiedConfig:
             pdf_text_only_default=os.getenv('PDF_TEXT_ONLY_DEFAULT', 'False').lower() == 'true',
             pdf_fast_default=os.getenv('MINERU_FAST_DEFAULT', 'False').lower() == 'true',
             pdf_cleanup_temp=os.getenv('PDF_CLEANUP_TEMP', 'True').lower() == 'true'
-        )
-
-        self.llm = LLMConfig(
+        ),
+        "llm": LLMConfig(
             dashscope_api_key=os.getenv('DASHSCOPE_API_KEY', ''),
             dashscope_model=os.getenv('DASHSCOPE_MODEL', 'qwen3-max'),
             ollama_url=os.getenv('OLLAMA_URL', 'http://localhost:11434'),
@@ -120,16 +122,82 @@ class UnifiedConfig:
             num_ctx=int(os.getenv('LLM_NUM_CTX', '32768')),
             max_chars=int(os.getenv('LLM_MAX_CHARS', '0')),
             device=os.getenv('LLM_DEVICE', None)
-        )
-
-        self.parallel = ParallelConfig(
+        ),
+        "parallel": ParallelConfig(
             pdf_max_workers=int(os.getenv('PDF_MAX_WORKERS', '1')),
             gpu_free_mem_threshold_mb=int(os.getenv('GPU_FREE_MEM_THRESHOLD_MB', '2048')),
             gpu_poll_interval_secs=float(os.getenv('GPU_POLL_INTERVAL_SECS', '1.0')),
             gpu_wait_timeout_secs=int(os.getenv('GPU_WAIT_TIMEOUT_SECS', '300'))
-        )
+        ),
+        "paths": PathConfig.from_env(),
+    }
+
+
+def _load_sections(config_path: Optional[str]) -> Dict[str, Any]:
+    """加载配置文件并解析各段配置；同一配置文件在进程内只处理一次。"""
+    env_path = _resolve_env_path(config_path)
+    key = str(env_path)
+    sections = _SECTIONS_CACHE.get(key)
+    if sections is not None:
+        return sections
+    with _CACHE_LOCK:
+        sections = _SECTIONS_CACHE.get(key)
+        if sections is None:
+            if env_path.exists():
+                # 允许项目内配置覆盖环境变量，确保路径一致；写入 os.environ 后子进程继承同一份设置
+                load_dotenv(dotenv_path=env_path, override=True)
+            elif not config_path:
+                print(f"警告: 默认配置文件 {env_path} 不存在，将依赖环境变量。")
+            sections = _build_sections()
+            _SECTIONS_CACHE[key] = sections
+    return sections
+
 
-        self.paths = PathConfig.from_env()
+def reload_config() -> None:
+    """清空进程级配置缓存，下次构造 Config/UnifiedConfig 时重新加载配置文件与环境变量。"""
+    with _CACHE_LOCK:
+        _SECTIONS_CACHE.clear()
+
+
+class _FrozenConfig:
+    """只读配置基类：属性不可修改，通过 with_* 派生共享其余配置段的新视图。"""
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"配置对象只读，无法修改 {name}；请使用 with_llm()/with_paths() 等派生视图")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"配置对象只读，无法删除 {name}")
+
+    def _set(self, **attrs) -> None:
+        for name, value in attrs.items():
+            object.__setattr__(self, name, value)
+
+
+class UnifiedConfig(_FrozenConfig):
+    """统一配置管理类（各段配置为进程内共享的只读对象）"""
+    def __init__(self, config_path: str = None):
+        self._set(**_load_sections(config_path))
+
+    def _with_section(self, section: str, **changes) -> "UnifiedConfig":
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        object.__setattr__(view, section, replace(getattr(self, section), **changes))
+        return view
+
+    def with_llm(self, url: Optional[str] = None, **changes) -> "UnifiedConfig":
+        """派生仅 LLM 段不同的配置视图；url 为 ollama_url 的简写。"""
+        if url is not None:
+            changes["ollama_url"] = url
+        return self._with_section("llm", **changes)
+
+    def with_paths(self, **changes) -> "UnifiedConfig":
+        return self._with_section("paths", **changes)
+
+    def with_parallel(self, **changes) -> "UnifiedConfig":
+        return self._with_section("parallel", **changes)
+
+    def with_mineru(self, **changes) -> "UnifiedConfig":
+        return self._with_section("mineru", **changes)
 
     def setup_directories(self):
         """创建必要的目录"""
@@ -142,30 +210,54 @@ class UnifiedConfig:
         ]:
             path.mkdir(parents=True, exist_ok=True)
 
-class Config:
+class Config(_FrozenConfig):
     """向后兼容的配置类"""
     def __init__(self, config_path: str = None):
-        self._unified_config = UnifiedConfig(config_path)
+        self._bind(UnifiedConfig(config_path))
+
+    def _bind(self, unified: UnifiedConfig) -> None:
         # 保持原有属性以确保向后兼容
-        self.llm = self._unified_config.llm
-        self.db = self._unified_config.db
-        self.paths = self._unified_config.paths
-        self.mineru_path = self._unified_config.mineru.mineru_path
-        self.mineru_method = self._unified_config.mineru.mineru_method
-        self.mineru_lang = self._unified_config.mineru.mineru_lang
-        self.mineru_model_source = self._unified_config.mineru.mineru_model_source
-        self.dashscope_api_key = self._unified_config.llm.dashscope_api_key
-        self.dashscope_model = self._unified_config.llm.dashscope_model
-        self.pdf_output_format = self._unified_config.mineru.pdf_output_format
-        self.pdf_text_only_default = self._unified_config.mineru.pdf_text_only_default
-        self.pdf_fast_default = self._unified_config.mineru.pdf_fast_default
-        self.pdf_cleanup_temp = self._unified_config.mineru.pdf_cleanup_temp
-        self.mineru_timeout_secs = self._unified_config.mineru.mineru_timeout_secs
-        self.mineru_device = self._unified_config.mineru.mineru_device
-        self.pdf_max_workers = self._unified_config.parallel.pdf_max_workers
-        self.gpu_free_mem_threshold_mb = self._unified_config.parallel.gpu_free_mem_threshold_mb
-        self.gpu_poll_interval_secs = self._unified_config.parallel.gpu_poll_interval_secs
-        self.gpu_wait_timeout_secs = self._unified_config.parallel.gpu_wait_timeout_secs
+        self._set(
+            _unified_config=unified,
+            llm=unified.llm,
+            db=unified.db,
+            paths=unified.paths,
+            mineru_path=unified.mineru.mineru_path,
+            mineru_method=unified.mineru.mineru_method,
+            mineru_lang=unified.mineru.mineru_lang,
+            mineru_model_source=unified.mineru.mineru_model_source,
+            dashscope_api_key=unified.llm.dashscope_api_key,
+            dashscope_model=unified.llm.dashscope_model,
+            pdf_output_format=unified.mineru.pdf_output_format,
+            pdf_text_only_default=unified.mineru.pdf_text_only_default,
+            pdf_fast_default=unified.mineru.pdf_fast_default,
+            pdf_cleanup_temp=unified.mineru.pdf_cleanup_temp,
+            mineru_timeout_secs=unified.mineru.mineru_timeout_secs,
+            mineru_device=unified.mineru.mineru_device,
+            pdf_max_workers=unified.parallel.pdf_max_workers,
+            gpu_free_mem_threshold_mb=unified.parallel.gpu_free_mem_threshold_mb,
+            gpu_poll_interval_secs=unified.parallel.gpu_poll_interval_secs,
+            gpu_wait_timeout_secs=unified.parallel.gpu_wait_timeout_secs,
+        )
+
+    @classmethod
+    def _from_unified(cls, unified: UnifiedConfig) -> "Config":
+        view = object.__new__(cls)
+        view._bind(unified)
+        return view
+
+    def with_llm(self, url: Optional[str] = None, **changes) -> "Config":
+        """派生仅 LLM 段不同的配置视图（如 config.with_llm(device="cuda:1", url=...)）。"""
+        return self._from_unified(self._unified_config.with_llm(url=url, **changes))
+
+    def with_paths(self, **changes) -> "Config":
+        return self._from_unified(self._unified_config.with_paths(**changes))
+
+    def with_parallel(self, **changes) -> "Config":
+        return self._from_unified(self._unified_config.with_parallel(**changes))
+
+    def with_mineru(self, **changes) -> "Config":
+        return self._from_unified(self._unified_config.with_mineru(**changes))
 
     def setup_directories(self):
         """创建必要的目录"""
@@ -2,11 +2,16 @@
 统一的数据导入器 - 优化版本
 """
 from .database import DatabaseManager
+from .metrics import record_cache, track_stage
+from . import tracing
+from . import dead_letter
+from . import import_ledger
 from ..utils.field_mapping import infer_research_field
+import os
 import logging
 from pathlib import Path
 import json
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from ..utils.progress import progress_wrap
 from ..exceptions.processing_error import ProcessingError
 
@@ -16,9 +21,9 @@ logger = logging.getLogger(__name__)
 class DataImporter:
     """统一的数据导入器，支持批量操作和缓存"""
 
-    def __init__(self, config):
+    def __init__(self, config, db: Optional[DatabaseManager] = None):
         self.config = config
-        self.db = DatabaseManager(config)
+        self.db = db or DatabaseManager(config)
         # 延迟加载解析器，避免在仅进行JSON导入时引入可选模块依赖
         self.parser = None
         # 缓存已创建的实体ID以提高性能
@@ -26,6 +31,10 @@ class DataImporter:
 
     def import_markdown_file(self, md_file: Path) -> bool:
         """导入单个Markdown文件"""
+        return self._import_markdown(md_file) is not None
+
+    def _import_markdown(self, md_file: Path) -> Optional[str]:
+        """解析并导入单个Markdown文件，成功返回 paper_id"""
         try:
             md_path = Path(md_file)
             logger.info(f"处理Markdown文件: {md_path.name}")
@@ -37,25 +46,30 @@ class DataImporter:
                     self.parser = LLMParser(self.config)
                 except Exception as e:
                     logger.error(f"LLMParser 不可用，无法解析Markdown: {e}")
-                    return False
+                    dead_letter.set_cause(e)
+                    return None
 
             # 解析Markdown内容
             paper_data = self.parser.parse_markdown_file(str(md_path))
             if not paper_data:
                 logger.error(f"解析失败: {md_path.name}")
-                return False
+                dead_letter.set_cause("ParseError", "解析结果为空")
+                return None
 
             # 导入数据
-            return self.import_paper_data(paper_data)
+            return self._import_paper(paper_data)
 
         except Exception as e:
             logger.error(f"导入文件失败 {md_path.name}: {e}")
-            return False
+            dead_letter.set_cause(e)
+            return None
 
     def _get_cached_id(self, table: str, field: str, value: str) -> Optional[str]:
         """从缓存获取ID"""
         key = (table, field, value)
-        return self._id_cache.get(key)
+        record_id = self._id_cache.get(key)
+        record_cache("entity_id", record_id is not None)
+        return record_id
 
     def _set_cached_id(self, table: str, field: str, value: str, record_id: str) -> None:
         """设置缓存ID"""
@@ -64,6 +78,12 @@ class DataImporter:
 
     def import_paper_data(self, data: Dict[str, Any]) -> bool:
         """导入论文数据"""
+        return self._import_paper(data) is not None
+
+    @track_stage("import")
+    @tracing.traced("import.paper")
+    def _import_paper(self, data: Dict[str, Any]) -> Optional[str]:
+        """导入论文数据，成功返回 paper_id"""
         try:
             # 获取或创建期刊ID（表: venue, 字段: venue_name）
             venue_id = None
@@ -194,7 +214,7 @@ class DataImporter:
             metadata_inserts = []
             metadata_fields = [
                 'hrt_conditions', 'pollutants', 'cod_removal_efficiency',
-                'enzyme_activities', 'references'
+                'enzyme_activities', 'references', 'parsed_references'
             ]
 
             for field in metadata_fields:
@@ -217,25 +237,86 @@ class DataImporter:
                 )
 
             logger.info(f"成功导入论文: {data['title']}")
-            return True
+            return str(paper_id)
 
         except Exception as e:
             logger.error(f"导入论文数据失败: {e}")
-            return False
+            dead_letter.set_cause(e)
+            return None
+
+    def _existing_paper_ids(self, paper_ids: List[str]) -> set:
+        """批量核对 paper_id 是否仍在数据库中；查询失败时信任台账。"""
+        try:
+            rows = self.db.execute_query("SELECT id FROM paper WHERE id::text = ANY(%s)", (list(paper_ids),))
+            return {str(r["id"]) for r in rows}
+        except Exception as e:
+            logger.warning(f"核对导入台账失败，按台账跳过: {e}")
+            return set(paper_ids)
+
+    def filter_unchanged(self, md_files: List[Path]) -> Tuple[List[Tuple[Path, Optional[str]]], List[Path]]:
+        """按导入台账筛选：返回 ([(待导入文件, 内容哈希)], [内容未变化、已导入的文件])。
+
+        命中台账的文件（IMPORT_LEDGER_VERIFY 开启时）再按 paper_id 核对数据库，论文已不存在的重新导入。
+        """
+        ledger = import_ledger.get_ledger(self.config)
+        if ledger is None:
+            return [(Path(f), None) for f in md_files], []
+        digests = []
+        for f in md_files:
+            try:
+                digests.append((Path(f), import_ledger.content_hash(Path(f))))
+            except OSError:
+                # 文件不可读时照常导入，由导入流程记录失败
+                digests.append((Path(f), None))
+        known = ledger.lookup(d for _, d in digests if d)
+        if known and os.getenv("IMPORT_LEDGER_VERIFY", "true").lower() == "true":
+            existing = self._existing_paper_ids(sorted(set(known.values())))
+            stale = [d for d, paper_id in known.items() if paper_id not in existing]
+            if stale:
+                logger.info(f"导入台账中 {len(stale)} 篇论文已不在数据库中，将重新导入")
+                ledger.forget(stale)
+                known = {d: paper_id for d, paper_id in known.items() if paper_id in existing}
+        todo = [(path, digest) for path, digest in digests if not digest or digest not in known]
+        skipped = [path for path, digest in digests if digest and digest in known]
+        return todo, skipped
+
+    def import_with_retry(self, md_path: Path, digest: Optional[str] = None) -> bool:
+        """导入单个Markdown；成功后记入导入台账，失败记入死信存储，按策略当场重试或留待 retry-failed。"""
+        dead_letters = dead_letter.get_store(self.config)
+        retried_now = 0
+        while True:
+            with tracing.document(md_path.stem):
+                paper_id = self._import_markdown(md_path)
+            if paper_id is not None:
+                dead_letters.resolve("import", md_path)
+                ledger = import_ledger.get_ledger(self.config)
+                if ledger is not None:
+                    ledger.record(digest or import_ledger.content_hash(md_path), md_path, paper_id)
+                return True
+            error_class, message = dead_letter.take_cause()
+            decision = dead_letters.record_failure("import", md_path, error_class, message, retried_now)
+            if decision != dead_letter.RETRY_NOW:
+                return False
+            retried_now += 1
 
     def import_batch(self, md_files: list, limit: Optional[int] = None) -> dict:
-        """批量导入Markdown文件"""
-        results = {"imported": 0, "failed": 0, "errors": []}
+        """批量导入Markdown文件；内容未变化的已导入文件在解析前跳过，单个文件失败记入死信存储，不中止整批"""
+        results = {"imported": 0, "skipped": 0, "failed": 0, "errors": []}
+        # limit 限制实际导入的文件数（跳过的文件不计入）
+        todo, skipped = self.filter_unchanged(md_files)
         if limit is not None:
-            md_files = md_files[: max(0, limit)]
+            todo = todo[: max(0, limit)]
+        results["skipped"] = len(skipped)
+        if skipped:
+            logger.info(f"导入台账: 跳过 {len(skipped)} 个内容未变化的已导入文件")
 
         # 清空缓存以避免内存占用过高
         self._id_cache.clear()
 
-        for md_file in progress_wrap(md_files, desc="数据导入", unit="md"):
+        for md_path, digest in progress_wrap(todo, desc="数据导入", unit="md"):
             try:
-                md_path = Path(md_file)
-                if self.import_markdown_file(md_path):
+                ok = self.import_with_retry(md_path, digest)
+                if ok:
                     results["imported"] += 1
                 else:
                     results["failed"] += 1
@@ -250,7 +331,7 @@ class DataImporter:
                 results["failed"] += 1
                 results["errors"].append(str(md_path))
 
-        logger.info(f"批量导入完成: 成功 {results['imported']}, 失败 {results['failed']}")
+        logger.info(f"批量导入完成: 成功 {results['imported']}, 跳过 {results['skipped']}, 失败 {results['failed']}")
         return results
 
     def clear_cache(self) -> None:
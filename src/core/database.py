@@ -8,12 +8,35 @@ from contextlib import contextmanager
 from typing import Optional, Dict, Any, List, Tuple
 import uuid
 import logging
+import weakref
 from threading import Lock
 from .config import Config
+from .metrics import REGISTRY
+from . import tracing
 from ..exceptions import DatabaseError
 
 logger = logging.getLogger(__name__)
 
+_DB_SECONDS = REGISTRY.histogram("kg_db_seconds", "数据库操作耗时（秒）", ("op",))
+# 当前进程内存活的连接池，供 /metrics 抓取时汇总占用情况
+_LIVE_POOLS = weakref.WeakSet()
+
+
+def _collect_pool_usage():
+    in_use = idle = max_conn = 0
+    for p in list(_LIVE_POOLS):
+        if p.closed:
+            continue
+        in_use += len(p._used)
+        idle += len(p._pool)
+        max_conn += p.maxconn
+    yield ("kg_db_pool_connections", "gauge", "数据库连接池连接数",
+           [({"state": "in_use"}, in_use), ({"state": "idle"}, idle)])
+    yield ("kg_db_pool_max_connections", "gauge", "数据库连接池上限", [({}, max_conn)])
+
+
+REGISTRY.register_collector("db_pool", _collect_pool_usage)
+
 
 class DatabaseManager:
     """统一的数据库管理器，支持连接池和批量操作"""
@@ -46,6 +69,7 @@ class DatabaseManager:
                         database=self.config.database,
                         sslmode=getattr(self.config, 'sslmode', 'prefer')
                     )
+                    _LIVE_POOLS.add(self._connection_pool)
                     logger.info("数据库连接池初始化成功")
                 except Exception as e:
                     logger.error(f"数据库连接池初始化失败: {e}")
@@ -82,6 +106,8 @@ class DatabaseManager:
             finally:
                 cursor.close()
 
+    @tracing.traced("db.query")
+    @_DB_SECONDS.time(op="query")
     def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict]:
         """
         执行查询并返回结果
@@ -101,6 +127,8 @@ class DatabaseManager:
             logger.error(f"查询执行失败: {e}")
             raise DatabaseError(f"查询执行失败: {e}", query, params)
 
+    @tracing.traced("db.update")
+    @_DB_SECONDS.time(op="update")
     def execute_update(self, query: str, params: Optional[tuple] = None) -> int:
         """
         执行更新操作，返回影响的行数
@@ -120,6 +148,8 @@ class DatabaseManager:
             logger.error(f"更新执行失败: {e}")
             raise DatabaseError(f"更新执行失败: {e}", query, params)
 
+    @tracing.traced("db.batch_update")
+    @_DB_SECONDS.time(op="batch_update")
     def execute_batch_update(self, query: str, params_list: List[tuple]) -> int:
         """
         执行批量更新操作，返回影响的总行数
@@ -142,6 +172,8 @@ class DatabaseManager:
             logger.error(f"批量更新执行失败: {e}")
             raise DatabaseError(f"批量更新执行失败: {e}", query, params_list[0] if params_list else None)
 
+    @tracing.traced("db.insert")
+    @_DB_SECONDS.time(op="insert")
     def insert_and_get_id(self, query: str, params: tuple) -> Optional[str]:
         """
         插入数据并返回ID
@@ -169,6 +201,8 @@ class DatabaseManager:
             logger.error(f"插入执行失败: {e}")
             raise DatabaseError(f"插入执行失败: {e}", query, params)
 
+    @tracing.traced("db.get_or_create_id")
+    @_DB_SECONDS.time(op="get_or_create_id")
     def get_or_create_id(self, table: str, field: str, value: str,
                         additional_fields: Optional[Dict] = None) -> str:
         """
@@ -258,7 +292,15 @@ class DatabaseManager:
             # 构建参数列表，第一个是record_id，然后是除id外的所有字段值
             field_values = [v for k, v in value_fields.items()]
             params = [record_id] + field_values
-            result = self.insert_and_get_id(insert_query, tuple(params))
+            try:
+                result = self.insert_and_get_id(insert_query, tuple(params))
+            except DatabaseError:
+                # 多节点并发导入时，另一节点可能在查询与插入之间写入了同一实体（唯一约束冲突），
+                # 此时重新查询并复用其ID
+                existing = self.execute_query(query, (value,))
+                if existing:
+                    return existing[0]['id']
+                raise
 
             return result if result else record_id
         except Exception as e:
@@ -0,0 +1,225 @@
+"""
+死信存储：记录处理失败的文档（阶段、错误类别、尝试次数），失败不再中止整批处理。
+
+- 存储：SQLite（默认 logs/dead_letter.sqlite，可用 DEAD_LETTER_PATH 指定），(stage, doc) 唯一；
+  多线程共用一个连接（加锁），多进程各自连接，依赖 SQLite 的文件锁
+- 策略（RetryPolicy）：每次失败后给出 立即重试 / 稍后重试 / 放弃
+  - 错误类别在 DEAD_LETTER_GIVE_UP_ERRORS 中，或累计尝试达到 DEAD_LETTER_MAX_ATTEMPTS：放弃
+  - 错误类别在 DEAD_LETTER_RETRY_NOW_ERRORS 中（连接/超时类），且本次运行内立即重试未超过
+    DEAD_LETTER_RETRY_NOW_LIMIT：当场重试
+  - 其余：稍后重试，按 DEAD_LETTER_BACKOFF_SECS × 2^(尝试次数-1) 推迟，由 `main.py retry-failed` 批量处理
+- 失败原因：处理函数多以布尔值返回，失败点调用 set_cause() 记下错误类别，批处理循环在同一线程 take_cause() 取回
+- 成功处理后 resolve() 删除对应记录（按主键查询，仅在存在记录时写库；其他进程写入的记录同样可见）
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RETRY_NOW = "retry_now"
+RETRY_LATER = "retry_later"
+GIVE_UP = "give_up"
+
+# 记录中的状态
+STATUS_RETRY = "retry"
+STATUS_GAVE_UP = "gave_up"
+
+# MinerU 子进程超时（TimeoutExpired）对同一PDF基本可复现，不立即重试，留给 retry-failed
+_DEFAULT_RETRY_NOW = ("ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout",
+                      "OperationalError", "InterfaceError", "PoolError")
+_DEFAULT_GIVE_UP = ("FileNotFoundError", "IsADirectoryError", "PermissionError", "UnicodeDecodeError")
+
+
+def _names(value: Optional[str], default: Tuple[str, ...]) -> FrozenSet[str]:
+    if value is None:
+        return frozenset(default)
+    return frozenset(v.strip() for v in value.split(",") if v.strip())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """失败处理策略"""
+    max_attempts: int = 3
+    retry_now_limit: int = 1
+    backoff_secs: float = 600.0
+    retry_now_errors: FrozenSet[str] = field(default_factory=lambda: frozenset(_DEFAULT_RETRY_NOW))
+    give_up_errors: FrozenSet[str] = field(default_factory=lambda: frozenset(_DEFAULT_GIVE_UP))
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=int(os.getenv("DEAD_LETTER_MAX_ATTEMPTS", "3")),
+            retry_now_limit=int(os.getenv("DEAD_LETTER_RETRY_NOW_LIMIT", "1")),
+            backoff_secs=float(os.getenv("DEAD_LETTER_BACKOFF_SECS", "600")),
+            retry_now_errors=_names(os.getenv("DEAD_LETTER_RETRY_NOW_ERRORS"), _DEFAULT_RETRY_NOW),
+            give_up_errors=_names(os.getenv("DEAD_LETTER_GIVE_UP_ERRORS"), _DEFAULT_GIVE_UP),
+        )
+
+    def decide(self, error_class: str, attempts: int, retried_now: int = 0) -> str:
+        """attempts 为含本次在内的累计失败次数，retried_now 为本次运行内已立即重试的次数。"""
+        if error_class in self.give_up_errors or attempts >= self.max_attempts:
+            return GIVE_UP
+        if error_class in self.retry_now_errors and retried_now < self.retry_now_limit:
+            return RETRY_NOW
+        return RETRY_LATER
+
+    def next_retry_at(self, attempts: int, now: float) -> float:
+        return now + self.backoff_secs * (2 ** max(0, attempts - 1))
+
+
+# ---------------------------------------------------------------------------
+# 失败原因（同一线程内由失败点写入、由批处理循环读取）
+# ---------------------------------------------------------------------------
+
+_cause = threading.local()
+
+
+def set_cause(error: Any, message: str = "") -> None:
+    """记录当前线程最近一次失败的原因；error 为异常对象或错误类别名。"""
+    if isinstance(error, BaseException):
+        error_class, message = type(error).__name__, message or str(error)
+    else:
+        error_class = str(error)
+    _cause.value = (error_class, message[:500])
+
+
+def take_cause() -> Tuple[str, str]:
+    """取出并清除当前线程记录的失败原因；未记录时为 ("Unknown", "")。"""
+    value = getattr(_cause, "value", None) or ("Unknown", "")
+    _cause.value = None
+    return value
+
+
+# ---------------------------------------------------------------------------
+# 存储
+# ---------------------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dead_letter (
+    stage TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    path TEXT NOT NULL,
+    error_class TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    first_failed_at REAL NOT NULL,
+    last_failed_at REAL NOT NULL,
+    next_retry_at REAL,
+    PRIMARY KEY (stage, doc)
+)
+"""
+
+
+class DeadLetterStore:
+    """SQLite 死信存储"""
+
+    def __init__(self, path: Path, policy: Optional[RetryPolicy] = None):
+        self.path = Path(path)
+        self.policy = policy or RetryPolicy.from_env()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+
+    def record_failure(self, stage: str, path: Path, error_class: str, error: str = "",
+                       retried_now: int = 0) -> str:
+        """记录一次失败并返回策略决定（RETRY_NOW / RETRY_LATER / GIVE_UP）。"""
+        path = Path(path)
+        doc = path.stem
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM dead_letter WHERE stage = ? AND doc = ?",
+                                     (stage, doc)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            decision = self.policy.decide(error_class, attempts, retried_now)
+            status = STATUS_GAVE_UP if decision == GIVE_UP else STATUS_RETRY
+            next_retry = self.policy.next_retry_at(attempts, now) if decision == RETRY_LATER else now
+            self._conn.execute(
+                """INSERT INTO dead_letter (stage, doc, path, error_class, error, attempts, status,
+                                            first_failed_at, last_failed_at, next_retry_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (stage, doc) DO UPDATE SET
+                       path = excluded.path, error_class = excluded.error_class, error = excluded.error,
+                       attempts = excluded.attempts, status = excluded.status,
+                       last_failed_at = excluded.last_failed_at, next_retry_at = excluded.next_retry_at""",
+                (stage, doc, str(path), error_class, error, attempts, status, now, now,
+                 None if decision == GIVE_UP else next_retry),
+            )
+            self._conn.commit()
+        logger.warning(f"死信记录 [{stage}] {path.name}: {error_class} 第{attempts}次失败 → {decision}")
+        return decision
+
+    def resolve(self, stage: str, path: Path) -> None:
+        """处理成功后移除记录。
+
+        每次按主键查询表（其他进程——多进程阶段的工作进程、并发的 retry-failed——写入的记录同样可见），
+        只有存在记录时才写库，成功的文档不争用 SQLite 写锁。
+        """
+        key = (stage, Path(path).stem)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM dead_letter WHERE stage = ? AND doc = ?", key).fetchone() is None:
+                return
+            self._conn.execute("DELETE FROM dead_letter WHERE stage = ? AND doc = ?", key)
+            self._conn.commit()
+
+    def pending(self, stage: Optional[str] = None, now: Optional[float] = None,
+                include_gave_up: bool = False) -> List[Dict[str, Any]]:
+        """待重试的记录：now 为 None 时不论是否到期；include_gave_up 时包含已放弃的记录。"""
+        sql = "SELECT stage, doc, path, error_class, error, attempts, status, next_retry_at FROM dead_letter WHERE 1 = 1"
+        params: list = []
+        if stage is not None:
+            sql += " AND stage = ?"
+            params.append(stage)
+        if not include_gave_up:
+            sql += " AND status = ?"
+            params.append(STATUS_RETRY)
+        if now is not None:
+            sql += " AND (next_retry_at IS NULL OR next_retry_at <= ?)"
+            params.append(now)
+        sql += " ORDER BY last_failed_at"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        keys = ("stage", "doc", "path", "error_class", "error", "attempts", "status", "next_retry_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def summary(self) -> Dict[str, Any]:
+        """按阶段/状态/错误类别汇总记录数。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, status, error_class, COUNT(*) FROM dead_letter GROUP BY stage, status, error_class"
+            ).fetchall()
+        out: Dict[str, Any] = {"total": 0, "by_stage": {}, "by_error": {}}
+        for stage, status, error_class, n in rows:
+            out["total"] += n
+            out["by_stage"].setdefault(stage, {}).setdefault(status, 0)
+            out["by_stage"][stage][status] += n
+            out["by_error"][error_class] = out["by_error"].get(error_class, 0) + n
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: Dict[str, DeadLetterStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(config) -> DeadLetterStore:
+    """按路径缓存的进程级死信存储（DEAD_LETTER_PATH，默认 logs_dir/dead_letter.sqlite）。"""
+    path = Path(os.getenv("DEAD_LETTER_PATH", "") or config.paths.logs_dir / "dead_letter.sqlite")
+    key = str(path.resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = DeadLetterStore(path)
+        return store
@@ -12,21 +12,26 @@ from pathlib import Path
 from typing import Optional, Dict, List, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from threading import Lock
 import queue
 import threading
+from collections import deque
 
-try:
-    import torch
-    HAS_GPU = torch.cuda.is_available() and torch.cuda.device_count() >= 2
-except ImportError:
-    HAS_GPU = False
+import psutil
 
 from .config import Config
 from .pdf_processor import PDFProcessor
 from .llm_parser import LLMParser
+from .heuristic_pool import HeuristicPool
 from .data_importer import DataImporter
+from .metrics import REGISTRY, MetricsSampler, StageCounters, start_exporter
+from .rolling_metrics import RollingMetrics
+from .autoscaler import Autoscaler, StageObservation, WorkerPool
+from .stage_processes import StageProcessPool, parse_stage_list
+from . import tracing
+from . import dead_letter
+from . import work_lease
 from ..utils.memory_manager import memory_manager
+from ..utils import device as device_probe
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +53,7 @@ class ProcessingStats:
 class DualGPUPipeline:
     """双显卡并行处理管道"""
     
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(self, config: Optional[Config] = None, db=None):
         self.config = config or Config()
         
         # 初始化处理器
@@ -56,46 +61,89 @@ class DualGPUPipeline:
 
         # 为LLM解析器配置GPU2设备
         if hasattr(self.config, 'llm'):
-            # 创建一个新的配置对象，指定GPU2设备
-            import copy
-            llm_config = copy.deepcopy(self.config)
-            llm_config.llm.device = "cuda:1" if HAS_GPU else None
-            try:
-                llm_config.llm.ollama_url = os.getenv("OLLAMA_GPU1_URL", "http://127.0.0.1:11435")
-            except Exception:
-                pass
-            self.llm_parser_gpu2 = LLMParser(llm_config)
+            # 派生仅 LLM 段不同的只读视图，指定GPU2设备
+            self.llm_config = self.config.with_llm(
+                device="cuda:1" if device_probe.has_gpu(2) else None,
+                url=os.getenv("OLLAMA_GPU1_URL", "http://127.0.0.1:11435"),
+            )
         else:
             # 对于旧的配置类，直接使用
-            self.llm_parser_gpu2 = LLMParser(self.config)
+            self.llm_config = self.config
+        self.llm_parser_gpu2 = LLMParser(self.llm_config)
+
+        self.data_importer = DataImporter(self.config, db=db)
+
+        # 启发式进程池：HEURISTIC_PROCESSES>0 时MD启发式解析与TXT转换在子进程中按块执行
+        self.heuristic_processes = int(os.getenv("HEURISTIC_PROCESSES", "0"))
+        self.heuristic_chunk_size = int(os.getenv("HEURISTIC_CHUNK_SIZE", "16"))
+        self.heuristic_pool: Optional[HeuristicPool] = None
+        # 进程池已完成启发式阶段、等待任一MD线程完成LLM补全的文件：(md_file, trace, stage)
+        self._md_stages: deque = deque()
 
-        self.data_importer = DataImporter(self.config)
+        # 多进程阶段：PIPELINE_STAGE_PROCESSES=md,import 时这些阶段在工作进程中执行
+        self.stage_processes = parse_stage_list(os.getenv("PIPELINE_STAGE_PROCESSES", ""))
+        self._db_injected = db is not None
+        self.process_pools: Dict[str, StageProcessPool] = {}
         
         # 任务队列
         self.pdf_queue = queue.Queue(maxsize=1000)
         self.md_queue = queue.Queue(maxsize=1000)
         self.json_queue = queue.Queue(maxsize=1000)
         
-        # 统计信息
-        self.stats = ProcessingStats()
-        self.stats_lock = Lock()
+        # 统计信息：工作线程只做计数器递增；队列深度/GPU显存由后台采样线程按间隔采集
+        self.counters = StageCounters()
+        self.metrics_interval = float(os.getenv("PIPELINE_METRICS_INTERVAL_SECS", "5"))
+        self.sampler = MetricsSampler(
+            self.metrics_interval,
+            probes={"queues": self._sample_queues, "gpu": self._sample_gpu, "memory": self._sample_memory},
+            on_sample=self._on_sample,
+        )
         
         # 停止标志
         self.stop_event = threading.Event()
         
-        # 工作线程
-        self.workers = []
-        
-        # 性能监控
-        self.performance_log = []
+        # 各阶段可伸缩线程池；PIPELINE_AUTOSCALE=true 时由采样线程按队列深度调整线程数
+        self.pools = {
+            "pdf": WorkerPool("pdf", self.pdf_processing_worker),
+            "md": WorkerPool("md", self.md_parsing_worker),
+            "import": WorkerPool("import", self.json_import_worker),
+        }
+        self.autoscale = os.getenv("PIPELINE_AUTOSCALE", "false").lower() == "true"
+        self.autoscaler: Optional[Autoscaler] = None
+        self._worker_budget_base = 0
+        self.scaling_log: List[Dict] = []
+
+        # 失败文档记入死信存储；PDF失败按策略立即重试（记录每个文件已立即重试的次数）。
+        # 重试项放入无界的 _pdf_retries 并由工作线程优先取出，不与调度线程争抢有界的 pdf_queue
+        self.dead_letters = dead_letter.get_store(self.config)
+        self._retried_now: Dict[str, int] = {}
+        self._pdf_retries: deque = deque()
+
+        # 多节点协调：PDF 由领取线程按需从共享租约表领取（WORK_LEASE=true）
+        self.lease_mode = work_lease.enabled()
+        self.lease: Optional[work_lease.WorkLease] = None
+        self._lease_feeder: Optional[threading.Thread] = None
+        
+        # 性能统计：固定内存（最近 PERF_LOG_CAPACITY 条采样 + 分位数草图 + 窗口速率），
+        # 每 PERF_LOG_FLUSH_EVERY 条采样（不超过缓冲区容量）追加写入 dual_gpu_performance.jsonl
+        self.perf_metrics = RollingMetrics(
+            sample_capacity=int(os.getenv("PERF_LOG_CAPACITY", "720")),
+            window_secs=float(os.getenv("PERF_WINDOW_SECS", "60")),
+        )
+        self._perf_flush_every = max(1, min(int(os.getenv("PERF_LOG_FLUSH_EVERY", "10")),
+                                            self.perf_metrics.samples.capacity))
+        self._perf_unflushed = 0
         
     def get_gpu_memory_info(self, device_id: int = 0) -> Dict[str, float]:
         """获取GPU内存信息"""
-        if not HAS_GPU:
+        if not device_probe.has_gpu(2):
             return {"total_gb": 0, "free_gb": 0, "used_gb": 0, "utilization": 0}
         
         try:
-            free_bytes, total_bytes = torch.cuda.mem_get_info(device_id)
+            info = device_probe.mem_get_info(device_id)
+            if info is None:
+                return {"total_gb": 0, "free_gb": 0, "used_gb": 0, "utilization": 0}
+            free_bytes, total_bytes = info
             used_bytes = total_bytes - free_bytes
             
             return {
@@ -108,61 +156,137 @@ class DualGPUPipeline:
             logger.warning(f"获取GPU {device_id} 内存信息失败: {e}")
             return {"total_gb": 0, "free_gb": 0, "used_gb": 0, "utilization": 0}
     
-    def update_stats(self, **kwargs):
-        """更新统计信息"""
-        with self.stats_lock:
-            for key, value in kwargs.items():
-                if hasattr(self.stats, key):
-                    setattr(self.stats, key, value)
-
-            # 更新队列大小
-            self.stats.pdf_queue_size = self.pdf_queue.qsize()
-            self.stats.md_queue_size = self.md_queue.qsize()
-
-            # 更新GPU利用率
-            if HAS_GPU:
-                gpu1_info = self.get_gpu_memory_info(0)
-                gpu2_info = self.get_gpu_memory_info(1) if torch.cuda.device_count() >= 2 else {"utilization": 0, "used_gb": 0}
-                self.stats.gpu1_utilization = gpu1_info["utilization"]
-                self.stats.gpu2_utilization = gpu2_info["utilization"]
-                self.stats.memory_usage_gb = gpu1_info["used_gb"] + gpu2_info.get("used_gb", 0)
-
-        # 定期优化内存使用
-        if self.stats.pdf_processed + self.stats.md_parsed + self.stats.json_imported % 10 == 0:
-            memory_manager.optimize_memory()
+    @property
+    def stats(self) -> ProcessingStats:
+        """当前统计快照（计数器汇总 + 最近一次采样）。"""
+        counts = self.counters.snapshot()
+        sample = self.sampler.snapshot()
+        return ProcessingStats(
+            pdf_processed=counts.get("pdf_processed", 0),
+            pdf_failed=counts.get("pdf_failed", 0),
+            md_parsed=counts.get("md_parsed", 0),
+            md_failed=counts.get("md_failed", 0),
+            json_imported=counts.get("json_imported", 0),
+            json_failed=counts.get("json_failed", 0),
+            pdf_queue_size=sample.get("pdf_queue_size", 0),
+            md_queue_size=sample.get("md_queue_size", 0),
+            gpu1_utilization=sample.get("gpu1_utilization", 0.0),
+            gpu2_utilization=sample.get("gpu2_utilization", 0.0),
+            memory_usage_gb=sample.get("memory_usage_gb", 0.0),
+        )
+
+    def _sample_queues(self) -> Dict[str, int]:
+        return {
+            "pdf_queue_size": self.pdf_queue.qsize(),
+            "md_queue_size": self.md_queue.qsize(),
+            "json_queue_size": self.json_queue.qsize(),
+        }
+
+    def _sample_gpu(self) -> Dict[str, float]:
+        if not device_probe.has_gpu(2):
+            return {}
+        gpu1_info = self.get_gpu_memory_info(0)
+        gpu2_info = self.get_gpu_memory_info(1)
+        return {
+            "gpu1_utilization": gpu1_info["utilization"],
+            "gpu2_utilization": gpu2_info["utilization"],
+            "gpu1_free_gb": gpu1_info["free_gb"],
+            "gpu2_free_gb": gpu2_info["free_gb"],
+            "memory_usage_gb": gpu1_info["used_gb"] + gpu2_info.get("used_gb", 0),
+        }
+
+    def _sample_memory(self) -> Dict[str, float]:
+        # 内存占用超过阈值时才会真正触发 gc（见 MemoryManager.optimize_memory）
+        memory_manager.optimize_memory()
+        return {"rss_gb": psutil.Process().memory_info().rss / (1024**3)}
+
+    def _on_sample(self, sample: Dict) -> None:
+        if self.autoscaler is not None:
+            self._autoscale(sample)
+        self.log_performance()
+
+    def _autoscale(self, sample: Dict) -> None:
+        """按本次采样调整各阶段线程数，并记录每次伸缩决策。"""
+        counts = self.counters.snapshot()
+        obs = {
+            "pdf": StageObservation(sample.get("pdf_queue_size", 0),
+                                    counts.get("pdf_processed", 0) + counts.get("pdf_failed", 0), self.pools["pdf"].size),
+            "md": StageObservation(sample.get("md_queue_size", 0),
+                                   counts.get("md_parsed", 0) + counts.get("md_failed", 0), self.pools["md"].size),
+            "import": StageObservation(sample.get("json_queue_size", 0),
+                                       counts.get("json_imported", 0) + counts.get("json_failed", 0), self.pools["import"].size),
+        }
+        gpu_free = {0: sample["gpu1_free_gb"], 1: sample["gpu2_free_gb"]} if "gpu1_free_gb" in sample else None
+        decisions = self.autoscaler.decide(
+            sample["timestamp"], obs,
+            worker_budget=memory_manager.get_optimal_worker_count(self._worker_budget_base),
+            rss_gb=sample.get("rss_gb", 0.0),
+            gpu_free_gb=gpu_free,
+        )
+        for d in decisions:
+            self.pools[d.stage].resize(d.new)
+            self.scaling_log.append({"timestamp": sample["timestamp"], "stage": d.stage,
+                                     "old": d.old, "new": d.new, "reason": d.reason})
+            logger.info(f"自动伸缩 {d.stage}: {d.old} -> {d.new} 线程 | 队列={obs[d.stage].depth} | {d.reason}")
+
+    def _collect_metrics(self):
+        """/metrics 抓取回调：队列深度实时读取，GPU显存取最近一次采样。"""
+        yield ("kg_queue_depth", "gauge", "双卡流水线队列深度", [
+            ({"queue": "pdf"}, self.pdf_queue.qsize()),
+            ({"queue": "md"}, self.md_queue.qsize()),
+            ({"queue": "json"}, self.json_queue.qsize()),
+        ])
+        sample = self.sampler.snapshot()
+        if "gpu1_utilization" in sample:
+            yield ("kg_gpu_memory_utilization_percent", "gauge", "GPU显存占用率", [
+                ({"gpu": "0"}, sample["gpu1_utilization"]),
+                ({"gpu": "1"}, sample["gpu2_utilization"]),
+            ])
+        yield ("kg_stage_workers", "gauge", "双卡流水线各阶段工作线程数", [
+            ({"stage": name}, pool.size) for name, pool in self.pools.items()
+        ])
+
+    def update_stats(self):
+        """立即采样一次队列深度与GPU显存；计数请使用 self.counters.incr。"""
+        self.sampler.sample_now()
     
     def log_performance(self):
-        """记录性能指标"""
+        """记录性能指标（由采样线程按间隔调用）"""
+        stats = self.stats
         perf_record = {
             "timestamp": time.time(),
             "stats": {
-                "pdf_processed": self.stats.pdf_processed,
-                "pdf_failed": self.stats.pdf_failed,
-                "md_parsed": self.stats.md_parsed,
-                "md_failed": self.stats.md_failed,
-                "json_imported": self.stats.json_imported,
-                "json_failed": self.stats.json_failed,
-                "pdf_queue_size": self.stats.pdf_queue_size,
-                "md_queue_size": self.stats.md_queue_size,
-                "gpu1_utilization": self.stats.gpu1_utilization,
-                "gpu2_utilization": self.stats.gpu2_utilization,
-                "memory_usage_gb": self.stats.memory_usage_gb
+                "pdf_processed": stats.pdf_processed,
+                "pdf_failed": stats.pdf_failed,
+                "md_parsed": stats.md_parsed,
+                "md_failed": stats.md_failed,
+                "json_imported": stats.json_imported,
+                "json_failed": stats.json_failed,
+                "pdf_queue_size": stats.pdf_queue_size,
+                "md_queue_size": stats.md_queue_size,
+                "gpu1_utilization": stats.gpu1_utilization,
+                "gpu2_utilization": stats.gpu2_utilization,
+                "memory_usage_gb": stats.memory_usage_gb
             }
         }
-        self.performance_log.append(perf_record)
+        self.perf_metrics.add_sample(perf_record)
+        for name in ("pdf_queue_size", "md_queue_size", "memory_usage_gb"):
+            self.perf_metrics.observe(name, perf_record["stats"][name])
+        self._perf_unflushed += 1
         
         # 定期写入性能日志
-        if len(self.performance_log) % 10 == 0:
+        if self._perf_unflushed >= self._perf_flush_every:
             self.save_performance_log()
     
     def save_performance_log(self):
-        """保存性能日志"""
+        """追加写入上次保存后的采样（写入失败时只保留环形缓冲区容量内的最近采样）"""
         log_file = self.config.paths.logs_dir / "dual_gpu_performance.jsonl"
         try:
+            records = self.perf_metrics.recent_samples(self._perf_unflushed)
             with open(log_file, "a") as f:
-                for record in self.performance_log:
+                for record in records:
                     f.write(json.dumps(record) + "\n")
-            self.performance_log.clear()
+            self._perf_unflushed = 0
         except Exception as e:
             logger.error(f"保存性能日志失败: {e}")
     
@@ -170,115 +294,200 @@ class DualGPUPipeline:
         """PDF处理工作线程 (显卡1)"""
         logger.info(f"PDF处理工作线程 {worker_id} 启动 (GPU-1)")
         
-        while not self.stop_event.is_set():
+        while not self.stop_event.is_set() and not self.pools["pdf"].should_retire():
             try:
-                # 从队列获取PDF文件
-                pdf_file = self.pdf_queue.get(timeout=1)
-                if pdf_file is None:  # 结束信号
+                # 优先取立即重试的PDF，其次从队列获取（附带文档追踪上下文）
+                try:
+                    item = self._pdf_retries.popleft()
+                except IndexError:
+                    item = self.pdf_queue.get(timeout=1)
+                if item is None:  # 结束信号
                     break
+                pdf_file, trace = item
+                tracing.record_queue_wait(trace, "pdf")
                 
                 logger.info(f"工作线程 {worker_id} 处理PDF: {pdf_file.name}")
                 
                 # 配置GPU1参数
-                if HAS_GPU:
-                    try:
-                        gpu_count = torch.cuda.device_count()
-                        device = f"cuda:{worker_id % max(1, gpu_count)}"
-                    except Exception:
-                        device = "cuda:0"
+                if device_probe.has_gpu(2):
+                    device = f"cuda:{worker_id % device_probe.gpu_count()}"
                 else:
                     device = "cpu"
                 output_dir = self.config.paths.output_dir / "markdown"
                 
                 # 处理PDF
-                success = self.pdf_processor_gpu1.process_single_pdf(
-                    pdf_file, 
-                    output_dir,
-                    device=device,
-                    fast=self.config.pdf_fast_default,
-                    text_only=self.config.pdf_text_only_default
-                )
+                pdf_start = time.time()
+                with tracing.activate(trace):
+                    success = self.pdf_processor_gpu1.process_single_pdf(
+                        pdf_file, 
+                        output_dir,
+                        device=device,
+                        fast=self.config.pdf_fast_default,
+                        text_only=self.config.pdf_text_only_default
+                    )
                 
-                if success:
+                md_file = output_dir / f"{pdf_file.stem}.md"
+                if success and md_file.exists():
                     # 将生成的MD文件加入MD队列
-                    md_file = output_dir / f"{pdf_file.stem}.md"
-                    if md_file.exists():
-                        self.md_queue.put(md_file)
-                        with self.stats_lock:
-                            self.stats.pdf_processed += 1
-                        logger.info(f"PDF处理成功: {pdf_file.name} -> {md_file.name}")
-                    else:
-                        with self.stats_lock:
-                            self.stats.pdf_failed += 1
-                        logger.error(f"PDF处理成功但未找到MD文件: {pdf_file.name}")
+                    self.dead_letters.resolve("pdf", pdf_file)
+                    self.perf_metrics.observe("pdf_seconds", time.time() - pdf_start)
+                    if self.lease is not None:
+                        self.lease.complete(pdf_file, True, time.time() - pdf_start)
+                    self.md_queue.put((md_file, tracing.mark_enqueued(trace)))
+                    self.counters.incr("pdf_processed")
+                    logger.info(f"PDF处理成功: {pdf_file.name} -> {md_file.name}")
                 else:
-                    with self.stats_lock:
-                        self.stats.pdf_failed += 1
-                    logger.error(f"PDF处理失败: {pdf_file.name}")
+                    if success:
+                        logger.error(f"PDF处理成功但未找到MD文件: {pdf_file.name}")
+                        dead_letter.set_cause("OutputMissing", "未找到MD文件")
+                    else:
+                        logger.error(f"PDF处理失败: {pdf_file.name}")
+                    if self._record_pdf_failure(pdf_file, trace, time.time() - pdf_start):
+                        # 重试项沿用本项在 pdf_queue 中的未完成计数，完成重试时再 task_done
+                        continue
                 
                 self.pdf_queue.task_done()
-                self.update_stats()
-                self.log_performance()
                 
             except queue.Empty:
                 continue
             except Exception as e:
                 logger.error(f"PDF处理工作线程 {worker_id} 错误: {e}")
-                if 'pdf_file' in locals():
-                    with self.stats_lock:
-                        self.stats.pdf_failed += 1
+                if 'item' in locals():
+                    self.counters.incr("pdf_failed")
                     self.pdf_queue.task_done()
+
+    def _record_pdf_failure(self, pdf_file: Path, trace, duration: float) -> bool:
+        """记入死信存储；策略为立即重试时放入重试队列并返回 True（调用方不 task_done，排空等待不会提前结束）。"""
+        error_class, message = dead_letter.take_cause()
+        retried_now = self._retried_now.get(str(pdf_file), 0)
+        decision = self.dead_letters.record_failure("pdf", pdf_file, error_class, message, retried_now)
+        if decision == dead_letter.RETRY_NOW:
+            self._retried_now[str(pdf_file)] = retried_now + 1
+            self._pdf_retries.append((pdf_file, tracing.mark_enqueued(trace)))
+            return True
+        self.counters.incr("pdf_failed")
+        if self.lease is not None:
+            self.lease.complete(pdf_file, False, duration, error_class)
+        return False
+
+    def _feed_leased_pdfs(self, limit: Optional[int]) -> None:
+        """租约模式的PDF来源：PDF队列低于线程数两倍时领取下一批，本地已处理的直接回报完成。"""
+        output_dir = self.config.paths.output_dir / "markdown"
+        claimed = 0
+        try:
+            while not self.stop_event.is_set() and (limit is None or claimed < limit):
+                room = self.pools["pdf"].size * 2 - self.pdf_queue.qsize()
+                if room <= 0:
+                    time.sleep(0.2)
+                    continue
+                if limit is not None:
+                    room = min(room, limit - claimed)
+                pdf_files = self.lease.claim_wait(room)
+                if not pdf_files:
+                    break
+                claimed += len(pdf_files)
+                for pdf_file in pdf_files:
+                    if (output_dir / f"{pdf_file.stem}.md").exists():
+                        self.lease.complete(pdf_file, True)
+                    else:
+                        self.pdf_queue.put((pdf_file, tracing.mark_enqueued(tracing.new_trace(pdf_file.stem))))
+        except Exception as e:
+            logger.error(f"租约领取线程错误: {e}")
+        logger.info(f"租约领取结束: 本节点共领取 {claimed} 个PDF")
     
     def md_parsing_worker(self, worker_id: int):
         """MD解析工作线程 (显卡2/CPU)"""
         logger.info(f"MD解析工作线程 {worker_id} 启动")
+        # 启用进程池时缩短队列等待，空闲线程及时取走其他线程放入的阶段结果
+        poll_secs = 0.2 if self.heuristic_pool is not None else 1
         
-        while not self.stop_event.is_set():
+        while not self.stop_event.is_set() and not self.pools["md"].should_retire():
             try:
-                # 从队列获取MD文件
-                md_file = self.md_queue.get(timeout=1)
-                if md_file is None:  # 结束信号
-                    break
-                
-                logger.info(f"工作线程 {worker_id} 解析MD: {md_file.name}")
-                
+                # 优先完成已做完启发式阶段的文件（每次一个），其次从队列获取（附带文档追踪上下文）
                 try:
-                    # 解析MD文件
-                    json_data = self.llm_parser_gpu2.parse_markdown_file(str(md_file))
-                    
-                    if json_data and json_data.get("title"):
-                        # 将JSON数据加入JSON队列
-                        json_item = {
-                            "data": json_data,
-                            "source_file": str(md_file),
-                            "pdf_name": md_file.stem
-                        }
-                        self.json_queue.put(json_item)
-                        with self.stats_lock:
-                            self.stats.md_parsed += 1
-                        logger.info(f"MD解析成功: {md_file.name}")
-                    else:
-                        with self.stats_lock:
-                            self.stats.md_failed += 1
-                        logger.warning(f"MD解析结果不完整: {md_file.name}")
-                        
-                except Exception as e:
-                    with self.stats_lock:
-                        self.stats.md_failed += 1
-                    logger.error(f"MD解析失败 {md_file.name}: {e}")
-                
-                self.md_queue.task_done()
-                self.update_stats()
-                self.log_performance()
+                    md_file, trace, stage = self._md_stages.popleft()
+                except IndexError:
+                    item = self.md_queue.get(timeout=poll_secs)
+                    if item is None:  # 结束信号
+                        break
+                    md_file, trace = item
+                    tracing.record_queue_wait(trace, "md")
+                    stage = None
+                    if self.heuristic_pool is not None:
+                        md_file, trace, stage = self._run_heuristic_chunk(md_file, trace)
+                self._parse_md(worker_id, md_file, trace, stage)
                 
             except queue.Empty:
                 continue
             except Exception as e:
                 logger.error(f"MD解析工作线程 {worker_id} 错误: {e}")
-                if 'md_file' in locals():
-                    with self.stats_lock:
-                        self.stats.md_failed += 1
-                    self.md_queue.task_done()
+
+    def _run_heuristic_chunk(self, md_file: Path, trace) -> Tuple[Path, object, Dict]:
+        """取出队列中已就绪的若干文件，整块提交到进程池完成启发式阶段。
+
+        除第一个文件外的阶段结果放入 _md_stages，由各工作线程逐个完成LLM补全，
+        避免单个线程串行完成整块的LLM调用；各文件在 md_queue 中的未完成计数在完成时才 task_done。
+        """
+        md_files, traces = [md_file], [trace]
+        while len(md_files) < self.heuristic_chunk_size:
+            try:
+                nxt = self.md_queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is None:
+                self.md_queue.put(None)  # 放回结束信号
+                break
+            md_files.append(nxt[0])
+            traces.append(nxt[1])
+            tracing.record_queue_wait(nxt[1], "md")
+        try:
+            stages = self.heuristic_pool.run_chunk(md_files)
+        except Exception as e:
+            stages = [{"md_path": str(f), "error": str(e)} for f in md_files]
+        for item in zip(md_files[1:], traces[1:], stages[1:]):
+            self._md_stages.append(item)
+        return md_files[0], traces[0], stages[0]
+
+    def _parse_md(self, worker_id: int, md_file: Path, trace, stage: Optional[Dict]) -> None:
+        """解析单个MD文件并送入JSON队列；stage 为进程池完成的启发式阶段结果。"""
+        logger.info(f"工作线程 {worker_id} 解析MD: {md_file.name}")
+        md_start = time.time()
+        
+        try:
+            # 解析MD文件
+            with tracing.activate(trace):
+                if stage is not None:
+                    if "error" in stage:
+                        raise RuntimeError(stage["error"])
+                    json_data = self.llm_parser_gpu2.complete_stage(stage)
+                elif "md" in self.process_pools:
+                    json_data = self.process_pools["md"].parse_markdown(md_file, trace)
+                else:
+                    json_data = self.llm_parser_gpu2.parse_markdown_file(str(md_file))
+            
+            if json_data and json_data.get("title"):
+                # 将JSON数据加入JSON队列
+                json_item = {
+                    "data": json_data,
+                    "source_file": str(md_file),
+                    "pdf_name": md_file.stem,
+                    "trace": tracing.mark_enqueued(trace),
+                }
+                self.json_queue.put(json_item)
+                self.counters.incr("md_parsed")
+                self.perf_metrics.observe("md_seconds", time.time() - md_start)
+                logger.info(f"MD解析成功: {md_file.name}")
+            else:
+                self.counters.incr("md_failed")
+                logger.warning(f"MD解析结果不完整: {md_file.name}")
+                self.dead_letters.record_failure("import", md_file, "ParseError", "解析结果不完整")
+                
+        except Exception as e:
+            self.counters.incr("md_failed")
+            logger.error(f"MD解析失败 {md_file.name}: {e}")
+            self.dead_letters.record_failure("import", md_file, type(e).__name__, str(e))
+        finally:
+            self.md_queue.task_done()
     
     def json_import_worker(self, worker_id: int):
         """JSON入库工作线程"""
@@ -287,7 +496,7 @@ class DualGPUPipeline:
         batch_size = 50
         batch = []
         
-        while not self.stop_event.is_set():
+        while not self.stop_event.is_set() and not self.pools["import"].should_retire():
             try:
                 # 从队列获取JSON数据
                 json_item = self.json_queue.get(timeout=1)
@@ -296,17 +505,14 @@ class DualGPUPipeline:
                         self._import_batch(batch)
                     break
                 
+                tracing.record_queue_wait(json_item.get("trace"), "json")
                 batch.append(json_item)
-                self.json_queue.task_done()
                 
                 # 批量入库
                 if len(batch) >= batch_size:
                     self._import_batch(batch)
                     batch = []
                 
-                self.update_stats()
-                self.log_performance()
-                
             except queue.Empty:
                 if batch:  # 处理剩余数据
                     self._import_batch(batch)
@@ -315,29 +521,40 @@ class DualGPUPipeline:
             except Exception as e:
                 logger.error(f"JSON入库工作线程 {worker_id} 错误: {e}")
                 if 'json_item' in locals():
-                    with self.stats_lock:
-                        self.stats.json_failed += 1
+                    self.counters.incr("json_failed")
                     self.json_queue.task_done()
+        
+        # 被缩容退出时提交手上剩余的数据
+        if batch:
+            self._import_batch(batch)
     
     def _import_batch(self, batch: List[Dict]):
         """批量导入JSON数据"""
+        batch_start = time.time()
         try:
             # 提取需要导入的数据
             md_files = [item["source_file"] for item in batch]
             
-            # 使用data_importer批量导入
-            results = self.data_importer.import_batch(md_files)
+            # 使用data_importer批量导入（多进程模式下在入库进程中执行）
+            if "import" in self.process_pools:
+                results = self.process_pools["import"].import_batch(md_files)
+            else:
+                results = self.data_importer.import_batch(md_files)
             
-            with self.stats_lock:
-                self.stats.json_imported += results.get("imported", 0)
-                self.stats.json_failed += results.get("failed", 0)
+            self.counters.incr("json_imported", results.get("imported", 0))
+            self.counters.incr("json_failed", results.get("failed", 0))
+            self.perf_metrics.observe("import_batch_seconds", time.time() - batch_start)
+            self.perf_metrics.incr("json_imported", results.get("imported", 0))
             
             logger.info(f"批量导入完成: 成功 {results.get('imported', 0)}, 失败 {results.get('failed', 0)}")
             
         except Exception as e:
             logger.error(f"批量导入失败: {e}")
-            with self.stats_lock:
-                self.stats.json_failed += len(batch)
+            self.counters.incr("json_failed", len(batch))
+        finally:
+            # 入库完成后才标记完成，run_parallel_processing 据此判断流水线已排空
+            for _ in batch:
+                self.json_queue.task_done()
     
     def scan_pdf_files(self, input_dir: Path, limit: Optional[int] = None) -> List[Path]:
         """扫描PDF文件"""
@@ -359,41 +576,81 @@ class DualGPUPipeline:
     def start_workers(self, num_pdf_workers: int = 2, num_md_workers: int = 4, num_import_workers: int = 2):
         """启动工作线程"""
         logger.info(f"启动工作线程: PDF={num_pdf_workers}, MD={num_md_workers}, Import={num_import_workers}")
+
+        if "md" in self.stage_processes and self.heuristic_processes > 0:
+            logger.info("MD解析阶段已在工作进程中执行，不再启动启发式进程池")
+        elif self.heuristic_processes > 0 and self.heuristic_pool is None:
+            self.heuristic_pool = HeuristicPool(
+                self.llm_parser_gpu2,
+                self.heuristic_processes,
+                self.heuristic_chunk_size,
+                os.getenv("HEURISTIC_POOL_START_METHOD", "forkserver"),
+            )
+            self.pdf_processor_gpu1.heuristic_pool = self.heuristic_pool
+
+        initial = {"pdf": num_pdf_workers, "md": num_md_workers, "import": num_import_workers}
+        if self.autoscale:
+            # 上限默认取初始线程数的两倍；GPU 阶段受对应显卡显存余量约束
+            bounds = {
+                stage: (1, max(n, int(os.getenv(f"PIPELINE_AUTOSCALE_MAX_{stage.upper()}_WORKERS", str(n * 2)))))
+                for stage, n in initial.items()
+            }
+            self._worker_budget_base = sum(initial.values())
+            self.autoscaler = Autoscaler(
+                bounds,
+                drain_secs=float(os.getenv("PIPELINE_AUTOSCALE_DRAIN_SECS", "60")),
+                up_after=int(os.getenv("PIPELINE_AUTOSCALE_UP_AFTER", "2")),
+                down_after=int(os.getenv("PIPELINE_AUTOSCALE_DOWN_AFTER", "3")),
+                gpu_stages={"pdf": 0, "md": 1},
+                min_gpu_free_gb=float(os.getenv("PIPELINE_AUTOSCALE_MIN_GPU_FREE_GB", "2")),
+                max_rss_gb=float(os.getenv("PIPELINE_AUTOSCALE_MAX_RSS_GB", "0")),
+            )
+            logger.info(f"自动伸缩已启用: 线程范围 {bounds}")
+
+        # 多进程阶段：进程数取该阶段线程数上限，实际并发度由阶段线程数控制
+        start_method = os.getenv("PIPELINE_STAGE_START_METHOD", "forkserver")
+        for stage in self.stage_processes:
+            if stage in self.process_pools:
+                continue
+            if stage == "import" and self._db_injected:
+                logger.warning("已注入数据库实例，入库阶段保持线程模式")
+                continue
+            processes = self.autoscaler.bounds[stage][1] if self.autoscaler is not None else initial[stage]
+            config = self.llm_config if stage == "md" else self.config
+            self.process_pools[stage] = StageProcessPool(stage, config, processes, start_method)
+
+        self.sampler.start()
+        REGISTRY.register_collector("dual_gpu_pipeline", self._collect_metrics)
+        start_exporter()
         
-        # PDF处理工作线程
-        for i in range(num_pdf_workers):
-            worker = threading.Thread(target=self.pdf_processing_worker, args=(i,))
-            worker.start()
-            self.workers.append(worker)
-        
-        # MD解析工作线程
-        for i in range(num_md_workers):
-            worker = threading.Thread(target=self.md_parsing_worker, args=(i,))
-            worker.start()
-            self.workers.append(worker)
-        
-        # JSON入库工作线程
-        for i in range(num_import_workers):
-            worker = threading.Thread(target=self.json_import_worker, args=(i,))
-            worker.start()
-            self.workers.append(worker)
+        # PDF处理 / MD解析 / JSON入库 工作线程
+        for stage, n in initial.items():
+            self.pools[stage].resize(n)
     
     def stop_workers(self):
         """停止工作线程"""
         logger.info("停止工作线程...")
+        # 先停采样线程，避免停止过程中继续伸缩
+        self.sampler.stop()
         self.stop_event.set()
         
-        # 发送结束信号
-        for _ in range(len([w for w in self.workers if "pdf" in str(w)])):
-            self.pdf_queue.put(None)
-        for _ in range(len([w for w in self.workers if "md" in str(w)])):
-            self.md_queue.put(None)
-        for _ in range(len([w for w in self.workers if "import" in str(w)])):
-            self.json_queue.put(None)
-        
-        # 等待线程结束
-        for worker in self.workers:
-            worker.join(timeout=30)
+        # 等待线程结束（工作线程取队列超时 1 秒后检查停止标志）
+        for pool in self.pools.values():
+            pool.join(timeout=30)
+        self.autoscaler = None
+
+        for pool in self.process_pools.values():
+            pool.close()
+        self.process_pools = {}
+
+        REGISTRY.unregister_collector("dual_gpu_pipeline")
+        # 结束前补采一次，保证最终统计与性能日志包含最后一批计数
+        self.sampler.sample_now()
+
+        if self.heuristic_pool is not None:
+            self.heuristic_pool.close()
+            self.pdf_processor_gpu1.heuristic_pool = None
+            self.heuristic_pool = None
         
         logger.info("所有工作线程已停止")
     
@@ -401,85 +658,121 @@ class DualGPUPipeline:
                                limit_pdfs: Optional[int] = None,
                                num_pdf_workers: int = 2,
                                num_md_workers: int = 4,
-                               num_import_workers: int = 2) -> Dict:
-        """运行并行处理"""
+                               num_import_workers: int = 2,
+                               autoscale: Optional[bool] = None,
+                               stage_processes: Optional[List[str]] = None,
+                               lease: Optional[bool] = None) -> Dict:
+        """运行并行处理
+
+        - autoscale 为 None 时按 PIPELINE_AUTOSCALE 决定是否自动伸缩线程数
+        - stage_processes 为 None 时按 PIPELINE_STAGE_PROCESSES 决定哪些阶段在工作进程中执行
+        - lease 为 None 时按 WORK_LEASE 决定是否从共享租约表领取PDF（多节点协调，limit_pdfs 为本节点领取上限）
+        """
         logger.info("=== 开始双显卡并行处理 ===")
         start_time = time.time()
+        if lease is not None:
+            self.lease_mode = lease
         
         # 扫描PDF文件
         input_path = input_dir or self.config.paths.input_dir
-        pdf_files = self.scan_pdf_files(input_path, limit_pdfs)
+        if self.lease_mode:
+            # 本地扫描结果幂等写入租约表，实际处理的文件由领取线程按需领取
+            self.lease = work_lease.WorkLease.from_config(self.config, input_path)
+            self.lease.seed(sorted(input_path.rglob("*.pdf")))
+            self.lease.start()
+            pdf_files = []
+        else:
+            pdf_files = self.scan_pdf_files(input_path, limit_pdfs)
         
-        if not pdf_files:
+        if not pdf_files and self.lease is None:
             logger.warning("未找到待处理的PDF文件")
             return {"success": False, "error": "未找到PDF文件"}
+        (self.config.paths.output_dir / "markdown").mkdir(parents=True, exist_ok=True)
+        
+        if autoscale is not None:
+            self.autoscale = autoscale
+        if stage_processes is not None:
+            self.stage_processes = parse_stage_list(",".join(stage_processes))
         
         # 启动工作线程
         self.start_workers(num_pdf_workers, num_md_workers, num_import_workers)
+        process_stages = list(self.process_pools)
         
         # 将PDF文件加入队列
+        if self.lease is not None:
+            self._lease_feeder = threading.Thread(target=self._feed_leased_pdfs, args=(limit_pdfs,),
+                                                  name="work-lease-feeder", daemon=True)
+            self._lease_feeder.start()
         logger.info(f"将 {len(pdf_files)} 个PDF文件加入处理队列")
         for pdf_file in pdf_files:
-            self.pdf_queue.put(pdf_file)
+            self.pdf_queue.put((pdf_file, tracing.mark_enqueued(tracing.new_trace(pdf_file.stem))))
         
         # 等待处理完成
         logger.info("等待处理完成...")
         try:
-            # 等待PDF队列处理完成
-            while not self.pdf_queue.empty():
-                time.sleep(5)
-                self.update_stats()
-                logger.info(f"处理进度: PDF队列={self.stats.pdf_queue_size}, MD队列={self.stats.md_queue_size}, "
-                          f"已处理PDF={self.stats.pdf_processed}, 已解析MD={self.stats.md_parsed}, "
-                          f"已入库={self.stats.json_imported}")
-            
-            # 等待MD队列处理完成
-            while not self.md_queue.empty():
-                time.sleep(5)
-                self.update_stats()
-                logger.info(f"等待MD解析完成: MD队列={self.stats.md_queue_size}")
-            
-            # 等待JSON队列处理完成
-            while not self.json_queue.empty():
-                time.sleep(5)
-                self.update_stats()
-                logger.info(f"等待JSON入库完成: JSON队列={self.json_queue.qsize()}")
+            # 按阶段顺序等待各队列排空：以未完成任务数（含正在处理的项）为准，
+            # 而不是队列为空，避免最后一批仍在处理时就停止下游工作线程
+            for name, q in (("PDF", self.pdf_queue), ("MD", self.md_queue), ("JSON", self.json_queue)):
+                last_log = time.time()
+                while q.unfinished_tasks or (q is self.pdf_queue and self._lease_feeder is not None
+                                             and self._lease_feeder.is_alive()):
+                    time.sleep(0.2)
+                    if time.time() - last_log >= 5:
+                        last_log = time.time()
+                        stats = self.stats
+                        logger.info(f"等待{name}阶段完成: PDF队列={self.pdf_queue.qsize()}, MD队列={self.md_queue.qsize()}, "
+                                  f"JSON队列={self.json_queue.qsize()}, 已处理PDF={stats.pdf_processed}, "
+                                  f"已解析MD={stats.md_parsed}, 已入库={stats.json_imported}")
             
         except KeyboardInterrupt:
             logger.info("用户中断处理")
         
         # 停止工作线程
         self.stop_workers()
-        
-        # 保存最终性能日志
+        node_report = None
+        if self.lease is not None:
+            self.lease.stop()
+            if self._lease_feeder is not None:
+                self._lease_feeder.join(timeout=10)
+            node_report = self.lease.node_report()
+            self.lease = self._lease_feeder = None
+        
+        # 保存最终性能日志与追踪记录
         self.save_performance_log()
+        tracing.flush()
         
         # 计算处理时间
         end_time = time.time()
         total_time = end_time - start_time
+        stats = self.stats
         
         results = {
             "success": True,
             "processing_time_seconds": total_time,
-            "pdf_processed": self.stats.pdf_processed,
-            "pdf_failed": self.stats.pdf_failed,
-            "md_parsed": self.stats.md_parsed,
-            "md_failed": self.stats.md_failed,
-            "json_imported": self.stats.json_imported,
-            "json_failed": self.stats.json_failed,
-            "throughput_pdf_per_second": self.stats.pdf_processed / total_time if total_time > 0 else 0,
+            "pdf_processed": stats.pdf_processed,
+            "pdf_failed": stats.pdf_failed,
+            "md_parsed": stats.md_parsed,
+            "md_failed": stats.md_failed,
+            "json_imported": stats.json_imported,
+            "json_failed": stats.json_failed,
+            "throughput_pdf_per_second": stats.pdf_processed / total_time if total_time > 0 else 0,
+            "scaling_decisions": list(self.scaling_log),
+            "stage_processes": process_stages,
+            "dead_letter": self.dead_letters.summary(),
+            "lease_nodes": node_report,
+            "performance": self.perf_metrics.report(),
             "final_stats": {
-                "gpu1_utilization": self.stats.gpu1_utilization,
-                "gpu2_utilization": self.stats.gpu2_utilization,
-                "memory_usage_gb": self.stats.memory_usage_gb
+                "gpu1_utilization": stats.gpu1_utilization,
+                "gpu2_utilization": stats.gpu2_utilization,
+                "memory_usage_gb": stats.memory_usage_gb
             }
         }
         
         logger.info(f"=== 双显卡并行处理完成 ===")
         logger.info(f"处理时间: {total_time:.2f}秒")
-        logger.info(f"PDF处理: 成功 {self.stats.pdf_processed}, 失败 {self.stats.pdf_failed}")
-        logger.info(f"MD解析: 成功 {self.stats.md_parsed}, 失败 {self.stats.md_failed}")
-        logger.info(f"JSON入库: 成功 {self.stats.json_imported}, 失败 {self.stats.json_failed}")
+        logger.info(f"PDF处理: 成功 {stats.pdf_processed}, 失败 {stats.pdf_failed}")
+        logger.info(f"MD解析: 成功 {stats.md_parsed}, 失败 {stats.md_failed}")
+        logger.info(f"JSON入库: 成功 {stats.json_imported}, 失败 {stats.json_failed}")
         logger.info(f"整体吞吐: {results['throughput_pdf_per_second']:.2f} PDF/秒")
         
         return results
@@ -0,0 +1,101 @@
+"""
+启发式解析进程池：正则启发式与 Markdown→TXT 转换均为纯 Python、受 GIL 约束，
+放到独立进程中执行，避免拖慢流水线线程的调度与统计。
+
+- 任务只传文件路径，返回紧凑的阶段结果（见 LLMParser.heuristic_stage），不回传全文
+- 按块提交（HEURISTIC_CHUNK_SIZE），摊薄进程间通信开销
+- 默认使用 forkserver 启动，避免在已有工作线程的进程中直接 fork
+"""
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .llm_parser import LLMParser
+from .markdown_document import md_to_txt
+
+logger = logging.getLogger(__name__)
+
+# 子进程内复用的解析器（仅用于启发式，不发起LLM调用）
+_WORKER_PARSER: Optional[LLMParser] = None
+
+# 影响启发式阶段输出的解析器设置，由主进程传给子进程保持一致
+_STAGE_SETTINGS = ("llm_policy", "confidence_threshold", "prompt_trunc", "batch_size", "batch_doc_chars")
+
+
+def _init_worker(settings: Dict[str, Any]) -> None:
+    global _WORKER_PARSER
+    _WORKER_PARSER = LLMParser(None)
+    for key, value in settings.items():
+        setattr(_WORKER_PARSER, key, value)
+
+
+def _run_chunk(md_paths: List[str]) -> List[Dict[str, Any]]:
+    """子进程：逐个执行启发式阶段；单篇失败返回 {"md_path", "error"} 而不中断整块。"""
+    out = []
+    for path in md_paths:
+        try:
+            out.append(_WORKER_PARSER.heuristic_stage(path))
+        except Exception as e:
+            out.append({"md_path": path, "error": str(e)})
+    return out
+
+
+def _md_to_txt_file(md_path: str, txt_path: str) -> int:
+    """子进程：读取Markdown、转换为纯文本并写出，返回写入字符数。"""
+    text = md_to_txt(Path(md_path).read_text(encoding="utf-8", errors="ignore"))
+    target = Path(txt_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text, encoding="utf-8")
+    return len(text)
+
+
+class HeuristicPool:
+    """启发式解析进程池"""
+
+    def __init__(self, parser: LLMParser, processes: int, chunk_size: int = 16,
+                 start_method: str = "forkserver"):
+        self.processes = max(1, processes)
+        self.chunk_size = max(1, chunk_size)
+        settings = {key: getattr(parser, key) for key in _STAGE_SETTINGS}
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(settings,),
+        )
+        logger.info(f"启发式进程池已启动: 进程数={self.processes}, 块大小={self.chunk_size}, 启动方式={start_method}")
+
+    def submit_chunk(self, md_paths: Iterable[Union[str, Path]]) -> Future:
+        """提交一块文件，Future 结果为与输入同序的阶段结果列表。"""
+        return self._executor.submit(_run_chunk, [str(p) for p in md_paths])
+
+    def run_chunk(self, md_paths: Iterable[Union[str, Path]]) -> List[Dict[str, Any]]:
+        return self.submit_chunk(md_paths).result()
+
+    def imap(self, md_paths: Iterable[Union[str, Path]]) -> Iterator[Dict[str, Any]]:
+        """按块并行提交全部文件，按输入顺序逐个产出阶段结果（先完成的块可先被消费）。"""
+        paths = [str(p) for p in md_paths]
+        futures = [
+            self.submit_chunk(paths[i:i + self.chunk_size])
+            for i in range(0, len(paths), self.chunk_size)
+        ]
+        for future in futures:
+            yield from future.result()
+
+    def map(self, md_paths: Iterable[Union[str, Path]]) -> List[Dict[str, Any]]:
+        return list(self.imap(md_paths))
+
+    def md_to_txt_file(self, md_path: Union[str, Path], txt_path: Union[str, Path]) -> int:
+        """在子进程中完成 Markdown→TXT 转换（阻塞等待结果）。"""
+        return self._executor.submit(_md_to_txt_file, str(md_path), str(txt_path)).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
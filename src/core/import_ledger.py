@@ -0,0 +1,120 @@
+"""
+导入台账：按Markdown内容哈希记录已导入的文件及其 paper_id，增量导入时在解析前跳过未变化的文件。
+
+- 存储：SQLite（默认 输出目录/import_ledger.sqlite，可用 IMPORT_LEDGER_PATH 指定），content_hash 唯一；
+  同一路径的文件内容变化后，旧哈希记录在新内容导入成功时被替换
+- 命中台账的文件再按 paper_id 批量核对数据库（IMPORT_LEDGER_VERIFY，默认开启），
+  数据库被清空或论文被删除时自动重新导入
+- IMPORT_LEDGER=false 关闭台账，恢复全量导入
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句的参数上限为 999（旧版本），批量查询按此分块
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_ledger (
+    content_hash TEXT PRIMARY KEY,
+    md_path TEXT NOT NULL,
+    paper_id TEXT NOT NULL,
+    imported_at REAL NOT NULL
+)
+"""
+
+
+def content_hash(md_path: Path) -> str:
+    """Markdown文件内容的 SHA-256。"""
+    digest = hashlib.sha256()
+    with open(md_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImportLedger:
+    """SQLite 导入台账"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(_SCHEMA)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_import_ledger_path ON import_ledger (md_path)")
+            self._conn.commit()
+
+    def lookup(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """返回已导入的 {content_hash: paper_id}。"""
+        hashes = list(hashes)
+        found: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(hashes), _CHUNK):
+                chunk = hashes[i:i + _CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT content_hash, paper_id FROM import_ledger WHERE content_hash IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def record(self, digest: str, md_path: Path, paper_id: str) -> None:
+        """记录一次成功导入；同一路径的旧内容记录一并移除。"""
+        with self._lock:
+            self._conn.execute("DELETE FROM import_ledger WHERE md_path = ? AND content_hash != ?",
+                               (str(md_path), digest))
+            self._conn.execute(
+                """INSERT INTO import_ledger (content_hash, md_path, paper_id, imported_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (content_hash) DO UPDATE SET
+                       md_path = excluded.md_path, paper_id = excluded.paper_id, imported_at = excluded.imported_at""",
+                (digest, str(md_path), str(paper_id), time.time()),
+            )
+            self._conn.commit()
+
+    def forget(self, hashes: Iterable[str]) -> None:
+        """移除记录（对应论文已不在数据库中）。"""
+        hashes = list(hashes)
+        with self._lock:
+            for i in range(0, len(hashes), _CHUNK):
+                chunk = hashes[i:i + _CHUNK]
+                self._conn.execute(
+                    f"DELETE FROM import_ledger WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk)
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM import_ledger").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ledgers: Dict[str, ImportLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv("IMPORT_LEDGER", "true").lower() == "true"
+
+
+def get_ledger(config) -> Optional[ImportLedger]:
+    """按路径缓存的进程级导入台账；IMPORT_LEDGER=false 时返回 None。"""
+    if not enabled():
+        return None
+    path = Path(os.getenv("IMPORT_LEDGER_PATH", "") or config.paths.output_dir / "import_ledger.sqlite")
+    key = str(path.resolve())
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = _ledgers[key] = ImportLedger(path)
+        return ledger
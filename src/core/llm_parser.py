@@ -0,0 +1,1266 @@
+import os
+import re
+import json
+import random
+import logging
+import time
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from threading import Event, Lock
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+
+from .markdown_document import MarkdownDocument
+from .metrics import REGISTRY, record_cache, track_stage
+from . import tracing
+from .prompt_templates import PromptTemplate, get_template
+from .reference_parser import Reference, parse_reference_lines, parse_references
+
+logger = logging.getLogger(__name__)
+
+_LLM_SECONDS = REGISTRY.histogram("kg_llm_request_seconds", "单次LLM生成耗时（秒，含空响应重试）", ("model", "outcome"))
+
+# 置信度门控覆盖的核心字段（启发式可独立产出）
+GATED_FIELDS = ["title", "authors", "abstract", "keywords", "doi", "year", "venue"]
+
+_VENUE_SUFFIX_MAP = [
+    (r"Marine-?Poll", "Marine Pollution Bulletin"),
+    (r"Chemical-?Eng", "Chemical Engineering Journal"),
+    (r"Journal-of-Analyt", "Journal of Analytical Chemistry"),
+    (r"Radiation-Physics-and-Chemistry", "Radiation Physics and Chemistry"),
+]
+_KNOWN_VENUES = {name for _, name in _VENUE_SUFFIX_MAP}
+
+
+def _strip_code_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```") and text.endswith("```"):
+        return text.strip("`\n")
+    return text
+
+
+# 预编译的启发式模式（避免每次调用重复编译）
+_AUTHOR_MARK_RE = re.compile(r"\s*[*^⁎]+")
+_AUTHOR_SPLIT_RE = re.compile(r",|;")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_DIGIT_RE = re.compile(r"\d")
+_KEYWORDS_RE = re.compile(r"^\s*Keywords\s*:?\s*(.+)$", re.MULTILINE | re.IGNORECASE)
+_KEYWORD_SPLIT_RE = re.compile(r"[,;]")
+_DOI_RE = re.compile(r"10\.[0-9]{4,9}/\S+")
+_DOI_YEAR_RE = re.compile(r"/(19|20)\d{2}([\./]|$)")
+_DASHES_RE = re.compile(r"[-_]+")
+_FILENAME_YEAR_VENUE_RE = re.compile(r"_(20\d{2}|19\d{2})_(.+)$")
+_FILENAME_YEAR_RE = re.compile(r"_(20\d{2}|19\d{2})")
+_ANY_YEAR_RE = re.compile(r"(19|20)\d{2}")
+_WS_RE = re.compile(r"\s+")
+_TRAILING_WS_RE = re.compile(r"[ \t]+\n")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_JSON_OBJECT_RE = re.compile(r"\{[\s\S]*\}")
+_BANNER_RE = re.compile(r"contents lists available|available online|journal homepage|elsevier", re.IGNORECASE)
+_SINGLE_LATIN_WORD_RE = re.compile(r"[A-Za-z.\-]+")
+_STRICT_DOI_RE = re.compile(r"10\.\d{4,9}/[-._;()/:A-Za-z0-9]+")
+_VENUE_SUFFIX_PATTERNS = [(re.compile(pat, re.IGNORECASE), name) for pat, name in _VENUE_SUFFIX_MAP]
+
+ABSTRACT_HEADINGS = ["Abstract", "A B S T R A C T", "摘要"]
+REFERENCE_HEADINGS = ["References", "参考文献"]
+
+
+def _extract_authors(doc: MarkdownDocument) -> List[str]:
+    # Heuristics: authors appear near the top, often a line after title
+    lines = doc.lines
+    title_idx = None
+    for h in doc.headings:
+        if h.line_no >= 15:
+            break
+        if h.level == 1 and h.spaced:
+            title_idx = h.line_no
+            break
+    if title_idx is None:
+        return []
+    for j in range(title_idx + 1, min(title_idx + 8, len(lines))):
+        line = lines[j].strip()
+        if not line or line.startswith('#'):
+            continue
+        # Filter affiliation-like tokens
+        cleaned = _AUTHOR_MARK_RE.sub("", line)
+        parts = [p.strip() for p in _AUTHOR_SPLIT_RE.split(cleaned) if p.strip()]
+        authors = [p for p in parts if _LATIN_RE.search(p) and not _DIGIT_RE.search(p)]
+        if authors:
+            return authors
+    return []
+
+
+def _extract_keywords(doc: MarkdownDocument) -> List[str]:
+    m = _KEYWORDS_RE.search(doc.text)
+    if not m:
+        return []
+    line = m.group(1).strip()
+    toks = [t.strip().strip(',') for t in _KEYWORD_SPLIT_RE.split(line) if t.strip()]
+    return toks
+
+
+def _extract_doi(doc: MarkdownDocument) -> Optional[str]:
+    m = _DOI_RE.search(doc.text)
+    return m.group(0).strip().rstrip('.') if m else None
+
+
+def _extract_year_from_doi(doi: Optional[str]) -> Optional[int]:
+    if not doi:
+        return None
+    m = _DOI_YEAR_RE.search(doi)
+    if m:
+        try:
+            return int(m.group(0).strip('/').split('.')[0])
+        except Exception:
+            return None
+    return None
+
+
+def _map_venue_from_suffix(suffix: str) -> Optional[str]:
+    for pat, name in _VENUE_SUFFIX_PATTERNS:
+        if pat.search(suffix):
+            return name
+    # Fallback: replace dashes with spaces
+    suffix = _DASHES_RE.sub(" ", suffix).strip()
+    if suffix:
+        return suffix
+    return None
+
+
+def _parse_filename_for_venue_year(file_path: Path) -> (Optional[str], Optional[int]):
+    stem = file_path.stem
+    # Pattern: <title>_<year>_<venue>
+    m = _FILENAME_YEAR_VENUE_RE.search(stem)
+    if m:
+        year = int(m.group(1))
+        venue_suffix = m.group(2)
+        venue = _map_venue_from_suffix(venue_suffix)
+        return venue, year
+    # If only year present
+    m2 = _FILENAME_YEAR_RE.search(stem)
+    if m2:
+        return None, int(m2.group(1))
+    # Fallback: detect any year token anywhere (e.g., " - 2024 - ", spaces, hyphens)
+    m3 = _ANY_YEAR_RE.search(stem)
+    if m3:
+        try:
+            return None, int(m3.group(0))
+        except Exception:
+            pass
+    return None, None
+
+
+def _extract_references(doc: MarkdownDocument) -> List[Reference]:
+    """按条切分参考文献章节（续行合并）并抽取 DOI/年份/作者/标题，不设条数上限。"""
+    refs = doc.section(REFERENCE_HEADINGS)
+    if not refs:
+        return []
+    return parse_references(refs)
+
+
+def _infer_research_field(title: str, keywords: List[str], venue: Optional[str], abstract: str) -> Optional[str]:
+    low_kw = [k.lower() for k in keywords]
+    low_title = (title or '').lower()
+    low_abs = (abstract or '').lower()
+    low_venue = (venue or '').lower()
+
+    if 'marine pollution bulletin' in low_venue:
+        return 'Marine Pollution'
+    if any('marine' in k or 'pollution' in k for k in low_kw):
+        return 'Marine Pollution'
+    if 'marine' in low_title or 'pollution' in low_title:
+        return 'Marine Pollution'
+    if 'wastewater' in low_kw or 'wastewater' in low_title or 'wastewater' in low_abs:
+        return 'Wastewater Treatment'
+    if 'chemical engineering journal' in low_venue:
+        return 'Chemical Engineering'
+    return None
+
+
+class _JsonObjectScanner:
+    """增量扫描流式文本，返回第一个完整的顶层JSON对象文本。"""
+
+    def __init__(self):
+        self.buf: List[str] = []
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        for ch in chunk:
+            if not self.started:
+                if ch != '{':
+                    continue
+                self.started = True
+            self.buf.append(ch)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+            if ch == '"':
+                self.in_string = True
+            elif ch == '{':
+                self.depth += 1
+            elif ch == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    return "".join(self.buf)
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
+    # 粗略估计：ASCII 约4字符/token，中日韩等非ASCII字符约1字符/token，留出余量
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+# 各字段的预期输出token（含键名、引号与分隔符开销），用于按请求估算 num_predict
+_FIELD_OUTPUT_TOKENS = {
+    "title": 48,
+    "authors": 96,
+    "abstract": 400,
+    "keywords": 48,
+    "year": 8,
+    "venue": 24,
+    "research_field": 16,
+    "doi": 24,
+    "references": 768,
+    "pdf_path": 24,
+}
+_OUTPUT_OVERHEAD_TOKENS = 16
+
+
+def _expected_output_tokens(fields: Optional[List[str]] = None) -> int:
+    """按请求字段估算输出token；fields 为 None 表示完整 schema。"""
+    names = _FIELD_OUTPUT_TOKENS.keys() if fields is None else fields
+    return _OUTPUT_OVERHEAD_TOKENS + sum(_FIELD_OUTPUT_TOKENS.get(f, 32) for f in names)
+
+
+def _compact_prompt_text(text: str) -> str:
+    """压缩提示正文：去掉行尾空白并合并连续空行，不改变内容。"""
+    return _BLANK_LINES_RE.sub("\n\n", _TRAILING_WS_RE.sub("\n", text)).strip()
+
+
+def _nonempty(val) -> bool:
+    return val is not None and val != "" and val != []
+
+
+def _to_int_safe(v) -> Optional[int]:
+    if v is None:
+        return None
+    try:
+        if isinstance(v, int):
+            return v
+        if isinstance(v, str) and v.strip().isdigit():
+            return int(v.strip())
+    except Exception:
+        return None
+    return None
+
+
+def _heuristic_confidence(result: Dict[str, Any], year_source: Optional[str]) -> Dict[str, float]:
+    """为启发式结果逐字段打分（0~1），用于决定哪些字段需要交给LLM补全。"""
+    conf = {f: 0.0 for f in GATED_FIELDS}
+
+    title = result.get("title") or ""
+    if title:
+        banner = _BANNER_RE.search(title)
+        conf["title"] = 0.4 if (banner or len(title) < 15 or len(title) > 300) else 0.9
+
+    authors = result.get("authors") or []
+    if authors:
+        # 单个拉丁词（如 "Abstract"、"Highlights"）多半不是人名
+        suspicious = len(authors) > 40 or any(
+            len(a) > 60 or (len(a.split()) < 2 and _SINGLE_LATIN_WORD_RE.fullmatch(a)) for a in authors
+        )
+        conf["authors"] = 0.4 if suspicious else 0.8
+
+    abstract = result.get("abstract") or ""
+    if abstract:
+        conf["abstract"] = 0.9 if len(abstract) >= 200 else 0.5
+
+    keywords = result.get("keywords") or []
+    if keywords:
+        suspicious = len(keywords) == 1 or len(keywords) > 15 or any(len(k) > 80 for k in keywords)
+        conf["keywords"] = 0.5 if suspicious else 0.85
+
+    doi = result.get("doi") or ""
+    if doi:
+        conf["doi"] = 0.95 if _STRICT_DOI_RE.fullmatch(doi) else 0.5
+
+    year = result.get("year")
+    if year is not None:
+        if not 1900 <= year <= 2100:
+            conf["year"] = 0.3
+        else:
+            conf["year"] = 0.9 if year_source == "filename" else 0.7
+
+    venue = result.get("venue") or ""
+    if venue:
+        conf["venue"] = 0.8 if venue in _KNOWN_VENUES else 0.5
+
+    return conf
+
+
+class LLMParser:
+    """Markdown 解析器：优先使用稳健启发式，必要时调用LLM补全。
+
+    - 本地优先：当 USE_LOCAL_MODEL=true 且 OLLAMA_URL 可用时，用本地模型
+    - 云端回退：当本地不可用且具备 DASHSCOPE_API_KEY 时，使用云端模型
+    - 启发式兜底：当模型不可用或响应不合规时，使用启发式结果
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.use_local = os.getenv('USE_LOCAL_MODEL', 'true').lower() == 'true'
+        self.ollama_url = os.getenv('OLLAMA_URL', 'http://127.0.0.1:11434')
+        self.local_model = os.getenv('MODEL', 'qwen3:30b')
+        self.local_model_fallback = os.getenv('LOCAL_MODEL_FALLBACK', 'qwen2.5:7b-instruct')
+        self.cloud_model = os.getenv('DASHSCOPE_MODEL', 'qwen3-max')
+        self.api_key = os.getenv('DASHSCOPE_API_KEY')
+        # 超时与性能参数（可通过环境变量覆盖）
+        self.ollama_timeout = int(os.getenv('OLLAMA_TIMEOUT', '180'))
+        self.ollama_connect_timeout = int(os.getenv('OLLAMA_CONNECT_TIMEOUT', '5'))
+        self.num_ctx = int(os.getenv('OLLAMA_NUM_CTX', '2048'))
+        self.num_predict = int(os.getenv('OLLAMA_NUM_PREDICT', '512'))
+        self.keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '2h')
+        # 提示截断长度（避免过长导致首token延迟或空响应）
+        self.prompt_trunc = int(os.getenv('OLLAMA_PROMPT_TRUNC', '8000'))
+        # LLM调用策略：always=始终调用；missing=仅对缺失或低置信字段调用；never=仅启发式
+        self.llm_policy = os.getenv('LLM_INVOKE_POLICY', 'always').strip().lower()
+        self.confidence_threshold = float(os.getenv('LLM_CONFIDENCE_THRESHOLD', '0.7'))
+        # 门控统计：跳过率与逐字段来源（heuristic/llm/missing）
+        self._gate_lock = Lock()
+        self.gate_stats = {
+            "documents": 0,
+            "llm_called": 0,
+            "llm_skipped": 0,
+            "field_sources": {f: {"heuristic": 0, "llm": 0, "missing": 0} for f in GATED_FIELDS},
+            "batches": 0,
+            "batched_documents": 0,
+            "batch_retries": 0,
+            "llm_retries": 0,
+            "llm_fallbacks": 0,
+            "heuristic_secs": 0.0,
+            "llm_secs": 0.0,
+        }
+        # 流式生成：完整JSON对象解析完成即提前终止；token上限默认取 num_predict
+        self.stream = os.getenv('OLLAMA_STREAM', 'false').lower() == 'true'
+        self.stream_max_tokens = int(os.getenv('OLLAMA_STREAM_MAX_TOKENS', '0'))
+        self.stream_stats = {
+            "requests": 0,
+            "tokens": 0,
+            "generation_secs": 0.0,
+            "early_stops": 0,
+            "token_ceiling_hits": 0,
+            "ttft_samples": 0,
+            "ttft_total_secs": 0.0,
+            "ttft_max_secs": 0.0,
+        }
+        # 多文档批量提示：LLM_BATCH_SIZE>1 时启用，默认使用小模型（回退模型）
+        self.batch_size = int(os.getenv('LLM_BATCH_SIZE', '1'))
+        self.batch_doc_chars = int(os.getenv('LLM_BATCH_DOC_CHARS', '3000'))
+        self.batch_output_tokens = int(os.getenv('LLM_BATCH_OUTPUT_TOKENS', '384'))
+        self.batch_model = os.getenv('LLM_BATCH_MODEL', self.local_model_fallback)
+        # 自适应上下文：按提示token估算逐请求选择 num_ctx 分档（分档避免每种长度都触发模型重载）
+        self.adaptive_ctx = os.getenv('OLLAMA_ADAPTIVE_CTX', 'false').lower() == 'true'
+        self.ctx_buckets = sorted(
+            int(b) for b in os.getenv('OLLAMA_CTX_BUCKETS', '2048,4096,8192,16384').split(',') if b.strip()
+        ) or [self.num_ctx]
+        self.num_predict_max = int(os.getenv('OLLAMA_NUM_PREDICT_MAX', '2048'))
+        self.sizing_stats = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "buckets": {},
+            "prompt_truncations": 0,
+            "ctx_overflows": 0,
+        }
+        # 提示模板版本（空为最新）；按模板记录前缀缓存命中与 prompt_eval 耗时
+        version = os.getenv('LLM_PROMPT_VERSION', '').strip()
+        self.prompt_template = get_template('metadata', int(version) if version else None)
+        self.batch_template = get_template('batch')
+        self.prompt_stats: Dict[str, Dict[str, Any]] = {}
+        # 尾延迟控制：连接错误抖动指数退避、单篇截止时间（0为不限制）、对冲请求
+        self.connect_retries = int(os.getenv('OLLAMA_CONNECT_RETRIES', '2'))
+        self.backoff_base = float(os.getenv('OLLAMA_BACKOFF_BASE_SECS', '0.5'))
+        self.backoff_max = float(os.getenv('OLLAMA_BACKOFF_MAX_SECS', '8'))
+        self.doc_deadline_secs = float(os.getenv('LLM_DOC_DEADLINE_SECS', '0'))
+        self.hedge_enabled = os.getenv('OLLAMA_HEDGE', 'false').lower() == 'true'
+        # 对冲目标：默认回退模型 + 同一端点；可指定另一台 Ollama
+        self.hedge_model = os.getenv('OLLAMA_HEDGE_MODEL', self.local_model_fallback)
+        self.hedge_url = os.getenv('OLLAMA_HEDGE_URL', '').strip() or None
+        self.hedge_after_secs = float(os.getenv('OLLAMA_HEDGE_AFTER_SECS', '30'))
+        self.hedge_min_samples = int(os.getenv('OLLAMA_HEDGE_MIN_SAMPLES', '20'))
+        self._primary_latencies = deque(maxlen=200)
+        self.retry_stats = {
+            "connect_retries": 0,
+            "backoff_secs": 0.0,
+            "deadline_exceeded": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "primary_wins": 0,
+        }
+
+    def _record_gate(self, llm_called: bool, sources: Dict[str, str]) -> None:
+        with self._gate_lock:
+            self.gate_stats["documents"] += 1
+            self.gate_stats["llm_called" if llm_called else "llm_skipped"] += 1
+            for field, src in sources.items():
+                self.gate_stats["field_sources"][field][src] += 1
+
+    def _add_gate_counter(self, key: str, value=1) -> None:
+        with self._gate_lock:
+            self.gate_stats[key] += value
+
+    def get_gate_stats(self) -> Dict[str, Any]:
+        """返回门控统计快照（含LLM跳过率）。"""
+        with self._gate_lock:
+            snapshot = json.loads(json.dumps(self.gate_stats))
+        docs = snapshot["documents"]
+        snapshot["skip_rate"] = round(snapshot["llm_skipped"] / docs, 4) if docs else 0.0
+        return snapshot
+
+    def get_sizing_stats(self) -> Dict[str, Any]:
+        """返回上下文分档与截断统计快照。"""
+        with self._gate_lock:
+            snapshot = json.loads(json.dumps(self.sizing_stats))
+        reqs = snapshot["requests"]
+        snapshot["avg_prompt_tokens"] = round(snapshot["prompt_tokens"] / reqs, 1) if reqs else 0.0
+        return snapshot
+
+    def _record_prompt_eval(self, template: PromptTemplate, prompt: str, resp: Dict[str, Any]) -> None:
+        """记录 Ollama 返回的 prompt_eval 计数与耗时。
+
+        Ollama 命中前缀缓存时 prompt_eval_count 只包含新计算的 token；
+        估算的提示token与其差值达到前缀的一半即视为缓存命中。
+        """
+        eval_count = resp.get('prompt_eval_count')
+        eval_ns = resp.get('prompt_eval_duration')
+        if eval_count is None or eval_ns is None:
+            return
+        prompt_tokens = _estimate_tokens(prompt)
+        prefix_tokens = _estimate_tokens(template.prefix_of(prompt))
+        cache_hit = prompt_tokens - int(eval_count) >= prefix_tokens // 2
+        record_cache("ollama_prefix", cache_hit)
+        with self._gate_lock:
+            st = self.prompt_stats.setdefault(template.key, {
+                "requests": 0,
+                "cache_hits": 0,
+                "prompt_tokens": 0,
+                "prompt_eval_count": 0,
+                "prompt_eval_ms": 0.0,
+            })
+            st["requests"] += 1
+            st["cache_hits"] += int(cache_hit)
+            st["prompt_tokens"] += prompt_tokens
+            st["prompt_eval_count"] += int(eval_count)
+            st["prompt_eval_ms"] += eval_ns / 1e6
+
+    def get_prompt_stats(self) -> Dict[str, Any]:
+        """返回按模板汇总的前缀缓存命中率与平均 prompt_eval 耗时。"""
+        with self._gate_lock:
+            snapshot = json.loads(json.dumps(self.prompt_stats))
+        for st in snapshot.values():
+            reqs = st["requests"]
+            st["cache_hit_rate"] = round(st["cache_hits"] / reqs, 4) if reqs else 0.0
+            st["avg_prompt_eval_ms"] = round(st["prompt_eval_ms"] / reqs, 2) if reqs else 0.0
+            st["prompt_eval_ms"] = round(st["prompt_eval_ms"], 2)
+        return snapshot
+
+    @property
+    def max_ctx(self) -> int:
+        return self.ctx_buckets[-1] if self.adaptive_ctx else self.num_ctx
+
+    def _size_request(self, prompt: str, expected_output: int) -> (int, int):
+        """按提示token估算与预期输出选择 (num_ctx, num_predict)。
+
+        - 自适应模式：取能容纳 提示+输出 的最小分档；超出最大分档时压缩 num_predict 并计为溢出
+        - 固定模式：沿用 OLLAMA_NUM_CTX，仅统计溢出（Ollama 会静默截断提示）
+        """
+        prompt_tokens = _estimate_tokens(prompt)
+        if self.adaptive_ctx:
+            num_predict = min(expected_output, self.num_predict_max)
+            need = prompt_tokens + num_predict
+            num_ctx = next((b for b in self.ctx_buckets if b >= need), self.ctx_buckets[-1])
+        else:
+            num_predict = expected_output
+            need = prompt_tokens + num_predict
+            num_ctx = self.num_ctx
+        overflow = need > num_ctx
+        if overflow and self.adaptive_ctx:
+            num_predict = max(64, min(num_predict, num_ctx - prompt_tokens))
+        with self._gate_lock:
+            self.sizing_stats["requests"] += 1
+            self.sizing_stats["prompt_tokens"] += prompt_tokens
+            buckets = self.sizing_stats["buckets"]
+            buckets[str(num_ctx)] = buckets.get(str(num_ctx), 0) + 1
+            if overflow:
+                self.sizing_stats["ctx_overflows"] += 1
+        if overflow:
+            logger.warning(f"提示超出上下文窗口，Ollama将截断: 估算 {need} tokens > num_ctx={num_ctx}")
+        return num_ctx, num_predict
+
+    def _ollama_available(self) -> bool:
+        try:
+            r = requests.get(f"{self.ollama_url}/api/tags", timeout=2)
+            return r.status_code == 200
+        except Exception:
+            return False
+
+    def _stream_generate(self, payload: Dict[str, Any],
+                         template: Optional[PromptTemplate] = None,
+                         base_url: Optional[str] = None,
+                         timeout: Optional[tuple] = None,
+                         cancel: Optional[Event] = None) -> Optional[str]:
+        """流式生成：解析到完整的顶层JSON对象即断开连接，并限制token上限。
+
+        cancel 被置位时（对冲请求已有结果）在下一个分块处断开连接。
+        """
+        payload = dict(payload, stream=True)
+        ceiling = self.stream_max_tokens or payload["options"]["num_predict"]
+        scanner = _JsonObjectScanner()
+        pieces: List[str] = []
+        tokens = 0
+        early_stop = False
+        ceiling_hit = False
+        cancelled = False
+        t0 = time.monotonic()
+        t_first = None
+        with requests.post(
+            f"{base_url or self.ollama_url}/api/generate",
+            json=payload,
+            stream=True,
+            timeout=timeout or (self.ollama_connect_timeout, self.ollama_timeout),
+        ) as r:
+            if r.status_code != 200:
+                logger.warning(f"Ollama响应非200: {r.status_code}")
+                return None
+            for line in r.iter_lines():
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    break
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except Exception:
+                    continue
+                piece = str(chunk.get('response', ''))
+                if piece:
+                    if t_first is None:
+                        t_first = time.monotonic()
+                    tokens += 1
+                    pieces.append(piece)
+                    obj_text = scanner.feed(piece)
+                    if obj_text is not None:
+                        early_stop = not chunk.get('done', False)
+                        pieces = [obj_text]
+                        break
+                    if ceiling and tokens >= ceiling:
+                        ceiling_hit = True
+                        break
+                if chunk.get('done'):
+                    # 仅完整结束的流带有 prompt_eval 统计；提前终止时无此数据
+                    if template is not None:
+                        self._record_prompt_eval(template, payload["prompt"], chunk)
+                    break
+        # 退出 with 块即关闭连接，Ollama 随之停止生成
+
+        elapsed = time.monotonic() - t0
+        ttft = (t_first - t0) if t_first is not None else None
+        gen_secs = (time.monotonic() - t_first) if t_first is not None else 0.0
+        tps = tokens / gen_secs if gen_secs > 0 else 0.0
+        with self._gate_lock:
+            st = self.stream_stats
+            st["requests"] += 1
+            st["tokens"] += tokens
+            st["generation_secs"] += gen_secs
+            st["early_stops"] += int(early_stop)
+            st["token_ceiling_hits"] += int(ceiling_hit)
+            if ttft is not None:
+                st["ttft_samples"] += 1
+                st["ttft_total_secs"] += ttft
+                st["ttft_max_secs"] = max(st["ttft_max_secs"], ttft)
+        logger.debug(
+            f"流式生成: model={payload.get('model')} ttft={ttft if ttft is None else round(ttft, 3)}s "
+            f"tokens={tokens} tok/s={tps:.1f} total={elapsed:.2f}s early_stop={early_stop} "
+            f"ceiling_hit={ceiling_hit} cancelled={cancelled}"
+        )
+        if cancelled:
+            return None
+        text = "".join(pieces).strip()
+        return _strip_code_fences(text) or None
+
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """返回流式生成统计快照（平均首token延迟、吞吐、提前终止次数）。"""
+        with self._gate_lock:
+            st = dict(self.stream_stats)
+        st["avg_ttft_secs"] = round(st["ttft_total_secs"] / st["ttft_samples"], 4) if st["ttft_samples"] else None
+        st["tokens_per_sec"] = round(st["tokens"] / st["generation_secs"], 2) if st["generation_secs"] > 0 else 0.0
+        return st
+
+    def _add_retry_counter(self, key: str, value=1) -> None:
+        with self._gate_lock:
+            self.retry_stats[key] += value
+
+    def _record_primary_latency(self, secs: float) -> None:
+        with self._gate_lock:
+            self._primary_latencies.append(secs)
+
+    def _primary_p95(self) -> Optional[float]:
+        with self._gate_lock:
+            samples = sorted(self._primary_latencies)
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def _hedge_delay(self) -> float:
+        """对冲触发时延：主模型成功延迟的 p95；样本不足时使用 OLLAMA_HEDGE_AFTER_SECS。"""
+        p95 = self._primary_p95()
+        return p95 if p95 is not None else self.hedge_after_secs
+
+    def get_retry_stats(self) -> Dict[str, Any]:
+        """返回退避重试、截止时间与对冲请求统计快照。"""
+        with self._gate_lock:
+            st = dict(self.retry_stats)
+        st["backoff_secs"] = round(st["backoff_secs"], 3)
+        p95 = self._primary_p95()
+        st["primary_p95_secs"] = round(p95, 3) if p95 is not None else None
+        st["hedge_win_rate"] = round(st["hedge_wins"] / st["hedged"], 4) if st["hedged"] else 0.0
+        return st
+
+    def _deadline_timeout(self, deadline: Optional[float]) -> Optional[tuple]:
+        """按剩余截止时间收紧读超时；已超时返回 None。"""
+        if deadline is None:
+            return (self.ollama_connect_timeout, self.ollama_timeout)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return (min(self.ollama_connect_timeout, remaining), min(self.ollama_timeout, remaining))
+
+    def _ollama_request(self, model_name: str, use_json_format: bool, prompt_text: str,
+                        num_predict: int, num_ctx: int, template: PromptTemplate,
+                        deadline: Optional[float] = None, base_url: Optional[str] = None,
+                        cancel: Optional[Event] = None) -> Optional[str]:
+        """单次 /api/generate 请求；连接错误按抖动指数退避重试，整体受截止时间约束。"""
+        payload = {
+            "model": model_name,
+            "prompt": prompt_text,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0.2,
+                "num_ctx": num_ctx,
+                "num_predict": num_predict,
+            },
+            # 通过 system 强化仅输出 JSON（模板静态前缀的一部分）
+            "system": template.system,
+        }
+        if use_json_format:
+            payload["format"] = "json"
+        base_url = base_url or self.ollama_url
+
+        attempt = 0
+        while True:
+            timeout = self._deadline_timeout(deadline)
+            if timeout is None:
+                logger.warning(f"Ollama请求已超过单篇截止时间，放弃: model={model_name}")
+                self._add_retry_counter("deadline_exceeded")
+                return None
+            try:
+                with tracing.span("llm.attempt", model=model_name, attempt=attempt, json=use_json_format) as sp:
+                    # 对冲请求始终流式，便于在另一路先返回时断开
+                    if self.stream or cancel is not None:
+                        text = self._stream_generate(payload, template, base_url, timeout, cancel)
+                        sp["outcome"] = "ok" if text else "empty"
+                        return text
+                    r = requests.post(f"{base_url}/api/generate", json=payload, timeout=timeout)
+                    if r.status_code != 200:
+                        logger.warning(f"Ollama响应非200: {r.status_code}")
+                        sp["outcome"] = f"http_{r.status_code}"
+                        return None
+                    try:
+                        obj = r.json()
+                        text = str(obj.get('response', '')).strip()
+                        self._record_prompt_eval(template, prompt_text, obj)
+                    except Exception:
+                        text = _strip_code_fences(r.text.strip())
+                    sp["outcome"] = "ok" if text else "empty"
+                    return text or None
+            except requests.exceptions.ConnectionError as e:
+                if attempt >= self.connect_retries or (cancel is not None and cancel.is_set()):
+                    raise
+                # 全抖动指数退避：sleep ~ U(0, min(cap, base * 2^attempt))，不超过剩余截止时间
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if deadline is not None:
+                    delay = min(delay, max(0.0, deadline - time.monotonic()))
+                attempt += 1
+                logger.info(f"Ollama连接失败，{delay:.2f}s 后第{attempt}次重试: {base_url} ({e})")
+                self._add_retry_counter("connect_retries")
+                self._add_retry_counter("backoff_secs", delay)
+                time.sleep(delay)
+
+    def _generate_with_model(self, model_name: str, prompt: str, predict_budget: int,
+                             template: PromptTemplate, deadline: Optional[float] = None,
+                             base_url: Optional[str] = None,
+                             cancel: Optional[Event] = None) -> Optional[Dict[str, Any]]:
+        t0 = time.perf_counter()
+        res = self._generate_with_model_once(model_name, prompt, predict_budget, template,
+                                             deadline, base_url, cancel)
+        outcome = "ok" if res is not None else ("cancelled" if cancel is not None and cancel.is_set() else "failed")
+        _LLM_SECONDS.observe(time.perf_counter() - t0, model=model_name, outcome=outcome)
+        return res
+
+    def _generate_with_model_once(self, model_name: str, prompt: str, predict_budget: int,
+                                  template: PromptTemplate, deadline: Optional[float],
+                                  base_url: Optional[str],
+                                  cancel: Optional[Event]) -> Optional[Dict[str, Any]]:
+        try:
+            # 尝试1：JSON格式，按提示长度分档
+            num_ctx, num_predict = self._size_request(prompt, predict_budget)
+            logger.info(f"Ollama请求: model={model_name}, num_ctx={num_ctx}, num_predict={num_predict}")
+            text = self._ollama_request(model_name, True, prompt, num_predict, num_ctx,
+                                        template, deadline, base_url, cancel)
+            if not text and not (cancel is not None and cancel.is_set()):
+                logger.info(f"主模型空响应，准备重试: model={model_name}, json_format=True")
+                self._add_gate_counter("llm_retries")
+                # 尝试2：去掉JSON格式限制，截断尾部正文（前缀不变）；自适应模式下按缩短后的提示重新分档
+                short_prompt = prompt[: max(1024, self.prompt_trunc // 2)]
+                if self.adaptive_ctx:
+                    num_ctx, num_predict = self._size_request(short_prompt, num_predict)
+                else:
+                    num_ctx, num_predict = max(512, self.num_ctx // 2), max(64, predict_budget // 2)
+                logger.info(f"Ollama重试: model={model_name}, num_ctx={num_ctx}, num_predict={num_predict}")
+                text = self._ollama_request(model_name, False, short_prompt, num_predict, num_ctx,
+                                            template, deadline, base_url, cancel)
+            if not text:
+                return None
+            try:
+                return json.loads(text)
+            except Exception:
+                m = _JSON_OBJECT_RE.search(text)
+                if m:
+                    try:
+                        return json.loads(m.group(0))
+                    except Exception:
+                        logger.warning("Ollama返回非严格JSON且提取失败")
+                        return None
+                logger.warning("Ollama返回空或不可解析的响应文本")
+                return None
+        except requests.exceptions.ReadTimeout:
+            logger.warning(f"Ollama读取超时 (model={model_name}, timeout={self.ollama_timeout}s)")
+            return None
+        except Exception as e:
+            logger.warning(f"Ollama调用失败 (model={model_name}): {e}")
+            return None
+
+    def _call_ollama_hedged(self, prompt: str, predict_budget: int, template: PromptTemplate,
+                            deadline: Optional[float]) -> Optional[Dict[str, Any]]:
+        """对冲请求：主模型超过其 p95 仍未返回时，向回退模型/备用端点并发发起第二路请求。
+
+        先得到有效JSON的一路胜出，另一路在下一个流式分块处断开。
+        主模型提前失败时第二路即等同于原有的回退调用。
+        """
+        hedge_model = self.hedge_model or self.local_model
+        hedge_url = self.hedge_url or self.ollama_url
+        cancels = {"primary": Event(), "hedge": Event()}
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ollama-hedge')
+        try:
+            t0 = time.monotonic()
+            # 每一路复制当前上下文，使对冲线程内的 LLM span 归属当前文档
+            primary = pool.submit(contextvars.copy_context().run, self._generate_with_model, self.local_model, prompt, predict_budget,
+                                  template, deadline, None, cancels["primary"])
+            legs = {primary: "primary"}
+            hedged = False
+            delay = self._hedge_delay()
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            done, _ = wait([primary], timeout=delay)
+            if primary in done:
+                res = primary.result()
+                if res is not None:
+                    self._record_primary_latency(time.monotonic() - t0)
+                    self._add_retry_counter("primary_wins")
+                    return res
+                logger.info(f"主模型失败，改用: model={hedge_model}, url={hedge_url}")
+                self._add_gate_counter("llm_fallbacks")
+            else:
+                logger.info(f"主模型超过 {delay:.2f}s 未返回，发起对冲请求: model={hedge_model}, url={hedge_url}")
+                self._add_retry_counter("hedged")
+                hedged = True
+
+            hedge = pool.submit(contextvars.copy_context().run, self._generate_with_model, hedge_model, prompt, predict_budget,
+                                template, deadline, hedge_url, cancels["hedge"])
+            legs[hedge] = "hedge"
+            pending = {f for f in legs if not f.done()} | {hedge}
+            while pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    logger.warning("LLM解析超过单篇截止时间，放弃对冲请求")
+                    self._add_retry_counter("deadline_exceeded")
+                    return None
+                done_now, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for f in done_now:
+                    res = f.result()
+                    if res is None:
+                        continue
+                    if legs[f] == "primary":
+                        self._record_primary_latency(time.monotonic() - t0)
+                        self._add_retry_counter("primary_wins")
+                    elif hedged:
+                        self._add_retry_counter("hedge_wins")
+                    return res
+            return None
+        finally:
+            # 取消未完成的一路；不等待其线程结束
+            for ev in cancels.values():
+                ev.set()
+            pool.shutdown(wait=False)
+
+    def _call_ollama(self, prompt: str, model: Optional[str] = None,
+                     num_predict: Optional[int] = None,
+                     template: Optional[PromptTemplate] = None,
+                     deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        predict_budget = num_predict or self.num_predict
+        template = template or self.prompt_template
+        if deadline is None and self.doc_deadline_secs > 0:
+            deadline = time.monotonic() + self.doc_deadline_secs
+
+        # 指定模型时不走回退链（如批量模式固定使用小模型）
+        if model:
+            return self._generate_with_model(model, prompt, predict_budget, template, deadline)
+
+        if self.hedge_enabled:
+            res = self._call_ollama_hedged(prompt, predict_budget, template, deadline)
+            # 对冲使用的不是回退模型时，两路均失败后仍按原顺序尝试回退模型
+            if res is None and self.local_model_fallback and self.local_model_fallback != (self.hedge_model or self.local_model):
+                self._add_gate_counter("llm_fallbacks")
+                res = self._generate_with_model(self.local_model_fallback, prompt, predict_budget, template, deadline)
+            return res
+
+        # 先尝试主模型，失败则回退到7B模型
+        t0 = time.monotonic()
+        res = self._generate_with_model(self.local_model, prompt, predict_budget, template, deadline)
+        if res is not None:
+            self._record_primary_latency(time.monotonic() - t0)
+        if res is None and self.local_model_fallback:
+            logger.info(f"尝试回退本地模型: {self.local_model_fallback}")
+            self._add_gate_counter("llm_fallbacks")
+            res = self._generate_with_model(self.local_model_fallback, prompt, predict_budget, template, deadline)
+        return res
+
+    def _call_dashscope(self, prompt: str) -> Optional[Dict[str, Any]]:
+        if not self.api_key:
+            return None
+        try:
+            import dashscope
+            rsp = dashscope.Generation.call(
+                model=self.cloud_model,
+                prompt=prompt,
+                api_key=self.api_key,
+                result_format='text',
+            )
+            text = _strip_code_fences(str(rsp)).strip()
+            try:
+                return json.loads(text)
+            except Exception:
+                m = _JSON_OBJECT_RE.search(text)
+                if m:
+                    return json.loads(m.group(0))
+                return None
+        except Exception as e:
+            logger.warning(f"DashScope调用失败: {e}")
+            return None
+
+    @staticmethod
+    def _field_schema() -> Dict[str, Any]:
+        return {
+            "title": "string",
+            "authors": ["string"],
+            "abstract": "string",
+            "keywords": ["string"],
+            "year": "int|null",
+            "venue": "string|null",
+            "research_field": "string|null",
+            "doi": "string|null",
+            "references": ["string"],
+            "pdf_path": "string|null",
+        }
+
+    def _build_prompt(self, text: str, fields: Optional[List[str]] = None) -> str:
+        """按当前模板渲染提示：说明、完整 schema 与规则在前，请求字段说明与正文在后。"""
+        # Truncate excessively long text to keep latency bounded
+        text = _compact_prompt_text(text)
+        if len(text) > self.prompt_trunc:
+            with self._gate_lock:
+                self.sizing_stats["prompt_truncations"] += 1
+        truncated = text[: self.prompt_trunc]
+        # schema 保持完整以稳定前缀；仅请求缺失/低置信字段时在正文前列出，缩短输出长度
+        if fields is not None:
+            fields = [k for k in self._field_schema() if k in fields]
+        return self.prompt_template.render(truncated, self._field_schema(), fields=fields)
+
+    def _heuristic_parse(self, doc: MarkdownDocument, md_path: Optional[Path] = None) -> Dict[str, Any]:
+        """启发式解析并决定需要LLM补全的字段，返回解析上下文。"""
+        # Heuristics first：所有抽取器共享同一份标题/行索引
+        title = doc.first_heading()
+        abstract = doc.section(ABSTRACT_HEADINGS)
+        abstract = _WS_RE.sub(" ", abstract).strip()[:4000] if abstract else ""
+        authors = _extract_authors(doc)
+        keywords = _extract_keywords(doc)
+        doi = _extract_doi(doc)
+        references = _extract_references(doc)
+
+        venue = None
+        year = None
+        year_source = None
+        if md_path is not None:
+            v, y = _parse_filename_for_venue_year(md_path)
+            venue = v or venue
+            year = y or year
+            if y:
+                year_source = "filename"
+
+        # Year from DOI if filename lacks year
+        if year is None:
+            y2 = _extract_year_from_doi(doi)
+            if y2:
+                year = y2
+                year_source = "doi"
+
+        # Initial result
+        result = {
+            "title": title or None,
+            "authors": authors or [],
+            "abstract": abstract or None,
+            "keywords": keywords or [],
+            "year": year,
+            "venue": venue,
+            "research_field": None,
+            "doi": doi,
+            "references": [r.raw for r in references],
+            "parsed_references": [r.to_dict() for r in references],
+            "pdf_path": None,
+        }
+
+        # Infer research field if possible
+        if result["research_field"] is None:
+            rf = _infer_research_field(result["title"] or '', result["keywords"], result["venue"], result["abstract"] or '')
+            if rf:
+                result["research_field"] = rf
+
+        # 按策略决定需要LLM补全的字段；None 表示全字段
+        request_fields: Optional[List[str]] = None
+        if self.llm_policy in ("missing", "never"):
+            confidence = _heuristic_confidence(result, year_source)
+            request_fields = [] if self.llm_policy == "never" else [
+                f for f in GATED_FIELDS if confidence[f] < self.confidence_threshold
+            ]
+            if request_fields and result["research_field"] is None:
+                request_fields.append("research_field")
+
+        return {
+            "result": result,
+            "request_fields": request_fields,
+            "heuristic_values": {f: result[f] for f in GATED_FIELDS},
+            "md_path": md_path,
+            "doc": doc,
+        }
+
+    @staticmethod
+    def _needs_llm(ctx: Dict[str, Any]) -> bool:
+        return ctx["request_fields"] is None or bool(ctx["request_fields"])
+
+    def _invoke_llm(self, prompt: str, num_predict: Optional[int] = None) -> (Optional[Dict[str, Any]], bool):
+        """按本地优先、云端回退的顺序调用模型；返回 (结果, 是否实际调用)。"""
+        t0 = time.perf_counter()
+        try:
+            if self.use_local and self._ollama_available():
+                return self._call_ollama(prompt, num_predict=num_predict), True
+            if self.api_key:
+                return self._call_dashscope(prompt), True
+            return None, False
+        finally:
+            self._add_gate_counter("llm_secs", time.perf_counter() - t0)
+
+    def _finish_parse(self, ctx: Dict[str, Any], llm_obj: Optional[Dict[str, Any]], llm_called: bool) -> Dict[str, Any]:
+        """合并LLM结果、规范化并记录字段来源。"""
+        result = ctx["result"]
+        request_fields = ctx["request_fields"]
+
+        # Merge: prefer LLM non-empty fields
+        def pick(a, b):
+            return b if _nonempty(b) else a
+        def prefer_heuristic(a, b):
+            # 保留启发式结果，只有在启发式为空时才采纳LLM值
+            return a if _nonempty(a) else (b if _nonempty(b) else a)
+
+        if llm_obj and request_fields is not None:
+            try:
+                # 门控模式：仅用LLM覆盖被请求的字段
+                for field in request_fields:
+                    val = llm_obj.get(field)
+                    if field == "year":
+                        val = _to_int_safe(val)
+                    result[field] = pick(result[field], val)
+            except Exception as e:
+                logger.warning(f"LLM结果合并失败: {e}")
+        elif llm_obj:
+            try:
+                result["title"] = pick(result["title"], llm_obj.get("title"))
+                result["authors"] = pick(result["authors"], llm_obj.get("authors")) or []
+                result["abstract"] = pick(result["abstract"], llm_obj.get("abstract"))
+                result["keywords"] = pick(result["keywords"], llm_obj.get("keywords")) or []
+                # year/doi/venue 采用“启发式优先、LLM补缺”
+                llm_year = _to_int_safe(llm_obj.get("year"))
+                result["year"] = prefer_heuristic(result["year"], llm_year)
+                result["venue"] = prefer_heuristic(result["venue"], llm_obj.get("venue"))
+                result["doi"] = prefer_heuristic(result["doi"], llm_obj.get("doi"))
+                result["research_field"] = pick(result["research_field"], llm_obj.get("research_field"))
+                # references and pdf_path are optional
+                # 启发式已按条切分时以其为准，LLM 仅在章节缺失时补缺
+                refs = llm_obj.get("references")
+                if isinstance(refs, list) and refs and not result["references"]:
+                    result["references"] = [str(r) for r in refs]
+                    result["parsed_references"] = parse_reference_lines(result["references"])
+                pdfp = llm_obj.get("pdf_path")
+                if isinstance(pdfp, str) and pdfp.lower().endswith('.pdf'):
+                    result["pdf_path"] = pdfp
+            except Exception as e:
+                logger.warning(f"LLM结果合并失败: {e}")
+
+        # Final normalization
+        if result["abstract"]:
+            result["abstract"] = result["abstract"].strip()
+        if result["title"]:
+            result["title"] = result["title"].strip()
+
+        heuristic_values = ctx["heuristic_values"]
+        sources = {}
+        for field in GATED_FIELDS:
+            if not _nonempty(result[field]):
+                sources[field] = "missing"
+            elif result[field] == heuristic_values[field] or (
+                isinstance(result[field], str) and result[field] == (heuristic_values[field] or "").strip()
+            ):
+                sources[field] = "heuristic"
+            else:
+                sources[field] = "llm"
+        self._record_gate(llm_called, sources)
+
+        return result
+
+    def heuristic_stage(self, md_path: Union[str, Path]) -> Dict[str, Any]:
+        """启发式阶段：读取文件并返回可跨进程传递的紧凑结果（不含全文）。
+
+        需要LLM时附带压缩并截断后的提示正文；批量模式下另附题录部分。
+        """
+        t0 = time.perf_counter()
+        path = Path(md_path)
+        doc = MarkdownDocument.from_file(path)
+        ctx = self._heuristic_parse(doc, path)
+        stage = {
+            "md_path": str(path),
+            "result": ctx["result"],
+            "request_fields": ctx["request_fields"],
+            "heuristic_values": ctx["heuristic_values"],
+            "needs_llm": self._needs_llm(ctx),
+            "prompt_text": None,
+            "front_matter": None,
+            "truncated": False,
+        }
+        if stage["needs_llm"]:
+            text = _compact_prompt_text(doc.text)
+            stage["truncated"] = len(text) > self.prompt_trunc
+            stage["prompt_text"] = text[: self.prompt_trunc]
+            if self.batch_size > 1:
+                stage["front_matter"] = doc.front_matter(self.batch_doc_chars)
+        stage["heuristic_secs"] = time.perf_counter() - t0
+        return stage
+
+    def _stage_ctx(self, stage: Dict[str, Any]) -> Dict[str, Any]:
+        """由启发式阶段结果还原解析上下文，并补记阶段内的统计。"""
+        self._add_gate_counter("heuristic_secs", stage["heuristic_secs"])
+        # 启发式可能在子进程中完成，按其耗时补记 span
+        tracing.record("parse.heuristic", time.time() - stage["heuristic_secs"], stage["heuristic_secs"])
+        if stage["truncated"]:
+            with self._gate_lock:
+                self.sizing_stats["prompt_truncations"] += 1
+        return {
+            "result": stage["result"],
+            "request_fields": stage["request_fields"],
+            "heuristic_values": stage["heuristic_values"],
+            "md_path": Path(stage["md_path"]),
+            "doc": None,
+        }
+
+    @track_stage("parse")
+    @tracing.traced("parse.document")
+    def complete_stage(self, stage: Dict[str, Any]) -> Dict[str, Any]:
+        """对启发式阶段结果按需调用LLM并合并，返回最终解析结果。"""
+        ctx = self._stage_ctx(stage)
+        llm_obj: Optional[Dict[str, Any]] = None
+        llm_called = False
+        if stage["needs_llm"]:
+            prompt = self._build_prompt(stage["prompt_text"], fields=ctx["request_fields"])
+            num_predict = _expected_output_tokens(ctx["request_fields"]) if self.adaptive_ctx else None
+            llm_obj, llm_called = self._invoke_llm(prompt, num_predict=num_predict)
+        else:
+            logger.debug(f"启发式字段完整，跳过LLM: {ctx['md_path'].name}")
+        return self._finish_parse(ctx, llm_obj, llm_called)
+
+    def parse_markdown_text(self, text: str, md_path: Optional[Path] = None) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        with tracing.span("parse.heuristic"):
+            ctx = self._heuristic_parse(MarkdownDocument(text), md_path)
+        self._add_gate_counter("heuristic_secs", time.perf_counter() - t0)
+
+        # Try LLM to refine if available
+        llm_obj: Optional[Dict[str, Any]] = None
+        llm_called = False
+        if self._needs_llm(ctx):
+            prompt = self._build_prompt(text, fields=ctx["request_fields"])
+            # 自适应模式按请求字段估算输出长度，否则沿用 OLLAMA_NUM_PREDICT
+            num_predict = _expected_output_tokens(ctx["request_fields"]) if self.adaptive_ctx else None
+            llm_obj, llm_called = self._invoke_llm(prompt, num_predict=num_predict)
+        else:
+            logger.debug(f"启发式字段完整，跳过LLM: {md_path.name if md_path else '<text>'}")
+
+        return self._finish_parse(ctx, llm_obj, llm_called)
+
+    def _build_batch_prompt(self, entries: List[Dict[str, Any]]) -> str:
+        """将多篇压缩后的文档打包为一个提示，要求返回带 index 的结果数组。"""
+        # 单条结果 schema 固定为全部门控字段，各文档请求的字段写在各自的分隔行中
+        batch_fields = GATED_FIELDS + ["research_field"]
+        item_schema = {"index": "int"}
+        item_schema.update({k: v for k, v in self._field_schema().items() if k in batch_fields})
+        parts = []
+        for e in entries:
+            wanted = ", ".join(e["fields"]) if e["fields"] else "all"
+            parts.append(f"\n=== Document {e['index']} (fields: {wanted}) ===\n{e['text']}\n")
+        return self.batch_template.render("".join(parts), item_schema)
+
+    def _plan_batches(self, entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """按上下文窗口(num_ctx，自适应模式取最大分档)贪心装箱，批大小不超过 LLM_BATCH_SIZE。"""
+        header_tokens = _estimate_tokens(self._build_batch_prompt([]))
+        budget = max(0, self.max_ctx - header_tokens)
+        batches: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        used = 0
+        for e in entries:
+            cost = _estimate_tokens(e["text"]) + self.batch_output_tokens
+            if current and (len(current) >= self.batch_size or used + cost > budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(e)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _invoke_batch_llm(self, prompt: str, num_docs: int) -> (Optional[Dict[str, Any]], bool):
+        if self.use_local and self._ollama_available():
+            return self._call_ollama(prompt, model=self.batch_model,
+                                     num_predict=self.batch_output_tokens * num_docs,
+                                     template=self.batch_template), True
+        if self.api_key:
+            return self._call_dashscope(prompt), True
+        return None, False
+
+    @staticmethod
+    def _split_batch_response(obj: Any) -> Dict[int, Dict[str, Any]]:
+        """校验批量响应并按 index 拆分；缺失或不合规的条目不返回。"""
+        items = obj.get("results") if isinstance(obj, dict) else obj
+        if not isinstance(items, list):
+            return {}
+        by_index: Dict[int, Dict[str, Any]] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            idx = _to_int_safe(item.get("index"))
+            if idx is None or idx in by_index:
+                continue
+            by_index[idx] = item
+        return by_index
+
+    @staticmethod
+    def _valid_batch_item(item: Optional[Dict[str, Any]], ctx: Dict[str, Any]) -> bool:
+        if not item:
+            return False
+        for key in ("authors", "keywords"):
+            if item.get(key) is not None and not isinstance(item.get(key), list):
+                return False
+        # 标题缺失时必须由LLM给出
+        if not ctx["result"]["title"] and not (isinstance(item.get("title"), str) and item["title"].strip()):
+            return False
+        return True
+
+    def parse_markdown_batch(self, md_paths: List[Path],
+                             stages: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """批量解析多个Markdown文件，结果顺序与输入一致。
+
+        LLM_BATCH_SIZE>1 时将需要LLM的文档打包成一个提示；批量响应中
+        缺失或校验失败的文档单独重跑。stages 为已在进程池中完成的启发式阶段结果。
+        """
+        if stages is None:
+            stages = [self.heuristic_stage(p) for p in md_paths]
+        ctxs = [self._stage_ctx(st) for st in stages]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(stages)
+
+        pending = [i for i, st in enumerate(stages) if st["needs_llm"]]
+        for i, c in enumerate(ctxs):
+            if i not in pending:
+                results[i] = self._finish_parse(c, None, False)
+
+        if self.batch_size > 1 and len(pending) > 1:
+            entries = [
+                {"index": i, "text": stages[i]["front_matter"] or stages[i]["prompt_text"][: self.batch_doc_chars],
+                 "fields": ctxs[i]["request_fields"]}
+                for i in pending
+            ]
+            for batch in self._plan_batches(entries):
+                if len(batch) == 1:
+                    continue
+                t_batch = time.perf_counter()
+                obj, called = self._invoke_batch_llm(self._build_batch_prompt(batch), len(batch))
+                self._add_gate_counter("llm_secs", time.perf_counter() - t_batch)
+                if not called:
+                    break
+                items = self._split_batch_response(obj)
+                retried = 0
+                for e in batch:
+                    item = items.get(e["index"])
+                    if self._valid_batch_item(item, ctxs[e["index"]]):
+                        results[e["index"]] = self._finish_parse(ctxs[e["index"]], item, True)
+                    else:
+                        retried += 1
+                with self._gate_lock:
+                    self.gate_stats["batches"] += 1
+                    self.gate_stats["batched_documents"] += len(batch)
+                    self.gate_stats["batch_retries"] += retried
+                if retried:
+                    logger.info(f"批量解析 {len(batch)} 篇，{retried} 篇校验失败将单独重跑")
+
+        # 未批量处理或批量失败的文档走单篇路径
+        for i in pending:
+            if results[i] is None:
+                prompt = self._build_prompt(stages[i]["prompt_text"], fields=ctxs[i]["request_fields"])
+                num_predict = _expected_output_tokens(ctxs[i]["request_fields"]) if self.adaptive_ctx else None
+                llm_obj, llm_called = self._invoke_llm(prompt, num_predict=num_predict)
+                results[i] = self._finish_parse(ctxs[i], llm_obj, llm_called)
+        return results
+
+    @track_stage("parse")
+    @tracing.traced("parse.document")
+    def parse_markdown_file(self, md_path_str: str) -> Dict[str, Any]:
+        md_path = Path(md_path_str)
+        text = md_path.read_text(encoding='utf-8', errors='ignore')
+        return self.parse_markdown_text(text, md_path=md_path)
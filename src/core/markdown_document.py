@@ -0,0 +1,153 @@
+"""
+Markdown 文档索引：一次扫描建立行偏移与标题索引，供各启发式抽取器共享
+"""
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+_HEADING_RE = re.compile(r"[ \t]*(#{1,6})(?:[ \t]+(.*?)|[ \t]*(\S.*?))?[ \t]*$")
+_WS_RE = re.compile(r"\s+")
+_INTRO_RE = re.compile(r"(?:1\.?\s+)?introduction\b")
+
+# Markdown→纯文本的替换步骤（模块级预编译，按顺序执行）
+_MD_TO_TXT_STEPS = [
+    # 删除代码块
+    (re.compile(r"```[\s\S]*?```"), "\n"),
+    # 删除图片
+    (re.compile(r"!\[[^\]]*\]\([^\)]*\)"), ""),
+    # 将链接替换为其文本
+    (re.compile(r"\[([^\]]+)\]\([^\)]+\)"), r"\1"),
+    # 去掉标题标记 #
+    (re.compile(r"^\s*#{1,6}\s*", re.MULTILINE), ""),
+    # 去掉强调 * 和 _
+    (re.compile(r"[*_]+"), ""),
+    # 简化列表项前缀
+    (re.compile(r"^[\s>*-]+", re.MULTILINE), ""),
+    # 去掉表格分隔线
+    (re.compile(r"^\s*\|?\s*-{2,}.*$", re.MULTILINE), ""),
+    # 压缩多余空行
+    (re.compile(r"\n{3,}"), "\n\n"),
+]
+
+
+def normalize_heading(name: str) -> str:
+    """标题归一化：小写、压缩空白、去掉首尾冒号与空白。"""
+    return _WS_RE.sub(" ", name).strip().strip(":：").strip().lower()
+
+
+@dataclass
+class Heading:
+    """标题行信息"""
+    index: int
+    line_no: int
+    level: int
+    title: str
+    norm: str
+    start: int       # 标题行起始偏移
+    body_start: int  # 标题行结束（正文起始）偏移
+    spaced: bool     # '#' 后是否有空白（"# Title" 而非 "#Title"）
+
+
+class MarkdownDocument:
+    """一次性切分行与标题的 Markdown 文档。
+
+    - 行偏移与标题只在构造时扫描一次
+    - 按归一化标题名 O(1) 查找章节
+    - 章节边界为下一个同级或更高级标题
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines: List[str] = []
+        self.line_offsets: List[int] = []
+        self.headings: List[Heading] = []
+        self._by_name: Dict[str, int] = {}
+
+        raw_lines = text.split("\n")
+        if raw_lines and raw_lines[-1] == "":
+            raw_lines.pop()
+        offset = 0
+        for line_no, raw in enumerate(raw_lines):
+            line = raw[:-1] if raw.endswith("\r") else raw
+            self.lines.append(line)
+            self.line_offsets.append(offset)
+            if "#" in line[:8]:
+                m = _HEADING_RE.match(line)
+                if m:
+                    title = (m.group(2) if m.group(2) is not None else m.group(3)) or ""
+                    heading = Heading(
+                        index=len(self.headings),
+                        line_no=line_no,
+                        level=len(m.group(1)),
+                        title=title.strip(),
+                        norm=normalize_heading(title),
+                        start=offset,
+                        body_start=offset + len(line),
+                        spaced=m.group(3) is None,
+                    )
+                    self._by_name.setdefault(heading.norm, heading.index)
+                    self.headings.append(heading)
+            offset += len(raw) + 1
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "MarkdownDocument":
+        return cls(Path(path).read_text(encoding="utf-8", errors="ignore"))
+
+    def line_at(self, offset: int) -> int:
+        """返回偏移所在的行号。"""
+        return max(0, bisect_right(self.line_offsets, offset) - 1)
+
+    def first_heading(self) -> str:
+        """首个一级 "# " 标题文本（MinerU 输出均为一级标题）；没有时取首个任意级标题。"""
+        fallback = ""
+        for h in self.headings:
+            if h.spaced and h.title:
+                if h.level == 1:
+                    return h.title
+                fallback = fallback or h.title
+        return fallback
+
+    def find_heading(self, names: Union[str, Iterable[str]]) -> Optional[Heading]:
+        if isinstance(names, str):
+            names = [names]
+        for name in names:
+            idx = self._by_name.get(normalize_heading(name))
+            if idx is not None:
+                return self.headings[idx]
+        return None
+
+    def section_span(self, heading: Heading) -> (int, int):
+        """章节正文的 [start, end) 偏移，止于下一个同级或更高级标题。"""
+        end = len(self.text)
+        for nxt in self.headings[heading.index + 1:]:
+            if nxt.level <= heading.level:
+                end = nxt.start
+                break
+        return heading.body_start, end
+
+    def section(self, names: Union[str, Iterable[str]]) -> str:
+        """按候选标题名返回第一个命中章节的正文；未命中返回空串。"""
+        heading = self.find_heading(names)
+        if heading is None:
+            return ""
+        start, end = self.section_span(heading)
+        return self.text[start:end].strip()
+
+    def front_matter(self, limit: Optional[int] = None) -> str:
+        """正文（Introduction）之前的题录部分。"""
+        end = len(self.text)
+        for h in self.headings:
+            if _INTRO_RE.match(h.norm):
+                end = h.start
+                break
+        text = self.text[:end]
+        return (text[:limit] if limit else text).strip()
+
+
+def md_to_txt(content: str) -> str:
+    """将Markdown内容转换为纯文本，去除图片/链接/格式标记。"""
+    for pattern, repl in _MD_TO_TXT_STEPS:
+        content = pattern.sub(repl, content)
+    return content.strip()
@@ -0,0 +1,509 @@
+"""
+流水线指标：按线程分片的计数器、后台采样线程与 Prometheus 文本格式导出
+
+- StageCounters：每个线程只写自己的分片，递增无需加锁；读取时汇总各分片得到快照，已退出线程的分片并入基础计数
+- MetricsSampler：按固定间隔在后台采集队列深度、GPU显存等较重的指标，
+  结果整体替换为新的字典，读取方直接拿快照，不与工作线程争用锁
+- MetricsRegistry：进程内的 Counter / Gauge / Histogram 与采集回调，
+  render() 输出 Prometheus 文本格式；start_exporter() 在后台线程提供 HTTP /metrics
+- export_state() / state_delta() / merge_state()：子进程按任务回传计数器与直方图增量，
+  由主进程并入自己的注册表，多进程阶段与线程模式对外暴露同一套指标
+"""
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StageCounters:
+    """按线程分片的单调计数器
+
+    工作线程随自动伸缩不断创建与退出：登记新分片或读取时，已退出线程的分片并入基础计数后移除，
+    分片数只与存活线程数有关。
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[str, int]]] = []
+        self._base: Dict[str, int] = {}
+        self._register_lock = threading.Lock()
+
+    def _fold_dead(self) -> List[Dict[str, int]]:
+        """将已退出线程的分片并入基础计数（调用方持有 _register_lock），返回存活线程的分片。"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for name, value in shard.items():
+                    self._base[name] = self._base.get(name, 0) + value
+        self._shards = live
+        return [shard for _, shard in live]
+
+    def _shard(self) -> Dict[str, int]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            # 仅在线程首次递增时加锁登记分片
+            with self._register_lock:
+                self._fold_dead()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def incr(self, name: str, n: int = 1) -> None:
+        shard = self._shard()
+        shard[name] = shard.get(name, 0) + n
+
+    def get(self, name: str) -> int:
+        with self._register_lock:
+            shards = self._fold_dead()
+            base = self._base.get(name, 0)
+        return base + sum(shard.get(name, 0) for shard in shards)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._register_lock:
+            shards = self._fold_dead()
+            totals = dict(self._base)
+        for shard in shards:
+            for name, value in list(shard.items()):
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+
+class MetricsSampler:
+    """后台指标采样线程"""
+
+    def __init__(self, interval: float, probes: Dict[str, Callable[[], Dict[str, Any]]],
+                 on_sample: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.interval = max(0.05, interval)
+        self.probes = probes
+        self.on_sample = on_sample
+        self._latest: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample_now(self) -> Dict[str, Any]:
+        """立即采样一次并返回结果；单个探针失败不影响其他探针。"""
+        sample: Dict[str, Any] = {"timestamp": time.time()}
+        for name, probe in self.probes.items():
+            try:
+                sample.update(probe())
+            except Exception as e:
+                logger.debug(f"指标探针 {name} 失败: {e}")
+        self._latest = sample
+        if self.on_sample is not None:
+            try:
+                self.on_sample(sample)
+            except Exception as e:
+                logger.warning(f"指标回调失败: {e}")
+        return sample
+
+    def snapshot(self) -> Dict[str, Any]:
+        """最近一次采样结果（未采样时为空字典）。"""
+        return self._latest
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample_now()
+
+    def start(self) -> "MetricsSampler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+
+# ---------------------------------------------------------------------------
+# Prometheus 文本格式导出
+# ---------------------------------------------------------------------------
+
+# 延迟直方图默认分桶（秒），覆盖 DB 单次查询到 MinerU 整篇转换
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# 采集回调返回的指标族：(名称, 类型, 说明, [(标签, 值), ...])
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], **extra) -> Dict[str, str]:
+        labels = dict(zip(self.labelnames, key))
+        labels.update(extra)
+        return labels
+
+
+class Counter(_Metric):
+    """单调计数器
+
+    注册表中的计数器会在短生命周期线程中递增（如每篇文档一个的 LLM 对冲请求线程），
+    按线程分片会使分片数随文档数增长，因此与 Gauge 一样使用加锁的字典。
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, key: Tuple[str, ...], n: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def inc(self, n: float = 1, **labels) -> None:
+        self._add(self._key(labels), n)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值（如进行中的任务数）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def dec(self, n: float = 1, **labels) -> None:
+        self.inc(-n, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """固定分桶的延迟直方图"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每个标签组合：[各桶计数(非累计)..., +Inf桶计数, 总和]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        out = []
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += n
+                out.append((f"{self.name}_bucket", self._labels(key, le=_format_value(bound)), cumulative))
+            out.append((f"{self.name}_sum", self._labels(key), series[-1]))
+            out.append((f"{self.name}_count", self._labels(key), cumulative))
+        return out
+
+
+class MetricsRegistry:
+    """进程内指标注册表；同名指标重复注册返回同一对象"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[MetricFamily]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, key: str, collect: Callable[[], Iterable[MetricFamily]]) -> None:
+        """注册抓取时调用的采集回调（如队列深度、连接池占用）；同一 key 后注册者覆盖。"""
+        with self._lock:
+            self._collectors[key] = collect
+
+    def unregister_collector(self, key: str) -> None:
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式（0.0.4）。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        lines: List[str] = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for key, collect in collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                logger.debug(f"指标采集回调 {key} 失败: {e}")
+                continue
+            for name, type_name, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def export_state(self) -> Dict[str, Dict[str, Any]]:
+        """计数器与直方图的累计值（可 pickle）；仪表盘为瞬时值，不参与跨进程汇总。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        state = {}
+        for metric in metrics:
+            if isinstance(metric, Counter):
+                with metric._lock:
+                    values = dict(metric._values)
+            elif isinstance(metric, Histogram):
+                with metric._lock:
+                    values = {key: list(series) for key, series in metric._series.items()}
+            else:
+                continue
+            if values:
+                state[metric.name] = {"type": metric.type_name, "doc": metric.documentation,
+                                      "labels": metric.labelnames,
+                                      "buckets": getattr(metric, "buckets", None), "values": values}
+        return state
+
+    def merge_state(self, delta: Dict[str, Dict[str, Any]]) -> None:
+        """将其他进程的指标增量（见 state_delta）累加到本注册表。"""
+        for name, entry in delta.items():
+            try:
+                if entry["type"] == "counter":
+                    metric = self.counter(name, entry["doc"], entry["labels"])
+                    for key, value in entry["values"].items():
+                        metric._add(key, value)
+                elif entry["type"] == "histogram":
+                    metric = self.histogram(name, entry["doc"], entry["labels"], entry["buckets"])
+                    with metric._lock:
+                        for key, series in entry["values"].items():
+                            current = metric._series.get(key)
+                            if current is None:
+                                metric._series[key] = list(series)
+                            elif len(current) == len(series):
+                                metric._series[key] = [a + b for a, b in zip(current, series)]
+            except ValueError as e:
+                logger.debug(f"合并指标 {name} 失败: {e}")
+
+
+def state_delta(prev: Dict[str, Dict[str, Any]], cur: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """两次 export_state 之间的增量，只保留发生变化的序列。"""
+    delta = {}
+    for name, entry in cur.items():
+        before = prev.get(name, {}).get("values", {})
+        values = {}
+        for key, value in entry["values"].items():
+            old = before.get(key)
+            if isinstance(value, list):
+                diff = [a - b for a, b in zip(value, old)] if old is not None else value
+                if any(diff):
+                    values[key] = diff
+            elif value != (old or 0):
+                values[key] = value - (old or 0)
+        if values:
+            delta[name] = dict(entry, values=values)
+    return delta
+
+
+REGISTRY = MetricsRegistry()
+
+# 各阶段通用指标（PDF转换、MD解析、入库）
+STAGE_DOCUMENTS = REGISTRY.counter("kg_stage_documents_total", "各阶段处理的文档数", ("stage", "outcome"))
+STAGE_SECONDS = REGISTRY.histogram("kg_stage_seconds", "各阶段单篇文档耗时（秒）", ("stage",))
+STAGE_INFLIGHT = REGISTRY.gauge("kg_stage_inflight", "各阶段正在处理的文档数", ("stage",))
+CACHE_REQUESTS = REGISTRY.counter("kg_cache_requests_total", "缓存查询次数", ("cache", "result"))
+
+
+def track_stage(stage: str):
+    """装饰返回布尔/结果对象的单篇处理函数：记录进行中数量、耗时与成功/失败计数。"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            STAGE_INFLIGHT.inc(stage=stage)
+            t0 = time.perf_counter()
+            outcome = "failed"
+            try:
+                result = func(*args, **kwargs)
+                if result:
+                    outcome = "ok"
+                return result
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+                STAGE_DOCUMENTS.inc(stage=stage, outcome=outcome)
+                STAGE_INFLIGHT.dec(stage=stage)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter: Optional[ThreadingHTTPServer] = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(port: Optional[int] = None, host: Optional[str] = None,
+                   registry: MetricsRegistry = REGISTRY) -> Optional[ThreadingHTTPServer]:
+    """在后台线程启动 HTTP /metrics，每进程只启动一次。
+
+    未指定端口时取 METRICS_PORT，为0或未配置则不启动；显式传入 port=0 绑定随机空闲端口。
+    监听地址默认取 METRICS_HOST（0.0.0.0）。
+    """
+    global _exporter
+    if port is None:
+        port = int(os.getenv("METRICS_PORT", "0") or 0)
+        if port <= 0:
+            return None
+    host = host or os.getenv("METRICS_HOST", "0.0.0.0")
+    with _exporter_lock:
+        if _exporter is not None:
+            return _exporter
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        try:
+            server = ThreadingHTTPServer((host, port), handler)
+        except OSError as e:
+            logger.warning(f"指标导出端口 {host}:{port} 启动失败: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+        _exporter = server
+        logger.info(f"指标导出已启动: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+def stop_exporter() -> None:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            _exporter.shutdown()
+            _exporter.server_close()
+            _exporter = None
@@ -2,21 +2,23 @@ import subprocess
 import logging
 import shutil
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
 import time
 import json
 from datetime import datetime
-from ..config import Config
+from .config import Config
 from ..utils.progress import progress_wrap
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-try:
-    import torch  # 用于GPU可用性与内存查询
-except Exception:
-    torch = None
+from ..utils import device as device_probe
+from .markdown_document import md_to_txt
+from .metrics import REGISTRY, track_stage
+from . import tracing
+from . import dead_letter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 logger = logging.getLogger(__name__)
 
+_MINERU_SECONDS = REGISTRY.histogram("kg_mineru_seconds", "MinerU子进程耗时（秒）")
+
 class PDFProcessor:
     """统一的PDF处理器"""
 
@@ -29,6 +31,8 @@ class PDFProcessor:
         else:
             # 旧的Config类
             self.mineru_path = self._detect_mineru_path(config.mineru_path)
+        # 可选的启发式进程池（由流水线注入），用于在子进程中完成 MD→TXT 转换
+        self.heuristic_pool = None
         # MinerU日志文件目录
         try:
             self.mineru_logs_dir = self.config.paths.logs_dir / "mineru"
@@ -115,25 +119,10 @@ class PDFProcessor:
     
     def _md_to_txt(self, content: str) -> str:
         """将Markdown内容转换为纯文本，去除图片/链接/格式标记。"""
-        import re
-        # 删除代码块
-        content = re.sub(r"```[\s\S]*?```", "\n", content)
-        # 删除图片
-        content = re.sub(r"!\[[^\]]*\]\([^\)]*\)", "", content)
-        # 将链接替换为其文本
-        content = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", content)
-        # 去掉标题标记 #
-        content = re.sub(r"^\s*#{1,6}\s*", "", content, flags=re.MULTILINE)
-        # 去掉强调 * 和 _
-        content = re.sub(r"[*_]+", "", content)
-        # 简化列表项前缀
-        content = re.sub(r"^[\s>*-]+", "", content, flags=re.MULTILINE)
-        # 去掉表格分隔线
-        content = re.sub(r"^\s*\|?\s*-{2,}.*$", "", content, flags=re.MULTILINE)
-        # 压缩多余空行
-        content = re.sub(r"\n{3,}", "\n\n", content)
-        return content.strip()
+        return md_to_txt(content)
 
+    @track_stage("pdf")
+    @tracing.traced("pdf.convert")
     def process_single_pdf(self, pdf_path: Path, output_dir: Path, output_format: str = "md", text_only: bool = False, device: Optional[str] = None, language: Optional[str] = None, fast: bool = False, start_page: Optional[int] = None, end_page: Optional[int] = None) -> bool:
         """处理单个PDF文件
         - output_format: "md" 或 "txt"
@@ -154,11 +143,7 @@ class PDFProcessor:
                 if self._get_config_attr('mineru_device'):
                     device = self._get_config_attr('mineru_device')
                 else:
-                    try:
-                        import torch
-                        device = "cuda:0" if torch.cuda.is_available() else "cpu"
-                    except Exception:
-                        device = "cpu"
+                    device = "cuda:0" if device_probe.has_gpu() else "cpu"
             # 读取配置默认值（方法/语言/模型源）
             method = (self._get_config_attr('mineru_method') or "auto").strip()
             lang = (language or self._get_config_attr('mineru_lang') or "en").strip()
@@ -204,7 +189,8 @@ class PDFProcessor:
             out_log = self.mineru_logs_dir / f"{pdf_path.stem}.out.log"
             err_log = self.mineru_logs_dir / f"{pdf_path.stem}.err.log"
             with open(out_log, "w", encoding="utf-8", errors="ignore") as out_fh, \
-                 open(err_log, "w", encoding="utf-8", errors="ignore") as err_fh:
+                 open(err_log, "w", encoding="utf-8", errors="ignore") as err_fh, \
+                 _MINERU_SECONDS.time(), tracing.span("pdf.mineru") as sp:
                 result = subprocess.run(
                     cmd,
                     stdout=out_fh,
@@ -212,11 +198,13 @@ class PDFProcessor:
                     text=True,
                     timeout=self._get_config_attr('mineru_timeout_secs')
                 )
+                sp["rc"] = result.returncode
             
             logger.info(f"MinerU返回码: {result.returncode} | 日志: out={out_log} err={err_log}")
             
             if result.returncode != 0:
                 logger.error(f"MinerU处理失败 {pdf_path.name}，详见日志: {err_log}")
+                dead_letter.set_cause("MineruError", f"returncode={result.returncode}, log={err_log}")
                 return False
             
             # 查找生成的文本/markdown文件（MinerU会在子目录中生成文件）
@@ -238,14 +226,18 @@ class PDFProcessor:
                     logger.info(f"生成TXT: {target_file.name}")
                 elif md_files:
                     src = md_files[0]
-                    text = Path(src).read_text(encoding="utf-8", errors="ignore")
-                    text = self._md_to_txt(text)
                     target_file = output_dir / f"{pdf_path.stem}.txt"
-                    output_dir.mkdir(parents=True, exist_ok=True)
-                    Path(target_file).write_text(text, encoding="utf-8")
+                    if self.heuristic_pool is not None:
+                        self.heuristic_pool.md_to_txt_file(src, target_file)
+                    else:
+                        text = Path(src).read_text(encoding="utf-8", errors="ignore")
+                        text = self._md_to_txt(text)
+                        output_dir.mkdir(parents=True, exist_ok=True)
+                        Path(target_file).write_text(text, encoding="utf-8")
                     logger.info(f"从MD转换生成TXT: {target_file.name}")
                 else:
                     logger.warning(f"未找到可生成TXT的文件: {pdf_path.name}")
+                    dead_letter.set_cause("OutputMissing", "MinerU 未生成 md/txt")
                     return False
             else:
                 # 期望生成Markdown；若直接没有MD则尝试使用TXT兜底包装为Markdown
@@ -261,6 +253,7 @@ class PDFProcessor:
                         logger.info(f"兜底转换: 从TXT包装生成Markdown: {target_file.name}")
                     else:
                         logger.warning(f"未找到Markdown文件: {pdf_path.name}")
+                        dead_letter.set_cause("OutputMissing", "MinerU 未生成 md/txt")
                         return False
                 else:
                     src = md_files[0]
@@ -283,11 +276,13 @@ class PDFProcessor:
             
             return True
             
-        except subprocess.TimeoutExpired:
+        except subprocess.TimeoutExpired as e:
             logger.error(f"处理超时: {pdf_path.name}")
+            dead_letter.set_cause(e)
             return False
         except Exception as e:
             logger.error(f"处理PDF失败 {pdf_path.name}: {e}")
+            dead_letter.set_cause(e)
             return False
         finally:
             # 始终根据配置尝试清理临时目录（包括失败场景），避免残留空目录
@@ -302,14 +297,10 @@ class PDFProcessor:
                 logger.warning(f"清理临时目录失败: {ce}")
     
     def _get_free_gpu_mem_mb(self, device_index: int = 0) -> Optional[float]:
-        """查询指定GPU的空闲显存(MB)。优先使用torch，其次nvidia-smi。失败返回None。"""
-        # torch 优先
-        try:
-            if torch is not None and torch.cuda.is_available():
-                free_bytes, total_bytes = torch.cuda.mem_get_info(device_index)
-                return float(free_bytes) / (1024.0 ** 2)
-        except Exception:
-            pass
+        """查询指定GPU的空闲显存(MB)。优先使用NVML/torch（见 utils.device），其次nvidia-smi。失败返回None。"""
+        info = device_probe.mem_get_info(device_index)
+        if info is not None:
+            return float(info[0]) / (1024.0 ** 2)
         # nvidia-smi 回退
         try:
             smi = subprocess.run(
@@ -343,9 +334,31 @@ class PDFProcessor:
                 return False
             time.sleep(poll)
 
-    def process_batch(self, input_dir: Path, output_dir: Path, limit: Optional[int] = None, stats_every: Optional[int] = None) -> dict:
-        """批量处理PDF文件"""
-        pdf_files = self.find_pdf_files(input_dir)
+    def process_batch(self, input_dir: Path, output_dir: Path, limit: Optional[int] = None, stats_every: Optional[int] = None,
+                      on_result: Optional[Callable[[Path, bool], None]] = None,
+                      files: Optional[List[Path]] = None, lease=None) -> dict:
+        """批量处理PDF文件
+
+        - on_result: 每个文件处理完成后在调度线程中回调 (pdf_path, success)，供流式下游消费
+        - files: 指定待处理文件（如死信重试），为 None 时扫描 input_dir
+        - lease: 多节点协调（work_lease.WorkLease）；给出时写入本地扫描到的文件后，
+          从共享租约表按需领取单元处理并回报结果，limit 限制本节点领取数
+        - 单个文件失败记入死信存储（见 dead_letter），按策略当场重试或留待 retry-failed，不中止整批
+        """
+        max_workers = max(1, self._get_config_attr('pdf_max_workers'))
+        if lease is not None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            lease.seed(list(files) if files is not None else self.find_pdf_files(input_dir))
+            lease.start()
+            try:
+                results = self._process_files(self._leased_files(lease, output_dir, max_workers, limit),
+                                              output_dir, max_workers, stats_every, on_result, lease)
+            finally:
+                lease.stop()
+            results["lease_nodes"] = lease.node_report()
+            return results
+
+        pdf_files = list(files) if files is not None else self.find_pdf_files(input_dir)
         if limit is not None:
             pdf_files = pdf_files[: max(0, limit)]
         
@@ -366,8 +379,21 @@ class PDFProcessor:
                 filtered_pdf_files.append(pf)
         if skipped_count:
             logger.info(f"本次批次预先跳过 {skipped_count} 个已处理文件")
-        pdf_files = filtered_pdf_files
-        
+        return self._process_files(iter(filtered_pdf_files), output_dir, max_workers, stats_every, on_result)
+
+    def _leased_files(self, lease, output_dir: Path, batch_size: int, limit: Optional[int]):
+        """从租约表领取的待处理文件；本地已处理的直接回报完成。"""
+        for pf in lease.claims(batch_size, limit):
+            if self._is_already_processed(pf, output_dir):
+                logger.info(f"跳过已处理文件: {pf.name}")
+                lease.complete(pf, True)
+            else:
+                yield pf
+
+    def _process_files(self, pdf_files, output_dir: Path, max_workers: int, stats_every: Optional[int],
+                       on_result: Optional[Callable[[Path, bool], None]], lease=None) -> dict:
+        """按需从 pdf_files 迭代器取文件处理；并发模式下在途文件数不超过线程数的两倍。"""
+
         results = {"processed": 0, "failed": 0, "errors": []}
         batch_start = time.time()
         # 阶段统计缓存
@@ -383,14 +409,28 @@ class PDFProcessor:
         default_device = self._get_config_attr('mineru_device') or None
         default_language = self._get_config_attr('mineru_lang')
 
-        max_workers = max(1, self._get_config_attr('pdf_max_workers'))
+        dead_letters = dead_letter.get_store(self.config)
 
         def worker(pdf_file: Path):
             file_start = time.time()
+            retried_now = 0
+            while True:
+                success = attempt(pdf_file)
+                if success:
+                    dead_letters.resolve("pdf", pdf_file)
+                    break
+                error_class, message = dead_letter.take_cause()
+                decision = dead_letters.record_failure("pdf", pdf_file, error_class, message, retried_now)
+                if decision != dead_letter.RETRY_NOW:
+                    break
+                retried_now += 1
+            return (success, pdf_file, time.time() - file_start)
+
+        def attempt(pdf_file: Path) -> bool:
             try:
                 # GPU内存门控：仅在GPU设备可能被使用时启用
                 use_gpu = False
-                if torch is not None and torch.cuda.is_available():
+                if device_probe.has_gpu():
                     if default_device is None:
                         use_gpu = True
                     else:
@@ -405,21 +445,20 @@ class PDFProcessor:
                 else:
                     dev_override = default_device
 
-                success = self.process_single_pdf(
-                    pdf_file,
-                    output_dir,
-                    output_format=default_output_format,
-                    text_only=default_text_only,
-                    device=dev_override,
-                    language=default_language,
-                    fast=default_fast
-                )
-                duration = time.time() - file_start
-                return (success, pdf_file, duration)
+                with tracing.document(pdf_file.stem):
+                    return self.process_single_pdf(
+                        pdf_file,
+                        output_dir,
+                        output_format=default_output_format,
+                        text_only=default_text_only,
+                        device=dev_override,
+                        language=default_language,
+                        fast=default_fast
+                    )
             except Exception as e:
-                duration = time.time() - file_start
                 logger.error(f"处理文件失败 {pdf_file}: {e}")
-                return (False, pdf_file, duration)
+                dead_letter.set_cause(e)
+                return False
 
         def write_interval_stats():
             interval_count = len(interval_durations)
@@ -468,6 +507,10 @@ class PDFProcessor:
                     results["failed"] += 1
                     results["errors"].append(str(pf))
                     interval_failed += 1
+                if lease is not None:
+                    lease.complete(pf, success, duration)
+                if on_result is not None:
+                    on_result(pf, success)
 
                 processed_so_far = results["processed"] + results["failed"]
                 if stats_every and processed_so_far > 0 and processed_so_far % max(1, stats_every) == 0:
@@ -478,26 +521,42 @@ class PDFProcessor:
         else:
             # 并发处理，提升GPU利用率（含显存门控）
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [executor.submit(worker, f) for f in pdf_files]
+                inflight = set()
+                exhausted = False
                 completed = 0
-                for fut in as_completed(futures):
-                    success, pf, duration = fut.result()
-                    interval_durations.append(duration)
-                    completed += 1
-                    if success:
-                        results["processed"] += 1
-                        # 写入已处理标记
-                        self._write_processed_marker(pf)
-                    else:
-                        results["failed"] += 1
-                        results["errors"].append(str(pf))
-                        interval_failed += 1
-
-                    if stats_every and completed % max(1, stats_every) == 0:
-                        write_interval_stats()
-                        interval_durations = []
-                        interval_failed = 0
-                        interval_index += 1
+                while True:
+                    # 按需补充在途任务，租约模式下只领取即将处理的单元
+                    while not exhausted and len(inflight) < max_workers * 2:
+                        pdf_file = next(pdf_files, None)
+                        if pdf_file is None:
+                            exhausted = True
+                        else:
+                            inflight.add(executor.submit(worker, pdf_file))
+                    if not inflight:
+                        break
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        success, pf, duration = fut.result()
+                        interval_durations.append(duration)
+                        completed += 1
+                        if success:
+                            results["processed"] += 1
+                            # 写入已处理标记
+                            self._write_processed_marker(pf)
+                        else:
+                            results["failed"] += 1
+                            results["errors"].append(str(pf))
+                            interval_failed += 1
+                        if lease is not None:
+                            lease.complete(pf, success, duration)
+                        if on_result is not None:
+                            on_result(pf, success)
+
+                        if stats_every and completed % max(1, stats_every) == 0:
+                            write_interval_stats()
+                            interval_durations = []
+                            interval_failed = 0
+                            interval_index += 1
 
         # 处理最后不足一个阶段的剩余统计
         if stats_every and interval_durations:
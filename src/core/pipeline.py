@@ -1,21 +1,35 @@
-from ..config import Config, setup_logging
+from .config import Config
+from ..config.logging_config import setup_logging
 from .pdf_processor import PDFProcessor
 from .llm_parser import LLMParser
 from .data_importer import DataImporter
+from . import tracing
+from . import dead_letter
+from . import work_lease
 from pathlib import Path
+import os
+import queue
 import logging
-from typing import Optional
+import threading
+import time
+from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
 class KnowledgePipeline:
     """统一的知识图谱构建管道"""
 
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(self, config: Optional[Config] = None, db=None):
         self.config = config or Config()
         self.pdf_processor = PDFProcessor(self.config)
         self.llm_parser = LLMParser(self.config)
-        self.data_importer = DataImporter(self.config)
+        # db 可注入其他数据库实现（如压测用的内存库），默认连接配置中的 Postgres
+        self.data_importer = DataImporter(self.config, db=db)
+        # 多节点协调：PDF从共享 Postgres 的 work_lease 表领取（WORK_LEASE=true 或 main.py --lease）
+        self.lease_mode = work_lease.enabled()
+
+    def _lease(self, input_dir: Path) -> Optional[work_lease.WorkLease]:
+        return work_lease.WorkLease.from_config(self.config, input_dir) if self.lease_mode else None
         
     def run_pdf_processing(self, input_dir: Optional[Path] = None, 
                           output_dir: Optional[Path] = None,
@@ -26,11 +40,11 @@ class KnowledgePipeline:
         output_path = output_dir or self.config.paths.output_dir / "markdown"
         
         logger.info("=== 开始PDF处理阶段 ===")
-        results = self.pdf_processor.process_batch(input_path, output_path, limit=limit_pdfs, stats_every=stats_every)
+        results = self.pdf_processor.process_batch(input_path, output_path, limit=limit_pdfs, stats_every=stats_every,
+                                                   lease=self._lease(input_path))
         logger.info(f"PDF处理完成: 成功 {results['processed']}, 失败 {results['failed']}")
-        # 若发生失败，立即抛出异常以中止后续流程
-        if results.get('failed', 0) > 0:
-            raise RuntimeError(f"PDF处理阶段出现失败: {results['failed']} 个文件")
+        # 失败文件已记入死信存储，不中止后续流程
+        self._report_failures("PDF处理", results.get('failed', 0))
         return results
     
     def run_data_import(self, input_dir: Optional[Path] = None, limit_md: Optional[int] = None) -> dict:
@@ -39,7 +53,7 @@ class KnowledgePipeline:
         
         if not input_path.exists():
             logger.error(f"Markdown目录不存在: {input_path}")
-            return {"imported": 0, "failed": 0, "errors": []}
+            return {"imported": 0, "skipped": 0, "failed": 0, "errors": []}
         
         logger.info("=== 开始数据导入阶段 ===")
         
@@ -47,19 +61,184 @@ class KnowledgePipeline:
         md_files = list(input_path.glob("*.md"))
         if not md_files:
             logger.warning("未找到Markdown文件")
-            return {"imported": 0, "failed": 0, "errors": []}
+            return {"imported": 0, "skipped": 0, "failed": 0, "errors": []}
         
-        results = self.data_importer.import_batch(md_files, limit=limit_md)
-        logger.info(f"数据导入完成: 成功 {results['imported']}, 失败 {results['failed']}")
-        # 若发生失败，立即抛出异常以中止流程
-        if results.get('failed', 0) > 0:
-            raise RuntimeError(f"数据导入阶段出现失败: {results['failed']} 个文件")
+        # 导入台账中内容未变化的文件在解析前跳过，每日增量只处理新增/修改的Markdown
+        results = self.data_importer.import_batch(sorted(md_files), limit=limit_md)
+        logger.info(f"数据导入完成: 成功 {results['imported']}, 跳过 {results['skipped']}, 失败 {results['failed']}")
+        self._report_failures("数据导入", results.get('failed', 0))
         return results
+
+    def _report_failures(self, stage_name: str, failed: int) -> None:
+        if failed > 0:
+            store = dead_letter.get_store(self.config)
+            logger.warning(f"{stage_name}阶段失败 {failed} 个文件，已记入死信存储 {store.path}，"
+                           f"可运行 `python main.py retry-failed` 重新处理")
+
+    @staticmethod
+    def _stage_failed(results: Optional[dict], ok_key: str) -> bool:
+        """整个阶段无一成功且有失败时视为阶段失败；部分失败只记入死信存储。"""
+        return bool(results) and results.get("failed", 0) > 0 and results.get(ok_key, 0) == 0
+
+    def _finish(self, final_results: dict) -> dict:
+        """附上死信汇总；某阶段全部失败时 success 为 False。"""
+        errors = []
+        if self._stage_failed(final_results.get("pdf_processing"), "processed"):
+            errors.append(f"PDF处理阶段全部失败: {final_results['pdf_processing']['failed']} 个文件")
+        if self._stage_failed(final_results.get("data_import"), "imported"):
+            errors.append(f"数据导入阶段全部失败: {final_results['data_import']['failed']} 个文件")
+        if errors:
+            final_results["success"] = False
+            final_results["error"] = "; ".join(errors)
+        final_results["dead_letter"] = dead_letter.get_store(self.config).summary()
+        return final_results
+
+    def retry_failed(self, force: bool = False, stats_every: Optional[int] = None) -> dict:
+        """只重新处理死信存储中的文档：先重跑失败的PDF，再导入其产出与入库失败的Markdown。
+
+        - 默认只处理已到重试时间的记录；force=True 时忽略退避时间并包含已放弃的记录
+        - 结果字典与 run_full_pipeline 相同
+        """
+        store = dead_letter.get_store(self.config)
+        now = None if force else time.time()
+        md_dir = self.config.paths.output_dir / "markdown"
+        pdf_rows = store.pending("pdf", now=now, include_gave_up=force)
+        import_rows = store.pending("import", now=now, include_gave_up=force)
+        logger.info(f"=== 开始重试死信: PDF {len(pdf_rows)} 个, 入库 {len(import_rows)} 个 ===")
+        final_results = {"pdf_processing": None, "data_import": None, "success": True}
+
+        md_files = [Path(r["path"]) for r in import_rows]
+        if pdf_rows:
+            pdf_files = [Path(r["path"]) for r in pdf_rows]
+            final_results["pdf_processing"] = self.pdf_processor.process_batch(
+                self.config.paths.input_dir, md_dir, stats_every=stats_every, files=pdf_files)
+            md_files += [md_dir / f"{p.stem}.md" for p in pdf_files if (md_dir / f"{p.stem}.md").exists()]
+        if md_files:
+            final_results["data_import"] = self.data_importer.import_batch(list(dict.fromkeys(md_files)))
+        return self._finish(final_results)
     
+    def run_streaming(self, limit_pdfs: Optional[int] = None, limit_md: Optional[int] = None,
+                      stats_every: Optional[int] = None) -> dict:
+        """流式运行：每篇PDF转换完成即送入有界队列，由入库线程并行解析、入库。
+
+        - 输出目录中已有的Markdown由单独的线程核对台账后入队，与新转换的文件交错进入队列，PDF转换立即开始；
+          导入的文件集合与分阶段模式一致，导入台账中内容未变化的文件不入队
+        - 队列满时PDF调度线程阻塞等待（背压），队列长度 STREAMING_QUEUE_SIZE，入库线程数 STREAMING_IMPORT_WORKERS
+        - 失败记入死信存储、不中断处理；结果字典与 run_full_pipeline 相同
+        """
+        input_path = self.config.paths.input_dir
+        md_dir = self.config.paths.output_dir / "markdown"
+        md_dir.mkdir(parents=True, exist_ok=True)
+        queue_size = max(1, int(os.getenv("STREAMING_QUEUE_SIZE", "32")))
+        num_importers = max(1, int(os.getenv("STREAMING_IMPORT_WORKERS", "1")))
+        md_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        import_results = {"imported": 0, "skipped": 0, "failed": 0, "errors": []}
+        results_lock = threading.Lock()
+        enqueued: set = set()
+        enqueue_lock = threading.Lock()
+        backlog_stop = threading.Event()
+
+        def enqueue(md_path: Path, digest: Optional[str] = None) -> None:
+            # 由PDF调度线程与存量文件线程调用；limit_md 与分阶段模式一样限制导入总数
+            with enqueue_lock:
+                if md_path in enqueued or (limit_md is not None and len(enqueued) >= max(0, limit_md)):
+                    return
+                enqueued.add(md_path)
+            md_queue.put((md_path, digest, tracing.mark_enqueued(tracing.new_trace(md_path.stem))))
+
+        def feed_backlog() -> None:
+            # 存量Markdown可能远多于队列长度，在单独线程中入队，避免阻塞PDF转换的启动
+            try:
+                todo, skipped = self.data_importer.filter_unchanged(sorted(md_dir.glob("*.md")))
+            except Exception as e:
+                logger.error(f"存量Markdown核对失败: {e}")
+                return
+            with results_lock:
+                import_results["skipped"] += len(skipped)
+            for md_path, digest in todo:
+                if backlog_stop.is_set():
+                    break
+                enqueue(md_path, digest)
+
+        def on_pdf_done(pdf_path: Path, success: bool) -> None:
+            md_path = md_dir / f"{pdf_path.stem}.md"
+            if success and md_path.exists():
+                # 新转换的文件由入库线程按台账核对，不阻塞PDF调度
+                enqueue(md_path)
+
+        def importer(worker_id: int) -> None:
+            while True:
+                item = md_queue.get()
+                if item is None:
+                    break
+                md_path, digest, trace = item
+                tracing.record_queue_wait(trace, "md")
+                try:
+                    if digest is None:
+                        todo, skipped = self.data_importer.filter_unchanged([md_path])
+                        digest = todo[0][1] if todo else None
+                    else:
+                        skipped = []
+                    with tracing.activate(trace):
+                        ok = bool(skipped) or self.data_importer.import_with_retry(md_path, digest)
+                except Exception as e:
+                    logger.error(f"流式导入失败 {md_path.name}: {e}")
+                    ok, skipped = False, []
+                with results_lock:
+                    if skipped:
+                        import_results["skipped"] += 1
+                    elif ok:
+                        import_results["imported"] += 1
+                    else:
+                        import_results["failed"] += 1
+                        import_results["errors"].append(str(md_path))
+                    imported, failed = import_results["imported"], import_results["failed"]
+                # 跳过的文件不改变 done，只在本次导入使 done 跨过10的倍数时输出
+                if not skipped and (imported + failed) % 10 == 0:
+                    logger.info(f"流式导入进度: 成功 {imported}, 失败 {failed}, 队列 {md_queue.qsize()}")
+
+        logger.info(f"=== 开始流式管道: 队列长度 {queue_size}, 入库线程 {num_importers} ===")
+        threads: List[threading.Thread] = [
+            threading.Thread(target=importer, args=(i,), name=f"stream-import-{i}", daemon=True)
+            for i in range(num_importers)
+        ]
+        for t in threads:
+            t.start()
+        backlog = threading.Thread(target=feed_backlog, name="stream-backlog", daemon=True)
+        backlog.start()
+        completed = False
+        try:
+            pdf_results = self.pdf_processor.process_batch(
+                input_path, md_dir, limit=limit_pdfs, stats_every=stats_every, on_result=on_pdf_done,
+                lease=self._lease(input_path))
+            completed = True
+        finally:
+            if not completed:
+                backlog_stop.set()
+            # 入库线程仍在消费，存量文件线程可以放完剩余文件后退出
+            backlog.join()
+            for _ in threads:
+                md_queue.put(None)
+            for t in threads:
+                t.join()
+            tracing.flush()
+
+        logger.info(f"PDF处理完成: 成功 {pdf_results['processed']}, 失败 {pdf_results['failed']}")
+        logger.info(f"数据导入完成: 成功 {import_results['imported']}, 跳过 {import_results['skipped']}, 失败 {import_results['failed']}")
+        self._report_failures("PDF处理", pdf_results.get("failed", 0))
+        self._report_failures("数据导入", import_results["failed"])
+        return self._finish({"pdf_processing": pdf_results, "data_import": import_results, "success": True})
+
     def run_full_pipeline(self, skip_pdf: bool = False, skip_import: bool = False,
                           limit_pdfs: Optional[int] = None, limit_md: Optional[int] = None,
-                          stats_every: Optional[int] = None) -> dict:
-        """运行完整管道"""
+                          stats_every: Optional[int] = None, streaming: bool = False) -> dict:
+        """运行完整管道；streaming=True 时PDF转换与解析入库重叠执行（见 run_streaming）"""
+        if streaming and not skip_pdf and not skip_import:
+            try:
+                return self.run_streaming(limit_pdfs=limit_pdfs, limit_md=limit_md, stats_every=stats_every)
+            except Exception as e:
+                logger.error(f"管道执行失败: {e}")
+                return {"pdf_processing": None, "data_import": None, "success": False, "error": str(e)}
         logger.info("=== 开始完整知识图谱构建管道 ===")
         
         final_results = {
@@ -73,8 +252,6 @@ class KnowledgePipeline:
             if not skip_pdf:
                 pdf_results = self.run_pdf_processing(limit_pdfs=limit_pdfs, stats_every=stats_every)
                 final_results["pdf_processing"] = pdf_results
-                
-                # 失败直接通过异常在上面抛出并被捕获
             else:
                 logger.info("跳过PDF处理阶段")
             
@@ -82,13 +259,11 @@ class KnowledgePipeline:
             if not skip_import:
                 import_results = self.run_data_import(limit_md=limit_md)
                 final_results["data_import"] = import_results
-                
-                # 失败直接通过异常在上面抛出并被捕获
             else:
                 logger.info("跳过数据导入阶段")
             
             logger.info("=== 知识图谱构建管道完成 ===")
-            return final_results
+            return self._finish(final_results)
             
         except Exception as e:
             logger.error(f"管道执行失败: {e}")
@@ -107,6 +282,7 @@ def main():
     parser.add_argument("--limit-pdfs", type=int, default=None, help="仅处理前N个PDF")
     parser.add_argument("--limit-md", type=int, default=None, help="仅导入前N个Markdown")
     parser.add_argument("--stats-every", type=int, default=None, help="每N个文件输出阶段统计并写入logs/pdf_progress.jsonl")
+    parser.add_argument("--streaming", action="store_true", help="流式模式：每篇PDF转换完成即解析入库")
     
     args = parser.parse_args()
     
@@ -125,7 +301,8 @@ def main():
         skip_import=args.skip_import,
         limit_pdfs=args.limit_pdfs,
         limit_md=args.limit_md,
-        stats_every=args.stats_every
+        stats_every=args.stats_every,
+        streaming=args.streaming
     )
     
     # 输出结果
@@ -136,7 +313,7 @@ def main():
         print(f"PDF处理: 成功 {pdf['processed']}, 失败 {pdf['failed']}")
     if results.get('data_import'):
         imp = results['data_import']
-        print(f"数据导入: 成功 {imp['imported']}, 失败 {imp['failed']}")
+        print(f"数据导入: 成功 {imp['imported']}, 跳过 {imp.get('skipped', 0)}, 失败 {imp['failed']}")
     if results.get('error'):
         print(f"错误: {results['error']}")
 
@@ -0,0 +1,123 @@
+"""
+LLM 提示模板：带版本号的模板注册表
+
+静态说明、完整字段 schema 与规则组成稳定前缀（system + 用户提示开头），本次请求的字段子集
+以一行短说明放在正文之前，文档正文放在最后，使 Ollama 能跨请求复用前缀的 KV 缓存；
+重试时截断的也只是尾部正文。
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence
+
+JSON_ONLY_SYSTEM = "You are a JSON-only parser. Respond with STRICT JSON object only. No prose."
+
+_METADATA_HEADER = (
+    "You are an academic parser. Extract core metadata from the Markdown "
+    "and return ONLY a compact JSON object with the following fields: "
+    "{schema}. Do not include any commentary or code fences.\n\n"
+)
+_METADATA_RULES = (
+    "Rules:\n"
+    "- If a field is unknown, set null.\n"
+    "- Authors must be an array of names.\n"
+    "- Keywords must be an array.\n"
+    "- Venue is the journal or conference name (not the publisher).\n"
+    "- Strict JSON only."
+)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """单个版本的提示模板。
+
+    - header/rules 为静态文本，header 中的 {schema} 为完整字段 schema，不随请求变化
+    - fields_line 列出本次请求的字段子集，紧接在 doc_marker 之前，不破坏前缀
+    - doc_marker 标记正文起点；fields_line（或 doc_marker）之前的部分即可缓存前缀
+    - document_last=False 为旧布局（正文夹在说明与规则之间），保留用于对比
+    """
+    name: str
+    version: int
+    system: str
+    header: str
+    rules: str
+    doc_marker: str
+    document_last: bool = True
+    fields_line: str = "Return only these fields: {fields}.\n"
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def render(self, text: str, schema: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> str:
+        header = self.header.format(schema=json.dumps(schema))
+        marker = self.doc_marker
+        if fields is not None:
+            marker = self.fields_line.format(fields=", ".join(fields)) + marker
+        if self.document_last:
+            return header + self.rules + "\n\n" + marker + text
+        return header + marker + text + "\n\n" + self.rules
+
+    def prefix_of(self, prompt: str) -> str:
+        """返回提示中不随文档变化的部分（可复用前缀）：字段子集说明或正文之前。"""
+        idx = prompt.find(self.fields_line.split("{", 1)[0])
+        if idx >= 0:
+            return prompt[:idx]
+        idx = prompt.find(self.doc_marker)
+        return prompt if idx < 0 else prompt[: idx + len(self.doc_marker)]
+
+
+METADATA_V1 = PromptTemplate(
+    name="metadata",
+    version=1,
+    system=JSON_ONLY_SYSTEM,
+    header=_METADATA_HEADER,
+    rules=_METADATA_RULES,
+    doc_marker="Markdown:\n",
+    document_last=False,
+)
+
+METADATA_V2 = PromptTemplate(
+    name="metadata",
+    version=2,
+    system=JSON_ONLY_SYSTEM,
+    header=_METADATA_HEADER,
+    rules=_METADATA_RULES,
+    doc_marker="Markdown:\n",
+)
+
+# 批量模板的 {schema} 为单条结果的 schema；各文档以 "=== Document i ===" 分隔追加在末尾
+BATCH_V1 = PromptTemplate(
+    name="batch",
+    version=1,
+    system=JSON_ONLY_SYSTEM,
+    header=(
+        "You are an academic parser. For EACH document below, extract core metadata and return "
+        "ONLY a compact JSON object of the form "
+        '{{"results": [{schema}, ...]}} with exactly one item per document. '
+        "Copy the document index into \"index\". Do not include any commentary or code fences.\n\n"
+    ),
+    rules=(
+        "Rules:\n"
+        "- If a field is unknown, set null.\n"
+        "- Authors and keywords must be arrays.\n"
+        "- Venue is the journal or conference name (not the publisher).\n"
+        "- Strict JSON only."
+    ),
+    doc_marker="Documents:\n",
+)
+
+TEMPLATES: Dict[str, Dict[int, PromptTemplate]] = {}
+for _tpl in (METADATA_V1, METADATA_V2, BATCH_V1):
+    TEMPLATES.setdefault(_tpl.name, {})[_tpl.version] = _tpl
+
+
+def get_template(name: str, version: Optional[int] = None) -> PromptTemplate:
+    """按名称与版本获取模板；version 为空时取最新版本。"""
+    versions = TEMPLATES.get(name)
+    if not versions:
+        raise KeyError(f"未知提示模板: {name}")
+    if version is None:
+        return versions[max(versions)]
+    if version not in versions:
+        raise KeyError(f"提示模板 {name} 不存在版本 v{version}")
+    return versions[version]
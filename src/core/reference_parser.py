@@ -0,0 +1,242 @@
+"""
+参考文献解析：将 References 章节切分为逐条文献，并一次性抽取 DOI、年份、第一作者与标题片段
+
+- 支持编号式（[1] / 1. / 1)）与作者-年份式两类版式
+- 正则均在模块级预编译；每条文献只扫描一次
+- 输出紧凑字典（省略空字段），便于整体存入 JSON 或按 DOI/标题指纹建索引
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+# 行首编号：[12] / 12. / 12)
+_NUMBERED_START_RE = re.compile(r"^\s*(?:\[(\d{1,4})\]|(\d{1,4})[.)])\s+")
+# 行内编号（多条文献被合并到同一行时按递增编号切开）
+_INLINE_NUMBER_RE = re.compile(r"\s\[(\d{1,4})\]\s")
+# 作者-年份式的行首：大写字母或常见姓氏前缀
+_AUTHOR_START_RE = re.compile(r"^(?:[A-ZÀ-Þ]|(?:de|van|von|da|di|del|dos|du|la|le|ten|ter)\s)")
+# 作者-年份式的条目开头 "Surname, X."（可带姓氏前缀、复姓）
+_SURNAME_HEAD_RE = re.compile(
+    r"^(?:(?:de|der|den|van|von|da|di|del|dos|du|la|le|ten|ter)\s+)*"
+    r"[A-ZÀ-Þ][\w'’-]+(?:[\s-][A-ZÀ-Þ][\w'’-]+)?,\s+[A-ZÀ-Þ]\."
+)
+_YEAR_RE = re.compile(r"(?<![\d/.])((?:19|20)\d{2})[a-z]?(?!\d)")
+_PAREN_YEAR_RE = re.compile(r"\(((?:19|20)\d{2})[a-z]?\)")
+# DOI：允许 "doi. org/" 与 "/"、"." 之后被 OCR 断开的单个空格
+_DOI_URL_GAP_RE = re.compile(r"doi\.\s+org/", re.IGNORECASE)
+_REF_DOI_RE = re.compile(r"10\.\d{4,9}/\s?(?:[^\s\"<>]|(?<=[./])\s(?=[0-9a-z]))+")
+_WS_RE = re.compile(r"\s+")
+# 句末：前两个字符为小写字母/数字/括号，避免在姓名缩写 "J." 处断句
+_SENTENCE_END_RE = re.compile(r"(?<=[a-z0-9)\]]{2})[.?!](?=\s|$)")
+_SEGMENT_SEP_RE = re.compile(r"[,;]\s+|\.\s+")
+_LOWER_WORD_RE = re.compile(r"[a-z]{3}")
+_JOURNAL_PART_RE = re.compile(r"\d|\b[A-Z][a-z]*\.")
+_NAME_PARTICLES = {"de", "der", "den", "van", "von", "da", "di", "del", "dos", "du", "la", "le", "ten", "ter", "et", "al", "al.", "and", "&"}
+# 第一作者片段的结束位置：逗号、"et al" 或姓名缩写后的句点
+_AUTHOR_END_RE = re.compile(r",|\bet al\b|(?<=\b[A-Z])\.")
+_INITIAL_TOKEN_RE = re.compile(r"^(?:[A-Z]{1,3}|[A-Z]\.?(?:-?[A-Z]\.?)*|[A-Z][a-z]?\.)$")
+_AFTER_YEAR_RE = re.compile(r"^[a-z]?\)?[.:,]?\s*")
+_MATH_RE = re.compile(r"\$[^$]*\$")
+_FINGERPRINT_STRIP_RE = re.compile(r"[^0-9a-z]+")
+
+_TITLE_MAX_CHARS = 200
+
+
+@dataclass
+class Reference:
+    """单条参考文献"""
+    index: int
+    raw: str
+    label: Optional[str] = None
+    doi: Optional[str] = None
+    year: Optional[int] = None
+    first_author: Optional[str] = None
+    title: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """紧凑表示：短键名、省略空字段。"""
+        out: Dict[str, Any] = {"n": self.index}
+        if self.label and self.label != str(self.index):
+            out["label"] = self.label
+        for key, val in (("doi", self.doi), ("year", self.year),
+                         ("author", self.first_author), ("title", self.title)):
+            if val:
+                out[key] = val
+        out["raw"] = self.raw
+        return out
+
+
+def normalize_doi(doi: Optional[str]) -> Optional[str]:
+    """DOI 规范化：去掉前缀与空白、统一小写、去掉结尾标点。"""
+    if not doi:
+        return None
+    doi = _WS_RE.sub("", doi).lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    doi = doi.rstrip(".,;)]")
+    return doi if doi.startswith("10.") else None
+
+
+def title_fingerprint(title: Optional[str], max_chars: int = 60) -> Optional[str]:
+    """标题指纹：仅保留小写字母数字，取前 max_chars 个字符；过短返回 None。"""
+    if not title:
+        return None
+    fp = _FINGERPRINT_STRIP_RE.sub("", _MATH_RE.sub("", title).lower())[:max_chars]
+    return fp if len(fp) >= 20 else None
+
+
+def _is_numbered(lines: List[str]) -> bool:
+    hits = sum(1 for ln in lines if _NUMBERED_START_RE.match(ln))
+    return hits >= max(2, len(lines) // 2)
+
+
+def _split_numbered(lines: List[str]) -> List[tuple]:
+    refs: List[list] = []
+    for line in lines:
+        m = _NUMBERED_START_RE.match(line)
+        if m:
+            refs.append([m.group(1) or m.group(2), line[m.end():]])
+        elif refs:
+            refs[-1][1] += " " + line
+        else:
+            refs.append([None, line])
+    # 同一行内合并的多条文献：按连续编号继续切分
+    out = []
+    for label, text in refs:
+        expected = int(label) + 1 if label and label.isdigit() else None
+        start = 0
+        cur_label = label
+        if expected is not None:
+            for m in _INLINE_NUMBER_RE.finditer(text):
+                if int(m.group(1)) == expected:
+                    out.append((cur_label, text[start:m.start()]))
+                    cur_label, start, expected = m.group(1), m.end(), expected + 1
+        out.append((cur_label, text[start:]))
+    return out
+
+
+def _split_author_year(lines: List[str]) -> List[tuple]:
+    # 标题后折行的期刊名等续行同样以大写开头、上一行以句点结尾，只凭行首年份或 "Surname, X." 判断新条目
+    refs: List[str] = []
+    for line in lines:
+        starts_new = bool(_AUTHOR_START_RE.match(line)) and (
+            bool(_YEAR_RE.search(line[:150])) or bool(_SURNAME_HEAD_RE.match(line)))
+        if starts_new or not refs:
+            refs.append(line)
+        else:
+            refs[-1] += " " + line
+    return [(None, r) for r in refs]
+
+
+def split_references(section: str) -> List[tuple]:
+    """将参考文献章节切分为 (编号, 文本) 列表，续行并入上一条。"""
+    lines = [ln.strip() for ln in section.splitlines() if ln.strip()]
+    if not lines:
+        return []
+    return _split_numbered(lines) if _is_numbered(lines) else _split_author_year(lines)
+
+
+def _author_names(segment: str) -> str:
+    tokens = [t for t in re.split(r"[\s.]+", segment) if t]
+    names = [t for t in tokens if not _INITIAL_TOKEN_RE.match(t) and any(ch.isalpha() for ch in t)]
+    return " ".join(names).strip(" ,;:")
+
+
+def _first_author(text: str) -> Optional[str]:
+    # 作者片段止于第一个已包含姓氏的结束位置（"A. Smith, ..." 中 "A." 之前尚无姓氏，继续向后找）
+    head = text[:80]
+    for m in _AUTHOR_END_RE.finditer(head):
+        author = _author_names(head[:m.start()])
+        if author:
+            return author
+    cut = head.find(".")
+    return _author_names(head[:cut] if cut > 0 else head) or None
+
+
+def _is_author_like(segment: str) -> bool:
+    words = segment.split()
+    if not words or len(words) > 5:
+        return False
+    return all(
+        _INITIAL_TOKEN_RE.match(w.strip(",.;")) or w[0].isupper() or w.lower() in _NAME_PARTICLES
+        for w in words
+    )
+
+
+def _sentence(text: str) -> str:
+    m = _SENTENCE_END_RE.search(text)
+    return text[: m.start()] if m else text
+
+
+def _title_fragment(text: str, year_end: Optional[int]) -> Optional[str]:
+    if year_end is not None:
+        # 作者-年份式：年份之后的第一句即标题
+        title = _sentence(_AFTER_YEAR_RE.sub("", text[year_end:], count=1))
+    else:
+        # 编号式：跳过作者片段，从第一个非作者片段开始取一句
+        title = None
+        start = 0
+        for m in list(_SEGMENT_SEP_RE.finditer(text)) + [None]:
+            end = m.start() if m else len(text)
+            segment = text[start:end].strip()
+            if segment and not _is_author_like(segment) and _LOWER_WORD_RE.search(segment):
+                rest = text[start:]
+                # 逗号式版式中标题后紧跟期刊缩写或卷期页码，在此截断
+                parts = rest.split(", ")
+                for i in range(1, len(parts)):
+                    if _JOURNAL_PART_RE.search(parts[i]):
+                        rest = ", ".join(parts[:i])
+                        break
+                title = _sentence(rest)
+                break
+            if m is None:
+                break
+            start = m.end()
+    if not title:
+        return None
+    title = _MATH_RE.sub("", title).strip(" .,;:")
+    return title[:_TITLE_MAX_CHARS] or None
+
+
+def parse_reference(index: int, text: str, label: Optional[str] = None) -> Reference:
+    """单条文献的字段抽取（DOI 之前的部分用于年份/作者/标题）。"""
+    raw = _WS_RE.sub(" ", text).strip()
+    doi = None
+    body = raw
+    m = _REF_DOI_RE.search(_DOI_URL_GAP_RE.sub("doi.org/", raw))
+    if m:
+        doi = normalize_doi(m.group(0))
+        cut = raw.find(m.group(0)[:12])
+        if cut > 0:
+            body = raw[:cut]
+
+    year = None
+    year_end = None
+    pm = _PAREN_YEAR_RE.search(body)
+    ym = pm or _YEAR_RE.search(body)
+    if ym:
+        year = int(ym.group(1))
+        # 作者-年份式（年份出现在前部）才以年份定位标题
+        if ym.start() < 200 and (label is None):
+            year_end = ym.end()
+
+    return Reference(
+        index=index,
+        raw=raw,
+        label=label,
+        doi=doi,
+        year=year,
+        first_author=_first_author(body),
+        title=_title_fragment(body, year_end),
+    )
+
+
+def parse_references(section: str) -> List[Reference]:
+    """解析整个参考文献章节（不设条数上限）。"""
+    return [parse_reference(i + 1, text, label) for i, (label, text) in enumerate(split_references(section))]
+
+
+def parse_reference_lines(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """将已切分的文献字符串列表（如LLM输出）解析为紧凑结构。"""
+    return [parse_reference(i + 1, str(ln)).to_dict() for i, ln in enumerate(lines) if str(ln).strip()]
@@ -0,0 +1,225 @@
+"""
+固定内存的运行期性能统计：长时间批处理（10 万篇级）中不再逐条保存样本。
+
+- RingBuffer：最近 N 条快照记录（如双卡流水线的性能采样），超出容量丢弃最旧的
+- QuantileSketch：对数分桶的分位数草图（DDSketch/HDR 思路），相对误差 relative_accuracy，
+  桶数有上限，内存与样本数无关；可合并
+- WindowedRate：按秒分桶的滑动窗口速率
+- RollingMetrics：按名称汇总以上三者，报告（均值/分位数/窗口速率）全部由草图计算
+"""
+import math
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class RingBuffer:
+    """容量固定的最近记录缓冲区"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._items: deque = deque(maxlen=self.capacity)
+        self.total = 0
+
+    def append(self, item: Any) -> None:
+        self._items.append(item)
+        self.total += 1
+
+    def recent(self, n: Optional[int] = None) -> List[Any]:
+        """最近 n 条（默认全部保留的记录），按时间先后。"""
+        items = list(self._items)
+        return items if n is None else items[-n:] if n > 0 else []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class QuantileSketch:
+    """对数分桶分位数草图：值 v 落入桶 ceil(log_γ v)，γ = (1+α)/(1-α)，估计值的相对误差不超过 α"""
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-9, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.max_buckets = max_buckets
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        # 桶数超限时合并最低的两个桶（牺牲低分位的精度，高分位保持相对误差）
+        lowest, second = sorted(self.bins)[:2]
+        self.bins[second] += self.bins.pop(lowest)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("只能合并相同精度的分位数草图")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return min(max(0.0, self.min), self.max)
+        running = self.zero_count
+        for key in sorted(self.bins):
+            running += self.bins[key]
+            if running > rank:
+                estimate = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class WindowedRate:
+    """滑动窗口事件速率：按 resolution 秒分桶，只保留窗口内的桶"""
+
+    def __init__(self, window_secs: float = 60.0, resolution_secs: float = 1.0):
+        self.window = window_secs
+        self.resolution = resolution_secs
+        self._buckets: deque = deque(maxlen=int(math.ceil(window_secs / resolution_secs)) + 1)
+        self._first: Optional[float] = None
+
+    def add(self, n: float = 1, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if self._first is None:
+            self._first = now
+        slot = math.floor(now / self.resolution)
+        if self._buckets and self._buckets[-1][0] == slot:
+            self._buckets[-1][1] += n
+        else:
+            self._buckets.append([slot, n])
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """窗口内每秒事件数；运行时间不足一个窗口时按实际时长计算。"""
+        now = time.time() if now is None else now
+        if self._first is None:
+            return 0.0
+        oldest = math.floor((now - self.window) / self.resolution)
+        total = sum(n for slot, n in self._buckets if slot > oldest)
+        span = min(self.window, max(now - self._first, self.resolution))
+        return total / span
+
+
+class RollingMetrics:
+    """按名称汇总的固定内存统计：observe 记录耗时等数值，incr 记录事件数，add_sample 保存最近快照"""
+
+    def __init__(self, sample_capacity: int = 720, window_secs: float = 60.0, relative_accuracy: float = 0.01):
+        self.window_secs = window_secs
+        self.relative_accuracy = relative_accuracy
+        self.samples = RingBuffer(sample_capacity)
+        self._sketches: Dict[str, QuantileSketch] = {}
+        self._rates: Dict[str, WindowedRate] = {}
+        self._totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _rate(self, name: str) -> WindowedRate:
+        rate = self._rates.get(name)
+        if rate is None:
+            rate = self._rates[name] = WindowedRate(self.window_secs)
+        return rate
+
+    def observe(self, name: str, value: float, now: Optional[float] = None) -> None:
+        with self._lock:
+            sketch = self._sketches.get(name)
+            if sketch is None:
+                sketch = self._sketches[name] = QuantileSketch(self.relative_accuracy)
+            sketch.add(value)
+            self._rate(name).add(1, now)
+
+    def incr(self, name: str, n: float = 1, now: Optional[float] = None) -> None:
+        with self._lock:
+            self._totals[name] = self._totals.get(name, 0) + n
+            self._rate(name).add(n, now)
+
+    def add_sample(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.samples.append(record)
+
+    def recent_samples(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self.samples.recent(n)
+
+    def count(self, name: str) -> int:
+        """observe 的样本数或 incr 的累计数。"""
+        with self._lock:
+            if name in self._sketches:
+                return self._sketches[name].count
+            return int(self._totals.get(name, 0))
+
+    def mean(self, name: str) -> float:
+        with self._lock:
+            sketch = self._sketches.get(name)
+            return sketch.mean if sketch else 0.0
+
+    def quantile(self, name: str, q: float) -> float:
+        with self._lock:
+            sketch = self._sketches.get(name)
+            return sketch.quantile(q) if sketch else 0.0
+
+    def rate(self, name: str, now: Optional[float] = None) -> float:
+        with self._lock:
+            rate = self._rates.get(name)
+            return rate.rate(now) if rate else 0.0
+
+    def report(self, quantiles: Sequence[float] = DEFAULT_QUANTILES, now: Optional[float] = None) -> Dict[str, Any]:
+        """各指标的计数/均值/极值/分位数与窗口速率，全部由草图计算。"""
+        now = time.time() if now is None else now
+        with self._lock:
+            metrics = {}
+            for name, sketch in sorted(self._sketches.items()):
+                entry = {
+                    "count": sketch.count,
+                    "sum": round(sketch.sum, 6),
+                    "mean": round(sketch.mean, 6),
+                    "min": round(sketch.min, 6),
+                    "max": round(sketch.max, 6),
+                }
+                for q in quantiles:
+                    entry[f"p{q * 100:g}"] = round(sketch.quantile(q), 6)
+                entry["rate_per_sec"] = round(self._rates[name].rate(now), 4)
+                metrics[name] = entry
+            counters = {
+                name: {"total": total, "rate_per_sec": round(self._rates[name].rate(now), 4)}
+                for name, total in sorted(self._totals.items())
+            }
+            return {
+                "window_secs": self.window_secs,
+                "relative_accuracy": self.relative_accuracy,
+                "metrics": metrics,
+                "counters": counters,
+                "samples_kept": len(self.samples),
+                "samples_total": self.samples.total,
+            }
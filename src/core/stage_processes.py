@@ -0,0 +1,127 @@
+"""
+流水线阶段进程池：MD解析（正则启发式 + LLM 调用）与入库（字典构建、JSON 序列化、psycopg2 参数适配）
+都是受 GIL 约束的纯 Python 工作，与协调线程、其他阶段争用同一个解释器。
+多进程模式下这两个阶段在独立的工作进程中执行，CPU 侧阶段随核数扩展。
+
+- 队列、计数器、自动伸缩仍在主进程：阶段线程从队列取项后提交到进程池并等待结果，
+  线程数即该阶段的并发度，进程数为其上限
+- 子进程的追踪记录暂存在 CollectingSink 中，计数器/直方图按任务计算增量，
+  随结果交回主进程写出/合并，/metrics 与追踪文件与线程模式一致
+- PDF 阶段本身由 MinerU 子进程执行并绑定显卡，保持线程模式
+- 每个子进程各自建立 LLM 会话与数据库连接池，默认使用 forkserver 启动
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import tracing
+from .metrics import REGISTRY, STAGE_INFLIGHT, state_delta
+
+logger = logging.getLogger(__name__)
+
+# 支持多进程执行的阶段 → kg_stage_* 指标中的阶段名
+PROCESS_STAGES = {"md": "parse", "import": "import"}
+
+# 子进程内复用的处理对象（LLMParser 或 DataImporter）
+_WORKER: Any = None
+_METRICS_BASE: Dict[str, Dict[str, Any]] = {}
+
+
+def _init_worker(stage: str, config, run_id: str, trace_enabled: bool) -> None:
+    global _WORKER, _METRICS_BASE
+    tracing.RUN_ID = run_id
+    tracing.set_sink(tracing.CollectingSink() if trace_enabled else None)
+    if stage == "md":
+        from .llm_parser import LLMParser
+        _WORKER = LLMParser(config)
+    else:
+        from .data_importer import DataImporter
+        _WORKER = DataImporter(config)
+    _METRICS_BASE = REGISTRY.export_state()
+
+
+def _finish(result: Any, error: Optional[str]) -> Tuple[Any, Optional[str], List[Dict], Dict]:
+    """附上本次任务产生的追踪记录与指标增量。"""
+    global _METRICS_BASE
+    sink = tracing.get_sink()
+    records = sink.drain() if isinstance(sink, tracing.CollectingSink) else []
+    current = REGISTRY.export_state()
+    delta = state_delta(_METRICS_BASE, current)
+    _METRICS_BASE = current
+    return result, error, records, delta
+
+
+def _parse_markdown(md_path: str, trace: Optional[tracing.TraceContext]):
+    try:
+        with tracing.activate(trace):
+            return _finish(_WORKER.parse_markdown_file(md_path), None)
+    except Exception as e:
+        return _finish(None, str(e))
+
+
+def _import_batch(md_paths: List[str]):
+    try:
+        return _finish(_WORKER.import_batch(md_paths), None)
+    except Exception as e:
+        return _finish(None, str(e))
+
+
+class StageProcessPool:
+    """单个阶段的工作进程池"""
+
+    def __init__(self, stage: str, config, processes: int, start_method: str = "forkserver"):
+        if stage not in PROCESS_STAGES:
+            raise ValueError(f"阶段 {stage} 不支持多进程执行，可选: {', '.join(PROCESS_STAGES)}")
+        self.stage = stage
+        self.metric_stage = PROCESS_STAGES[stage]
+        self.processes = max(1, processes)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(stage, config, tracing.RUN_ID, tracing.enabled()),
+        )
+        logger.info(f"阶段进程池已启动: 阶段={stage}, 进程数={self.processes}, 启动方式={start_method}")
+
+    def _call(self, fn, *args) -> Any:
+        with STAGE_INFLIGHT.track_inprogress(stage=self.metric_stage):
+            result, error, records, delta = self._executor.submit(fn, *args).result()
+        tracing.write_records(records)
+        REGISTRY.merge_state(delta)
+        if error is not None:
+            raise RuntimeError(error)
+        return result
+
+    def parse_markdown(self, md_path: Path, trace: Optional[tracing.TraceContext] = None) -> Dict[str, Any]:
+        """在子进程中执行 LLMParser.parse_markdown_file。"""
+        return self._call(_parse_markdown, str(md_path), trace)
+
+    def import_batch(self, md_paths: List[str]) -> Dict[str, Any]:
+        """在子进程中执行 DataImporter.import_batch。"""
+        return self._call(_import_batch, [str(p) for p in md_paths])
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_stage_list(value: str) -> List[str]:
+    """解析 PIPELINE_STAGE_PROCESSES（如 "md,import"）；PDF 阶段或未知阶段给出警告后忽略。"""
+    stages = []
+    for name in (s.strip().lower() for s in (value or "").split(",")):
+        if not name:
+            continue
+        if name == "pdf":
+            logger.warning("PDF阶段由 MinerU 子进程执行并绑定显卡，保持线程模式")
+        elif name not in PROCESS_STAGES:
+            logger.warning(f"未知的多进程阶段: {name}，可选: {', '.join(PROCESS_STAGES)}")
+        elif name not in stages:
+            stages.append(name)
+    return stages
@@ -0,0 +1,294 @@
+"""
+文档级追踪：每篇文档一个 trace_id，贯穿 pdf_queue → md_queue → json_queue，
+排队等待、MinerU、启发式、每次LLM尝试、各数据库操作记录为 span，写入紧凑的 JSONL。
+
+- 未配置 TRACE_FILE 时所有 span 都是空操作
+- 当前文档通过 contextvars 传递，LLM/数据库等底层代码无需显式传参
+- trace_id 由文档名（PDF/MD 文件名主干）确定性生成，不同阶段、不同入口得到同一 ID；
+  每条记录另带进程级 run 标识，区分多次运行
+- 记录格式：{"run", "t": trace_id, "doc", "s": span名, "ts": 开始时间(epoch秒), "ms": 耗时毫秒, "a": 属性}
+
+报告见 scripts/trace_report.py。
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RUN_ID = uuid.uuid4().hex[:8]
+
+_current: contextvars.ContextVar = contextvars.ContextVar("kg_trace", default=None)
+
+
+@dataclass
+class TraceContext:
+    """随队列项传递的文档追踪上下文"""
+    trace_id: str
+    doc: str
+    enqueued_at: Optional[float] = None
+
+
+def trace_id_for(doc: str) -> str:
+    return hashlib.sha1(doc.encode("utf-8", errors="ignore")).hexdigest()[:16]
+
+
+def new_trace(doc: str) -> TraceContext:
+    return TraceContext(trace_id_for(doc), doc)
+
+
+def current() -> Optional[TraceContext]:
+    return _current.get()
+
+
+class TraceSink:
+    """JSONL 追踪输出；按条数批量写入，进程退出时补写剩余记录"""
+
+    def __init__(self, path: Path, flush_every: int = 64):
+        self.path = Path(path)
+        self.flush_every = max(1, flush_every)
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self.flush_every:
+                return
+            lines, self._buffer = self._buffer, []
+        self._append(lines)
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        self._append(lines)
+
+    def _append(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning(f"写入追踪记录失败: {e}")
+
+
+class CollectingSink:
+    """在内存中暂存记录：多进程阶段的子进程使用，随任务结果交回主进程统一写出"""
+
+    def __init__(self):
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            records, self._records = self._records, []
+        return records
+
+
+_UNSET = object()
+_sink: Any = _UNSET
+_sink_lock = threading.Lock()
+
+
+def get_sink() -> Optional[TraceSink]:
+    """按 TRACE_FILE 创建进程级输出（结果缓存）；未配置时返回 None。"""
+    global _sink
+    if _sink is _UNSET:
+        with _sink_lock:
+            if _sink is _UNSET:
+                path = os.getenv("TRACE_FILE", "").strip()
+                _sink = TraceSink(Path(path), int(os.getenv("TRACE_FLUSH_EVERY", "64"))) if path else None
+                if _sink is not None:
+                    atexit.register(_sink.flush)
+    return _sink
+
+
+def set_sink(sink) -> None:
+    """替换进程级输出（测试或由调用方自行指定文件时使用）。"""
+    global _sink
+    with _sink_lock:
+        if isinstance(_sink, TraceSink):
+            _sink.flush()
+        _sink = sink
+
+
+def write_records(records: List[Dict[str, Any]]) -> None:
+    """写出其他进程交回的记录（见 CollectingSink）。"""
+    sink = get_sink()
+    if sink is None:
+        return
+    for rec in records:
+        sink.write(rec)
+
+
+def enabled() -> bool:
+    return get_sink() is not None
+
+
+def record(name: str, start: float, duration: float, ctx: Optional[TraceContext] = None, **attrs) -> None:
+    """直接写入一条已知起止时间的 span（如排队等待、子进程内的耗时）。"""
+    sink = get_sink()
+    ctx = ctx or _current.get()
+    if sink is None or ctx is None:
+        return
+    rec = {"run": RUN_ID, "t": ctx.trace_id, "doc": ctx.doc, "s": name,
+           "ts": round(start, 3), "ms": round(duration * 1000, 1)}
+    if attrs:
+        rec["a"] = attrs
+    sink.write(rec)
+
+
+@contextmanager
+def activate(ctx: Optional[TraceContext]):
+    """在当前线程/上下文中将 ctx 设为当前文档。"""
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def document(doc: str):
+    """进入文档追踪：当前已是同一文档则沿用，否则新建。"""
+    ctx = _current.get()
+    if ctx is not None and ctx.doc == doc:
+        yield ctx
+        return
+    with activate(new_trace(doc)) as ctx:
+        yield ctx
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """记录一个 span；产出的字典可在块内补充属性（如 outcome）。"""
+    if get_sink() is None or _current.get() is None:
+        yield attrs
+        return
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        record(name, start, time.perf_counter() - t0, **attrs)
+
+
+def traced(name: str):
+    """函数级 span 装饰器。"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def mark_enqueued(ctx: TraceContext) -> TraceContext:
+    ctx.enqueued_at = time.time()
+    return ctx
+
+
+def record_queue_wait(ctx: Optional[TraceContext], queue_name: str) -> None:
+    """出队时记录排队等待时长。"""
+    if ctx is None or ctx.enqueued_at is None:
+        return
+    now = time.time()
+    record(f"queue.{queue_name}", ctx.enqueued_at, now - ctx.enqueued_at, ctx)
+    ctx.enqueued_at = None
+
+
+def flush() -> None:
+    sink = get_sink()
+    if sink is not None:
+        sink.flush()
+
+
+def load_records(path: Path, run: Optional[str] = None) -> List[Dict[str, Any]]:
+    """读取追踪 JSONL；跳过损坏行，可按 run 过滤。"""
+    records = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if run is None or rec.get("run") == run:
+                records.append(rec)
+    return records
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarize(records: List[Dict[str, Any]], slowest: int = 10) -> Dict[str, Any]:
+    """按 span 名汇总耗时分布，并按端到端耗时列出最慢的文档。
+
+    文档端到端耗时 = 该文档最后一个 span 结束 − 第一个 span 开始（含排队等待）。
+    """
+    by_span: Dict[str, List[float]] = {}
+    by_doc: Dict[tuple, Dict[str, Any]] = {}
+    for rec in records:
+        ms = float(rec.get("ms", 0))
+        by_span.setdefault(rec["s"], []).append(ms)
+        start = float(rec["ts"])
+        doc = by_doc.setdefault((rec.get("run"), rec["t"]), {
+            "run": rec.get("run"), "trace_id": rec["t"], "doc": rec.get("doc"),
+            "start": start, "end": start, "spans": {},
+        })
+        doc["start"] = min(doc["start"], start)
+        doc["end"] = max(doc["end"], start + ms / 1000)
+        doc["spans"][rec["s"]] = doc["spans"].get(rec["s"], 0.0) + ms
+
+    stages = []
+    for name, values in by_span.items():
+        values.sort()
+        stages.append({
+            "span": name,
+            "count": len(values),
+            "total_ms": round(sum(values), 1),
+            "p50_ms": _percentile(values, 0.5),
+            "p95_ms": _percentile(values, 0.95),
+            "max_ms": values[-1],
+        })
+    stages.sort(key=lambda s: s["total_ms"], reverse=True)
+
+    docs = []
+    for doc in by_doc.values():
+        docs.append({
+            "run": doc["run"],
+            "trace_id": doc["trace_id"],
+            "doc": doc["doc"],
+            "wall_ms": round((doc["end"] - doc["start"]) * 1000, 1),
+            "spans": {k: round(v, 1) for k, v in sorted(doc["spans"].items(), key=lambda kv: kv[1], reverse=True)},
+        })
+    docs.sort(key=lambda d: d["wall_ms"], reverse=True)
+    return {"documents": len(docs), "spans": len(records), "stages": stages, "slowest": docs[:slowest]}
@@ -0,0 +1,299 @@
+"""
+多节点协调：多台GPU机器共享同一个 Postgres，从 work_lease 表领取工作单元（PDF），
+增加节点即增加吞吐，各节点不再重复扫描、重复处理同一批文件。
+
+- 工作单元：相对输入目录的PDF路径（各节点挂载位置可以不同）；首次运行时由各节点幂等写入（seed）
+- 领取：UPDATE ... FROM (SELECT ... FOR UPDATE SKIP LOCKED) 原子地把一批待处理/租约过期的单元
+  标记为本节点持有，并发领取互不阻塞、不会重复
+- 租约：领取时设置 lease_expires_at；后台心跳线程按 WORK_LEASE_SECS/3 间隔续约，
+  节点崩溃后租约过期，由其他节点重新领取；累计领取达到 WORK_LEASE_MAX_ATTEMPTS 次的单元标记为失败
+- 吞吐：心跳同时把本节点的成功/失败数与处理耗时写入 work_node 表，node_report() 汇总各节点速率；
+  节点号默认含进程号（同机多进程各自持有租约），start() 之后的报告只包含本次运行期间有心跳的节点
+- 本机无单元可领但其他节点仍持有租约时继续等待，以便接手崩溃节点的单元；全部完成后返回空
+
+通过 WORK_LEASE=true（或 main.py / high_performance_batch.py 的 --lease）启用。
+"""
+import os
+import time
+import socket
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 单条 INSERT 写入的单元数
+_SEED_CHUNK = 5000
+
+
+def enabled() -> bool:
+    return os.getenv("WORK_LEASE", "false").lower() == "true"
+
+
+def default_node_id() -> str:
+    return os.getenv("WORK_LEASE_NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkLease:
+    """基于 Postgres 租约表的工作单元分配"""
+
+    def __init__(self, db, input_dir: Path, node_id: Optional[str] = None,
+                 lease_secs: Optional[float] = None, max_attempts: Optional[int] = None,
+                 poll_secs: Optional[float] = None, table: str = "work_lease"):
+        self.db = db
+        self.input_dir = Path(input_dir)
+        self.node_id = node_id or default_node_id()
+        self.lease_secs = float(lease_secs if lease_secs is not None else os.getenv("WORK_LEASE_SECS", "300"))
+        self.max_attempts = int(max_attempts if max_attempts is not None else os.getenv("WORK_LEASE_MAX_ATTEMPTS", "3"))
+        self.poll_secs = float(poll_secs if poll_secs is not None else os.getenv("WORK_LEASE_POLL_SECS", "5"))
+        self.table = table
+        self.node_table = f"{table}_node" if table != "work_lease" else "work_node"
+        self._lock = threading.Lock()
+        self._counts = {"processed": 0, "failed": 0, "busy_secs": 0.0}
+        self._stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        # start() 时的数据库时间；node_report 只统计此后仍有心跳的节点，不列出历次运行留下的节点
+        self._run_started_at = None
+        self.ensure_schema()
+
+    @classmethod
+    def from_config(cls, config, input_dir: Optional[Path] = None) -> "WorkLease":
+        from .database import DatabaseManager
+        return cls(DatabaseManager(config), input_dir or config.paths.input_dir)
+
+    # ------------------------------------------------------------------
+    # 表结构与工作单元
+    # ------------------------------------------------------------------
+
+    def ensure_schema(self) -> None:
+        # 多个节点同时启动时用事务级咨询锁串行化建表
+        self.db.execute_update(f"""
+            SELECT pg_advisory_xact_lock(hashtext('{self.table}'));
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                unit_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT '{STATUS_PENDING}',
+                owner TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_expires_at TIMESTAMPTZ,
+                heartbeat_at TIMESTAMPTZ,
+                started_at TIMESTAMPTZ,
+                finished_at TIMESTAMPTZ,
+                duration_secs DOUBLE PRECISION,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_{self.table}_claim ON {self.table} (status, lease_expires_at);
+            CREATE TABLE IF NOT EXISTS {self.node_table} (
+                node_id TEXT PRIMARY KEY,
+                host TEXT,
+                started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                processed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                busy_secs DOUBLE PRECISION NOT NULL DEFAULT 0
+            );
+        """)
+
+    def unit_id(self, pdf_path: Path) -> str:
+        try:
+            return Path(pdf_path).relative_to(self.input_dir).as_posix()
+        except ValueError:
+            return Path(pdf_path).as_posix()
+
+    def path_for(self, unit_id: str) -> Path:
+        return self.input_dir / unit_id
+
+    def seed(self, pdf_files: Iterable[Path]) -> int:
+        """幂等写入工作单元，返回新增数量。"""
+        unit_ids = [self.unit_id(p) for p in pdf_files]
+        added = 0
+        for i in range(0, len(unit_ids), _SEED_CHUNK):
+            added += self.db.execute_update(
+                f"INSERT INTO {self.table} (unit_id) SELECT unnest(%s::text[]) ON CONFLICT (unit_id) DO NOTHING",
+                (unit_ids[i:i + _SEED_CHUNK],),
+            )
+        logger.info(f"工作单元写入完成: 新增 {added} / 共 {len(unit_ids)}")
+        return added
+
+    # ------------------------------------------------------------------
+    # 领取、完成与心跳
+    # ------------------------------------------------------------------
+
+    def claim(self, n: int) -> List[Path]:
+        """领取至多 n 个待处理或租约已过期的单元。"""
+        if n <= 0:
+            return []
+        # 租约多次过期（节点反复崩溃在同一文件上）的单元不再分配
+        self.db.execute_update(
+            f"""UPDATE {self.table} SET status = '{STATUS_FAILED}', owner = NULL, error = 'lease expired'
+                WHERE status = '{STATUS_LEASED}' AND lease_expires_at < now() AND attempts >= %s""",
+            (self.max_attempts,),
+        )
+        rows = self.db.execute_query(
+            f"""UPDATE {self.table} AS w
+                SET status = '{STATUS_LEASED}', owner = %s, attempts = w.attempts + 1,
+                    lease_expires_at = now() + make_interval(secs => %s),
+                    heartbeat_at = now(), started_at = now()
+                FROM (
+                    SELECT unit_id FROM {self.table}
+                    WHERE status = '{STATUS_PENDING}'
+                       OR (status = '{STATUS_LEASED}' AND lease_expires_at < now())
+                    ORDER BY unit_id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) AS c
+                WHERE w.unit_id = c.unit_id
+                RETURNING w.unit_id""",
+            (self.node_id, self.lease_secs, n),
+        )
+        return [self.path_for(r["unit_id"]) for r in rows]
+
+    def outstanding(self) -> int:
+        """其他节点仍持有（未过期）的租约数；已过期的租约由 claim 接手，不计入。"""
+        rows = self.db.execute_query(
+            f"""SELECT COUNT(*) AS n FROM {self.table}
+                WHERE status = '{STATUS_LEASED}' AND owner <> %s AND lease_expires_at > now()""",
+            (self.node_id,),
+        )
+        return int(rows[0]["n"]) if rows else 0
+
+    def claim_wait(self, n: int) -> List[Path]:
+        """领取单元；暂无可领但其他节点仍持有租约时轮询等待，全部完成后返回空列表。"""
+        while not self._stop.is_set():
+            paths = self.claim(n)
+            if paths or not self.outstanding():
+                return paths
+            time.sleep(self.poll_secs)
+        return []
+
+    def claims(self, batch_size: int, limit: Optional[int] = None) -> Iterator[Path]:
+        """逐个产出本节点领取的PDF路径，本地用完后再按 batch_size 领取下一批。"""
+        claimed = 0
+        while limit is None or claimed < limit:
+            n = batch_size if limit is None else min(batch_size, limit - claimed)
+            paths = self.claim_wait(n)
+            if not paths:
+                return
+            claimed += len(paths)
+            yield from paths
+
+    def complete(self, pdf_path: Path, success: bool, duration: float = 0.0, error: str = "") -> bool:
+        """标记单元完成；租约已被其他节点接手时返回 False（结果以对方为准）。"""
+        updated = self.db.execute_update(
+            f"""UPDATE {self.table}
+                SET status = %s, finished_at = now(), duration_secs = %s, error = %s, lease_expires_at = NULL
+                WHERE unit_id = %s AND owner = %s AND status = '{STATUS_LEASED}'""",
+            (STATUS_DONE if success else STATUS_FAILED, duration, error or None,
+             self.unit_id(pdf_path), self.node_id),
+        )
+        with self._lock:
+            self._counts["processed" if success else "failed"] += 1
+            self._counts["busy_secs"] += duration
+        if not updated:
+            logger.warning(f"租约已失效，结果未记录: {Path(pdf_path).name}")
+        return bool(updated)
+
+    def heartbeat(self) -> None:
+        """续约本节点持有的单元，并上报本节点累计吞吐。"""
+        self.db.execute_update(
+            f"""UPDATE {self.table} SET lease_expires_at = now() + make_interval(secs => %s), heartbeat_at = now()
+                WHERE owner = %s AND status = '{STATUS_LEASED}'""",
+            (self.lease_secs, self.node_id),
+        )
+        with self._lock:
+            counts = dict(self._counts)
+        self.db.execute_update(
+            f"""INSERT INTO {self.node_table} (node_id, host, processed, failed, busy_secs)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (node_id) DO UPDATE SET
+                    heartbeat_at = now(), processed = excluded.processed,
+                    failed = excluded.failed, busy_secs = excluded.busy_secs""",
+            (self.node_id, socket.gethostname(), counts["processed"], counts["failed"], counts["busy_secs"]),
+        )
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, self.lease_secs / 3)
+        while not self._stop.wait(interval):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.warning(f"租约心跳失败: {e}")
+
+    def start(self) -> None:
+        """注册节点并启动心跳线程。"""
+        self._stop.clear()
+        if self._run_started_at is None:
+            rows = self.db.execute_query("SELECT now() AS t")
+            self._run_started_at = rows[0]["t"] if rows else None
+        self.heartbeat()
+        if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="work-lease-heartbeat",
+                                                      daemon=True)
+            self._heartbeat_thread.start()
+        logger.info(f"多节点协调已启用: 节点 {self.node_id}, 租约 {self.lease_secs:.0f}秒")
+
+    def stop(self) -> None:
+        """停止心跳，归还未开始处理的单元，并上报最终吞吐。"""
+        self._stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join(timeout=5)
+            self._heartbeat_thread = None
+        released = self.db.execute_update(
+            f"""UPDATE {self.table}
+                SET status = '{STATUS_PENDING}', owner = NULL, lease_expires_at = NULL,
+                    attempts = GREATEST(attempts - 1, 0)
+                WHERE owner = %s AND status = '{STATUS_LEASED}'""",
+            (self.node_id,),
+        )
+        if released:
+            logger.info(f"归还未处理的工作单元: {released} 个")
+        self.heartbeat()
+
+    def requeue_failed(self) -> int:
+        """把失败的单元重新置为待处理（重置领取次数）。"""
+        return self.db.execute_update(
+            f"""UPDATE {self.table} SET status = '{STATUS_PENDING}', owner = NULL, attempts = 0, error = NULL
+                WHERE status = '{STATUS_FAILED}'"""
+        )
+
+    # ------------------------------------------------------------------
+    # 报告
+    # ------------------------------------------------------------------
+
+    def progress(self) -> Dict[str, int]:
+        rows = self.db.execute_query(f"SELECT status, COUNT(*) AS n FROM {self.table} GROUP BY status")
+        return {r["status"]: int(r["n"]) for r in rows}
+
+    def node_report(self) -> List[Dict]:
+        """各节点累计吞吐：成功/失败数、忙碌时间、按运行时长计算的速率、心跳是否新鲜。
+
+        start() 之后只包含本次运行开始后仍有心跳的节点；未启动时（如 lease_status 脚本）列出全部节点。
+        """
+        since = "WHERE heartbeat_at >= %s" if self._run_started_at is not None else ""
+        params = (self.lease_secs,) + ((self._run_started_at,) if since else ())
+        rows = self.db.execute_query(
+            f"""SELECT node_id, host, processed, failed, busy_secs,
+                       EXTRACT(EPOCH FROM (heartbeat_at - started_at)) AS uptime_secs,
+                       heartbeat_at > now() - make_interval(secs => %s) AS alive
+                FROM {self.node_table} {since} ORDER BY node_id""",
+            params,
+        )
+        report = []
+        for r in rows:
+            uptime = float(r["uptime_secs"] or 0)
+            report.append({
+                "node_id": r["node_id"],
+                "host": r["host"],
+                "processed": int(r["processed"]),
+                "failed": int(r["failed"]),
+                "busy_secs": round(float(r["busy_secs"]), 3),
+                "uptime_secs": round(uptime, 3),
+                "files_per_sec": round(int(r["processed"]) / uptime, 4) if uptime > 0 else 0.0,
+                "alive": bool(r["alive"]),
+            })
+        return report
@@ -1,11 +1,13 @@
 """
 解析服务
 """
+import os
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 from ..config import Config
 from ..core.llm_parser import LLMParser
+from ..core.heuristic_pool import HeuristicPool
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,26 @@ class ParsingService:
         """
         self.config = config
         self.parser = LLMParser(config)
+        # 启发式进程池：HEURISTIC_PROCESSES>0 时启用，首次批量解析时创建
+        self.heuristic_processes = int(os.getenv('HEURISTIC_PROCESSES', '0'))
+        self.heuristic_chunk_size = int(os.getenv('HEURISTIC_CHUNK_SIZE', '16'))
+        self.heuristic_pool: Optional[HeuristicPool] = None
+
+    def _get_heuristic_pool(self) -> Optional[HeuristicPool]:
+        if self.heuristic_pool is None and self.heuristic_processes > 0:
+            self.heuristic_pool = HeuristicPool(
+                self.parser,
+                self.heuristic_processes,
+                self.heuristic_chunk_size,
+                os.getenv('HEURISTIC_POOL_START_METHOD', 'forkserver'),
+            )
+        return self.heuristic_pool
+
+    def close(self) -> None:
+        """释放启发式进程池"""
+        if self.heuristic_pool is not None:
+            self.heuristic_pool.close()
+            self.heuristic_pool = None
 
     def parse_markdown_file(self, md_file: Path) -> Dict[str, Any]:
         """
@@ -56,6 +78,17 @@ class ParsingService:
         if limit is not None:
             md_files = md_files[:limit]
 
+        pool = self._get_heuristic_pool()
+        if pool is not None:
+            return self._parse_batch_with_pool(pool, md_files)
+
+        # 启用多文档批量提示时整体交给解析器（失败时回退逐篇解析）
+        if getattr(self.parser, 'batch_size', 1) > 1:
+            try:
+                return self.parser.parse_markdown_batch(md_files)
+            except Exception as e:
+                logger.error(f"批量提示解析失败，回退逐篇解析: {e}")
+
         results = []
         for md_file in md_files:
             try:
@@ -65,4 +98,24 @@ class ParsingService:
                 logger.error(f"批量解析失败 {md_file}: {e}")
                 # 继续处理其他文件而不是中断整个批处理
 
-        return results
\ No newline at end of file
+        return results
+
+    def _parse_batch_with_pool(self, pool: HeuristicPool, md_files: List[Path]) -> List[Dict[str, Any]]:
+        """启发式在进程池中按块并行执行，LLM补全与合并在当前进程进行。"""
+        stages = []
+        results = []
+        for stage in pool.imap(md_files):
+            if "error" in stage:
+                logger.error(f"批量解析失败 {stage['md_path']}: {stage['error']}")
+            elif self.parser.batch_size > 1:
+                stages.append(stage)
+            else:
+                try:
+                    results.append(self.parser.complete_stage(stage))
+                except Exception as e:
+                    logger.error(f"批量解析失败 {stage['md_path']}: {e}")
+
+        # 多文档批量提示：启发式全部完成后统一装箱
+        if stages:
+            results = self.parser.parse_markdown_batch([Path(st["md_path"]) for st in stages], stages=stages)
+        return results
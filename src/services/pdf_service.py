@@ -67,9 +67,9 @@ class PDFService:
         return self.processor.process_single_pdf(
             pdf_path,
             output_path,
-            output_format=self.config.pdf.pdf_output_format,
-            text_only=self.config.pdf.pdf_text_only_default,
-            device=self.config.pdf.mineru_device or None,
-            language=self.config.pdf.mineru_lang,
-            fast=self.config.pdf.pdf_fast_default
+            output_format=self.config.pdf_output_format,
+            text_only=self.config.pdf_text_only_default,
+            device=self.config.mineru_device or None,
+            language=self.config.mineru_lang,
+            fast=self.config.pdf_fast_default
         )
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+设备探测：按需、每进程缓存的GPU信息查询，避免在模块导入时加载 torch / 初始化 CUDA。
+
+- GPU 数量：CUDA_VISIBLE_DEVICES → NVML(pynvml，可选) → /proc/driver/nvidia/gpus → torch（首次需要时才导入）
+- 显存信息：NVML → torch；每次实时查询，不缓存
+- torch 仅在确实需要时导入一次（get_torch），导入失败同样缓存，后续不再尝试
+"""
+import os
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_lock = Lock()
+_UNSET = object()
+_torch: Any = _UNSET
+_nvml: Any = _UNSET
+_gpu_count: Optional[int] = None
+_probe_source: Optional[str] = None
+
+_PROC_GPUS_DIR = Path("/proc/driver/nvidia/gpus")
+
+
+def get_torch():
+    """按需导入 torch；不可用时返回 None（结果缓存）。"""
+    global _torch
+    if _torch is _UNSET:
+        with _lock:
+            if _torch is _UNSET:
+                try:
+                    import torch
+                    _torch = torch
+                except Exception:
+                    _torch = None
+    return _torch
+
+
+def _get_nvml():
+    """按需初始化 NVML；pynvml 未安装或驱动不可用时返回 None（结果缓存）。"""
+    global _nvml
+    if _nvml is _UNSET:
+        with _lock:
+            if _nvml is _UNSET:
+                try:
+                    import pynvml
+                    pynvml.nvmlInit()
+                    _nvml = pynvml
+                except Exception:
+                    _nvml = None
+    return _nvml
+
+
+def _visible_devices() -> Optional[List[str]]:
+    """解析 CUDA_VISIBLE_DEVICES；未设置返回 None，空/-1 返回空列表。"""
+    raw = os.getenv("CUDA_VISIBLE_DEVICES")
+    if raw is None:
+        return None
+    items = [x.strip() for x in raw.split(",") if x.strip()]
+    if not items or items[0] == "-1":
+        return []
+    return items
+
+
+def _physical_index(device_index: int) -> int:
+    """将进程内逻辑设备号映射为 NVML 物理设备号（仅支持数字形式的 CUDA_VISIBLE_DEVICES）。"""
+    visible = _visible_devices()
+    if visible and device_index < len(visible) and visible[device_index].isdigit():
+        return int(visible[device_index])
+    return device_index
+
+
+def _probe_gpu_count() -> Tuple[int, str]:
+    visible = _visible_devices()
+    if visible == []:
+        return 0, "env"
+    nvml = _get_nvml()
+    if nvml is not None:
+        try:
+            count = nvml.nvmlDeviceGetCount()
+            return (min(count, len(visible)) if visible else count), "nvml"
+        except Exception:
+            pass
+    try:
+        if _PROC_GPUS_DIR.is_dir():
+            count = sum(1 for _ in _PROC_GPUS_DIR.iterdir())
+            return (min(count, len(visible)) if visible else count), "proc"
+    except OSError:
+        pass
+    torch = get_torch()
+    if torch is not None:
+        try:
+            return (torch.cuda.device_count() if torch.cuda.is_available() else 0), "torch"
+        except Exception:
+            pass
+    return 0, "none"
+
+
+def gpu_count() -> int:
+    """可见GPU数量（每进程探测一次）。"""
+    global _gpu_count, _probe_source
+    if _gpu_count is None:
+        count, source = _probe_gpu_count()
+        with _lock:
+            if _gpu_count is None:
+                _gpu_count, _probe_source = count, source
+                logger.debug(f"GPU探测: {count} 块 (来源: {source})")
+    return _gpu_count
+
+
+def has_gpu(min_count: int = 1) -> bool:
+    return gpu_count() >= min_count
+
+
+def probe_source() -> Optional[str]:
+    """最近一次 GPU 数量探测的来源（env/nvml/proc/torch/none），未探测时为 None。"""
+    return _probe_source
+
+
+def mem_get_info(device_index: int = 0) -> Optional[Tuple[int, int]]:
+    """返回 (空闲字节, 总字节)；无法查询时返回 None。"""
+    if not has_gpu(device_index + 1):
+        return None
+    nvml = _get_nvml()
+    if nvml is not None:
+        try:
+            handle = nvml.nvmlDeviceGetHandleByIndex(_physical_index(device_index))
+            info = nvml.nvmlDeviceGetMemoryInfo(handle)
+            return int(info.free), int(info.total)
+        except Exception:
+            pass
+    torch = get_torch()
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                free_bytes, total_bytes = torch.cuda.mem_get_info(device_index)
+                return int(free_bytes), int(total_bytes)
+        except Exception:
+            pass
+    return None
+
+
+def reset_cache() -> None:
+    """清空探测缓存（测试或设备热插拔后使用）。"""
+    global _gpu_count, _probe_source
+    with _lock:
+        _gpu_count, _probe_source = None, None
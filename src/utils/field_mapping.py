@@ -4,89 +4,190 @@
 """
 研究领域映射与补全工具：
 - 根据 venue、keywords、title、abstract 等上下文，推断并补全 research_field。
-- 使用简单的启发式打分机制，优先匹配期刊名中的强信号（如 Chemical Engineering Journal、Marine Pollution Bulletin）。
+- 使用加权打分机制，优先匹配期刊名中的强信号（如 Chemical Engineering Journal、Marine Pollution Bulletin）。
+- 领域词表（FieldTaxonomy）在首次使用时编译一次；文本只切词一次，
+  以整词方式匹配全部（含重叠的）短语，避免 "sea" 命中 "research" 之类的子串误报。
+- 可通过环境变量 RESEARCH_FIELD_TAXONOMY 指向 JSON 词表文件，新增领域无需改代码。
 
 返回值：字符串（规范化研究领域名）或 None（无法确定）。
 """
 
-from typing import Dict, Any, List, Optional
+import os
+import re
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# 默认词表；JSON 文件格式与此相同
+DEFAULT_TAXONOMY: Dict[str, Any] = {
+    # 强信号：期刊名短语直接映射，按顺序取第一个命中
+    "venues": [
+        ["chemical engineering", "Chemical Engineering"],
+        ["cej", "Chemical Engineering"],
+        ["marine pollution", "Marine Pollution"],
+        ["water research", "Environmental Engineering"],
+        ["journal of environmental", "Environmental Engineering"],
+    ],
+    # venue中的弱信号：all 中的词须全部出现，any 中的词至少出现一个
+    "venue_rules": [
+        {"field": "Chemical Engineering", "all": ["chemical", "engineering"], "weight": 2},
+        {"field": "Marine Pollution", "all": ["marine"], "any": ["pollution", "bulletin"], "weight": 2},
+        {"field": "Environmental Engineering", "any": ["water", "environment", "environmental"], "weight": 1},
+    ],
+    # 关键词/标题/摘要综合打分：短语 → 权重（每个短语每篇只计一次）；领域顺序决定同分时的优先级
+    "fields": {
+        "Chemical Engineering": {
+            "chemical engineering": 1, "chem eng": 1, "reaction": 1, "catalysis": 1,
+            "adsorption": 1, "oxygen vacancy": 1, "kinetics": 1, "process": 1,
+        },
+        "Marine Pollution": {
+            "marine pollution": 1, "marine": 1, "coastal": 1, "ocean": 1, "sea": 1, "reef": 1,
+        },
+        "Environmental Engineering": {
+            "wastewater": 1, "water quality": 1, "sewage": 1, "hrt": 1, "cod": 1, "bod": 1,
+            "bioreactor": 1, "activated sludge": 1, "nitrification": 1, "denitrification": 1,
+            "pollutant": 1, "removal": 1, "treatment": 1,
+        },
+        "Materials Science": {
+            "materials": 1, "nanomaterial": 1, "nanomaterials": 1, "sensor": 1, "graphene": 1,
+            "lignocellulose": 1, "composite": 1, "adsorbent": 1,
+        },
+    },
+}
 
 
 def _norm(s: Optional[str]) -> str:
     return (s or "").strip().lower()
 
 
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class _PhraseMatcher:
+    """整词短语匹配器：单词短语用集合求交，多词短语在以空格规范化的词序列上查找，均为整词命中。"""
+
+    def __init__(self, phrases: Iterable[str]):
+        self._single: Dict[str, Tuple[str, ...]] = {}
+        self._multi: List[Tuple[str, Tuple[str, ...]]] = []
+        for phrase in phrases:
+            toks = tuple(_tokens(phrase))
+            if len(toks) == 1:
+                self._single[toks[0]] = toks
+            elif toks:
+                self._multi.append((f" {' '.join(toks)} ", toks))
+
+    def find(self, tokens: List[str]) -> Set[Tuple[str, ...]]:
+        found = {self._single[t] for t in self._single.keys() & set(tokens)}
+        if self._multi:
+            joined = f" {' '.join(tokens)} "
+            found.update(toks for needle, toks in self._multi if needle in joined)
+        return found
+
+
+class FieldTaxonomy:
+    """编译后的研究领域词表"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.venues: List[Tuple[Tuple[str, ...], str]] = [
+            (tuple(_tokens(phrase)), field) for phrase, field in spec.get("venues", [])
+        ]
+        self.venue_rules = [
+            (rule["field"], set(rule.get("all", [])), set(rule.get("any", [])), float(rule.get("weight", 1)))
+            for rule in spec.get("venue_rules", [])
+        ]
+        self.fields: List[str] = list(spec.get("fields", {}).keys())
+        # 短语 → [(领域, 权重)]；同一短语可属于多个领域
+        self._signals: Dict[Tuple[str, ...], List[Tuple[str, float]]] = {}
+        for field, terms in spec.get("fields", {}).items():
+            for phrase, weight in terms.items():
+                self._signals.setdefault(tuple(_tokens(phrase)), []).append((field, float(weight)))
+            if field not in self.fields:
+                self.fields.append(field)
+        for field, *_ in self.venue_rules:
+            if field not in self.fields:
+                self.fields.append(field)
+        self._venue_matcher = _PhraseMatcher(" ".join(p) for p, _ in self.venues)
+        self._content_matcher = _PhraseMatcher(" ".join(p) for p in self._signals)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "FieldTaxonomy":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def score(self, data: Dict[str, Any]) -> Dict[str, float]:
+        """返回各领域得分；venue 强信号命中时该领域得分为 inf。"""
+        venue_tokens = _tokens(_norm(data.get("venue")))
+        scores = {f: 0.0 for f in self.fields}
+
+        if venue_tokens:
+            hits = self._venue_matcher.find(venue_tokens)
+            for phrase, field in self.venues:
+                if phrase in hits:
+                    scores[field] = float("inf")
+                    return scores
+            venue_set = set(venue_tokens)
+            for field, need_all, need_any, weight in self.venue_rules:
+                if need_all <= venue_set and (not need_any or need_any & venue_set):
+                    scores[field] += weight
+
+        kw_list: List[str] = data.get("keywords") or []
+        content = " ".join(filter(None, [
+            _norm(data.get("title")), _norm(data.get("abstract")),
+            " ".join(_norm(k) for k in kw_list), _norm(data.get("venue")),
+        ]))
+        for phrase in self._content_matcher.find(_tokens(content)):
+            for field, weight in self._signals[phrase]:
+                scores[field] += weight
+        return scores
+
+    def classify(self, data: Dict[str, Any]) -> Optional[str]:
+        """推断单条记录的研究领域；得分为0时返回None，交由上层决定是否使用兜底。"""
+        best_field = None
+        best_score = 0.0
+        for f, s in self.score(data).items():
+            if s > best_score:
+                best_field = f
+                best_score = s
+        return best_field
+
+    def classify_batch(self, records: Iterable[Dict[str, Any]]) -> List[Optional[str]]:
+        """批量推断，返回与输入同序的领域列表。"""
+        return [self.classify(r) for r in records]
+
+
+_DEFAULT: Optional[FieldTaxonomy] = None
+
+
+def get_taxonomy() -> FieldTaxonomy:
+    """获取进程内共享的词表（首次调用时编译；RESEARCH_FIELD_TAXONOMY 指定文件时从文件加载）。"""
+    global _DEFAULT
+    if _DEFAULT is None:
+        path = os.getenv("RESEARCH_FIELD_TAXONOMY", "").strip()
+        if path:
+            try:
+                _DEFAULT = FieldTaxonomy.from_file(path)
+                logger.info(f"已加载研究领域词表: {path} ({len(_DEFAULT.fields)} 个领域)")
+            except Exception as e:
+                logger.warning(f"研究领域词表加载失败，使用内置词表: {path}: {e}")
+        if _DEFAULT is None:
+            _DEFAULT = FieldTaxonomy(DEFAULT_TAXONOMY)
+    return _DEFAULT
+
+
 def infer_research_field(data: Dict[str, Any]) -> Optional[str]:
     """根据解析出的数据字典推断研究领域。
 
     期望字段：title, abstract, keywords(list[str]), venue
     """
-    title = _norm(data.get("title"))
-    abstract = _norm(data.get("abstract"))
-    venue = _norm(data.get("venue"))
-    kw_list: List[str] = data.get("keywords") or []
-    keywords = " ".join([_norm(k) for k in kw_list])
-
-    content = " ".join(filter(None, [title, abstract, keywords, venue]))
-
-    # 强信号：期刊名直接映射（加权更高）
-    venue_map = {
-        "chemical engineering": "Chemical Engineering",
-        "chemical engineering journal": "Chemical Engineering",
-        "cej": "Chemical Engineering",
-        "marine pollution bulletin": "Marine Pollution",
-        "marine pollution": "Marine Pollution",
-        "water research": "Environmental Engineering",
-        "journal of environmental": "Environmental Engineering",
-    }
-
-    for k, v in venue_map.items():
-        if k in venue:
-            return v
-
-    # 关键词/标题/摘要综合打分
-    field_signals = {
-        "Chemical Engineering": {
-            "chemical engineering", "chem eng", "reaction", "catalysis",
-            "adsorption", "oxygen vacancy", "kinetics", "process",
-        },
-        "Marine Pollution": {
-            "marine pollution", "marine", "coastal", "ocean", "sea", "reef",
-        },
-        "Environmental Engineering": {
-            "wastewater", "water quality", "sewage", "hrt", "cod", "bod",
-            "bioreactor", "activated sludge", "nitrification", "denitrification",
-            "pollutant", "removal", "treatment",
-        },
-        "Materials Science": {
-            "materials", "nanomaterial", "nanomaterials", "sensor", "graphene",
-            "lignocellulose", "composite", "adsorbent",
-        },
-    }
-
-    scores = {f: 0 for f in field_signals.keys()}
-
-    # venue中的弱信号也给予一定加分
-    if "chemical" in venue and "engineering" in venue:
-        scores["Chemical Engineering"] += 2
-    if "marine" in venue and ("pollution" in venue or "bulletin" in venue):
-        scores["Marine Pollution"] += 2
-    if "water" in venue or "environment" in venue:
-        scores["Environmental Engineering"] += 1
-
-    # 内容匹配加分
-    for field, tokens in field_signals.items():
-        for t in tokens:
-            if t in content:
-                scores[field] += 1
-
-    # 选择最高分的领域
-    best_field = None
-    best_score = 0
-    for f, s in scores.items():
-        if s > best_score:
-            best_field = f
-            best_score = s
-
-    # 若得分为0则返回None，交由上层决定是否使用兜底
-    return best_field if best_score > 0 else None
\ No newline at end of file
+    return get_taxonomy().classify(data)
+
+
+def classify_batch(records: Iterable[Dict[str, Any]]) -> List[Optional[str]]:
+    """批量推断研究领域。"""
+    return get_taxonomy().classify_batch(records)
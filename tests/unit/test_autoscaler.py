@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+测试队列深度驱动的自动伸缩：滞回、线程预算优先给最慢阶段、资源约束、线程池扩缩容
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.autoscaler import Autoscaler, StageObservation, WorkerPool
+
+BOUNDS = {"pdf": (1, 8), "md": (1, 8), "import": (1, 4)}
+
+
+def _obs(pdf, md, imp):
+    return {"pdf": StageObservation(*pdf), "md": StageObservation(*md), "import": StageObservation(*imp)}
+
+
+def test_scale_up_after_hysteresis():
+    scaler = Autoscaler(BOUNDS, drain_secs=10, up_after=2, down_after=3)
+    # 第一次采样只建立基准
+    assert scaler.decide(0, _obs((100, 0, 2), (0, 0, 1), (0, 0, 1))) == []
+    # pdf 积压且 1 线程/秒：需要 100/10/1 = 10 → 上限 8；第一次判定不动作
+    assert scaler.decide(10, _obs((90, 10, 1), (0, 0, 1), (0, 0, 1))) == []
+    decisions = scaler.decide(20, _obs((80, 20, 1), (0, 0, 1), (0, 0, 1)))
+    assert [(d.stage, d.old, d.new) for d in decisions] == [("pdf", 1, 8)]
+
+
+def test_scale_down_one_at_a_time():
+    scaler = Autoscaler(BOUNDS, up_after=1, down_after=2)
+    scaler.decide(0, _obs((0, 0, 4), (0, 0, 1), (0, 0, 1)))
+    assert scaler.decide(5, _obs((0, 0, 4), (0, 0, 1), (0, 0, 1))) == []
+    decisions = scaler.decide(10, _obs((0, 0, 4), (0, 0, 1), (0, 0, 1)))
+    assert [(d.stage, d.old, d.new) for d in decisions] == [("pdf", 4, 3)]
+
+
+def test_budget_goes_to_slowest_stage():
+    scaler = Autoscaler(BOUNDS, drain_secs=10, up_after=1)
+    scaler.decide(0, _obs((50, 0, 2), (50, 0, 2), (0, 0, 1)))
+    # pdf 单线程 1/s，md 单线程 0.25/s：md 预计排空更慢，预算优先给 md
+    decisions = {d.stage: d for d in scaler.decide(
+        10, _obs((40, 20, 2), (45, 5, 2), (0, 5, 1)), worker_budget=8)}
+    assert decisions["md"].new == 6
+    assert "pdf" not in decisions or decisions["pdf"].new <= 2
+
+
+def test_gpu_headroom_blocks_growth_and_rss_shrinks():
+    scaler = Autoscaler(BOUNDS, drain_secs=10, up_after=1, gpu_stages={"pdf": 0}, min_gpu_free_gb=2,
+                        max_rss_gb=4)
+    scaler.decide(0, _obs((100, 0, 2), (0, 0, 3), (0, 0, 1)))
+    decisions = scaler.decide(10, _obs((90, 10, 2), (0, 0, 3), (0, 0, 1)), gpu_free_gb={0: 1.0})
+    assert all(d.stage != "pdf" for d in decisions)
+    decisions = {d.stage: d for d in scaler.decide(20, _obs((80, 20, 2), (0, 0, 3), (0, 0, 1)), rss_gb=6.0)}
+    assert decisions["md"].new == 2 and "RSS" in decisions["md"].reason
+    assert "pdf" not in decisions
+
+
+def test_worker_pool_resize_and_retire():
+    stop = threading.Event()
+    pool = None
+
+    def worker(worker_id):
+        while not stop.is_set() and not pool.should_retire():
+            time.sleep(0.01)
+
+    pool = WorkerPool("t", worker)
+    pool.resize(3)
+    assert pool.size == 3
+    pool.resize(1)
+    assert pool.size == 1
+    deadline = time.time() + 2
+    while len(pool._threads) > 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(pool._threads) == 1
+    # 扩容时先撤销未领取的退休名额
+    pool.resize(0)
+    pool.resize(2)
+    assert pool.size == 2
+    stop.set()
+    pool.join(timeout=2)
+    assert pool.size == 0
+
+
+if __name__ == "__main__":
+    test_scale_up_after_hysteresis()
+    test_scale_down_one_at_a_time()
+    test_budget_goes_to_slowest_stage()
+    test_gpu_headroom_blocks_growth_and_rss_shrinks()
+    test_worker_pool_resize_and_retire()
+    print("\n🎉 自动伸缩测试通过!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+测试引用关系解析：DOI/标题指纹索引、边去重与水位读写（不连接数据库）
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.citation_resolver import CitationIndex, CitationResolver, _load_refs, resolve_edges
+
+
+def _index() -> CitationIndex:
+    index = CitationIndex()
+    index.add("p1", "https://doi.org/10.1016/J.WATRES.2019.01.001", "Removal of nitrate by anaerobic membrane bioreactors")
+    index.add("p2", None, "When drinking water stinks to high heaven")
+    # 同名标题的两篇论文：指纹不参与匹配
+    index.add("p3", None, "A review of constructed wetlands")
+    index.add("p4", None, "A Review of Constructed Wetlands.")
+    return index
+
+
+def test_match_by_doi_then_title():
+    index = _index()
+    assert index.match({"doi": "10.1016/j.watres.2019.01.001"}) == ("p1", "doi")
+    assert index.match({"title": "When drinking water stinks to high heaven"}) == ("p2", "title")
+    assert index.match({"title": "A review of constructed wetlands"}) == (None, None)
+    assert index.match({"doi": "10.9999/unknown", "title": "Short"}) == (None, None)
+
+
+def test_resolve_edges_dedupes_and_skips_self():
+    stats = {}
+    refs = [
+        {"doi": "10.1016/j.watres.2019.01.001", "raw": "Smith 2019"},
+        {"title": "Removal of nitrate by anaerobic membrane bioreactors", "raw": "dup"},
+        {"title": "When drinking water stinks to high heaven", "raw": "Benanou 2003"},
+        {"title": "Something not in the library at all"},
+    ]
+    edges = resolve_edges(_index(), "p2", refs, stats)
+    assert edges == [("p2", "p1", "Smith 2019")]
+    assert stats == {"references": 4, "matched_doi": 1, "matched_title": 2}
+
+
+def test_load_refs_legacy_strings():
+    raw = json.dumps(["Benanou, D., 2003. When drinking water stinks to high heaven. Water Res. 37."])
+    refs = _load_refs("references", raw)
+    assert refs[0]["year"] == 2003 and refs[0]["title"] == "When drinking water stinks to high heaven"
+    assert _load_refs("parsed_references", json.dumps([{"n": 1, "doi": "10.1/x"}, "bad"])) == [{"n": 1, "doi": "10.1/x"}]
+    assert _load_refs("references", "not json") == []
+
+
+def test_watermark_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SimpleNamespace(paths=SimpleNamespace(processed_dir=Path(tmp)))
+        resolver = CitationResolver(config, db=object())
+        assert resolver.load_watermark() is None
+        resolver.save_watermark("2025-01-02T03:04:05", {"inserted": 3})
+        assert resolver.load_watermark() == "2025-01-02T03:04:05"
+
+
+if __name__ == "__main__":
+    test_match_by_doi_then_title()
+    test_resolve_edges_dedupes_and_skips_self()
+    test_load_refs_legacy_strings()
+    test_watermark_roundtrip()
+    print("\n🎉 引用关系解析测试通过!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+测试CLI启动开销：各入口在导入阶段不得加载 torch / pynvml，并记录启动耗时
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.utils import device
+
+# 启动耗时上限（秒），CI 机器较慢时可通过环境变量放宽
+STARTUP_BUDGET_SECS = float(os.getenv("CLI_STARTUP_BUDGET_SECS", "5"))
+
+# 在子进程中记录对 torch / pynvml 的导入尝试（无论是否安装都能检测到）
+_GUARD = """
+import sys, atexit
+_seen = []
+class _Guard:
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] in ('torch', 'pynvml'):
+            _seen.append(name)
+        return None
+sys.meta_path.insert(0, _Guard())
+atexit.register(lambda: sys.stderr.write('HEAVY_IMPORTS=' + ','.join(_seen) + '\\n'))
+"""
+
+ENTRY_POINTS = [
+    ("main.py --help", ["import runpy; sys.argv = ['main.py', '--help']",
+                        "runpy.run_path('main.py', run_name='__main__')"]),
+    ("resolve_citations.py --help", ["import runpy; sys.argv = ['resolve_citations.py', '--help']",
+                                     "runpy.run_path('scripts/resolve_citations.py', run_name='__main__')"]),
+    ("import src.core.pipeline", ["import src.core.pipeline"]),
+    ("import src.core.dual_gpu_pipeline", ["import src.core.dual_gpu_pipeline"]),
+]
+
+
+def _run(lines):
+    code = _GUARD + "\n" + "\n".join(lines)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=str(ROOT), capture_output=True, text=True, timeout=120)
+    elapsed = time.perf_counter() - t0
+    heavy = ""
+    for line in proc.stderr.splitlines():
+        if line.startswith("HEAVY_IMPORTS="):
+            heavy = line.split("=", 1)[1]
+    return proc, elapsed, heavy
+
+
+def test_entry_points_do_not_import_torch():
+    for name, lines in ENTRY_POINTS:
+        proc, elapsed, heavy = _run(lines)
+        print(f"{name}: {elapsed * 1000:.0f}ms")
+        assert proc.returncode == 0, proc.stderr[-2000:]
+        assert heavy == "", f"{name} 在启动时导入了 {heavy}"
+        assert elapsed < STARTUP_BUDGET_SECS, f"{name} 启动耗时 {elapsed:.2f}s 超过 {STARTUP_BUDGET_SECS}s"
+
+
+def test_device_probe_cached_and_env_override():
+    saved = os.environ.get("CUDA_VISIBLE_DEVICES")
+    try:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+        device.reset_cache()
+        assert device.gpu_count() == 0 and device.probe_source() == "env"
+        assert device.mem_get_info(0) is None
+        # 缓存：环境变化后不重新探测，直到 reset_cache
+        os.environ["CUDA_VISIBLE_DEVICES"] = "0,1"
+        assert device.gpu_count() == 0
+        assert device._physical_index(1) == 1
+        os.environ["CUDA_VISIBLE_DEVICES"] = "3,5"
+        assert device._physical_index(1) == 5
+    finally:
+        if saved is None:
+            os.environ.pop("CUDA_VISIBLE_DEVICES", None)
+        else:
+            os.environ["CUDA_VISIBLE_DEVICES"] = saved
+        device.reset_cache()
+
+
+if __name__ == "__main__":
+    test_entry_points_do_not_import_torch()
+    test_device_probe_cached_and_env_override()
+    print("\n🎉 CLI启动测试通过!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+测试进程级只读配置：配置文件只加载一次、各段共享、with_* 派生视图与可序列化
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import FrozenInstanceError
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.config import Config, UnifiedConfig, reload_config
+
+
+def test_env_file_loaded_once_until_reload():
+    saved = os.environ.get("DB_NAME")
+    with tempfile.TemporaryDirectory() as tmp:
+        env_path = Path(tmp) / "config.env"
+        env_path.write_text("DB_NAME=kb_first\n", encoding="utf-8")
+        try:
+            assert UnifiedConfig(str(env_path)).db.database == "kb_first"
+            env_path.write_text("DB_NAME=kb_second\n", encoding="utf-8")
+            # 同一文件不重复读取
+            assert UnifiedConfig(str(env_path)).db.database == "kb_first"
+            reload_config()
+            assert UnifiedConfig(str(env_path)).db.database == "kb_second"
+        finally:
+            if saved is None:
+                os.environ.pop("DB_NAME", None)
+            else:
+                os.environ["DB_NAME"] = saved
+            reload_config()
+
+
+def test_sections_shared_and_frozen():
+    a, b = Config(), Config()
+    assert a.llm is b.llm and a.paths is b.paths
+    try:
+        a.llm.device = "cuda:9"
+        assert False, "LLMConfig 应为只读"
+    except FrozenInstanceError:
+        pass
+    try:
+        a.pdf_max_workers = 8
+        assert False, "Config 应为只读"
+    except AttributeError:
+        pass
+
+
+def test_with_llm_view():
+    base = Config()
+    view = base.with_llm(device="cuda:1", url="http://127.0.0.1:11435")
+    assert view.llm.device == "cuda:1" and view.llm.ollama_url == "http://127.0.0.1:11435"
+    assert base.llm.device != "cuda:1" or base.llm.ollama_url != view.llm.ollama_url
+    # 其余配置段与兼容属性共享同一份对象
+    assert view.db is base.db and view.paths is base.paths
+    assert view.dashscope_model == base.dashscope_model
+    assert view.with_parallel(pdf_max_workers=3).pdf_max_workers == 3
+
+    restored = pickle.loads(pickle.dumps(view))
+    assert restored.llm == view.llm
+
+
+def test_legacy_config_module_shares_frozen_view():
+    # services/pipeline 通过 src.config 导入的 Config 与核心配置是同一个只读类
+    import src.config as legacy
+    assert legacy.Config is Config
+    a, b = legacy.Config(), Config()
+    assert a.db is b.db and a.llm is b.llm
+    try:
+        a.mineru_path = "/tmp/mineru"
+        assert False, "Config 应为只读"
+    except AttributeError:
+        pass
+
+
+if __name__ == "__main__":
+    test_env_file_loaded_once_until_reload()
+    test_sections_shared_and_frozen()
+    test_with_llm_view()
+    test_legacy_config_module_shares_frozen_view()
+    print("\n🎉 配置单例测试通过!")
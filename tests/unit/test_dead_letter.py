@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+测试死信存储与重试策略：失败不中止整批，记录阶段/错误类别/尝试次数，retry-failed 只重跑失败的文档
+"""
+
+import os
+import sys
+import queue
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core import dead_letter
+from src.core.config import Config
+from src.core.dead_letter import DeadLetterStore, RetryPolicy
+from src.core.dual_gpu_pipeline import DualGPUPipeline
+from src.core.pipeline import KnowledgePipeline
+from bench_corpus import generate_corpus
+from memory_db import MemoryDatabase
+
+STUB_ENV = {'STUB_MINERU_STARTUP_MS': '0', 'STUB_MINERU_PAGE_MS': '0', 'LLM_INVOKE_POLICY': 'never'}
+
+
+def test_policy_decisions():
+    policy = RetryPolicy(max_attempts=3, retry_now_limit=1)
+    assert policy.decide("ReadTimeout", 1, retried_now=0) == dead_letter.RETRY_NOW
+    assert policy.decide("ReadTimeout", 2, retried_now=1) == dead_letter.RETRY_LATER
+    assert policy.decide("MineruError", 1) == dead_letter.RETRY_LATER
+    # MinerU 子进程超时对同一PDF可复现，不立即重试
+    assert policy.decide("TimeoutExpired", 1, retried_now=0) == dead_letter.RETRY_LATER
+    assert policy.decide("MineruError", 3) == dead_letter.GIVE_UP
+    assert policy.decide("FileNotFoundError", 1) == dead_letter.GIVE_UP
+    # 退避时间按尝试次数翻倍
+    assert policy.next_retry_at(3, 0) == 4 * policy.backoff_secs
+
+
+def test_store_record_resolve_pending():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DeadLetterStore(Path(tmp) / 'dl.sqlite', RetryPolicy(max_attempts=2, backoff_secs=100))
+        a, b = Path(tmp) / 'a.pdf', Path(tmp) / 'b.md'
+        assert store.record_failure("pdf", a, "MineruError", "rc=1") == dead_letter.RETRY_LATER
+        assert store.record_failure("import", b, "ParseError") == dead_letter.RETRY_LATER
+        # 未到重试时间
+        assert store.pending(now=0) == []
+        assert [r["doc"] for r in store.pending("pdf")] == ["a"]
+        assert store.record_failure("pdf", a, "MineruError") == dead_letter.GIVE_UP
+        assert store.pending("pdf") == []
+        assert store.pending("pdf", include_gave_up=True)[0]["attempts"] == 2
+        assert store.summary() == {"total": 2,
+                                   "by_stage": {"pdf": {"gave_up": 1}, "import": {"retry": 1}},
+                                   "by_error": {"MineruError": 1, "ParseError": 1}}
+        store.resolve("import", b)
+        store.close()
+        # 重新打开后仍保留记录
+        store = DeadLetterStore(Path(tmp) / 'dl.sqlite')
+        assert store.summary()["total"] == 1
+        store.close()
+
+
+def test_resolve_sees_records_from_other_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'dl.sqlite'
+        mine = DeadLetterStore(path, RetryPolicy())
+        # 另一进程（如多进程阶段的入库工作进程）在本存储创建后记录的失败
+        other = DeadLetterStore(path, RetryPolicy())
+        md = Path(tmp) / 'paper.md'
+        other.record_failure("import", md, "OperationalError")
+        mine.resolve("import", md)
+        assert other.summary()["total"] == 0
+        mine.resolve("import", md)  # 无记录时不报错
+
+
+def test_failures_do_not_abort_and_retry_failed():
+    saved = {k: os.environ.get(k) for k in (*STUB_ENV, 'STUB_MINERU_FAIL_RATE', 'DEAD_LETTER_PATH')}
+    os.environ.update(STUB_ENV)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            os.environ['DEAD_LETTER_PATH'] = str(tmp / 'dead_letter.sqlite')
+            pdfs = generate_corpus(tmp / 'corpus', 3, median_pages=2, seed=5)
+            config = Config().with_paths(
+                input_dir=tmp / 'corpus',
+                output_dir=tmp / 'output',
+                processed_dir=tmp / 'processed',
+                logs_dir=tmp / 'logs',
+                temp_dir=tmp / 'temp',
+            ).with_mineru(mineru_path=str(ROOT / 'scripts' / 'stub_mineru.py')).with_parallel(pdf_max_workers=2)
+            config.setup_directories()
+
+            # 全部失败：不抛异常，失败文档记入死信存储
+            os.environ['STUB_MINERU_FAIL_RATE'] = '1'
+            db = MemoryDatabase()
+            results = KnowledgePipeline(config, db=db).run_full_pipeline()
+            assert results['pdf_processing']['failed'] == len(pdfs)
+            assert results['dead_letter']['by_stage'] == {"pdf": {"retry": len(pdfs)}}
+            assert results['dead_letter']['by_error'] == {"MineruError": len(pdfs)}
+
+            # retry-failed 只重跑死信中的文档，成功后记录被移除
+            os.environ['STUB_MINERU_FAIL_RATE'] = '0'
+            results = KnowledgePipeline(config, db=db).retry_failed(force=True)
+            assert results['success'], results.get('error')
+            assert results['pdf_processing']['processed'] == len(pdfs)
+            assert results['data_import']['imported'] == len(pdfs)
+            assert results['dead_letter']['total'] == 0
+            assert db.count('paper') == len(pdfs)
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def test_dual_pipeline_retry_does_not_block_on_full_queue():
+    env = dict(STUB_ENV, STUB_MINERU_FAIL_RATE='1', DEAD_LETTER_RETRY_NOW_ERRORS='MineruError')
+    saved = {k: os.environ.get(k) for k in (*env, 'DEAD_LETTER_PATH')}
+    os.environ.update(env)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            os.environ['DEAD_LETTER_PATH'] = str(tmp / 'dead_letter.sqlite')
+            pdfs = generate_corpus(tmp / 'corpus', 6, median_pages=2, seed=8)
+            config = Config().with_paths(
+                input_dir=tmp / 'corpus',
+                output_dir=tmp / 'output',
+                processed_dir=tmp / 'processed',
+                logs_dir=tmp / 'logs',
+                temp_dir=tmp / 'temp',
+            ).with_mineru(mineru_path=str(ROOT / 'scripts' / 'stub_mineru.py'))
+            config.setup_directories()
+            pipeline = DualGPUPipeline(config, db=MemoryDatabase())
+            # PDF多于队列容量且全部立即重试：调度线程阻塞在入队时，唯一的工作线程仍须能重试
+            pipeline.pdf_queue = queue.Queue(maxsize=1)
+            results = {}
+            runner = threading.Thread(target=lambda: results.update(pipeline.run_parallel_processing(
+                num_pdf_workers=1, num_md_workers=1, num_import_workers=1,
+                autoscale=False, stage_processes=[])), daemon=True)
+            runner.start()
+            runner.join(timeout=60)
+            assert not runner.is_alive(), "PDF重试与调度线程互相阻塞"
+            assert results['pdf_failed'] == len(pdfs)
+            assert results['dead_letter']['by_stage'] == {"pdf": {"retry": len(pdfs)}}
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+if __name__ == "__main__":
+    test_policy_decisions()
+    test_store_record_resolve_pending()
+    test_resolve_sees_records_from_other_processes()
+    test_failures_do_not_abort_and_retry_failed()
+    test_dual_pipeline_retry_does_not_block_on_full_queue()
+    print("\n🎉 死信存储测试通过!")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+测试研究领域词表：整词匹配、期刊强信号、加权打分与从JSON文件加载
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.field_mapping import DEFAULT_TAXONOMY, FieldTaxonomy, classify_batch, infer_research_field
+
+
+def test_word_boundary_matching():
+    # 旧实现中 "research" 内的 "sea"、"processing" 内的 "process" 都会计分
+    assert infer_research_field({"title": "Research on data processing"}) is None
+    assert infer_research_field({"title": "Sea level and coastal erosion"}) == "Marine Pollution"
+    # 重叠短语同时计分："marine pollution" 与 "marine"
+    scores = FieldTaxonomy(DEFAULT_TAXONOMY).score({"keywords": ["Marine pollution"]})
+    assert scores["Marine Pollution"] == 2
+
+
+def test_venue_signals():
+    assert infer_research_field({"venue": "Chemical Engineering Journal", "title": "Reef survey"}) == "Chemical Engineering"
+    assert infer_research_field({"venue": "Marine Pollution Bulletin"}) == "Marine Pollution"
+    # 弱信号：venue 含 environment/environmental 给环境工程加分；整词匹配不再命中 "watershed"
+    assert infer_research_field({"venue": "Science of the Total Environment"}) == "Environmental Engineering"
+    assert infer_research_field({"venue": "Environmental Science & Technology"}) == "Environmental Engineering"
+    assert infer_research_field({"venue": "Watershed Ecology"}) is None
+
+
+def test_weighted_taxonomy_from_file():
+    spec = {
+        "venues": [["desalination", "Desalination"]],
+        "fields": {
+            "Environmental Engineering": {"membrane": 1, "wastewater": 1},
+            "Membrane Science": {"membrane fouling": 3, "reverse osmosis": 2},
+        },
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "fields.json"
+        path.write_text(json.dumps(spec), encoding="utf-8")
+        taxonomy = FieldTaxonomy.from_file(path)
+    records = [
+        {"title": "Membrane fouling in wastewater reuse"},
+        {"venue": "Desalination", "title": "Wastewater"},
+        {"title": "Nothing relevant"},
+    ]
+    assert taxonomy.classify_batch(records) == ["Membrane Science", "Desalination", None]
+
+
+def test_classify_batch_matches_single():
+    records = [
+        {"title": "Activated sludge nitrification kinetics", "keywords": ["HRT", "COD"]},
+        {"title": "Graphene composite sensor", "abstract": "A nanomaterial adsorbent."},
+    ]
+    assert classify_batch(records) == [infer_research_field(r) for r in records]
+    assert classify_batch(records) == ["Environmental Engineering", "Materials Science"]
+
+
+if __name__ == "__main__":
+    test_word_boundary_matching()
+    test_venue_signals()
+    test_weighted_taxonomy_from_file()
+    test_classify_batch_matches_single()
+    print("\n🎉 研究领域词表测试通过!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+测试启发式进程池：子进程阶段结果与进程内一致，按块提交且保持顺序
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core import tracing
+from src.core.heuristic_pool import HeuristicPool
+from src.core.llm_parser import LLMParser
+from src.core.markdown_document import md_to_txt
+from memory_db import MemoryDatabase
+
+MD_DIR = Path(__file__).parent.parent / 'data' / 'md'
+
+
+def _strip_timing(stage):
+    return {k: v for k, v in stage.items() if k != "heuristic_secs"}
+
+
+def test_pool_matches_in_process_heuristics():
+    os.environ['LLM_INVOKE_POLICY'] = 'never'
+    try:
+        parser = LLMParser(Config())
+    finally:
+        os.environ.pop('LLM_INVOKE_POLICY', None)
+    md_files = sorted(MD_DIR.glob('*.md'))
+    missing = MD_DIR / 'does-not-exist.md'
+
+    with HeuristicPool(parser, processes=2, chunk_size=2) as pool:
+        stages = pool.map(md_files + [missing])
+        with tempfile.TemporaryDirectory() as tmp:
+            txt_path = Path(tmp) / 'out.txt'
+            pool.md_to_txt_file(md_files[0], txt_path)
+            txt = txt_path.read_text(encoding='utf-8')
+
+    assert [s["md_path"] for s in stages] == [str(p) for p in md_files + [missing]]
+    assert "error" in stages[-1]
+    for md, stage in zip(md_files, stages):
+        assert _strip_timing(stage) == _strip_timing(parser.heuristic_stage(md))
+        assert parser.complete_stage(stage) == parser.parse_markdown_file(str(md))
+    assert txt == md_to_txt(md_files[0].read_text(encoding='utf-8', errors='ignore'))
+
+
+def test_dual_pipeline_completes_chunk_across_workers():
+    from src.core.dual_gpu_pipeline import DualGPUPipeline
+    saved = os.environ.get('LLM_INVOKE_POLICY')
+    os.environ['LLM_INVOKE_POLICY'] = 'never'
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            config = Config().with_paths(output_dir=Path(tmp) / 'output', logs_dir=Path(tmp) / 'logs')
+            config.setup_directories()
+            pipeline = DualGPUPipeline(config, db=MemoryDatabase())
+            parser = pipeline.llm_parser_gpu2
+            md_files = sorted(MD_DIR.glob('*.md')) * 4
+            with HeuristicPool(parser, processes=1, chunk_size=len(md_files)) as pool:
+                pipeline.heuristic_pool = pool
+                pipeline.heuristic_chunk_size = len(md_files)
+
+                # LLM补全阶段较慢：整块的补全应由多个MD线程并发完成，而非取块的线程串行完成
+                lock, active, peak = threading.Lock(), [0], [0]
+                complete_stage = parser.complete_stage
+
+                def slow_complete(stage):
+                    with lock:
+                        active[0] += 1
+                        peak[0] = max(peak[0], active[0])
+                    time.sleep(0.1)
+                    with lock:
+                        active[0] -= 1
+                    return complete_stage(stage)
+
+                parser.complete_stage = slow_complete
+                for md in md_files:
+                    pipeline.md_queue.put((md, tracing.mark_enqueued(tracing.new_trace(md.stem))))
+                workers = [threading.Thread(target=pipeline.md_parsing_worker, args=(i,), daemon=True)
+                           for i in range(4)]
+                for t in workers:
+                    t.start()
+                pipeline.md_queue.join()
+                pipeline.stop_event.set()
+                for t in workers:
+                    t.join(timeout=5)
+            assert pipeline.json_queue.qsize() == len(md_files)
+            assert peak[0] >= 3
+    finally:
+        if saved is None:
+            os.environ.pop('LLM_INVOKE_POLICY', None)
+        else:
+            os.environ['LLM_INVOKE_POLICY'] = saved
+
+
+if __name__ == "__main__":
+    test_pool_matches_in_process_heuristics()
+    test_dual_pipeline_completes_chunk_across_workers()
+    print("\n🎉 启发式进程池测试通过!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+测试导入台账：未变化的Markdown在解析前跳过，修改过的文件与数据库中已不存在的论文重新导入
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core.data_importer import DataImporter
+from src.core.import_ledger import ImportLedger, content_hash, get_ledger
+from bench_corpus import generate_corpus
+from memory_db import MemoryDatabase
+
+
+def _write_markdown(tmp: Path, n: int) -> list:
+    md_dir = tmp / 'output' / 'markdown'
+    md_dir.mkdir(parents=True)
+    files = []
+    for pdf in generate_corpus(tmp / 'corpus', n, median_pages=2, seed=11):
+        raw = pdf.read_bytes()
+        md = md_dir / f"{pdf.stem}.md"
+        md.write_bytes(raw[raw.index(b"\n%%MD\n") + 6:])
+        files.append(md)
+    return files
+
+
+def test_ledger_record_replaces_old_content():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = ImportLedger(Path(tmp) / 'ledger.sqlite')
+        md = Path(tmp) / 'a.md'
+        ledger.record("h1", md, "p1")
+        ledger.record("h2", md, "p1")
+        assert ledger.lookup(["h1", "h2", "h3"]) == {"h2": "p1"}
+        ledger.forget(["h2"])
+        assert ledger.count() == 0
+        ledger.close()
+
+
+def test_incremental_import_skips_unchanged():
+    saved = os.environ.get('LLM_INVOKE_POLICY')
+    os.environ['LLM_INVOKE_POLICY'] = 'never'
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            files = _write_markdown(tmp, 4)
+            config = Config().with_paths(output_dir=tmp / 'output', logs_dir=tmp / 'logs')
+            db = MemoryDatabase()
+            importer = DataImporter(config, db=db)
+
+            results = importer.import_batch(files)
+            assert (results['imported'], results['skipped']) == (4, 0)
+
+            # 再次导入：全部跳过，不再发起任何解析与写库
+            writes = db.op_counts.get('get_or_create_id', 0)
+            results = importer.import_batch(files)
+            assert (results['imported'], results['skipped']) == (0, 4)
+            assert db.op_counts.get('get_or_create_id', 0) == writes
+
+            # 修改一个文件：只重新导入该文件；limit 只计实际导入的文件
+            files[0].write_text(files[0].read_text(encoding='utf-8') + "\n\nErratum.\n", encoding='utf-8')
+            results = importer.import_batch(files, limit=1)
+            assert (results['imported'], results['skipped']) == (1, 3)
+            assert content_hash(files[0]) in get_ledger(config).lookup([content_hash(files[0])])
+
+            # 数据库被清空：台账记录失效，全部重新导入
+            results = DataImporter(config, db=MemoryDatabase()).import_batch(files)
+            assert (results['imported'], results['skipped']) == (4, 0)
+    finally:
+        if saved is None:
+            os.environ.pop('LLM_INVOKE_POLICY', None)
+        else:
+            os.environ['LLM_INVOKE_POLICY'] = saved
+
+
+if __name__ == "__main__":
+    test_ledger_record_replaces_old_content()
+    test_incremental_import_skips_unchanged()
+    print("\n🎉 导入台账测试通过!")
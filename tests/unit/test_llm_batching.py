@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+测试多文档批量提示：按上下文窗口装箱、按 index 拆分与校验响应
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.config import Config
+from src.core.llm_parser import LLMParser
+
+
+def _entries(n: int, chars: int):
+    return [{"index": i, "text": "x" * chars, "fields": None} for i in range(n)]
+
+
+def test_plan_batches_respects_size_and_context():
+    parser = LLMParser(Config())
+    parser.batch_size = 4
+    parser.batch_output_tokens = 100
+
+    parser.num_ctx = 100000
+    batches = parser._plan_batches(_entries(10, 400))
+    assert [len(b) for b in batches] == [4, 4, 2]
+
+    # 上下文较小时自动缩小批大小
+    parser.num_ctx = 1200
+    batches = parser._plan_batches(_entries(6, 1600))
+    assert all(len(b) <= 2 for b in batches)
+    assert sum(len(b) for b in batches) == 6
+
+
+def test_split_and_validate_batch_response():
+    parser = LLMParser(Config())
+    obj = {"results": [
+        {"index": 0, "title": "A study", "authors": ["A. B"]},
+        {"index": "2", "title": "Other", "authors": "not-a-list"},
+        {"title": "no index"},
+    ]}
+    items = parser._split_batch_response(obj)
+    assert sorted(items) == [0, 2]
+
+    ctx = {"result": {"title": None}}
+    assert parser._valid_batch_item(items[0], ctx)
+    assert not parser._valid_batch_item(items[2], ctx)
+    assert not parser._valid_batch_item(items.get(1), ctx)
+
+
+if __name__ == "__main__":
+    test_plan_batches_respects_size_and_context()
+    test_split_and_validate_batch_response()
+    print("\n🎉 批量提示测试通过!")
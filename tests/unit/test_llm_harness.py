@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+测试离线压测工具：本地 Ollama 替身注入空响应时，重试与回退被正确统计
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core.llm_parser import LLMParser
+from mock_ollama import MockBehavior, MockOllamaServer
+from benchmark_llm_harness import percentile, run_benchmark
+
+MD_DIR = Path(__file__).parent.parent / 'data' / 'md'
+
+
+def _parser(url: str) -> LLMParser:
+    parser = LLMParser(Config())
+    parser.use_local = True
+    parser.ollama_url = url
+    parser.api_key = None
+    parser.llm_policy = 'always'
+    return parser
+
+
+def test_percentile_nearest_rank():
+    vals = [float(i) for i in range(1, 101)]
+    assert percentile(vals, 50) == 50.0
+    assert percentile(vals, 95) == 95.0
+    assert percentile(vals, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+def test_harness_counts_retries_and_fallbacks():
+    md_files = sorted(MD_DIR.glob('*.md'))[:2]
+    with MockOllamaServer(MockBehavior(empty_rate=1.0, seed=1)) as mock:
+        report = run_benchmark(_parser(mock.url), md_files, concurrency=2)
+        server = mock.snapshot()
+
+    # 每篇：主模型空响应+重试，回退模型空响应+重试
+    assert report["docs"] == 2 and not report["failures"]
+    assert report["retry_rate"] == 2.0
+    assert report["fallback_rate"] == 1.0
+    assert server["requests"] == 8 and server["empty"] == 8
+    assert report["latency"]["p50_ms"] is not None
+
+
+def test_harness_valid_responses():
+    md_files = sorted(MD_DIR.glob('*.md'))[:2]
+    with MockOllamaServer(MockBehavior(seed=1)) as mock:
+        report = run_benchmark(_parser(mock.url), md_files, concurrency=2)
+    assert report["retry_rate"] == 0.0 and report["fallback_rate"] == 0.0
+    assert report["llm_prompt"]["metadata@v2"]["requests"] == 2
+
+
+if __name__ == "__main__":
+    test_percentile_nearest_rank()
+    test_harness_counts_retries_and_fallbacks()
+    test_harness_valid_responses()
+    print("\n🎉 压测工具测试通过!")
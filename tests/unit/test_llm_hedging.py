@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+测试尾延迟控制：连接错误指数退避、单篇截止时间与对冲请求
+"""
+
+import socket
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core.llm_parser import LLMParser
+from mock_ollama import MockBehavior, MockOllamaServer
+
+
+def _parser(url: str) -> LLMParser:
+    parser = LLMParser(Config())
+    parser.ollama_url = url
+    parser.local_model = 'primary'
+    parser.local_model_fallback = 'fallback'
+    parser.hedge_model = 'fallback'
+    parser.backoff_base = 0.01
+    parser.backoff_max = 0.02
+    return parser
+
+
+def _closed_port_url() -> str:
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"http://127.0.0.1:{port}"
+
+
+def test_connect_errors_back_off_and_give_up():
+    parser = _parser(_closed_port_url())
+    parser.connect_retries = 2
+    assert parser._call_ollama("prompt") is None
+    # 主模型与回退模型各重试2次
+    stats = parser.get_retry_stats()
+    assert stats["connect_retries"] == 4
+    assert stats["backoff_secs"] <= 4 * 0.02
+
+
+def test_hedge_wins_when_primary_is_slow():
+    behavior = MockBehavior(latency_ms=20, model_latency_scale={'primary': 100.0}, seed=1)
+    with MockOllamaServer(behavior) as mock:
+        parser = _parser(mock.url)
+        parser.hedge_enabled = True
+        parser.hedge_after_secs = 0.1
+        t0 = time.monotonic()
+        res = parser._call_ollama("prompt")
+        elapsed = time.monotonic() - t0
+
+    assert res and res["title"] == "Mock title"
+    assert elapsed < 1.0, elapsed
+    stats = parser.get_retry_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_deadline_bounds_total_latency():
+    with MockOllamaServer(MockBehavior(latency_ms=1000, seed=1)) as mock:
+        parser = _parser(mock.url)
+        parser.doc_deadline_secs = 0.2
+        t0 = time.monotonic()
+        assert parser._call_ollama("prompt") is None
+        elapsed = time.monotonic() - t0
+
+    assert elapsed < 0.6, elapsed
+    assert parser.get_retry_stats()["deadline_exceeded"] >= 1
+
+
+if __name__ == "__main__":
+    test_connect_errors_back_off_and_give_up()
+    test_hedge_wins_when_primary_is_slow()
+    test_deadline_bounds_total_latency()
+    print("\n🎉 尾延迟控制测试通过!")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+测试自适应上下文分档：按提示token估算选择 num_ctx，统计截断与溢出
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.config import Config
+from src.core.llm_parser import LLMParser, _estimate_tokens, _expected_output_tokens
+
+
+def _make_parser() -> LLMParser:
+    parser = LLMParser(Config())
+    parser.adaptive_ctx = True
+    parser.ctx_buckets = [2048, 4096, 8192]
+    parser.num_predict_max = 2048
+    return parser
+
+
+def test_token_estimate_and_expected_output():
+    assert _estimate_tokens("abcd" * 100) == 101
+    # 非ASCII字符按约1字符/token估算
+    assert _estimate_tokens("摘要" * 50) == 101
+    assert _expected_output_tokens(["doi", "year"]) < _expected_output_tokens(None)
+
+
+def test_size_request_picks_smallest_bucket():
+    parser = _make_parser()
+    assert parser._size_request("x" * 4000, 500) == (2048, 500)
+    assert parser._size_request("x" * 12000, 500) == (4096, 500)
+
+    # 超出最大分档：压缩 num_predict 并计为溢出
+    num_ctx, num_predict = parser._size_request("x" * 40000, 500)
+    assert num_ctx == 8192 and num_predict == 64
+
+    stats = parser.get_sizing_stats()
+    assert stats["requests"] == 3
+    assert stats["buckets"] == {"2048": 1, "4096": 1, "8192": 1}
+    assert stats["ctx_overflows"] == 1
+
+
+def test_prompt_truncation_counted():
+    parser = _make_parser()
+    parser.prompt_trunc = 1000
+    parser._build_prompt("# Title\n\n\n\n" + "y" * 500)
+    assert parser.get_sizing_stats()["prompt_truncations"] == 0
+    parser._build_prompt("z" * 5000)
+    assert parser.get_sizing_stats()["prompt_truncations"] == 1
+
+
+if __name__ == "__main__":
+    test_token_estimate_and_expected_output()
+    test_size_request_picks_smallest_bucket()
+    test_prompt_truncation_counted()
+    print("\n🎉 上下文分档测试通过!")
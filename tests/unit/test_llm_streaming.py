@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+测试流式生成：增量JSON扫描，完整顶层对象出现即断开、token上限与首token延迟/吞吐统计
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core.llm_parser import LLMParser, _JsonObjectScanner
+from mock_ollama import _MOCK_RESULT, MockBehavior, MockOllamaServer
+
+
+def _stream(mock: MockOllamaServer, parser: LLMParser, num_predict: int = 512):
+    payload = {"model": "primary", "prompt": "prompt", "options": {"num_predict": num_predict}}
+    return parser._stream_generate(payload, base_url=mock.url)
+
+
+def test_scanner_stops_at_first_complete_object():
+    scanner = _JsonObjectScanner()
+    chunks = ['Sure: {"title": "A {b', '} \\"q\\"", "authors": ["X', ' Y"]', '}', ' trailing {"x": 1}']
+    out = None
+    for i, chunk in enumerate(chunks):
+        out = scanner.feed(chunk)
+        if out is not None:
+            break
+    assert i == 3
+    assert out == '{"title": "A {b} \\"q\\"", "authors": ["X Y"]}'
+
+
+def test_scanner_incomplete_object():
+    scanner = _JsonObjectScanner()
+    assert scanner.feed('{"title": "unterminated') is None
+    assert scanner.feed(' } still open') is None
+
+
+def test_stream_closes_after_first_complete_object():
+    with MockOllamaServer(MockBehavior(trailing_chars=2000, seed=1)) as mock:
+        parser = LLMParser(Config())
+        parser.stream_max_tokens = 0
+        text = _stream(mock, parser)
+    assert json.loads(text) == _MOCK_RESULT
+    stats = parser.get_stream_stats()
+    # 替身每4个字符一个token：只读到JSON结束为止，之后的补充说明未被读取
+    assert stats["early_stops"] == 1 and stats["token_ceiling_hits"] == 0
+    assert stats["tokens"] == -(-len(json.dumps(_MOCK_RESULT)) // 4)
+
+
+def test_stream_token_ceiling_aborts():
+    with MockOllamaServer(MockBehavior(seed=1)) as mock:
+        parser = LLMParser(Config())
+        parser.stream_max_tokens = 5
+        text = _stream(mock, parser)
+    assert text == json.dumps(_MOCK_RESULT)[:20]
+    stats = parser.get_stream_stats()
+    assert stats["token_ceiling_hits"] == 1 and stats["early_stops"] == 0 and stats["tokens"] == 5
+
+    # 未设置 OLLAMA_STREAM_MAX_TOKENS 时以 num_predict 为上限
+    with MockOllamaServer(MockBehavior(seed=1)) as mock:
+        parser = LLMParser(Config())
+        parser.stream_max_tokens = 0
+        _stream(mock, parser, num_predict=3)
+    assert parser.get_stream_stats()["tokens"] == 3
+
+
+def test_stream_records_ttft_and_throughput():
+    with MockOllamaServer(MockBehavior(latency_ms=100, seed=1)) as mock:
+        parser = LLMParser(Config())
+        parser.stream_max_tokens = 0
+        _stream(mock, parser)
+        _stream(mock, parser)
+    stats = parser.get_stream_stats()
+    assert stats["requests"] == 2 and stats["ttft_samples"] == 2
+    assert 0.1 <= stats["avg_ttft_secs"] < 1.0 and stats["ttft_max_secs"] >= 0.1
+    assert stats["tokens_per_sec"] > 0
+
+
+if __name__ == "__main__":
+    test_scanner_stops_at_first_complete_object()
+    test_scanner_incomplete_object()
+    test_stream_closes_after_first_complete_object()
+    test_stream_token_ceiling_aborts()
+    test_stream_records_ttft_and_throughput()
+    print("\n🎉 流式生成测试通过!")
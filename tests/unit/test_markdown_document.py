@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+测试Markdown文档索引：标题切分、章节查找与题录截取
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.markdown_document import MarkdownDocument
+
+SAMPLE = """# A Study of Things
+
+Jane Doe, John Smith
+
+# Abstract
+
+First line.
+Second line.
+
+Keywords: alpha; beta
+
+# 1. Introduction
+
+Body text.
+
+## 1.1 Details
+
+More.
+
+# References
+
+[1] Ref one.
+[2] Ref two.
+"""
+
+
+def test_headings_and_sections():
+    doc = MarkdownDocument(SAMPLE)
+    assert doc.first_heading() == "A Study of Things"
+    assert [h.title for h in doc.headings] == ["A Study of Things", "Abstract", "1. Introduction", "1.1 Details", "References"]
+    assert doc.section(["A B S T R A C T", "abstract"]) == "First line.\nSecond line.\n\nKeywords: alpha; beta"
+    # 二级标题不截断一级章节
+    assert doc.section("1. Introduction") == "Body text.\n\n## 1.1 Details\n\nMore."
+    assert doc.section("References").splitlines() == ["[1] Ref one.", "[2] Ref two."]
+    assert doc.section("Conclusion") == ""
+
+
+def test_offsets_and_front_matter():
+    text = SAMPLE.replace("\n", "\r\n")
+    doc = MarkdownDocument(text)
+    h = doc.find_heading("abstract")
+    assert text[h.start:h.body_start] == "# Abstract"
+    assert doc.line_at(h.start) == h.line_no
+    assert doc.front_matter().endswith("Keywords: alpha; beta")
+    assert "Body text" not in doc.front_matter()
+
+
+if __name__ == "__main__":
+    test_headings_and_sections()
+    test_offsets_and_front_matter()
+    print("\n🎉 Markdown文档索引测试通过!")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+测试流水线指标：分片计数器并发递增、后台采样线程启停与探针失败隔离、
+Prometheus 文本格式与 HTTP 导出
+"""
+
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.metrics import (
+    MetricsRegistry, MetricsSampler, StageCounters, STAGE_DOCUMENTS, STAGE_INFLIGHT,
+    start_exporter, stop_exporter, track_stage,
+)
+
+
+def test_counters_concurrent_increments():
+    counters = StageCounters()
+
+    def work():
+        for _ in range(10000):
+            counters.incr("md_parsed")
+        counters.incr("json_imported", 5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snapshot = counters.snapshot()
+    assert snapshot == {"md_parsed": 80000, "json_imported": 40}
+    assert counters.get("md_parsed") == 80000
+    assert counters.get("pdf_failed") == 0
+
+
+def test_counters_fold_exited_threads():
+    # 自动伸缩反复创建、退出工作线程：分片数不随线程总数增长
+    counters = StageCounters()
+    for _ in range(50):
+        threads = [threading.Thread(target=counters.incr, args=("md_parsed",)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    counters.incr("md_parsed")
+    assert counters.snapshot() == {"md_parsed": 201}
+    assert counters.get("md_parsed") == 201
+    assert len(counters._shards) == 1
+
+
+def test_sampler_background_and_probe_isolation():
+    calls = []
+
+    def broken():
+        raise RuntimeError("nvml unavailable")
+
+    sampler = MetricsSampler(
+        0.05,
+        probes={"queue": lambda: {"pdf_queue_size": 3}, "gpu": broken},
+        on_sample=calls.append,
+    )
+    assert sampler.snapshot() == {}
+    sampler.start()
+    deadline = time.time() + 5
+    while len(calls) < 2 and time.time() < deadline:
+        time.sleep(0.02)
+    sampler.stop()
+    assert len(calls) >= 2
+    # 失败的探针不影响其他探针结果
+    assert sampler.snapshot()["pdf_queue_size"] == 3
+    stopped_at = len(calls)
+    time.sleep(0.15)
+    assert len(calls) == stopped_at
+
+    sample = sampler.sample_now()
+    assert sample["pdf_queue_size"] == 3 and "timestamp" in sample
+
+
+def test_registry_text_format():
+    registry = MetricsRegistry()
+    docs = registry.counter("t_docs_total", "文档数", ("stage",))
+    docs.inc(stage="pdf")
+    docs.inc(2, stage="pdf")
+    assert registry.counter("t_docs_total", "文档数", ("stage",)) is docs
+    latency = registry.histogram("t_seconds", "耗时", ("op",), buckets=(0.1, 1))
+    latency.observe(0.05, op="q")
+    latency.observe(0.5, op="q")
+    latency.observe(5, op="q")
+    registry.gauge("t_inflight", "进行中").set(4)
+    registry.register_collector("queues", lambda: [("t_queue_depth", "gauge", "队列", [({"queue": 'a"b'}, 7)])])
+    registry.register_collector("broken", lambda: 1 / 0)
+
+    text = registry.render()
+    assert "# TYPE t_docs_total counter" in text
+    assert 't_docs_total{stage="pdf"} 3' in text
+    assert 't_seconds_bucket{op="q",le="0.1"} 1' in text
+    assert 't_seconds_bucket{op="q",le="1"} 2' in text
+    assert 't_seconds_bucket{op="q",le="+Inf"} 3' in text
+    assert 't_seconds_count{op="q"} 3' in text and 't_seconds_sum{op="q"} 5.55' in text
+    assert "t_inflight 4" in text
+    assert 't_queue_depth{queue="a\\"b"} 7' in text
+
+
+def test_registry_counter_from_short_lived_threads():
+    # 每篇文档一个的对冲请求线程：计数不按线程分片累积
+    registry = MetricsRegistry()
+    hits = registry.counter("t_cache_total", "缓存", ("result",))
+    for _ in range(50):
+        threads = [threading.Thread(target=hits.inc, kwargs={"result": "hit"}) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert hits.value(result="hit") == 200
+    assert 't_cache_total{result="hit"} 200' in registry.render()
+
+    other = MetricsRegistry()
+    other.merge_state(registry.export_state())
+    assert other.counter("t_cache_total", "缓存", ("result",)).value(result="hit") == 200
+
+
+def test_track_stage_and_exporter():
+    @track_stage("t_stage")
+    def work(ok):
+        assert STAGE_INFLIGHT.value(stage="t_stage") == 1
+        if ok is None:
+            raise ValueError("boom")
+        return ok
+
+    work(True)
+    work(False)
+    try:
+        work(None)
+    except ValueError:
+        pass
+    assert STAGE_DOCUMENTS.value(stage="t_stage", outcome="ok") == 1
+    assert STAGE_DOCUMENTS.value(stage="t_stage", outcome="failed") == 2
+    assert STAGE_INFLIGHT.value(stage="t_stage") == 0
+
+    server = start_exporter(0, "127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = resp.read().decode("utf-8")
+        assert 'kg_stage_documents_total{stage="t_stage",outcome="failed"} 2' in body
+    finally:
+        stop_exporter()
+
+
+if __name__ == "__main__":
+    test_counters_concurrent_increments()
+    test_counters_fold_exited_threads()
+    test_sampler_background_and_probe_isolation()
+    test_registry_text_format()
+    test_registry_counter_from_short_lived_threads()
+    test_track_stage_and_exporter()
+    print("\n🎉 流水线指标测试通过!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+测试端到端压测组件：合成语料 + MinerU 替身生成 Markdown、内存数据库语义、基线对比
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from bench_corpus import generate_corpus
+from memory_db import MemoryDatabase
+from benchmark_pipeline import compare_with_baseline
+
+
+def test_stub_mineru_writes_markdown():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pdfs = generate_corpus(tmp / 'corpus', 3, median_pages=4, seed=1)
+        assert len(pdfs) == 3
+        # 同一种子生成同一语料
+        again = generate_corpus(tmp / 'again', 3, median_pages=4, seed=1)
+        assert [p.read_bytes() for p in pdfs] == [p.read_bytes() for p in again]
+
+        env = dict(os.environ, STUB_MINERU_STARTUP_MS='0', STUB_MINERU_PAGE_MS='0', STUB_MINERU_FAIL_RATE='0')
+        out = tmp / 'out'
+        proc = subprocess.run(
+            [sys.executable, str(ROOT / 'scripts' / 'stub_mineru.py'), '-p', str(pdfs[0]), '-o', str(out),
+             '-b', 'pipeline', '-d', 'cpu', '-m', 'auto', '-l', 'en', '--source', 'huggingface'],
+            env=env, capture_output=True, text=True, timeout=60)
+        assert proc.returncode == 0, proc.stderr
+        md_files = list(out.rglob('*.md'))
+        assert [p.name for p in md_files] == [f"{pdfs[0].stem}.md"]
+        assert md_files[0].read_text(encoding='utf-8').startswith('# ')
+
+
+def test_memory_db_get_or_create_and_links():
+    db = MemoryDatabase()
+    a = db.get_or_create_id('author', 'name', 'Zhang San')
+    assert db.get_or_create_id('author', 'name', 'Zhang San') == a
+    assert db.execute_query("SELECT id FROM author WHERE name = %s", ('Zhang San',)) == [{'id': a}]
+    assert db.execute_query("SELECT id FROM author WHERE name = %s", ('Li Si',)) == []
+
+    paper = db.insert_and_get_id("INSERT INTO paper (title, year) VALUES (%s, %s) RETURNING id", ('T', 2020))
+    assert db.execute_query("SELECT id FROM paper WHERE title = %s", ('T',)) == [{'id': paper}]
+    sql = "INSERT INTO paper_author (paper_id, author_id, author_order) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING"
+    assert db.execute_batch_update(sql, [(paper, a, 1), (paper, a, 1)]) == 1
+    assert db.count('paper') == 1 and db.count('paper_author') == 1
+    assert db.op_counts['get_or_create_id'] == 2
+
+
+def test_baseline_diff_by_run_key():
+    def run(tp, p95):
+        return {"mode": "dual", "workers": 2, "throughput_docs_per_sec": tp, "doc_latency": {"p95_ms": p95}}
+    diff = compare_with_baseline({"runs": [run(2.0, 1200.0)]}, {"runs": [run(4.0, 1000.0)]})
+    assert diff["dual-w2"]["throughput"]["delta_pct"] == 50.0
+    assert diff["dual-w2"]["p95_ms"]["delta_pct"] == 20.0
+    assert compare_with_baseline({"runs": [run(2.0, 1.0)]}, {"runs": []}) == {}
+
+
+if __name__ == "__main__":
+    test_stub_mineru_writes_markdown()
+    test_memory_db_get_or_create_and_links()
+    test_baseline_diff_by_run_key()
+    print("\n🎉 端到端压测组件测试通过!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+测试版本化提示模板：静态前缀稳定、正文在末尾，以及前缀缓存命中统计
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.config import Config
+from src.core.llm_parser import LLMParser
+from src.core.prompt_templates import get_template
+
+
+def test_prefix_is_stable_and_document_last():
+    parser = LLMParser(Config())
+    assert parser.prompt_template.key == "metadata@v2"
+
+    p1 = parser._build_prompt("# Paper A\n\nBody A")
+    p2 = parser._build_prompt("# Paper B\n\nSomething else")
+    tpl = parser.prompt_template
+    assert tpl.prefix_of(p1) == tpl.prefix_of(p2)
+    assert p1.endswith("Body A") and "Rules:" in tpl.prefix_of(p1)
+
+    # 按文档变化的字段子集不进入前缀
+    p3 = parser._build_prompt("# Paper C\n\nBody C", fields=["year"])
+    p4 = parser._build_prompt("# Paper D\n\nBody D", fields=["title", "venue"])
+    assert tpl.prefix_of(p3) == tpl.prefix_of(p4) == tpl.prefix_of(p1)[: len(tpl.prefix_of(p3))]
+    assert p3.index("Return only these fields: year.") > p3.index("Rules:")
+
+    # 旧布局：规则在正文之后
+    legacy = get_template("metadata", 1).render("BODY", {"title": "string"})
+    assert legacy.index("BODY") < legacy.index("Rules:")
+
+
+def test_batch_prompt_documents_last():
+    parser = LLMParser(Config())
+    prompt = parser._build_batch_prompt([{"index": 0, "text": "DOC ZERO", "fields": None}])
+    assert parser.batch_template.prefix_of(prompt).endswith("Documents:\n")
+    assert prompt.rstrip().endswith("DOC ZERO")
+
+
+def test_prompt_eval_stats():
+    parser = LLMParser(Config())
+    tpl = parser.prompt_template
+    prompt = parser._build_prompt("x" * 2000)
+    total = len(prompt) // 4
+    parser._record_prompt_eval(tpl, prompt, {"prompt_eval_count": total, "prompt_eval_duration": 40_000_000})
+    parser._record_prompt_eval(tpl, prompt, {"prompt_eval_count": 500, "prompt_eval_duration": 10_000_000})
+    parser._record_prompt_eval(tpl, prompt, {})  # 无统计字段时忽略
+
+    st = parser.get_prompt_stats()["metadata@v2"]
+    assert st["requests"] == 2
+    assert st["cache_hits"] == 1
+    assert st["avg_prompt_eval_ms"] == 25.0
+
+
+if __name__ == "__main__":
+    test_prefix_is_stable_and_document_last()
+    test_batch_prompt_documents_last()
+    test_prompt_eval_stats()
+    print("\n🎉 提示模板测试通过!")
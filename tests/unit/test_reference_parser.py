@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+测试参考文献结构化解析：编号式/作者-年份式切分、DOI 断行修复与字段抽取
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.llm_parser import LLMParser
+from src.core.reference_parser import (
+    normalize_doi,
+    parse_reference,
+    parse_reference_lines,
+    parse_references,
+    split_references,
+    title_fingerprint,
+)
+
+MD_DIR = Path(__file__).parent.parent / "data" / "md"
+
+
+def test_numbered_split_merges_continuations():
+    section = (
+        "[1] A. Smith, B. Jones, Removal of nitrate by anaerobic\n"
+        "membrane bioreactors, Water Res. 12 (2019) 1–10. [2] C. Lee, Another paper on things, "
+        "J. Hazard. Mater. 3 (2020) 5.\n"
+        "[3] D. Wu, Third paper title here, Chem. Eng. J. 1 (2021) 2.\n"
+    )
+    refs = parse_references(section)
+    assert [r.label for r in refs] == ["1", "2", "3"]
+    assert refs[0].title == "Removal of nitrate by anaerobic membrane bioreactors"
+    assert refs[0].first_author == "Smith" and refs[0].year == 2019
+    assert refs[2].title == "Third paper title here"
+
+
+def test_author_year_split():
+    section = (
+        "Atlas, E., Sullivan, K., Giam, C.S., 1986. Widespread occurrence of polyhalogenated\n"
+        "aromatic ethers in marine atmosphere. Atmos. Environ. 20, 1217–1220.\n"
+        "Benanou, D., 2003. When drinking water stinks to high heaven. Water Res. 37, 1–2.\n"
+    )
+    pairs = split_references(section)
+    assert len(pairs) == 2
+    ref = parse_reference(1, pairs[0][1])
+    assert ref.year == 1986 and ref.first_author == "Atlas"
+    assert ref.title == "Widespread occurrence of polyhalogenated aromatic ethers in marine atmosphere"
+
+    # 标题后折行的期刊名：以大写开头、上一行以句点结尾，但不是新条目
+    section = (
+        "van der Berg, K. (2018a). Groundwater recharge under climate change.\n"
+        "Water Resources Research, 54(3), 1-10.\n"
+        "Le Roux, A., 2019. Coastal aquifers. Nature 1, 2.\n"
+    )
+    pairs = split_references(section)
+    assert len(pairs) == 2
+    ref = parse_reference(1, pairs[0][1])
+    assert ref.first_author == "van der Berg" and ref.year == 2018
+    assert pairs[0][1].endswith("Water Resources Research, 54(3), 1-10.")
+    assert parse_reference(2, pairs[1][1]).first_author == "Le Roux"
+
+
+def test_first_author_stops_before_title():
+    ref = parse_reference(1, "Brown T. et al. Language models are few-shot learners, 2020.")
+    assert ref.first_author == "Brown" and ref.year == 2020
+    assert parse_reference(2, "Brown T, Mann B. Language models, 2020.").first_author == "Brown"
+    assert parse_reference(3, "A. Smith, B. Jones, Removal of nitrate, 2019.").first_author == "Smith"
+
+
+def test_broken_doi_repair():
+    cases = {
+        "Anderson, M.J., 2008. PERMANOVA. PRIMER-E. https://doi. org/10.13564/j.cnki.issn.1672-9382.2013.01.010.":
+            "10.13564/j.cnki.issn.1672-9382.2013.01.010",
+        "Arévalo, R., 2007. Changes. Mar. Pollut. Bull. 55. https://doi.org/10.1016/j.marpolbul. 2006.08.023.":
+            "10.1016/j.marpolbul.2006.08.023",
+        "Castro, P., 2007. Eutrophication. Mar. Ecol. Prog. Ser. 351. https://doi.org/10.3354/ meps07173.":
+            "10.3354/meps07173",
+    }
+    for text, doi in cases.items():
+        assert parse_reference(1, text).doi == doi
+    assert normalize_doi("https://doi.org/10.1000/ABC.") == "10.1000/abc"
+    assert normalize_doi("not a doi") is None
+
+
+def test_compact_dict_and_fingerprint():
+    d = parse_reference(3, "Smith J, Jones K. Removal of nitrate by anaerobic membrane bioreactors. "
+                           "Water Res. 2019;12:1-10.", label="3").to_dict()
+    assert "label" not in d and "doi" not in d
+    assert d["n"] == 3 and d["year"] == 2019 and d["author"] == "Smith"
+    assert title_fingerprint("Removal of Nitrate: by anaerobic membrane") == "removalofnitratebyanaerobicmembrane"
+    assert title_fingerprint("Short") is None
+    assert parse_reference_lines(["", "Benanou, D., 2003. When drinking water stinks."])[0]["year"] == 2003
+
+
+def test_sample_documents_not_capped():
+    parser = LLMParser(None)
+    parser.llm_policy = "never"
+    for md in sorted(MD_DIR.glob("*.md")):
+        result = parser.parse_markdown_file(str(md))
+        refs, parsed = result["references"], result["parsed_references"]
+        assert len(refs) == len(parsed) > 50
+        assert sum(1 for p in parsed if p.get("year")) >= len(parsed) * 0.9
+
+
+if __name__ == "__main__":
+    test_numbered_split_merges_continuations()
+    test_author_year_split()
+    test_first_author_stops_before_title()
+    test_broken_doi_repair()
+    test_compact_dict_and_fingerprint()
+    test_sample_documents_not_capped()
+    print("\n🎉 参考文献解析测试通过!")
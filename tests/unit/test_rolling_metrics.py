@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试固定内存的性能统计：分位数草图误差与桶数上限、窗口速率、环形缓冲区，双卡流水线性能日志不再随采样增长
+"""
+
+import os
+import sys
+import json
+import random
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core.rolling_metrics import QuantileSketch, RingBuffer, RollingMetrics, WindowedRate
+from memory_db import MemoryDatabase
+
+
+def test_sketch_quantiles_within_relative_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 1.5) for _ in range(50000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+    values.sort()
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact < 0.03
+    assert sketch.count == len(values) and sketch.max == values[-1]
+    # 桶数与样本数无关
+    assert len(sketch.bins) < 2048
+
+    # 合并两个草图等价于合并样本
+    a, b = QuantileSketch(), QuantileSketch()
+    for i, v in enumerate(values):
+        (a if i % 2 else b).add(v)
+    a.merge(b)
+    assert a.count == sketch.count and abs(a.quantile(0.9) - sketch.quantile(0.9)) < 1e-9
+
+
+def test_sketch_bucket_limit_and_zero_values():
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=50)
+    for i in range(1, 5000):
+        sketch.add(i * 0.37)
+    sketch.add(0.0)
+    assert len(sketch.bins) <= 50
+    assert sketch.quantile(0.0) == 0.0
+    assert abs(sketch.quantile(0.99) - 0.99 * 4999 * 0.37) / (0.99 * 4999 * 0.37) < 0.03
+
+
+def test_windowed_rate_and_ring_buffer():
+    rate = WindowedRate(window_secs=10)
+    for t in range(100):
+        rate.add(2, now=1000 + t)
+    # 只统计最近10秒
+    assert abs(rate.rate(now=1099.5) - 2.0) < 0.25
+    assert rate.rate(now=1200) == 0.0
+
+    ring = RingBuffer(3)
+    for i in range(10):
+        ring.append(i)
+    assert ring.recent() == [7, 8, 9] and ring.recent(2) == [8, 9] and ring.total == 10
+
+
+def test_report_computed_from_sketches():
+    metrics = RollingMetrics(sample_capacity=4, window_secs=10)
+    for i in range(1, 101):
+        metrics.observe("parse_seconds", i / 10, now=500 + i / 10)
+        metrics.add_sample({"i": i})
+    metrics.incr("pdf_processed", 100, now=510)
+    report = metrics.report(now=510)
+    entry = report["metrics"]["parse_seconds"]
+    assert entry["count"] == 100 and abs(entry["mean"] - 5.05) < 1e-9
+    assert abs(entry["p50"] - 5.0) / 5.0 < 0.03 and entry["max"] == 10.0
+    assert report["counters"]["pdf_processed"]["total"] == 100
+    assert report["samples_kept"] == 4 and report["samples_total"] == 100
+    assert metrics.count("pdf_processed") == 100
+
+
+def test_dual_pipeline_performance_log_is_bounded():
+    from src.core.dual_gpu_pipeline import DualGPUPipeline
+    saved = {k: os.environ.get(k) for k in ("PERF_LOG_CAPACITY", "PERF_LOG_FLUSH_EVERY")}
+    os.environ.update({"PERF_LOG_CAPACITY": "5", "PERF_LOG_FLUSH_EVERY": "10"})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            config = Config().with_paths(output_dir=Path(tmp) / 'output', logs_dir=Path(tmp) / 'logs')
+            config.setup_directories()
+            pipeline = DualGPUPipeline(config, db=MemoryDatabase())
+            for _ in range(23):
+                pipeline.log_performance()
+            pipeline.save_performance_log()
+            lines = (Path(tmp) / 'logs' / 'dual_gpu_performance.jsonl').read_text().splitlines()
+            # 写入间隔不超过缓冲区容量：每5条写入一次，最后3条由收尾写入，不丢采样
+            assert len(lines) == 23 and "stats" in json.loads(lines[-1])
+            assert len(pipeline.perf_metrics.samples) == 5
+            assert pipeline.perf_metrics.report()["metrics"]["pdf_queue_size"]["count"] == 23
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+if __name__ == "__main__":
+    test_sketch_quantiles_within_relative_error()
+    test_sketch_bucket_limit_and_zero_values()
+    test_windowed_rate_and_ring_buffer()
+    test_report_computed_from_sketches()
+    test_dual_pipeline_performance_log_is_bounded()
+    print("\n🎉 固定内存性能统计测试通过!")
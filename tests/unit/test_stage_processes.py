@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+测试多进程阶段：子进程解析结果、追踪记录与指标增量交回主进程，/metrics 与线程模式一致
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import tracing
+from src.core.config import Config
+from src.core.metrics import STAGE_DOCUMENTS, MetricsRegistry, state_delta
+from src.core.stage_processes import StageProcessPool, parse_stage_list
+
+MD_DIR = Path(__file__).parent.parent / 'data' / 'md'
+
+
+def test_state_delta_merges_into_registry():
+    child = MetricsRegistry()
+    docs = child.counter("t_docs_total", "docs", ("stage",))
+    secs = child.histogram("t_secs", "secs", ("stage",), buckets=(1, 10))
+    base = child.export_state()
+    docs.inc(stage="parse")
+    secs.observe(0.5, stage="parse")
+    first = child.export_state()
+    docs.inc(2, stage="parse")
+    secs.observe(5, stage="parse")
+    second = child.export_state()
+
+    parent = MetricsRegistry()
+    parent.merge_state(state_delta(base, first))
+    parent.merge_state(state_delta(first, second))
+    # 无变化时增量为空
+    assert state_delta(second, child.export_state()) == {}
+    assert parent.counter("t_docs_total", "docs", ("stage",)).value(stage="parse") == 3
+    hist = parent.histogram("t_secs", "secs", ("stage",), buckets=(1, 10))
+    assert hist.count(stage="parse") == 2
+    assert 't_secs_sum{stage="parse"} 5.5' in parent.render()
+
+
+def test_parse_stage_list():
+    assert parse_stage_list("md, import,md,pdf,bogus") == ["md", "import"]
+    assert parse_stage_list("") == []
+
+
+def test_md_stage_in_worker_process():
+    md_file = sorted(MD_DIR.glob('*.md'))[0]
+    before = STAGE_DOCUMENTS.value(stage="parse", outcome="ok")
+    os.environ['LLM_INVOKE_POLICY'] = 'never'
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_file = Path(tmp) / 'traces.jsonl'
+        tracing.set_sink(tracing.TraceSink(trace_file, flush_every=1))
+        try:
+            # spawn 启动的子进程继承当前环境变量（启发式模式，不发起LLM调用）
+            with StageProcessPool("md", Config(), processes=1, start_method="spawn") as pool:
+                data = pool.parse_markdown(md_file, tracing.new_trace(md_file.stem))
+                try:
+                    pool.import_batch([])
+                    assert False, "md 阶段进程池不应执行入库"
+                except RuntimeError:
+                    pass
+        finally:
+            tracing.set_sink(None)
+            os.environ.pop('LLM_INVOKE_POLICY', None)
+        records = tracing.load_records(trace_file)
+
+    assert data and data.get("title")
+    assert STAGE_DOCUMENTS.value(stage="parse", outcome="ok") == before + 1
+    spans = {r["s"] for r in records}
+    assert "parse.document" in spans
+    assert all(r["run"] == tracing.RUN_ID and r["t"] == tracing.trace_id_for(md_file.stem) for r in records)
+
+
+if __name__ == "__main__":
+    test_state_delta_merges_into_registry()
+    test_parse_stage_list()
+    test_md_stage_in_worker_process()
+    print("\n🎉 多进程阶段测试通过!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试流式管道：PDF转换完成即入库，已有Markdown一并导入，结果字典与分阶段模式一致
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core.pipeline import KnowledgePipeline
+from bench_corpus import generate_corpus
+from memory_db import MemoryDatabase
+
+STUB_ENV = {'STUB_MINERU_STARTUP_MS': '0', 'STUB_MINERU_PAGE_MS': '0', 'STUB_MINERU_FAIL_RATE': '0',
+            'LLM_INVOKE_POLICY': 'never'}
+
+
+def _pipeline(tmp: Path, db: MemoryDatabase) -> KnowledgePipeline:
+    config = Config().with_paths(
+        input_dir=tmp / 'corpus',
+        output_dir=tmp / 'output',
+        processed_dir=tmp / 'processed',
+        logs_dir=tmp / 'logs',
+        temp_dir=tmp / 'temp',
+    ).with_mineru(mineru_path=str(ROOT / 'scripts' / 'stub_mineru.py')).with_parallel(pdf_max_workers=2)
+    config.setup_directories()
+    return KnowledgePipeline(config, db=db)
+
+
+def test_streaming_imports_converted_and_existing_markdown():
+    saved = {k: os.environ.get(k) for k in STUB_ENV}
+    os.environ.update(STUB_ENV)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            pdfs = generate_corpus(tmp / 'corpus', 4, median_pages=2, seed=3)
+            # 上次运行留下的Markdown：对应PDF被跳过，但仍需导入
+            extra = generate_corpus(tmp / 'extra', 1, median_pages=2, seed=4)[0]
+            md_dir = tmp / 'output' / 'markdown'
+            md_dir.mkdir(parents=True)
+            raw = extra.read_bytes()
+            (md_dir / f"{extra.stem}.md").write_bytes(raw[raw.index(b"\n%%MD\n") + 6:])
+
+            db = MemoryDatabase()
+            results = _pipeline(tmp, db).run_full_pipeline(streaming=True)
+            assert results['success'], results.get('error')
+            assert results['pdf_processing']['processed'] == len(pdfs)
+            assert results['data_import'] == {"imported": 5, "skipped": 0, "failed": 0, "errors": []}
+            assert db.count('paper') == 5
+
+            # 再次运行：PDF全部跳过，limit_md 限制导入数量
+            db = MemoryDatabase()
+            results = _pipeline(tmp, db).run_full_pipeline(streaming=True, limit_md=2)
+            assert results['pdf_processing']['processed'] == 0
+            assert results['data_import']['imported'] == 2
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def test_backlog_does_not_delay_pdf_conversion():
+    env = dict(STUB_ENV, STREAMING_QUEUE_SIZE='1')
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            generate_corpus(tmp / 'corpus', 2, median_pages=2, seed=5)
+            # 存量Markdown远多于队列长度
+            md_dir = tmp / 'output' / 'markdown'
+            md_dir.mkdir(parents=True)
+            for pdf in generate_corpus(tmp / 'extra', 6, median_pages=2, seed=6):
+                raw = pdf.read_bytes()
+                (md_dir / f"{pdf.stem}.md").write_bytes(raw[raw.index(b"\n%%MD\n") + 6:])
+
+            pipeline = _pipeline(tmp, MemoryDatabase())
+            pdf_started = threading.Event()
+            imported_before_start = []
+            process_batch = pipeline.pdf_processor.process_batch
+            import_with_retry = pipeline.data_importer.import_with_retry
+
+            def start_pdfs(*args, **kwargs):
+                pdf_started.set()
+                return process_batch(*args, **kwargs)
+
+            def slow_import(*args, **kwargs):
+                # 入库在PDF转换开始前不推进：若存量文件阻塞了调度线程，这里会等到超时
+                if not pdf_started.wait(5):
+                    imported_before_start.append(args[0])
+                return import_with_retry(*args, **kwargs)
+
+            pipeline.pdf_processor.process_batch = start_pdfs
+            pipeline.data_importer.import_with_retry = slow_import
+            results = pipeline.run_full_pipeline(streaming=True)
+            assert imported_before_start == []
+            assert results['pdf_processing']['processed'] == 2
+            assert results['data_import']['imported'] == 8
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+if __name__ == "__main__":
+    test_streaming_imports_converted_and_existing_markdown()
+    test_backlog_does_not_delay_pdf_conversion()
+    print("\n🎉 流式管道测试通过!")
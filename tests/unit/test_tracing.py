@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试文档级追踪：未启用时为空操作、跨队列传递上下文、对冲线程继承当前文档、报告汇总
+"""
+
+import contextvars
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import tracing
+
+
+def test_disabled_is_noop():
+    tracing.set_sink(None)
+    with tracing.document("paper-a"):
+        with tracing.span("db.query") as sp:
+            sp["outcome"] = "ok"
+    assert not tracing.enabled()
+
+
+def test_spans_follow_document_across_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "traces.jsonl"
+        tracing.set_sink(tracing.TraceSink(path, flush_every=1000))
+        try:
+            # 生产者入队 → 消费线程出队并激活同一上下文
+            ctx = tracing.mark_enqueued(tracing.new_trace("paper-b"))
+            time.sleep(0.01)
+
+            def consumer():
+                tracing.record_queue_wait(ctx, "md")
+                with tracing.activate(ctx):
+                    with tracing.span("parse.heuristic"):
+                        pass
+                    # 对冲请求在线程池中执行，需复制上下文
+                    t = threading.Thread(target=contextvars.copy_context().run,
+                                         args=(lambda: tracing.record("llm.attempt", time.time(), 0.25, model="m"),))
+                    t.start()
+                    t.join()
+                    try:
+                        with tracing.span("db.insert"):
+                            raise ValueError("dup")
+                    except ValueError:
+                        pass
+
+            worker = threading.Thread(target=consumer)
+            worker.start()
+            worker.join()
+            # 上下文之外的 span 不记录
+            with tracing.span("db.query"):
+                pass
+            tracing.flush()
+
+            records = tracing.load_records(path)
+            names = [r["s"] for r in records]
+            assert names == ["queue.md", "parse.heuristic", "llm.attempt", "db.insert"]
+            assert {r["t"] for r in records} == {tracing.trace_id_for("paper-b")}
+            assert records[0]["ms"] >= 10
+            assert records[2]["a"] == {"model": "m"} and records[2]["ms"] == 250.0
+            assert records[3]["a"] == {"error": "ValueError"}
+        finally:
+            tracing.set_sink(None)
+
+
+def test_summarize_breakdown_and_slowest():
+    records = [
+        {"run": "r1", "t": "a", "doc": "A", "s": "queue.pdf", "ts": 100.0, "ms": 1000.0},
+        {"run": "r1", "t": "a", "doc": "A", "s": "pdf.mineru", "ts": 101.0, "ms": 4000.0},
+        {"run": "r1", "t": "b", "doc": "B", "s": "pdf.mineru", "ts": 100.0, "ms": 2000.0},
+        {"run": "r1", "t": "b", "doc": "B", "s": "llm.attempt", "ts": 102.0, "ms": 500.0},
+        {"run": "r1", "t": "b", "doc": "B", "s": "llm.attempt", "ts": 102.5, "ms": 700.0},
+    ]
+    report = tracing.summarize(records, slowest=1)
+    assert report["documents"] == 2 and report["spans"] == 5
+    mineru = next(s for s in report["stages"] if s["span"] == "pdf.mineru")
+    assert mineru["count"] == 2 and mineru["total_ms"] == 6000.0 and mineru["max_ms"] == 4000.0
+    assert report["stages"][0]["span"] == "pdf.mineru"
+    slow = report["slowest"]
+    assert len(slow) == 1 and slow[0]["doc"] == "A" and slow[0]["wall_ms"] == 5000.0
+    assert list(slow[0]["spans"]) == ["pdf.mineru", "queue.pdf"]
+
+
+if __name__ == "__main__":
+    test_disabled_is_noop()
+    test_spans_follow_document_across_threads()
+    test_summarize_breakdown_and_slowest()
+    print("\n🎉 文档追踪测试通过!")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+测试多节点协调：process_batch 按需领取并回报工作单元；
+本机有 Postgres 时，多个进程从同一张租约表领取，单元不重复、不遗漏，过期租约由其他节点接手
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录与 scripts 目录到Python路径
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+from src.core.config import Config
+from src.core.pdf_processor import PDFProcessor
+from bench_corpus import generate_corpus
+
+STUB_ENV = {'STUB_MINERU_STARTUP_MS': '0', 'STUB_MINERU_PAGE_MS': '0', 'STUB_MINERU_FAIL_RATE': '0'}
+TABLE = f"work_lease_test_{os.getpid()}"
+
+
+class _LocalLease:
+    """与 WorkLease 接口一致的进程内实现，记录领取与回报顺序"""
+
+    def __init__(self, input_dir: Path):
+        self.input_dir = input_dir
+        self.units = []
+        self.claimed = []
+        self.completed = {}
+        self.started = self.stopped = False
+
+    def seed(self, pdf_files):
+        self.units = [p for p in pdf_files if p not in self.units]
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+    def claims(self, batch_size, limit=None):
+        while self.units and (limit is None or len(self.claimed) < limit):
+            pf = self.units.pop(0)
+            self.claimed.append(pf)
+            yield pf
+
+    def complete(self, pdf_path, success, duration=0.0, error=""):
+        assert pdf_path not in self.completed
+        self.completed[pdf_path] = success
+        return True
+
+    def node_report(self):
+        return [{"node_id": "local", "processed": sum(self.completed.values())}]
+
+
+def _processor(tmp: Path) -> PDFProcessor:
+    config = Config().with_paths(
+        input_dir=tmp / 'corpus',
+        output_dir=tmp / 'output',
+        processed_dir=tmp / 'processed',
+        logs_dir=tmp / 'logs',
+        temp_dir=tmp / 'temp',
+    ).with_mineru(mineru_path=str(ROOT / 'scripts' / 'stub_mineru.py')).with_parallel(pdf_max_workers=2)
+    config.setup_directories()
+    return PDFProcessor(config)
+
+
+def test_process_batch_claims_and_completes_units():
+    saved = {k: os.environ.get(k) for k in STUB_ENV}
+    os.environ.update(STUB_ENV)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            pdfs = generate_corpus(tmp / 'corpus', 5, median_pages=2, seed=21)
+            processor = _processor(tmp)
+            md_dir = tmp / 'output' / 'markdown'
+
+            lease = _LocalLease(tmp / 'corpus')
+            results = processor.process_batch(tmp / 'corpus', md_dir, limit=3, lease=lease)
+            assert lease.started and lease.stopped
+            assert results['processed'] == 3 and results['lease_nodes'][0]['node_id'] == 'local'
+            assert len(lease.claimed) == 3 and all(lease.completed[p] for p in lease.claimed)
+
+            # 本地已处理的单元（如其他节点曾分配给本机）直接回报完成
+            lease = _LocalLease(tmp / 'corpus')
+            results = processor.process_batch(tmp / 'corpus', md_dir, lease=lease)
+            assert results['processed'] == 2
+            assert sorted(lease.completed) == sorted(pdfs) and all(lease.completed.values())
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+# ---------------------------------------------------------------------------
+# 以下用例需要本机可连接的 Postgres（config/config.env 中的数据库配置），不可用时跳过
+# ---------------------------------------------------------------------------
+
+def _lease(node_id: str, **kwargs):
+    from src.core.database import DatabaseManager
+    from src.core.work_lease import WorkLease
+    return WorkLease(DatabaseManager(Config()), Path('/corpus'), node_id=node_id, table=TABLE, poll_secs=0.2, **kwargs)
+
+
+@pytest.fixture
+def lease_table():
+    try:
+        lease = _lease("setup")
+    except Exception as e:
+        pytest.skip(f"Postgres 不可用: {e}")
+    yield lease
+    lease.db.execute_update(f"DROP TABLE IF EXISTS {TABLE}; DROP TABLE IF EXISTS {TABLE}_node")
+
+
+def _node_main(node_id: str) -> int:
+    lease = _lease(node_id)
+    lease.start()
+    done = 0
+    try:
+        for pdf in lease.claims(batch_size=3):
+            time.sleep(0.01)
+            lease.complete(pdf, True, 0.01)
+            done += 1
+    finally:
+        lease.stop()
+    return done
+
+
+def test_nodes_share_units_without_duplicates(lease_table):
+    units = [Path('/corpus') / f"batch{i % 3}" / f"paper{i:03d}.pdf" for i in range(60)]
+    assert lease_table.seed(units) == 60
+    assert lease_table.seed(units) == 0
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(3) as pool:
+        counts = pool.map(_node_main, ["node-a", "node-b", "node-c"])
+
+    assert sum(counts) == 60
+    assert lease_table.progress() == {"done": 60}
+    rows = lease_table.db.execute_query(f"SELECT MAX(attempts) AS a FROM {TABLE}")
+    assert rows[0]["a"] == 1
+    report = {n["node_id"]: n for n in lease_table.node_report()}
+    assert sum(report[n]["processed"] for n in ("node-a", "node-b", "node-c")) == 60
+
+
+def test_expired_lease_is_taken_over(lease_table):
+    lease_table.seed([Path('/corpus') / 'a.pdf', Path('/corpus') / 'b.pdf'])
+    crashed = _lease("crashed", lease_secs=0.5)
+    assert len(crashed.claim(2)) == 2
+    other = _lease("other", lease_secs=30)
+    assert other.claim(2) == [] and other.outstanding() == 2
+    time.sleep(1.0)
+    # 崩溃节点的租约过期后不再算作进行中，claim_wait 直接接手而不是继续轮询
+    assert other.outstanding() == 0
+    taken = other.claim_wait(2)
+    assert sorted(p.name for p in taken) == ["a.pdf", "b.pdf"]
+    # 崩溃节点恢复后回报结果，租约已属于其他节点
+    assert crashed.complete(taken[0], True) is False
+    assert other.complete(taken[0], True) is True
+
+
+def test_node_report_limited_to_current_run(lease_table):
+    lease_table.db.execute_update(
+        f"INSERT INTO {TABLE}_node (node_id, host, started_at, heartbeat_at, processed) "
+        f"VALUES ('old-run', 'h', now() - interval '1 day', now() - interval '1 day', 7)")
+    assert "old-run" in {n["node_id"] for n in lease_table.node_report()}
+    current = _lease("current")
+    current.start()
+    try:
+        assert [n["node_id"] for n in current.node_report()] == ["current"]
+    finally:
+        current.stop()
+
+
+if __name__ == "__main__":
+    test_process_batch_claims_and_completes_units()
+    print("\n🎉 多节点协调测试通过!")
@@ -20,26 +20,23 @@ from src.core.pdf_processor import PDFProcessor
 from src.core.llm_parser import LLMParser
 from src.core.data_importer import DataImporter
 from src.core.database import DatabaseManager
+from src.core.metrics import start_exporter
+from src.core.rolling_metrics import RollingMetrics
 
 class PerformanceMonitor:
-    """性能监控器"""
+    """性能监控器：样本进入分位数草图与窗口速率（RollingMetrics），内存不随样本数增长"""
     def __init__(self):
-        self.metrics = {}
+        self.metrics = RollingMetrics()
         self.start_time = time.time()
 
     def record_metric(self, name, value):
-        if name not in self.metrics:
-            self.metrics[name] = []
-        self.metrics[name].append({
-            "timestamp": time.time(),
-            "value": value
-        })
+        self.metrics.observe(name, value)
 
     def calculate_throughput(self):
         elapsed = time.time() - self.start_time
         if elapsed > 0:
             # 计算处理的PDF数量（假设这是主要指标）
-            pdf_processed = len(self.metrics.get("pdf_processed", []))
+            pdf_processed = self.metrics.count("pdf_processed")
             return pdf_processed / elapsed
         return 0
 
@@ -54,13 +51,13 @@ class PerformanceMonitor:
     def identify_bottlenecks(self):
         # 简单的瓶颈识别逻辑
         bottlenecks = []
-        if self.metrics.get("pdf_processing_time"):
-            avg_time = sum([m["value"] for m in self.metrics["pdf_processing_time"]]) / len(self.metrics["pdf_processing_time"])
+        if self.metrics.count("pdf_processing_time"):
+            avg_time = self.metrics.mean("pdf_processing_time")
             if avg_time > 60:  # 如果平均处理时间超过60秒
                 bottlenecks.append("PDF处理时间过长")
 
-        if self.metrics.get("md_parsing_time"):
-            avg_time = sum([m["value"] for m in self.metrics["md_parsing_time"]]) / len(self.metrics["md_parsing_time"])
+        if self.metrics.count("md_parsing_time"):
+            avg_time = self.metrics.mean("md_parsing_time")
             if avg_time > 30:  # 如果平均解析时间超过30秒
                 bottlenecks.append("MD解析时间过长")
 
@@ -73,7 +70,8 @@ class PerformanceMonitor:
             "throughput": self.calculate_throughput(),
             "resource_usage": self.get_resource_usage(),
             "bottlenecks": self.identify_bottlenecks(),
-            "metrics": self.metrics
+            # 各指标的计数/均值/分位数/窗口速率，由草图计算，不再输出逐条样本
+            "metrics": self.metrics.report()
         }
         return report
 
@@ -127,19 +125,24 @@ class UnifiedBatchProcessor:
         input_dir = self.config.paths.input_dir
         output_dir = self.config.paths.output_dir / "markdown"
 
-        # 临时修改工作线程数
-        original_workers = self.config.parallel.pdf_max_workers
+        # 临时修改工作线程数（配置只读，使用派生视图）
+        original_config = self.pdf_processor.config
         if workers:
-            self.config.parallel.pdf_max_workers = workers
+            self.pdf_processor.config = self.config.with_parallel(pdf_max_workers=workers)
 
         try:
             self.logger.info(f"开始处理PDF文件，输入目录: {input_dir}")
-            results = self.pdf_processor.process_batch(input_dir, output_dir, limit=limit)
+            results = self.pdf_processor.process_batch(input_dir, output_dir, limit=limit,
+                                                       on_result=self._record_pdf_result)
             self.logger.info(f"PDF处理完成: {results}")
             return results
         finally:
-            # 恢复原始工作线程数
-            self.config.parallel.pdf_max_workers = original_workers
+            # 恢复原始配置
+            self.pdf_processor.config = original_config
+
+    def _record_pdf_result(self, pdf_path: Path, success: bool) -> None:
+        if success:
+            self.performance_monitor.metrics.incr("pdf_processed")
 
     def parse_mds(self, limit: Optional[int] = None):
         """解析MD文件"""
@@ -308,6 +311,13 @@ def main():
         help="指定性能报告输出路径"
     )
 
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="在该端口提供 Prometheus 格式的 /metrics（默认取 METRICS_PORT，0 表示关闭）"
+    )
+
     args = parser.parse_args()
 
     try:
@@ -316,7 +326,7 @@ def main():
 
         # 如果指定了输入目录，覆盖配置
         if args.input_dir:
-            config.paths.input_dir = args.input_dir
+            config = config.with_paths(input_dir=Path(args.input_dir))
 
         config.setup_directories()
 
@@ -328,6 +338,10 @@ def main():
         logger.info("统一批处理入口")
         logger.info("=" * 50)
 
+        # 指标导出（可选）
+        if args.metrics_port != 0:
+            start_exporter(args.metrics_port)
+
         # 创建处理器
         processor = UnifiedBatchProcessor(config)
 